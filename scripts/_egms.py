@@ -0,0 +1,29 @@
+"""Helpers shared by the scripts in this directory.
+
+Not a script itself: the scripts import it as a plain module, since the
+directory of the running script is first on sys.path.
+"""
+
+import importlib.util
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(name):
+    """Import a sibling script with a hyphenated name (e.g. bulk-load.py).
+
+    Registered in sys.modules at import time so worker processes can
+    unpickle its functions under any multiprocessing start method.
+    """
+    module_name = name.replace("-", "_")
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(
+        module_name, os.path.join(SCRIPT_DIR, f"{name}.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -5,26 +5,64 @@ Detects:
   - Added concepts (present in new, absent in old)
   - Removed concepts (present in old, absent in new)
   - Modified concepts (changed labels, definitions, relationships)
+  - Renamed concepts (same concept re-slugged to a new URI), with confidence
+
+Each snapshot is reduced to a map of concept URI -> canonical content hash
+in a single pass over its triples (both snapshots hashed in parallel).
+Only concepts whose hashes differ are expanded into property-level diffs,
+in a second pass that keeps just their tracked properties.
+In --manifest mode the hash maps are cached next to each snapshot
+(<snapshot>.hashes.json.gz, referenced from manifest.json) so later audits
+skip re-hashing entirely.
+
+Renames are found by joining the added set against a hash index of the
+removed set: identical content hashes are exact renames (confidence 1.0);
+otherwise candidates sharing a normalized definition or prefLabel bucket
+are scored by label similarity and property overlap, so no added/removed
+pair is compared outside its bucket. With --jsonl, each change is written as soon as it
+is computed, followed by a trailing {"action": "summary", ...} record.
+
+With --external the same records come from sorted-diff.py instead: both
+snapshots are sorted as N-Triples on disk (--tmp-dir, --buffer-mb) and
+merge-joined by subject, so memory does not grow with snapshot size.
 
 Usage:
     python scripts/audit-log.py snapshots/old.ttl snapshots/new.ttl
     python scripts/audit-log.py snapshots/old.ttl snapshots/new.ttl -o audit.json
     python scripts/audit-log.py --manifest snapshots/manifest.json  # compare last 2
+    python scripts/audit-log.py --index snapshots/manifest.json     # cache hashes
+    python scripts/audit-log.py old.ttl new.ttl --jsonl -o audit.jsonl  # streaming
+    python scripts/audit-log.py old.nt.gz new.nt.gz --external --tmp-dir /scratch  # larger than RAM
 """
 
 import argparse
+import difflib
+import gzip
+import hashlib
 import json
+import os
 import sys
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 
 try:
-    from rdflib import Graph, Namespace, RDF
+    from rdflib import Namespace, RDF, URIRef
 except ImportError:
     print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
     sys.exit(1)
 
+from _egms import load_script
+
 SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
 
+# Above this many changed concepts, details are extracted lazily in-process
+EAGER_DETAIL_LIMIT = 10000
+
+# Minimum confidence for a near-match (non-identical content) rename
+DEFAULT_RENAME_THRESHOLD = 0.6
+
 TRACKED_PROPERTIES = [
     (SKOS.prefLabel, "prefLabel"),
     (SKOS.altLabel, "altLabel"),
@@ -39,91 +77,435 @@ TRACKED_PROPERTIES = [
 
 
 def get_concept_data(g, concept):
-    """Extract all tracked properties for a concept."""
+    """Extract all tracked properties for a concept.
+
+    Values are the sorted distinct strings, on every path that reads
+    concepts (ConceptHasher, load_details, sorted-diff.py): a literal
+    stated in several languages counts once.
+    """
     data = {}
     for prop, name in TRACKED_PROPERTIES:
-        values = sorted(str(o) for o in g.objects(concept, prop))
+        values = sorted({str(o) for o in g.objects(concept, prop)})
         if values:
             data[name] = values
     return data
 
 
-def compare_snapshots(old_file, new_file):
-    """Compare two SKOS Turtle files and return a change log."""
-    old_g = Graph()
-    old_g.parse(old_file, format="turtle")
+def concept_digest(data):
+    """Canonical content hash of a get_concept_data() dict."""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ConceptHasher:
+    """Accumulate triples one at a time into a concept URI -> content hash map.
+
+    Feeding every triple of a graph gives the same map as hash_concepts(),
+    so streaming readers (snapshot-store.py capture) can hash concepts
+    without building a graph.
+    """
+
+    def __init__(self):
+        self.tracked = dict(TRACKED_PROPERTIES)
+        self.concepts = set()
+        self.values = defaultdict(dict)
+
+    def add(self, s, p, o):
+        if p == RDF.type and o == SKOS.Concept:
+            self.concepts.add(s)
+            return
+        name = self.tracked.get(p)
+        if name is not None:
+            self.values[s].setdefault(name, []).append(str(o))
+
+    def concept_data(self, c):
+        """Tracked properties of one concept, shaped like get_concept_data()."""
+        values = self.values.get(c, {})
+        return {name: sorted(set(values[name])) for _, name in TRACKED_PROPERTIES
+                if name in values}
+
+    def hashes(self):
+        return {str(c): concept_digest(self.concept_data(c)) for c in self.concepts}
+
+
+def hash_concepts(g):
+    """Map each concept URI to its content hash in one pass over the graph."""
+    hasher = ConceptHasher()
+    for s, p, o in g:
+        hasher.add(s, p, o)
+    return hasher.hashes()
+
+
+def index_snapshot(path):
+    """Stream a snapshot's triples and return its concept hash map."""
+    hasher = ConceptHasher()
+    for s, p, o in load_script("fast-turtle").iter_triples(path):
+        hasher.add(s, p, o)
+    return hasher.hashes()
+
+
+def load_details(path, uris):
+    """Stream a snapshot and extract tracked properties for the given URIs only."""
+    if not uris:
+        return {}
+    wanted = {URIRef(uri) for uri in uris}
+    tracked = dict(TRACKED_PROPERTIES)
+    values = defaultdict(lambda: defaultdict(set))
+    for s, p, o in load_script("fast-turtle").iter_triples(path):
+        name = tracked.get(p)
+        if name is not None and s in wanted:
+            values[s][name].add(str(o))
+    # Same shape as get_concept_data(): tracked order, sorted values
+    return {
+        uri: {name: sorted(values[URIRef(uri)][name])
+              for _, name in TRACKED_PROPERTIES if values[URIRef(uri)].get(name)}
+        for uri in uris
+    }
+
+
+def modified_change(uri, old_data, new_data):
+    """Build a "modified" change record with per-property old/new values."""
+    label = new_data.get("prefLabel", old_data.get("prefLabel", [uri]))[0]
+    diffs = {}
+    all_keys = set(old_data) | set(new_data)
+    for key in sorted(all_keys):
+        old_val = old_data.get(key, [])
+        new_val = new_data.get(key, [])
+        if old_val != new_val:
+            diffs[key] = {"old": old_val, "new": new_val}
+    return {
+        "action": "modified",
+        "uri": uri,
+        "label": label,
+        "changes": diffs,
+    }
+
+
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+
+def bucket_keys(data):
+    """Hash-join keys for near-match rename detection."""
+    keys = []
+    for name in ("definition", "prefLabel"):
+        values = data.get(name)
+        if values:
+            keys.append(name + ":" + concept_digest(sorted(normalize_text(v) for v in values)))
+    return keys
+
+
+def rename_confidence(old_data, new_data):
+    """Score a candidate rename by label similarity and property overlap."""
+    old_label = normalize_text(" ".join(old_data.get("prefLabel", [])))
+    new_label = normalize_text(" ".join(new_data.get("prefLabel", [])))
+    label_sim = difflib.SequenceMatcher(None, old_label, new_label).ratio()
+    old_pairs = {(k, v) for k, vals in old_data.items() for v in vals}
+    new_pairs = {(k, v) for k, vals in new_data.items() for v in vals}
+    union = old_pairs | new_pairs
+    overlap = len(old_pairs & new_pairs) / len(union) if union else 1.0
+    return round((label_sim + overlap) / 2, 3)
+
+
+def match_renames(added, removed, old_hashes, new_hashes, old_lookup, new_lookup,
+                  threshold=DEFAULT_RENAME_THRESHOLD):
+    """Pair added URIs with removed URIs that look like the same concept.
+
+    Returns a list of (old_uri, new_uri, confidence).
+    """
+    matches = []
+    used = set()
+
+    # Exact: identical content hashes
+    by_hash = defaultdict(list)
+    for uri in removed:
+        by_hash[old_hashes[uri]].append(uri)
+    unmatched = []
+    for uri in added:
+        bucket = by_hash.get(new_hashes[uri])
+        if bucket:
+            old_uri = bucket.pop(0)
+            used.add(old_uri)
+            matches.append((old_uri, uri, 1.0))
+        else:
+            unmatched.append(uri)
+
+    # Near: score only candidates sharing a normalized definition/label bucket
+    buckets = defaultdict(list)
+    for uri in removed:
+        if uri not in used:
+            for key in bucket_keys(old_lookup(uri)):
+                buckets[key].append(uri)
+    if not buckets:
+        return matches
+
+    for uri in unmatched:
+        new_data = new_lookup(uri)
+        candidates = {
+            old_uri
+            for key in bucket_keys(new_data)
+            for old_uri in buckets.get(key, ())
+            if old_uri not in used
+        }
+        best = None
+        for old_uri in sorted(candidates):
+            score = rename_confidence(old_lookup(old_uri), new_data)
+            if score >= threshold and (best is None or score > best[1]):
+                best = (old_uri, score)
+        if best:
+            used.add(best[0])
+            matches.append((best[0], uri, best[1]))
+    return matches
+
+
+def iter_changes(old_file, new_file, old_hashes=None, new_hashes=None,
+                 detect_renames=True, rename_threshold=DEFAULT_RENAME_THRESHOLD):
+    """Yield change records (added, then removed, then modified) one at a time.
+
+    Precomputed hash maps may be passed in; any that are missing are
+    computed in parallel. Only hashes come back from the workers: details
+    of a handful of changed concepts are then extracted in a second pass
+    in worker processes; beyond EAGER_DETAIL_LIMIT both graphs are parsed
+    here and details are extracted lazily as records are yielded, so
+    memory does not grow with the size of the diff.
+    """
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        old_future = pool.submit(index_snapshot, old_file) if old_hashes is None else None
+        new_future = pool.submit(index_snapshot, new_file) if new_hashes is None else None
+        if old_future:
+            old_hashes = old_future.result()
+        if new_future:
+            new_hashes = new_future.result()
 
-    new_g = Graph()
-    new_g.parse(new_file, format="turtle")
+        added = sorted(set(new_hashes) - set(old_hashes))
+        removed = sorted(set(old_hashes) - set(new_hashes))
+        modified = sorted(
+            uri for uri in set(old_hashes) & set(new_hashes)
+            if old_hashes[uri] != new_hashes[uri]
+        )
 
-    old_concepts = {c: get_concept_data(old_g, c)
-                    for c in old_g.subjects(RDF.type, SKOS.Concept)}
-    new_concepts = {c: get_concept_data(new_g, c)
-                    for c in new_g.subjects(RDF.type, SKOS.Concept)}
+        # Expand property-level details only for concepts that changed
+        if len(added) + len(removed) + len(modified) <= EAGER_DETAIL_LIMIT:
+            old_future = pool.submit(load_details, old_file, removed + modified)
+            new_future = pool.submit(load_details, new_file, added + modified)
+            old_lookup = old_future.result().__getitem__
+            new_lookup = new_future.result().__getitem__
+        else:
+            turtle = load_script("fast-turtle")
+            old_g = turtle.load_graph([old_file])
+            new_g = turtle.load_graph([new_file])
+            old_lookup = lambda uri: get_concept_data(old_g, URIRef(uri))  # noqa: E731
+            new_lookup = lambda uri: get_concept_data(new_g, URIRef(uri))  # noqa: E731
 
-    changes = []
+    renames = []
+    if detect_renames and added and removed:
+        renames = match_renames(added, removed, old_hashes, new_hashes,
+                                old_lookup, new_lookup, rename_threshold)
+        renamed_old = {old for old, _, _ in renames}
+        renamed_new = {new for _, new, _ in renames}
+        added = [uri for uri in added if uri not in renamed_new]
+        removed = [uri for uri in removed if uri not in renamed_old]
 
     # Added concepts
-    for uri in sorted(set(new_concepts) - set(old_concepts), key=str):
-        label = new_concepts[uri].get("prefLabel", [str(uri)])[0]
-        changes.append({
+    for uri in added:
+        data = new_lookup(uri)
+        yield {
             "action": "added",
-            "uri": str(uri),
-            "label": label,
-            "details": new_concepts[uri],
-        })
+            "uri": uri,
+            "label": data.get("prefLabel", [uri])[0],
+            "details": data,
+        }
 
     # Removed concepts
-    for uri in sorted(set(old_concepts) - set(new_concepts), key=str):
-        label = old_concepts[uri].get("prefLabel", [str(uri)])[0]
-        changes.append({
+    for uri in removed:
+        data = old_lookup(uri)
+        yield {
             "action": "removed",
-            "uri": str(uri),
-            "label": label,
-            "details": old_concepts[uri],
-        })
+            "uri": uri,
+            "label": data.get("prefLabel", [uri])[0],
+            "details": data,
+        }
+
+    # Renamed concepts
+    for old_uri, uri, confidence in sorted(renames, key=lambda r: r[1]):
+        old_data = old_lookup(old_uri)
+        new_data = new_lookup(uri)
+        change = modified_change(uri, old_data, new_data)
+        yield {
+            "action": "renamed",
+            "uri": uri,
+            "old_uri": old_uri,
+            "label": change["label"],
+            "confidence": confidence,
+            "details": new_data,
+            "changes": change["changes"],
+        }
 
     # Modified concepts
-    for uri in sorted(set(old_concepts) & set(new_concepts), key=str):
-        old_data = old_concepts[uri]
-        new_data = new_concepts[uri]
-        if old_data != new_data:
-            label = new_data.get("prefLabel", old_data.get("prefLabel", [str(uri)]))[0]
-            diffs = {}
-            all_keys = set(old_data) | set(new_data)
-            for key in sorted(all_keys):
-                old_val = old_data.get(key, [])
-                new_val = new_data.get(key, [])
-                if old_val != new_val:
-                    diffs[key] = {"old": old_val, "new": new_val}
-            changes.append({
-                "action": "modified",
-                "uri": str(uri),
-                "label": label,
-                "changes": diffs,
-            })
+    for uri in modified:
+        yield modified_change(uri, old_lookup(uri), new_lookup(uri))
+
+
+def compare_snapshots(old_file, new_file, old_hashes=None, new_hashes=None,
+                      detect_renames=True, rename_threshold=DEFAULT_RENAME_THRESHOLD,
+                      changes=None):
+    """Compare two SKOS Turtle files and return a change log.
+
+    changes may be passed in as another engine's change records.
+    """
+    if changes is None:
+        changes = iter_changes(old_file, new_file, old_hashes, new_hashes,
+                               detect_renames, rename_threshold)
+    summary = {"added": 0, "removed": 0, "renamed": 0, "modified": 0}
+    records = []
+    for change in changes:
+        summary[change["action"]] += 1
+        records.append(change)
 
     return {
         "generated": datetime.now(timezone.utc).isoformat(),
         "old_file": str(old_file),
         "new_file": str(new_file),
-        "summary": {
-            "added": sum(1 for c in changes if c["action"] == "added"),
-            "removed": sum(1 for c in changes if c["action"] == "removed"),
-            "modified": sum(1 for c in changes if c["action"] == "modified"),
-        },
-        "changes": changes,
+        "summary": summary,
+        "changes": records,
     }
 
 
+def write_jsonl(changes, out, old_file, new_file):
+    """Stream change records as JSON Lines, ending with a summary record.
+
+    Returns the summary counters, which are kept incrementally.
+    """
+    summary = {"added": 0, "removed": 0, "renamed": 0, "modified": 0}
+    for change in changes:
+        summary[change["action"]] += 1
+        out.write(json.dumps(change, ensure_ascii=False, separators=(",", ":")))
+        out.write("\n")
+    out.write(json.dumps({
+        "action": "summary",
+        "generated": datetime.now(timezone.utc).isoformat(),
+        "old_file": str(old_file),
+        "new_file": str(new_file),
+        "summary": summary,
+    }, ensure_ascii=False, separators=(",", ":")))
+    out.write("\n")
+    out.flush()
+    return summary
+
+
+def load_hashes(base, entry):
+    """Return the cached hash map for a manifest entry, or None."""
+    name = entry.get("concept_hashes")
+    if not name:
+        return None
+    opener = gzip.open if name.endswith(".gz") else open
+    try:
+        with opener(os.path.join(base, name), "rt", encoding="utf-8") as f:
+            return json.load(f)["concepts"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_hashes(base, entry, hashes):
+    """Write a gzipped hash map sidecar and reference it from the manifest entry."""
+    entry["concept_hashes"] = entry["file"] + ".hashes.json.gz"
+    entry["content_hash"] = concept_digest(sorted(hashes.items()))
+    path = os.path.join(base, entry["concept_hashes"])
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump({"algorithm": "blake2b-128", "concepts": hashes}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def save_manifest(manifest_path, manifest):
+    """Atomically rewrite manifest.json."""
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+
+
+def snapshot_source(manifest_path, entry, workdir):
+    """Path to a parseable copy of a manifest entry's snapshot.
+
+    Legacy entries are full Turtle files; delta-chain entries written by
+    snapshot-store.py are reconstructed (and verified) into workdir.
+    """
+    base = os.path.dirname(manifest_path)
+    if not entry.get("storage"):
+        return os.path.join(base, entry["file"])
+    store = load_script("snapshot-store")
+    path = os.path.join(workdir, f"v{entry['version']}.nt")
+    if not os.path.exists(path):
+        with open(path, "wb") as out:
+            store.restore_version(manifest_path, entry["version"], out)
+    return path
+
+
+def index_manifest(manifest_path, manifest, entries, workdir=None):
+    """Ensure each entry has a cached hash map; returns the maps in order."""
+    base = os.path.dirname(manifest_path)
+    cached = [load_hashes(base, e) for e in entries]
+    missing = [i for i, h in enumerate(cached) if h is None]
+    if not missing:
+        return cached
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            ProcessPoolExecutor(max_workers=min(len(missing), os.cpu_count() or 1)) as pool:
+        paths = [snapshot_source(manifest_path, entries[i], workdir or tmp) for i in missing]
+        for i, hashes in zip(missing, pool.map(index_snapshot, paths)):
+            save_hashes(base, entries[i], hashes)
+            cached[i] = hashes
+    save_manifest(manifest_path, manifest)
+    return cached
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate audit log from SKOS snapshot comparison")
     parser.add_argument("old_file", nargs="?", help="Old snapshot Turtle file")
     parser.add_argument("new_file", nargs="?", help="New snapshot Turtle file")
     parser.add_argument("-o", "--output", help="Output JSON file (default: stdout)")
     parser.add_argument("--manifest", help="Use manifest.json to compare last two snapshots")
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Stream one JSON record per change, then a summary record (JSON Lines)",
+    )
+    parser.add_argument(
+        "--no-renames",
+        action="store_true",
+        help="Report re-slugged concepts as removed + added instead of renamed",
+    )
+    parser.add_argument(
+        "--rename-threshold",
+        type=float,
+        default=DEFAULT_RENAME_THRESHOLD,
+        help=f"Minimum confidence for near-match renames (default: {DEFAULT_RENAME_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--external",
+        action="store_true",
+        help="Diff externally sorted N-Triples in bounded memory (see sorted-diff.py)",
+    )
+    parser.add_argument("--tmp-dir", default=os.environ.get("SORTED_DIFF_TMP_DIR") or None,
+                        help="With --external: directory for sorted runs")
+    parser.add_argument("--buffer-mb", type=float, default=64,
+                        help="With --external: sort buffer per snapshot in MB (default: 64)")
+    parser.add_argument(
+        "--index",
+        metavar="MANIFEST",
+        help="Compute and cache concept hashes for every snapshot in a manifest, then exit",
+    )
     args = parser.parse_args()
 
+    if args.index:
+        with open(args.index) as f:
+            manifest = json.load(f)
+        snapshots = manifest.get("snapshots", [])
+        index_manifest(args.index, manifest, snapshots)
+        print(f"Indexed {len(snapshots)} snapshot(s) in {args.index}", file=sys.stderr)
+        return
+
     if args.manifest:
         with open(args.manifest) as f:
             manifest = json.load(f)
@@ -131,18 +513,59 @@ def main():
         if len(snapshots) < 2:
             print("ERROR: Need at least 2 snapshots in manifest to compare.", file=sys.stderr)
             sys.exit(1)
-        import os
         base = os.path.dirname(args.manifest)
-        old_file = os.path.join(base, snapshots[-2]["file"])
-        new_file = os.path.join(base, snapshots[-1]["file"])
+        with tempfile.TemporaryDirectory(dir=args.tmp_dir if args.external else None) as workdir:
+            old_file = snapshot_source(args.manifest, snapshots[-2], workdir)
+            new_file = snapshot_source(args.manifest, snapshots[-1], workdir)
+            labels = (os.path.join(base, snapshots[-2]["file"]),
+                      os.path.join(base, snapshots[-1]["file"]))
+            if args.external:
+                # Stored versions restore as sorted canonical N-Triples
+                presorted = tuple(bool(e.get("storage")) for e in snapshots[-2:])
+                s = run_audit(args, old_file, new_file, labels=labels, presorted=presorted)
+            else:
+                old_hashes, new_hashes = index_manifest(
+                    args.manifest, manifest, snapshots[-2:], workdir
+                )
+                s = run_audit(args, old_file, new_file, old_hashes, new_hashes, labels=labels)
     elif args.old_file and args.new_file:
-        old_file = args.old_file
-        new_file = args.new_file
+        s = run_audit(args, args.old_file, args.new_file)
     else:
         parser.error("Provide two files or --manifest")
 
-    audit = compare_snapshots(old_file, new_file)
+    print(
+        f"Changes: {s['added']} added, {s['removed']} removed, "
+        f"{s['renamed']} renamed, {s['modified']} modified",
+        file=sys.stderr,
+    )
+
+
+def run_audit(args, old_file, new_file, old_hashes=None, new_hashes=None, labels=None,
+              presorted=(False, False)):
+    """Compare and write output in the requested format. Returns the summary."""
+    old_label, new_label = labels or (old_file, new_file)
+
+    detect = not args.no_renames
+    if args.external:
+        changes = load_script("sorted-diff").iter_changes(
+            old_file, new_file, detect, args.rename_threshold, args.tmp_dir,
+            args.buffer_mb, presorted,
+        )
+    else:
+        changes = iter_changes(old_file, new_file, old_hashes, new_hashes,
+                               detect, args.rename_threshold)
+    if args.jsonl:
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                summary = write_jsonl(changes, f, old_label, new_label)
+            print(f"Audit log written to {args.output}", file=sys.stderr)
+        else:
+            summary = write_jsonl(changes, sys.stdout, old_label, new_label)
+        return summary
 
+    audit = compare_snapshots(old_file, new_file, changes=changes)
+    audit["old_file"] = str(old_label)
+    audit["new_file"] = str(new_label)
     output = json.dumps(audit, indent=2, ensure_ascii=False)
 
     if args.output:
@@ -151,12 +574,7 @@ def main():
         print(f"Audit log written to {args.output}", file=sys.stderr)
     else:
         print(output)
-
-    s = audit["summary"]
-    print(
-        f"Changes: {s['added']} added, {s['removed']} removed, {s['modified']} modified",
-        file=sys.stderr,
-    )
+    return audit["summary"]
 
 
 if __name__ == "__main__":
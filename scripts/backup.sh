@@ -2,15 +2,23 @@
 # Automated backup of Fuseki glossary data with retention policy.
 #
 # Features:
-#   - Exports vocabulary as timestamped Turtle file
+#   - Exports vocabulary and stores it as a compressed delta against the
+#     previous backup, with periodic full bases (see snapshot-store.py)
 #   - Verifies backup integrity (non-empty, valid HTTP response)
-#   - Enforces retention policy (keep last N backups)
+#   - Enforces retention policy (keep last N backups restorable)
 #   - Suitable for cron scheduling
 #
+# Falls back to a full timestamped Turtle copy per backup when python3/rdflib
+# is unavailable, or with --full.
+#
 # Usage:
 #   ./scripts/backup.sh                    # Run backup with defaults
 #   ./scripts/backup.sh --retain 30        # Keep last 30 backups
 #   ./scripts/backup.sh --verify           # Verify after backup
+#   ./scripts/backup.sh --full             # Full Turtle copy instead of delta store
+#
+# Restore a backup:
+#   python scripts/snapshot-store.py restore latest --manifest backups/manifest.json -o restore.nt
 #
 # Environment variables:
 #   FUSEKI_URL      - Fuseki base URL (default: http://localhost:3030)
@@ -34,11 +42,13 @@ PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
 BACKUP_DIR="${BACKUP_DIR:-$PROJECT_DIR/backups}"
 RETAIN="${BACKUP_RETAIN:-14}"
 VERIFY=false
+FULL=false
 
 while [ $# -gt 0 ]; do
     case "$1" in
         --retain) RETAIN="$2"; shift 2 ;;
         --verify) VERIFY=true; shift ;;
+        --full) FULL=true; shift ;;
         --dir) BACKUP_DIR="$2"; shift 2 ;;
         *) echo "Unknown option: $1" >&2; exit 1 ;;
     esac
@@ -49,6 +59,7 @@ mkdir -p "$BACKUP_DIR"
 TIMESTAMP=$(date -u +%Y%m%d-%H%M%S)
 BACKUP_FILE="$BACKUP_DIR/backup-${TIMESTAMP}.ttl"
 LOG_FILE="$BACKUP_DIR/backup.log"
+MANIFEST="$BACKUP_DIR/manifest.json"
 
 log() {
     local msg="[$(date -u +%Y-%m-%dT%H:%M:%SZ)] $1"
@@ -62,27 +73,68 @@ if ! curl -sf "$FUSEKI_URL/\$/ping" > /dev/null 2>&1; then
     exit 1
 fi
 
+if [ "$FULL" = false ] && ! python3 -c "import rdflib" > /dev/null 2>&1; then
+    FULL=true
+    log "WARNING: python3/rdflib not available, storing full Turtle copy"
+fi
+
 # Export data
-log "Starting backup to $BACKUP_FILE"
+if [ "$FULL" = true ]; then
+    EXPORT_FILE="$BACKUP_FILE"
+else
+    EXPORT_FILE="$BACKUP_DIR/.export-${TIMESTAMP}.ttl"
+    trap 'rm -f "$EXPORT_FILE"' EXIT
+fi
+log "Starting backup to $BACKUP_DIR"
 
-HTTP_CODE=$(curl -s -o "$BACKUP_FILE" -w "%{http_code}" \
+HTTP_CODE=$(curl -s -o "$EXPORT_FILE" -w "%{http_code}" \
     -u "$FUSEKI_USER:$FUSEKI_PASS" \
     -H "Accept: text/turtle" \
     "$FUSEKI_URL/$DATASET/data?graph=$GRAPH_URI")
 
 if [ "$HTTP_CODE" -lt 200 ] || [ "$HTTP_CODE" -ge 300 ]; then
     log "ERROR: Backup failed (HTTP $HTTP_CODE)"
-    rm -f "$BACKUP_FILE"
+    rm -f "$EXPORT_FILE"
     exit 1
 fi
 
-# Verify backup is non-empty
-FILE_SIZE=$(wc -c < "$BACKUP_FILE" | tr -d ' ')
+# Verify export is non-empty
+FILE_SIZE=$(wc -c < "$EXPORT_FILE" | tr -d ' ')
 if [ "$FILE_SIZE" -lt 100 ]; then
     log "ERROR: Backup file suspiciously small ($FILE_SIZE bytes)"
     exit 1
 fi
 
+if [ "$FULL" = false ]; then
+    STORE="$SCRIPT_DIR/snapshot-store.py"
+    if ! STORED=$(python3 "$STORE" add "$EXPORT_FILE" \
+            --manifest "$MANIFEST" --version "$TIMESTAMP" --prefix backup); then
+        log "ERROR: Could not store backup in $MANIFEST"
+        exit 1
+    fi
+    log "Backup complete: $(echo "$STORED" | head -1) (export $FILE_SIZE bytes)"
+    log "  $(echo "$STORED" | grep "Size:" | sed 's/^ *//')"
+
+    if [ "$VERIFY" = true ]; then
+        if python3 "$STORE" verify --manifest "$MANIFEST" --version latest > /dev/null; then
+            log "Verification passed (reconstructed content matches sha256)"
+        else
+            log "WARNING: Backup verification failed (sha256 mismatch after reconstruction)"
+        fi
+    fi
+
+    # Retention: drop delta chains no longer needed for the last N backups
+    python3 "$STORE" prune --manifest "$MANIFEST" --keep "$RETAIN" | while read -r line; do
+        log "  $line"
+    done
+    BACKUP_COUNT=$(python3 -c "
+import json, sys
+print(len(json.load(open(sys.argv[1]))['snapshots']))
+" "$MANIFEST")
+    log "Backup process complete. $BACKUP_COUNT backup(s) restorable, retaining $RETAIN."
+    exit 0
+fi
+
 CHECKSUM=$(sha256sum "$BACKUP_FILE" | cut -d' ' -f1)
 log "Backup complete: $(basename "$BACKUP_FILE") ($FILE_SIZE bytes, sha256:${CHECKSUM:0:16}...)"
 
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Blue/green reload of the glossary graph with atomic switchover and rollback.
+
+A plain load POSTs into the live graph, so Skosmos and Varnish see (and
+cache) a half-loaded vocabulary while it runs. This script instead:
+
+  1. Stages the new data in the dataset's stored default graph. With
+     tdb2:unionDefaultGraph the query default graph is the union of the
+     named graphs only, so staged triples are invisible to readers.
+  2. Validates the staged triple count and an order-independent sha256
+     against the source files.
+  3. Swaps staging and live in a single SPARQL Update request (one Fuseki
+     transaction): readers see either the old or the new graph, never a
+     mix. The old graph is kept in the stored default graph for rollback.
+     The same request bumps the dataset version (see dataset-version.py).
+  4. Publishes the new version to Varnish, so cached SPARQL results for
+     the old data stop matching right after the swap.
+
+`rollback` swaps the two graphs back (and is itself reversible), also
+under a new version. The next `load` overwrites the rollback copy when
+it starts staging.
+
+Usage:
+    python scripts/blue-green-load.py load data/*.ttl
+    python scripts/blue-green-load.py load --chunked big/glossary.nt.gz
+    python scripts/blue-green-load.py rollback
+    python scripts/blue-green-load.py status
+
+Environment variables (same defaults as load-data.sh):
+    FUSEKI_URL, FUSEKI_USER, FUSEKI_PASS, GRAPH_URI, DATASET
+    DATASET_VERSION_FILE, VARNISH_RELOAD, VARNISH_URL - see dataset-version.py
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+
+try:
+    from rdflib import Graph
+except ImportError:
+    print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+    sys.exit(1)
+
+from _egms import load_script
+
+# Exists only inside the swap transaction, never visible to readers
+SWAP_GRAPH = "urn:egms:swap"
+# Graph key of chunked staging checkpoints (<file>.load-state.json)
+STAGING_CHECKPOINT = "staging"
+
+BNODE_SUBJECT = re.compile(r"^_:\S+")
+BNODE_OBJECT = re.compile(r"_:\S+ \.$")
+
+
+bulk = load_script("bulk-load")
+versions = load_script("dataset-version")
+
+
+class Fuseki:
+    """Minimal SPARQL Update / Graph Store client for one dataset."""
+
+    def __init__(self, base_url, dataset, user=None, password=None, timeout=300):
+        self.base = base_url.rstrip("/")
+        self.dataset = dataset
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+
+    def request(self, path, data=None, headers=None, method=None):
+        req = urllib.request.Request(self.base + path, data=data, headers=headers or {},
+                                     method=method)
+        if self.user:
+            token = base64.b64encode(f"{self.user}:{self.password or ''}".encode()).decode()
+            req.add_header("Authorization", f"Basic {token}")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return resp.read()
+
+    def update(self, text):
+        self.request(
+            f"/{self.dataset}/update",
+            data=urllib.parse.urlencode({"update": text}).encode("utf-8"),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+
+    def fetch_graph(self, graph_uri):
+        """Download one graph (None = stored default graph) as an rdflib Graph."""
+        body = self.request(
+            bulk.graph_target(self.dataset, graph_uri),
+            headers={"Accept": "application/n-triples"},
+        )
+        return Graph().parse(data=body.decode("utf-8"), format="nt")
+
+
+def graph_digest(g):
+    """(triple count, sha256) over sorted N-Triples, blind to blank-node labels."""
+    lines = set()
+    for line in g.serialize(format="nt").splitlines():
+        if line.strip():
+            line = BNODE_SUBJECT.sub("_:b", line)
+            lines.add(BNODE_OBJECT.sub("_:b .", line))
+    h = hashlib.sha256()
+    for line in sorted(lines):
+        h.update(line.encode("utf-8") + b"\n")
+    return len(g), h.hexdigest()
+
+
+def swap_update(live_graph):
+    """One update request that exchanges the live graph and the stored default graph."""
+    return (
+        f"MOVE SILENT GRAPH <{live_graph}> TO GRAPH <{SWAP_GRAPH}> ;\n"
+        f"MOVE DEFAULT TO GRAPH <{live_graph}> ;\n"
+        f"MOVE SILENT GRAPH <{SWAP_GRAPH}> TO DEFAULT"
+    )
+
+
+def swap_and_stamp(fuseki, args):
+    """Swap the graphs and bump the dataset version in one transaction; returns the version."""
+    floor = versions.read_version_file(args.version_file)
+    fuseki.update(swap_update(args.graph) + " ;\n" + versions.stamp_update(floor))
+    return versions.fuseki_version(fuseki.base, fuseki.dataset, fuseki.user, fuseki.password)
+
+
+def discard_staging_checkpoints(files):
+    """Remove chunked staging progress, which describes a staging graph that was just cleared."""
+    for path in files:
+        checkpoint = path + ".load-state.json"
+        try:
+            with open(checkpoint) as f:
+                graph = json.load(f).get("graph")
+        except (OSError, ValueError):
+            continue
+        if graph == STAGING_CHECKPOINT:
+            os.remove(checkpoint)
+
+
+def stage(fuseki, files, args):
+    """Upload files into the stored default graph; returns the error count."""
+    if args.chunked:
+        pool = bulk.ConnectionPool(fuseki.base, 1)
+        headers = bulk.request_headers(fuseki.user, fuseki.password, "application/n-triples")
+        target = bulk.graph_target(fuseki.dataset, None)
+        errors = 0
+        try:
+            for path in files:
+                sizer = bulk.BatchSizer(args.target_seconds)
+                try:
+                    state, error = bulk.chunked_load(
+                        pool, path, target, headers, sizer, path + ".load-state.json",
+                        STAGING_CHECKPOINT, retries=args.retries, log=lambda msg: None,
+                    )
+                except ValueError as e:
+                    errors += 1
+                    print(f"  {os.path.basename(path)}: FAILED ({e})", file=sys.stderr)
+                    continue
+                if error:
+                    errors += 1
+                    print(f"  {os.path.basename(path)}: FAILED ({error})", file=sys.stderr)
+                else:
+                    print(f"  {os.path.basename(path)}: {state['triples_done']} triples "
+                          f"in {state['batches']} batches")
+        finally:
+            pool.close()
+        return errors
+
+    results, elapsed, _ = bulk.bulk_load(
+        files, fuseki.base, fuseki.dataset, None, fuseki.user, fuseki.password,
+        concurrency=args.concurrency, retries=args.retries,
+    )
+    errors = 0
+    for r in results:
+        if "error" in r:
+            errors += 1
+            print(f"  {os.path.basename(r['file'])}: FAILED ({r['error']})", file=sys.stderr)
+        else:
+            print(f"  {os.path.basename(r['file'])}: OK ({r['seconds']:.2f}s)")
+    return errors
+
+
+def cmd_load(fuseki, args):
+    missing = [f for f in args.files if not os.path.isfile(f)]
+    if missing:
+        print(f"ERROR: File not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    expected = Graph()
+    for path in args.files:
+        expected.parse(path)
+    expected_count, expected_sha = graph_digest(expected)
+    del expected
+    print(f"Source:   {expected_count} triples (sha256 {expected_sha[:16]}...)")
+
+    print("Staging into the stored default graph (replaces the rollback copy)...")
+    fuseki.update("CLEAR SILENT DEFAULT")
+    # Staging always starts over, so progress from a failed run no longer applies
+    discard_staging_checkpoints(args.files)
+    if stage(fuseki, args.files, args):
+        print("ERROR: Staging failed; live graph untouched.", file=sys.stderr)
+        return 1
+
+    staged_count, staged_sha = graph_digest(fuseki.fetch_graph(None))
+    print(f"Staged:   {staged_count} triples (sha256 {staged_sha[:16]}...)")
+    if (staged_count, staged_sha) != (expected_count, expected_sha):
+        print("ERROR: Staged graph does not match the source files; live graph untouched.",
+              file=sys.stderr)
+        return 1
+
+    version = swap_and_stamp(fuseki, args)
+    live_count, live_sha = graph_digest(fuseki.fetch_graph(args.graph))
+    versions.publish(version, args.version_file, args.varnish_reload, args.varnish_url)
+    if (live_count, live_sha) != (expected_count, expected_sha):
+        print("ERROR: Live graph does not match after the swap; run 'rollback'.", file=sys.stderr)
+        return 1
+    print(f"Swapped:  <{args.graph}> now serves {live_count} triples (version {version})")
+    return 0
+
+
+def cmd_rollback(fuseki, args):
+    previous = fuseki.fetch_graph(None)
+    if len(previous) == 0:
+        print("ERROR: No previous graph to roll back to.", file=sys.stderr)
+        return 1
+    version = swap_and_stamp(fuseki, args)
+    print(f"Rolled back: <{args.graph}> now serves {len(previous)} triples (version {version})")
+    versions.publish(version, args.version_file, args.varnish_reload, args.varnish_url)
+    return 0
+
+
+def cmd_status(fuseki, args):
+    for name, graph_uri in (("Live", args.graph), ("Rollback", None)):
+        count, sha = graph_digest(fuseki.fetch_graph(graph_uri))
+        print(f"{name + ':':10}{count} triples (sha256 {sha[:16]}...)")
+    version = versions.fuseki_version(fuseki.base, fuseki.dataset, fuseki.user, fuseki.password)
+    print(f"{'Version:':10}{version}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blue/green glossary reload with rollback")
+    parser.add_argument("--fuseki-url", default=os.environ.get("FUSEKI_URL", "http://localhost:3030"))
+    parser.add_argument("--dataset", default=os.environ.get("DATASET", "skosmos"))
+    parser.add_argument("--graph", default=os.environ.get("GRAPH_URI", "http://glossary.example.org/"))
+    parser.add_argument("--user", default=os.environ.get("FUSEKI_USER", "admin"))
+    parser.add_argument("--password", default=os.environ.get("FUSEKI_PASS", "admin123"))
+    versions.add_publish_arguments(parser)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_load = sub.add_parser("load", help="Stage, validate and swap in new data")
+    p_load.add_argument("files", nargs="+", help="Turtle / N-Triples files to load")
+    p_load.add_argument("--chunked", action="store_true",
+                        help="Stage in adaptive transactional batches (see bulk-load.py)")
+    p_load.add_argument("--target-seconds", type=float, default=5.0,
+                        help="Chunked mode: target request latency per batch (default: 5)")
+    p_load.add_argument("--concurrency", type=int, default=4, help="Parallel uploads (default: 4)")
+    p_load.add_argument("--retries", type=int, default=3, help="Retries per request (default: 3)")
+
+    sub.add_parser("rollback", help="Swap the previous graph back into service")
+    sub.add_parser("status", help="Show live and rollback graph sizes")
+    args = parser.parse_args()
+
+    fuseki = Fuseki(args.fuseki_url, args.dataset, args.user, args.password)
+    commands = {"load": cmd_load, "rollback": cmd_rollback, "status": cmd_status}
+    try:
+        sys.exit(commands[args.command](fuseki, args))
+    except (urllib.error.URLError, OSError) as e:
+        print(f"ERROR: Fuseki request failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
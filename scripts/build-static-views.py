@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""Build precomputed, pre-compressed JSON views of the vocabulary for nginx.
+
+Most read traffic is the same concept pages, the top of the hierarchy and
+the alphabetical index, each of which otherwise goes gateway -> SKOSMOS ->
+Varnish -> Fuseki. This build writes them as static files that the gateway
+serves directly from /views/ (gzip_static, ETags from nginx):
+
+  concept/<slug>.jsonld     one JSON-LD document per concept: labels by
+                            language, notes, and broader/narrower/related
+                            concepts with their labels
+  hierarchy/top.json        top concepts of each concept scheme
+  hierarchy/<slug>.json     one per hierarchy level: the children of <slug>
+  index/<lang>.json         alphabetical index per language (prefLabels and
+                            altLabels, grouped by initial letter)
+  manifest.json             content digest of every document
+
+Each document is written next to a gzip copy (<file>.gz). The build is
+incremental: documents are rendered in memory and compared with the
+digests in manifest.json, and only those whose content changed are
+rewritten (including neighbours that show a renamed concept's label).
+Unchanged files keep their mtime, so the ETags nginx derives from it stay
+valid across loads; documents for removed concepts are deleted.
+
+Without input files, the graph is downloaded from Fuseki (Graph Store
+Protocol), which is how load-data.sh runs it after every load.
+
+Usage:
+    python scripts/build-static-views.py                    # from Fuseki
+    python scripts/build-static-views.py data/*.ttl         # from files
+    python scripts/build-static-views.py data/*.ttl -o /tmp/views
+
+Environment variables (same defaults as load-data.sh):
+    FUSEKI_URL, FUSEKI_USER, FUSEKI_PASS, GRAPH_URI, DATASET
+    STATIC_VIEWS_DIR - Output directory (default: views/)
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import unicodedata
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+try:
+    from rdflib import Graph, Namespace, RDF
+except ImportError:
+    print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+    sys.exit(1)
+
+SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+DEFAULT_OUTPUT = os.path.join(PROJECT_DIR, "views")
+DEFAULT_BASE_URI = "http://glossary.example.org/terms/"
+MANIFEST = "manifest.json"
+
+CONTEXT = {
+    "skos": str(SKOS),
+    "slug": "urn:egms:slug",
+    "prefLabel": {"@id": "skos:prefLabel", "@container": "@language"},
+    "altLabel": {"@id": "skos:altLabel", "@container": "@language"},
+    "hiddenLabel": {"@id": "skos:hiddenLabel", "@container": "@language"},
+    "definition": {"@id": "skos:definition", "@container": "@language"},
+    "scopeNote": {"@id": "skos:scopeNote", "@container": "@language"},
+    "example": {"@id": "skos:example", "@container": "@language"},
+    "broader": {"@id": "skos:broader", "@type": "@id"},
+    "narrower": {"@id": "skos:narrower", "@type": "@id"},
+    "related": {"@id": "skos:related", "@type": "@id"},
+    "inScheme": {"@id": "skos:inScheme", "@type": "@id"},
+}
+
+# Language-map properties of a concept document: (predicate, key, always a list)
+LANGUAGE_PROPERTIES = [
+    (SKOS.prefLabel, "prefLabel", False),
+    (SKOS.altLabel, "altLabel", True),
+    (SKOS.hiddenLabel, "hiddenLabel", True),
+    (SKOS.definition, "definition", False),
+    (SKOS.scopeNote, "scopeNote", False),
+    (SKOS.example, "example", False),
+]
+
+SAFE_SLUG = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def get_slug(uri, base_uri):
+    """Slug for file names: the local name under base_uri, else a URI digest."""
+    uri = str(uri)
+    if uri.startswith(base_uri) and SAFE_SLUG.match(uri[len(base_uri):]):
+        return uri[len(base_uri):]
+    return "u-" + hashlib.blake2b(uri.encode("utf-8"), digest_size=10).hexdigest()
+
+
+def language_map(g, subject, predicate, always_list):
+    """{lang: value} (or {lang: [values]}) for the literals of a predicate."""
+    by_lang = defaultdict(list)
+    for o in g.objects(subject, predicate):
+        by_lang[getattr(o, "language", None) or "@none"].append(str(o))
+    result = {}
+    for lang in sorted(by_lang):
+        values = sorted(by_lang[lang])
+        result[lang] = values if always_list or len(values) > 1 else values[0]
+    return result
+
+
+def sort_key(label):
+    """Accent- and case-insensitive collation key for the alphabetical index."""
+    folded = unicodedata.normalize("NFKD", label).encode("ascii", "ignore").decode("ascii")
+    return (folded.casefold(), label)
+
+
+def index_letter(label):
+    key = sort_key(label)[0].lstrip()
+    if key and key[0].isalpha():
+        return key[0].upper()
+    return "0-9" if key and key[0].isdigit() else "#"
+
+
+class Vocabulary:
+    """Concepts, labels and the hierarchy of a SKOS graph, for rendering views."""
+
+    def __init__(self, g, base_uri):
+        self.g = g
+        self.base_uri = base_uri
+        self.concepts = sorted(set(g.subjects(RDF.type, SKOS.Concept)), key=str)
+        known = set(self.concepts)
+        self.slugs = {c: get_slug(c, base_uri) for c in self.concepts}
+        self.labels = {c: language_map(g, c, SKOS.prefLabel, False) for c in self.concepts}
+
+        # Union of stated and inverse links, so half-stated hierarchies still render
+        self.broader = defaultdict(set)
+        self.narrower = defaultdict(set)
+        for child, parent in g.subject_objects(SKOS.broader):
+            if child in known and parent in known:
+                self.broader[child].add(parent)
+                self.narrower[parent].add(child)
+        for parent, child in g.subject_objects(SKOS.narrower):
+            if child in known and parent in known:
+                self.broader[child].add(parent)
+                self.narrower[parent].add(child)
+        self.related = defaultdict(set)
+        for a, b in g.subject_objects(SKOS.related):
+            if a in known and b in known:
+                self.related[a].add(b)
+                self.related[b].add(a)
+
+        self.schemes = sorted(set(g.subjects(RDF.type, SKOS.ConceptScheme)), key=str)
+        self.top = defaultdict(set)
+        for scheme, c in g.subject_objects(SKOS.hasTopConcept):
+            if c in known:
+                self.top[scheme].add(c)
+        for c, scheme in g.subject_objects(SKOS.topConceptOf):
+            if c in known:
+                self.top[scheme].add(c)
+        roots = {c for c in self.concepts if not self.broader[c]} - set().union(*self.top.values())
+        if roots:
+            # Concepts without a parent or a scheme entry still need a way in
+            self.top[None] |= roots
+
+    def label_key(self, c):
+        labels = self.labels[c]
+        label = labels.get("en") or next(iter(labels.values()), "")
+        return sort_key(label if isinstance(label, str) else label[0]) + (str(c),)
+
+    def ordered(self, concepts):
+        return sorted(concepts, key=self.label_key)
+
+    def summary(self, c):
+        """Short reference to a concept, embedded in other documents."""
+        return {"@id": str(c), "slug": self.slugs[c], "prefLabel": self.labels[c]}
+
+    def concept_document(self, c):
+        doc = {"@context": CONTEXT, "@id": str(c), "@type": "skos:Concept", "slug": self.slugs[c]}
+        for predicate, key, always_list in LANGUAGE_PROPERTIES:
+            values = language_map(self.g, c, predicate, always_list)
+            if values:
+                doc[key] = values
+        for key, links in (("broader", self.broader), ("narrower", self.narrower),
+                           ("related", self.related)):
+            if links[c]:
+                doc[key] = [self.summary(o) for o in self.ordered(links[c])]
+        schemes = sorted(str(s) for s in self.g.objects(c, SKOS.inScheme))
+        if schemes:
+            doc["inScheme"] = schemes
+        return doc
+
+    def level_entry(self, c):
+        entry = self.summary(c)
+        entry["narrowerCount"] = len(self.narrower[c])
+        return entry
+
+    def top_document(self):
+        schemes = []
+        for scheme in self.schemes + ([None] if None in self.top else []):
+            schemes.append({
+                "@id": str(scheme) if scheme is not None else None,
+                "prefLabel": language_map(self.g, scheme, SKOS.prefLabel, False)
+                if scheme is not None else {},
+                "topConcepts": [self.level_entry(c) for c in self.ordered(self.top[scheme])],
+            })
+        return {"schemes": schemes}
+
+    def level_document(self, c):
+        doc = self.summary(c)
+        doc["broader"] = [self.summary(p) for p in self.ordered(self.broader[c])]
+        doc["narrower"] = [self.level_entry(n) for n in self.ordered(self.narrower[c])]
+        return doc
+
+    def index_documents(self):
+        """{lang: index document} over prefLabels and altLabels."""
+        entries = defaultdict(list)
+        for c in self.concepts:
+            for predicate, kind in ((SKOS.prefLabel, "prefLabel"), (SKOS.altLabel, "altLabel")):
+                for o in self.g.objects(c, predicate):
+                    lang = getattr(o, "language", None)
+                    if lang:
+                        entry = {"label": str(o), "slug": self.slugs[c], "@id": str(c)}
+                        if kind == "altLabel":
+                            entry["prefLabel"] = self.labels[c].get(lang)
+                        entries[lang].append(entry)
+        docs = {}
+        for lang, items in entries.items():
+            letters = defaultdict(list)
+            for item in sorted(items, key=lambda e: sort_key(e["label"]) + (e["@id"],)):
+                letters[index_letter(item["label"])].append(item)
+            docs[lang] = {"language": lang, "count": len(items),
+                          "letters": {k: letters[k] for k in sorted(letters)}}
+        return docs
+
+    def documents(self):
+        """Yield (relative path, document) for every view."""
+        for c in self.concepts:
+            yield f"concept/{self.slugs[c]}.jsonld", self.concept_document(c)
+        yield "hierarchy/top.json", self.top_document()
+        for c in self.concepts:
+            if self.narrower[c]:
+                yield f"hierarchy/{self.slugs[c]}.json", self.level_document(c)
+        for lang, doc in sorted(self.index_documents().items()):
+            if re.match(r"^[A-Za-z0-9-]+$", lang):
+                yield f"index/{lang}.json", doc
+
+
+def encode(doc):
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_document(path, data):
+    """Write a document and its gzip copy (mtime 0, so the bytes are reproducible)."""
+    write_atomic(path, data)
+    write_atomic(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+
+
+def remove_document(path):
+    for p in (path, path + ".gz"):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f).get("documents", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def build_views(g, output_dir, base_uri=DEFAULT_BASE_URI):
+    """Render all views and rewrite the changed ones; returns counts by outcome."""
+    previous = load_manifest(output_dir)
+    digests = {}
+    stats = {"documents": 0, "written": 0, "unchanged": 0, "removed": 0}
+    for rel, doc in Vocabulary(g, base_uri).documents():
+        data = encode(doc)
+        digest = hashlib.sha256(data).hexdigest()
+        digests[rel] = digest
+        stats["documents"] += 1
+        path = os.path.join(output_dir, rel)
+        if previous.get(rel) == digest and os.path.exists(path) and os.path.exists(path + ".gz"):
+            stats["unchanged"] += 1
+            continue
+        write_document(path, data)
+        stats["written"] += 1
+    for rel in sorted(set(previous) - set(digests)):
+        remove_document(os.path.join(output_dir, rel))
+        stats["removed"] += 1
+    write_atomic(os.path.join(output_dir, MANIFEST),
+                 json.dumps({"documents": dict(sorted(digests.items()))}, indent=1).encode("utf-8"))
+    return stats
+
+
+def fetch_graph(base_url, dataset, graph_uri, user=None, password=None):
+    """Download the named graph from Fuseki's Graph Store endpoint."""
+    url = f"{base_url.rstrip('/')}/{dataset}/data?graph={urllib.parse.quote(graph_uri, safe='')}"
+    req = urllib.request.Request(url, headers={"Accept": "text/turtle"})
+    if user:
+        token = base64.b64encode(f"{user}:{password or ''}".encode()).decode()
+        req.add_header("Authorization", f"Basic {token}")
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        data = resp.read()
+    g = Graph()
+    g.parse(data=data, format="turtle")
+    return g
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build static JSON views of the vocabulary")
+    parser.add_argument("files", nargs="*", help="Turtle files (default: download from Fuseki)")
+    parser.add_argument("-o", "--output", default=os.environ.get("STATIC_VIEWS_DIR") or DEFAULT_OUTPUT,
+                        help="Output directory (default: $STATIC_VIEWS_DIR or views/)")
+    parser.add_argument("--base-uri", default=DEFAULT_BASE_URI,
+                        help=f"Concept URI prefix stripped to form slugs (default: {DEFAULT_BASE_URI})")
+    parser.add_argument("--fuseki-url", default=os.environ.get("FUSEKI_URL", "http://localhost:3030"))
+    parser.add_argument("--dataset", default=os.environ.get("DATASET", "skosmos"))
+    parser.add_argument("--graph", default=os.environ.get("GRAPH_URI", "http://glossary.example.org/"))
+    parser.add_argument("--user", default=os.environ.get("FUSEKI_USER"))
+    parser.add_argument("--password", default=os.environ.get("FUSEKI_PASS"))
+    args = parser.parse_args()
+
+    if args.files:
+        missing = [f for f in args.files if not os.path.isfile(f)]
+        if missing:
+            print(f"ERROR: File not found: {', '.join(missing)}", file=sys.stderr)
+            sys.exit(1)
+        g = Graph()
+        for path in args.files:
+            g.parse(path, format="turtle")
+        source = f"{len(args.files)} file(s)"
+    else:
+        try:
+            g = fetch_graph(args.fuseki_url, args.dataset, args.graph, args.user, args.password)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            print(f"ERROR: Could not download <{args.graph}> from {args.fuseki_url}: {e}",
+                  file=sys.stderr)
+            sys.exit(1)
+        source = f"<{args.graph}>"
+
+    stats = build_views(g, args.output, args.base_uri)
+    print(f"Static views for {source} in {args.output}: {stats['documents']} documents, "
+          f"{stats['written']} written, {stats['unchanged']} unchanged, {stats['removed']} removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""Bulk-load Turtle files into Fuseki over pooled keep-alive connections.
+
+Replaces the one-curl-per-file loop in load-data.sh. Files are uploaded
+concurrently (bounded by --concurrency) through a pool of persistent HTTP
+connections to the Graph Store Protocol endpoint. Request bodies are
+streamed gzip-compressed with chunked transfer encoding, so no file is
+held in memory. Connection errors and 429/502/503/504 responses are
+retried with exponential backoff.
+
+Throughput is reported as triples/s (from Fuseki's upload counts) and MB/s
+of source Turtle.
+
+With --chunked, each file is instead loaded as a sequence of
+subject-complete batches, one Graph Store POST (and so one Fuseki
+transaction) per batch, keeping each request well inside Fuseki's heap
+(-Xmx2g) and timeout limits. Batch sizes adapt to observed latency,
+aiming for --target-seconds per batch and halving after a failed batch.
+Progress is checkpointed to <file>.load-state.json after every committed
+batch, so re-running the same command resumes where a failed load
+stopped. Turtle input is parsed with rdflib and blank nodes stay in the
+batch of the subject that references them. N-Triples input (.nt, .nt.gz)
+is streamed and must be grouped by subject, as snapshot-store.py output is.
+
+Usage:
+    python scripts/bulk-load.py data/*.ttl
+    python scripts/bulk-load.py --concurrency 8 --retries 5 big/*.ttl
+    python scripts/bulk-load.py --no-gzip data/enterprise-glossary.ttl
+    python scripts/bulk-load.py --chunked --target-seconds 5 big/glossary.nt.gz
+
+Environment variables (same defaults as load-data.sh):
+    FUSEKI_URL, FUSEKI_USER, FUSEKI_PASS, GRAPH_URI, DATASET
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import http.client
+import io
+import json
+import os
+import queue
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import groupby
+from urllib.parse import quote, urlsplit
+
+CHUNK_SIZE = 256 * 1024
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Adaptive batch sizing for --chunked (in triples)
+INITIAL_BATCH = 5000
+MIN_BATCH = 500
+MAX_BATCH = 500000
+
+
+class ConnectionPool:
+    """A bounded pool of keep-alive HTTP(S) connections to one host."""
+
+    def __init__(self, base_url, size, timeout=300):
+        parts = urlsplit(base_url)
+        self.conn_class = (
+            http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        )
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.size = size
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            self.opened += 1
+            return self.conn_class(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn, reusable=True):
+        if reusable and self.idle.qsize() < self.size:
+            self.idle.put(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+def gzip_chunks(open_body, level=6):
+    """Yield the gzip-compressed contents of a binary stream, one block at a time."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    with open_body() as f:
+        while True:
+            block = f.read(CHUNK_SIZE)
+            if not block:
+                break
+            data = compressor.compress(block)
+            if data:
+                yield data
+    yield compressor.flush()
+
+
+def post_body(pool, target, headers, open_body, size, use_gzip=True, retries=3, backoff=1.0):
+    """POST a body to the Graph Store endpoint, retrying transient failures.
+
+    open_body() must return a fresh binary stream for each attempt.
+    Returns a result dict with status, triples, bytes, seconds and attempts.
+    """
+    result = {"bytes": size, "triples": None, "attempts": 0}
+    start = time.monotonic()
+
+    for attempt in range(retries + 1):
+        result["attempts"] = attempt + 1
+        conn = pool.acquire()
+        try:
+            req_headers = dict(headers)
+            if use_gzip:
+                req_headers["Content-Encoding"] = "gzip"
+                conn.request("POST", target, body=gzip_chunks(open_body), headers=req_headers,
+                             encode_chunked=True)
+            else:
+                with open_body() as body:
+                    req_headers["Content-Length"] = str(size)
+                    conn.request("POST", target, body=body, headers=req_headers)
+            resp = conn.getresponse()
+            payload = resp.read()
+            pool.release(conn, not resp.will_close)
+        except (OSError, http.client.HTTPException) as e:
+            pool.release(conn, reusable=False)
+            result["status"], result["error"] = None, str(e)
+        else:
+            result["status"] = resp.status
+            if 200 <= resp.status < 300:
+                result.pop("error", None)
+                try:
+                    counts = json.loads(payload)
+                    result["triples"] = counts.get("tripleCount", counts.get("count"))
+                except ValueError:
+                    pass
+                break
+            result["error"] = f"HTTP {resp.status}"
+            if resp.status not in RETRY_STATUSES:
+                break
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt)
+
+    result["seconds"] = time.monotonic() - start
+    return result
+
+
+def upload_file(pool, path, target, headers, use_gzip=True, retries=3, backoff=1.0):
+    """POST one whole file to the Graph Store endpoint."""
+    result = post_body(pool, target, headers, lambda: open(path, "rb"),
+                       os.path.getsize(path), use_gzip, retries, backoff)
+    result["file"] = path
+    return result
+
+
+# -- Chunked loading ---------------------------------------------------------
+
+
+def subject_of(line):
+    return line.split(" ", 1)[0]
+
+
+def object_of(line):
+    return line.rstrip().rstrip(".").rstrip().split(" ", 2)[2]
+
+
+def stream_ntriples_units(path):
+    """Subject groups from an N-Triples file that is already grouped by subject."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        lines = (line if line.endswith("\n") else line + "\n" for line in f
+                 if line.strip() and not line.startswith("#"))
+        for _, group in groupby(lines, key=subject_of):
+            yield list(group)
+
+
+def parsed_units(path):
+    """Subject groups from any rdflib-readable file, with blank-node closure.
+
+    Blank nodes are only meaningful within one request, so each blank-node
+    subject travels in the unit of the first subject that references it.
+    """
+    try:
+        from rdflib import Graph
+    except ImportError:
+        print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+        sys.exit(1)
+
+    g = Graph()
+    g.parse(path)
+    lines = sorted(line + "\n" for line in g.serialize(format="nt").splitlines() if line.strip())
+    groups = {s: list(grp) for s, grp in groupby(lines, key=subject_of)}
+    claimed = set()
+
+    def closure(subject):
+        unit = []
+        stack = [subject]
+        while stack:
+            for line in groups[stack.pop()]:
+                unit.append(line)
+                obj = object_of(line)
+                if obj.startswith("_:") and obj in groups and obj not in claimed:
+                    claimed.add(obj)
+                    stack.append(obj)
+        return unit
+
+    for subject in groups:
+        if not subject.startswith("_:"):
+            yield closure(subject)
+    for subject in groups:
+        if subject.startswith("_:") and subject not in claimed:
+            claimed.add(subject)
+            yield closure(subject)
+
+
+def read_units(path):
+    if path.endswith((".nt", ".nt.gz")):
+        return stream_ntriples_units(path)
+    return parsed_units(path)
+
+
+class BatchSizer:
+    """Size batches so each request takes about target_seconds."""
+
+    def __init__(self, target_seconds, initial=INITIAL_BATCH, minimum=MIN_BATCH, maximum=MAX_BATCH):
+        self.target = target_seconds
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = max(minimum, min(initial, maximum))
+
+    def observe(self, triples, seconds):
+        ideal = triples / max(seconds, 1e-3) * self.target
+        # Smooth so one slow or fast batch does not swing the size wildly
+        self.size = int(max(self.minimum, min(self.maximum, (self.size + ideal) / 2)))
+
+    def shrink(self):
+        self.size = max(self.minimum, self.size // 2)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_checkpoint(path, sha256, graph_uri):
+    """Return saved progress for this source, or a fresh state."""
+    if os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("sha256") != sha256 or state.get("graph") != graph_uri:
+            raise ValueError(
+                f"{path} belongs to a different source or graph; delete it to start over"
+            )
+        return state
+    return {"sha256": sha256, "graph": graph_uri, "units_done": 0,
+            "triples_done": 0, "batches": 0, "batch_size": None}
+
+
+def save_checkpoint(path, state):
+    state["updated"] = datetime.now(timezone.utc).isoformat()
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def chunked_load(pool, path, target, headers, sizer, checkpoint_path, graph_uri,
+                 use_gzip=True, retries=3, backoff=1.0, log=print):
+    """Load one file as adaptive subject-complete batches, one transaction each.
+
+    Returns (state, error message or None). Progress is checkpointed after
+    every committed batch and the checkpoint is removed on success.
+    """
+    state = load_checkpoint(checkpoint_path, file_sha256(path), graph_uri)
+    if state["batch_size"]:
+        sizer.size = state["batch_size"]
+    if state["units_done"]:
+        log(f"  Resuming after {state['triples_done']} triples "
+            f"({state['batches']} batches already committed)")
+
+    units = read_units(path)
+    for _ in range(state["units_done"]):
+        next(units, None)
+    pending = deque()
+
+    while True:
+        batch = []
+        count = 0
+        while count < sizer.size:
+            unit = pending.popleft() if pending else next(units, None)
+            if unit is None:
+                break
+            batch.append(unit)
+            count += len(unit)
+        if not batch:
+            break
+
+        body = "".join(line for unit in batch for line in unit).encode("utf-8")
+        result = post_body(pool, target, headers, lambda: io.BytesIO(body), len(body),
+                           use_gzip, retries, backoff)
+        if "error" in result:
+            # Server errors and timeouts (e.g. heap exhaustion) may just mean the
+            # batch is too big: retry it smaller until the minimum size
+            server_side = result["status"] is None or result["status"] >= 500
+            if server_side and min(sizer.size, count) > sizer.minimum:
+                pending.extendleft(reversed(batch))
+                sizer.size = min(sizer.size, count)
+                sizer.shrink()
+                log(f"  batch {state['batches'] + 1} failed ({result['error']}); "
+                    f"retrying with {sizer.size} triples")
+                continue
+            return state, result["error"]
+
+        sizer.observe(count, result["seconds"])
+        state["units_done"] += len(batch)
+        state["triples_done"] += count
+        state["batches"] += 1
+        state["batch_size"] = sizer.size
+        save_checkpoint(checkpoint_path, state)
+        log(f"  batch {state['batches']}: {count} triples in {result['seconds']:.2f}s "
+            f"(next {sizer.size})")
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return state, None
+
+
+def wait_for_fuseki(base_url, attempts=30, delay=2.0):
+    """Poll /$/ping until Fuseki answers. Returns True when it is ready."""
+    pool = ConnectionPool(base_url, 1, timeout=10)
+    for attempt in range(attempts):
+        conn = pool.acquire()
+        try:
+            conn.request("GET", "/$/ping")
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status == 200:
+                return True
+        except (OSError, http.client.HTTPException):
+            pass
+        finally:
+            conn.close()
+        if attempt < attempts - 1:
+            time.sleep(delay)
+    return False
+
+
+def bulk_load(files, base_url, dataset, graph_uri, user=None, password=None,
+              concurrency=4, use_gzip=True, retries=3, backoff=1.0):
+    """Upload files concurrently; returns (results, wall seconds, connections opened)."""
+    target = graph_target(dataset, graph_uri)
+    headers = request_headers(user, password, "text/turtle")
+
+    pool = ConnectionPool(base_url, concurrency)
+    start = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(
+                lambda path: upload_file(pool, path, target, headers, use_gzip, retries, backoff),
+                files,
+            ))
+    finally:
+        pool.close()
+    return results, time.monotonic() - start, pool.opened
+
+
+def request_headers(user, password, content_type):
+    headers = {"Content-Type": content_type, "Connection": "keep-alive"}
+    if user:
+        token = base64.b64encode(f"{user}:{password or ''}".encode()).decode()
+        headers["Authorization"] = f"Basic {token}"
+    return headers
+
+
+def graph_target(dataset, graph_uri):
+    """Graph Store URL path; graph_uri=None addresses the default graph."""
+    if graph_uri is None:
+        return f"/{dataset}/data?default"
+    return f"/{dataset}/data?graph={quote(graph_uri, safe='')}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent bulk loader for Fuseki")
+    parser.add_argument("files", nargs="+", help="Turtle files to load")
+    parser.add_argument("--fuseki-url", default=os.environ.get("FUSEKI_URL", "http://localhost:3030"))
+    parser.add_argument("--dataset", default=os.environ.get("DATASET", "skosmos"))
+    parser.add_argument("--graph", default=os.environ.get("GRAPH_URI", "http://glossary.example.org/"))
+    parser.add_argument("--user", default=os.environ.get("FUSEKI_USER", "admin"))
+    parser.add_argument("--password", default=os.environ.get("FUSEKI_PASS", "admin123"))
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Parallel uploads / pooled connections (default: 4)")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries per file on transient failures (default: 3)")
+    parser.add_argument("--backoff", type=float, default=1.0,
+                        help="Initial retry delay in seconds, doubled per attempt (default: 1.0)")
+    parser.add_argument("--no-gzip", action="store_true", help="Send uncompressed request bodies")
+    parser.add_argument("--no-wait", action="store_true", help="Skip waiting for /$/ping")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Load each file as adaptive, resumable subject-complete batches")
+    parser.add_argument("--target-seconds", type=float, default=5.0,
+                        help="Chunked mode: target request latency per batch (default: 5)")
+    parser.add_argument("--initial-batch", type=int, default=INITIAL_BATCH,
+                        help=f"Chunked mode: first batch size in triples (default: {INITIAL_BATCH})")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH,
+                        help=f"Chunked mode: largest batch in triples (default: {MAX_BATCH})")
+    args = parser.parse_args()
+
+    missing = [f for f in args.files if not os.path.isfile(f)]
+    for f in missing:
+        print(f"WARNING: File not found: {f}", file=sys.stderr)
+    files = [f for f in args.files if f not in missing]
+    if not files:
+        print("No .ttl files found to load.")
+        sys.exit(1 if missing else 0)
+
+    if not args.no_wait:
+        print(f"Waiting for Fuseki at {args.fuseki_url} ...")
+        if not wait_for_fuseki(args.fuseki_url):
+            print("ERROR: Fuseki not reachable after 30 attempts.", file=sys.stderr)
+            sys.exit(1)
+        print("Fuseki is ready.")
+
+    print("")
+    print(f"Loading {len(files)} file(s) into Fuseki dataset '{args.dataset}'...")
+    print(f"  Fuseki:       {args.fuseki_url}")
+    print(f"  Graph:        {args.graph}")
+    if args.chunked:
+        print(f"  Mode:         chunked (target {args.target_seconds:g}s per batch)")
+    else:
+        print(f"  Concurrency:  {args.concurrency}")
+    print("")
+
+    if args.chunked:
+        errors = run_chunked(args, files) + len(missing)
+        sys.exit(1 if errors else 0)
+
+    results, elapsed, opened = bulk_load(
+        files, args.fuseki_url, args.dataset, args.graph,
+        user=args.user, password=args.password, concurrency=args.concurrency,
+        use_gzip=not args.no_gzip, retries=args.retries, backoff=args.backoff,
+    )
+
+    errors = len(missing)
+    for r in results:
+        name = os.path.basename(r["file"])
+        retried = f", {r['attempts'] - 1} retr{'y' if r['attempts'] == 2 else 'ies'}" if r["attempts"] > 1 else ""
+        if "error" in r:
+            errors += 1
+            print(f"  {name}: FAILED ({r['error']}{retried})", file=sys.stderr)
+        else:
+            triples = f"{r['triples']} triples, " if r["triples"] is not None else ""
+            print(f"  {name}: OK ({r['status']}, {triples}{r['seconds']:.2f}s{retried})")
+
+    loaded = [r for r in results if "error" not in r]
+    total_triples = sum(r["triples"] or 0 for r in loaded)
+    total_mb = sum(r["bytes"] for r in loaded) / (1024 * 1024)
+    rate = elapsed if elapsed > 0 else 1e-9
+    print("")
+    print(
+        f"Loaded {len(loaded)} file(s): {total_triples} triples, {total_mb:.2f} MB "
+        f"in {elapsed:.2f}s ({total_triples / rate:.0f} triples/s, {total_mb / rate:.2f} MB/s) "
+        f"over {opened} connection(s)"
+    )
+
+    if errors:
+        print(f"Completed with {errors} error(s).", file=sys.stderr)
+        sys.exit(1)
+    print("All files loaded successfully.")
+
+
+def run_chunked(args, files):
+    """Load files one after another in chunked mode; returns the error count."""
+    pool = ConnectionPool(args.fuseki_url, 1)
+    target = graph_target(args.dataset, args.graph)
+    headers = request_headers(args.user, args.password, "application/n-triples")
+    errors = 0
+    total = 0
+    start = time.monotonic()
+    try:
+        for path in files:
+            print(f"{os.path.basename(path)}:")
+            sizer = BatchSizer(args.target_seconds, args.initial_batch, min(MIN_BATCH, args.max_batch),
+                               args.max_batch)
+            checkpoint = path + ".load-state.json"
+            try:
+                state, error = chunked_load(
+                    pool, path, target, headers, sizer, checkpoint, args.graph,
+                    use_gzip=not args.no_gzip, retries=args.retries, backoff=args.backoff,
+                )
+            except ValueError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                errors += 1
+                continue
+            total += state["triples_done"]
+            if error:
+                errors += 1
+                print(f"  FAILED ({error}) after {state['triples_done']} triples; "
+                      f"re-run to resume from {checkpoint}", file=sys.stderr)
+            else:
+                print(f"  OK ({state['triples_done']} triples in {state['batches']} batches)")
+    finally:
+        pool.close()
+
+    elapsed = time.monotonic() - start
+    print("")
+    print(f"Loaded {total} triples in {elapsed:.2f}s ({total / max(elapsed, 1e-9):.0f} triples/s)")
+    if errors:
+        print(f"Completed with {errors} error(s).", file=sys.stderr)
+    else:
+        print("All files loaded successfully.")
+    return errors
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""Append-only change history and change feed across all glossary snapshots.
+
+Each consecutive pair of snapshots in manifest.json is diffed once (using
+audit-log.py's hash-based comparison) and appended to a SQLite store that
+is indexed by concept URI and by version. History and feed queries then
+read the index instead of re-diffing snapshots. Renamed concepts are
+indexed under both their old and new URI, so a concept's history follows
+it across re-slugs.
+
+Commands:
+  record    Diff any snapshots not yet in the store and append them
+  concept   Every recorded change to one concept ("when did this change?")
+  since     All changes after a version, optionally collapsed per concept
+  versions  List recorded versions with change counts
+
+Usage:
+    python scripts/change-history.py record --manifest snapshots/manifest.json
+    python scripts/change-history.py concept http://glossary.example.org/terms/api
+    python scripts/change-history.py since 1.0.3
+    python scripts/change-history.py since 1.0.3 --net -o feed.json
+    python scripts/change-history.py versions
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from _egms import load_script
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+DEFAULT_DB = os.path.join(PROJECT_DIR, "snapshots", "history.db")
+
+
+audit_log = load_script("audit-log")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    seq       INTEGER PRIMARY KEY,
+    version   TEXT NOT NULL UNIQUE,
+    timestamp TEXT,
+    file      TEXT,
+    sha256    TEXT,
+    added     INTEGER NOT NULL DEFAULT 0,
+    removed   INTEGER NOT NULL DEFAULT 0,
+    modified  INTEGER NOT NULL DEFAULT 0,
+    recorded  TEXT NOT NULL,
+    renamed   INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq    INTEGER NOT NULL REFERENCES versions(seq),
+    uri    TEXT NOT NULL,
+    action TEXT NOT NULL,
+    label  TEXT,
+    body   TEXT NOT NULL,
+    old_uri TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_by_uri ON changes(uri, seq);
+CREATE INDEX IF NOT EXISTS changes_by_seq ON changes(seq);
+CREATE INDEX IF NOT EXISTS changes_by_old_uri ON changes(old_uri, seq);
+CREATE TRIGGER IF NOT EXISTS versions_append_only BEFORE UPDATE ON versions
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS versions_no_delete BEFORE DELETE ON versions
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS changes_append_only BEFORE UPDATE ON changes
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS changes_no_delete BEFORE DELETE ON changes
+    BEGIN SELECT RAISE(ABORT, 'history is append-only'); END;
+"""
+
+def open_store(path):
+    """Open (creating if needed) the history database."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    db.executescript(SCHEMA)
+    db.commit()
+    return db
+
+
+def compact(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def change_body(change):
+    if change["action"] == "renamed":
+        return compact({
+            "confidence": change["confidence"],
+            "details": change["details"],
+            "changes": change["changes"],
+        })
+    return compact(change.get("details", change.get("changes")))
+
+
+def append_version(db, entry, changes):
+    """Append one version and its changes in a single transaction."""
+    counts = {"added": 0, "removed": 0, "renamed": 0, "modified": 0}
+    for c in changes:
+        counts[c["action"]] += 1
+
+    with db:
+        cur = db.execute(
+            "INSERT INTO versions (version, timestamp, file, sha256, added, removed,"
+            " modified, renamed, recorded) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry["version"], entry.get("timestamp"), entry.get("file"),
+                entry.get("sha256"), counts["added"], counts["removed"],
+                counts["modified"], counts["renamed"],
+                datetime.now(timezone.utc).isoformat(),
+            ),
+        )
+        seq = cur.lastrowid
+        db.executemany(
+            "INSERT INTO changes (seq, uri, action, label, body, old_uri)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (seq, c["uri"], c["action"], c["label"], change_body(c), c.get("old_uri"))
+                for c in changes
+            ),
+        )
+    return counts
+
+
+def record(db, manifest_path):
+    """Diff and append every manifest snapshot after the last recorded one.
+
+    Older snapshots may have been pruned from the manifest; their changes
+    stay in the store.
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    entries = manifest.get("snapshots", [])
+    versions = [e["version"] for e in entries]
+    recorded = {row["version"] for row in db.execute("SELECT version FROM versions")}
+    last = db.execute("SELECT version FROM versions ORDER BY seq DESC LIMIT 1").fetchone()
+
+    start = 0
+    if last is not None:
+        if last["version"] not in versions:
+            raise ValueError(
+                "manifest does not extend the recorded history; "
+                f"the last recorded version v{last['version']} is missing"
+            )
+        start = versions.index(last["version"]) + 1
+        if not recorded.issuperset(versions[:start]):
+            raise ValueError(
+                "manifest does not extend the recorded history; "
+                f"snapshots were inserted before v{last['version']}"
+            )
+    pending = list(range(start, len(entries)))
+    if not pending:
+        return 0
+
+    first = max(pending[0] - 1, 0)
+    with tempfile.TemporaryDirectory() as workdir:
+        hashes = audit_log.index_manifest(manifest_path, manifest, entries[first:], workdir)
+        hashes = dict(zip(range(first, len(entries)), hashes))
+
+        for i in pending:
+            entry = entries[i]
+            if i == 0:
+                # The first snapshot is the baseline: consumers start from its full export
+                append_version(db, entry, [])
+                print(f"  v{entry['version']}: baseline", file=sys.stderr)
+                continue
+            audit = audit_log.compare_snapshots(
+                audit_log.snapshot_source(manifest_path, entries[i - 1], workdir),
+                audit_log.snapshot_source(manifest_path, entry, workdir),
+                hashes[i - 1],
+                hashes[i],
+            )
+            counts = append_version(db, entry, audit["changes"])
+            print(
+                f"  v{entry['version']}: {counts['added']} added, "
+                f"{counts['removed']} removed, {counts['renamed']} renamed, "
+                f"{counts['modified']} modified",
+                file=sys.stderr,
+            )
+    return len(pending)
+
+
+def row_to_change(row):
+    change = {
+        "version": row["version"],
+        "timestamp": row["timestamp"],
+        "action": row["action"],
+        "uri": row["uri"],
+        "label": row["label"],
+    }
+    body = json.loads(row["body"])
+    if row["action"] == "renamed":
+        change["old_uri"] = row["old_uri"]
+        change.update(body)
+    else:
+        change["details" if row["action"] != "modified" else "changes"] = body
+    return change
+
+
+def concept_history(db, uri):
+    """All recorded changes to one concept, oldest first."""
+    rows = db.execute(
+        "SELECT v.version, v.timestamp, c.* FROM changes c JOIN versions v USING (seq)"
+        " WHERE c.uri = ? OR c.old_uri = ? ORDER BY c.seq",
+        (uri, uri),
+    )
+    return [row_to_change(r) for r in rows]
+
+
+def version_seq(db, version):
+    row = db.execute("SELECT seq FROM versions WHERE version = ?", (version,)).fetchone()
+    if row is None:
+        raise KeyError(version)
+    return row["seq"]
+
+
+def changes_since(db, version):
+    """All changes recorded after the given version, in order."""
+    rows = db.execute(
+        "SELECT v.version, v.timestamp, c.* FROM changes c JOIN versions v USING (seq)"
+        " WHERE c.seq > ? ORDER BY c.seq, c.rowid",
+        (version_seq(db, version),),
+    )
+    return [row_to_change(r) for r in rows]
+
+
+def diff_details(old, new):
+    """Property-level diff between two concept detail dicts (audit-log format)."""
+    diffs = {}
+    for key in sorted(set(old) | set(new)):
+        if old.get(key, []) != new.get(key, []):
+            diffs[key] = {"old": old.get(key, []), "new": new.get(key, [])}
+    return diffs
+
+
+def combine(prev, cur):
+    """Fold two consecutive changes to one concept into their net effect.
+
+    Returns None when the changes cancel out (e.g. added then removed).
+    """
+    if prev["action"] == "added":
+        if cur["action"] == "removed":
+            return None
+        if cur["action"] == "modified":
+            details = dict(prev["details"])
+            for key, diff in cur["changes"].items():
+                if diff["new"]:
+                    details[key] = diff["new"]
+                else:
+                    details.pop(key, None)
+            return dict(cur, action="added", details=details, changes=None)
+    elif prev["action"] == "removed" and cur["action"] == "added":
+        diffs = diff_details(prev["details"], cur["details"])
+        return dict(cur, action="modified", changes=diffs, details=None) if diffs else None
+    elif prev["action"] == "modified" and cur["action"] == "modified":
+        merged = {}
+        for key in set(prev["changes"]) | set(cur["changes"]):
+            old = prev["changes"].get(key, cur["changes"].get(key))["old"]
+            new = cur["changes"].get(key, prev["changes"].get(key))["new"]
+            if old != new:
+                merged[key] = {"old": old, "new": new}
+        return dict(cur, changes=dict(sorted(merged.items()))) if merged else None
+    return cur
+
+
+def split_rename(change):
+    """A rename as the removal of the old URI and the addition of the new one."""
+    old_details = dict(change["details"])
+    for key, diff in change["changes"].items():
+        if diff["old"]:
+            old_details[key] = diff["old"]
+        else:
+            old_details.pop(key, None)
+    common = {k: change[k] for k in ("version", "timestamp") if k in change}
+    label = (old_details.get("prefLabel") or [change["old_uri"]])[0]
+    return [
+        dict(common, action="removed", uri=change["old_uri"], label=label, details=old_details),
+        dict(common, action="added", uri=change["uri"], label=change["label"],
+             details=change["details"]),
+    ]
+
+
+def net_changes(changes):
+    """Collapse an ordered change list to one net change per concept.
+
+    Renames are split into removed + added so the net feed stays a plain
+    per-URI state delta for consumers.
+    """
+    expanded = []
+    for change in changes:
+        expanded.extend(split_rename(change) if change["action"] == "renamed" else [change])
+    net = {}
+    for change in expanded:
+        prev = net.get(change["uri"])
+        net[change["uri"]] = change if prev is None else combine(prev, change)
+    result = []
+    for change in net.values():
+        if change is not None:
+            result.append({k: v for k, v in change.items() if v is not None})
+    return sorted(result, key=lambda c: c["uri"])
+
+
+def write_output(data, path):
+    output = json.dumps(data, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Written to {path}", file=sys.stderr)
+    else:
+        print(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Glossary change history and change feed")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"History database (default: {DEFAULT_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_record = sub.add_parser("record", help="Append unrecorded snapshots from a manifest")
+    p_record.add_argument("--manifest", required=True, help="Path to snapshots/manifest.json")
+
+    p_concept = sub.add_parser("concept", help="Show the change history of one concept")
+    p_concept.add_argument("uri", help="Concept URI")
+    p_concept.add_argument("-o", "--output", help="Output JSON file (default: stdout)")
+
+    p_since = sub.add_parser("since", help="Change feed after a version")
+    p_since.add_argument("version", help="Version the consumer already has")
+    p_since.add_argument("--net", action="store_true", help="Collapse to one net change per concept")
+    p_since.add_argument("-o", "--output", help="Output JSON file (default: stdout)")
+
+    sub.add_parser("versions", help="List recorded versions")
+    args = parser.parse_args()
+
+    db = open_store(args.db)
+
+    if args.command == "record":
+        try:
+            count = record(db, args.manifest)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Recorded {count} new version(s) in {args.db}", file=sys.stderr)
+
+    elif args.command == "concept":
+        history = concept_history(db, args.uri)
+        write_output({"uri": args.uri, "changes": history}, args.output)
+        print(f"{len(history)} change(s) to {args.uri}", file=sys.stderr)
+
+    elif args.command == "since":
+        try:
+            changes = changes_since(db, args.version)
+        except KeyError:
+            print(f"ERROR: Version {args.version} is not in the history.", file=sys.stderr)
+            sys.exit(1)
+        if args.net:
+            changes = net_changes(changes)
+        latest = db.execute("SELECT version FROM versions ORDER BY seq DESC LIMIT 1").fetchone()
+        write_output({
+            "since": args.version,
+            "latest": latest["version"],
+            "net": args.net,
+            "changes": changes,
+        }, args.output)
+        print(f"{len(changes)} change(s) since v{args.version}", file=sys.stderr)
+
+    elif args.command == "versions":
+        for row in db.execute("SELECT * FROM versions ORDER BY seq"):
+            print(
+                f"v{row['version']}\t{row['timestamp'] or '-'}\t"
+                f"+{row['added']} -{row['removed']} >{row['renamed']} ~{row['modified']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -84,6 +84,49 @@ def write_turtle(rows, base_uri, scheme_uri, out):
         out.write(f"    skos:inScheme <{scheme_uri}> .\n\n")
 
 
+def split_list(value):
+    """Items of a |-separated CSV cell, stripped, without empties."""
+    return [item.strip() for item in (value or "").split("|") if item.strip()]
+
+
+def rows_to_graph(rows, base_uri, scheme_uri):
+    """Build the graph write_turtle describes, without going through Turtle.
+
+    Used by import-pipeline.py to hand rows to validation in memory.
+    """
+    from rdflib import Graph, Literal, Namespace, RDF, URIRef
+
+    skos = Namespace("http://www.w3.org/2004/02/skos/core#")
+    g = Graph()
+    g.bind("skos", skos)
+    scheme = URIRef(scheme_uri)
+
+    for row in rows:
+        slug = row["uri_slug"].strip()
+        if not slug:
+            continue
+
+        concept = URIRef(base_uri + slug)
+        g.add((concept, RDF.type, skos.Concept))
+        g.add((concept, skos.prefLabel, Literal(row["pref_label"].strip(), lang="en")))
+        for alt in split_list(row.get("alt_labels")):
+            g.add((concept, skos.altLabel, Literal(alt, lang="en")))
+        for hidden in split_list(row.get("hidden_labels")):
+            g.add((concept, skos.hiddenLabel, Literal(hidden, lang="en")))
+        for column, predicate in (("definition", skos.definition),
+                                  ("scope_note", skos.scopeNote),
+                                  ("example", skos.example)):
+            if row.get(column, "").strip():
+                g.add((concept, predicate, Literal(row[column].strip(), lang="en")))
+        if row.get("broader_slug", "").strip():
+            g.add((concept, skos.broader, URIRef(base_uri + row["broader_slug"].strip())))
+        for rel in split_list(row.get("related_slugs")):
+            g.add((concept, skos.related, URIRef(base_uri + rel)))
+        g.add((concept, skos.inScheme, scheme))
+
+    return g
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Convert CSV glossary terms to SKOS RDF/Turtle"
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Stamp and publish the monotonically increasing dataset version.
+
+Every successful load bumps a version number kept in Fuseki, in the
+<urn:egms:meta> named graph as owl:versionInfo of <urn:egms:dataset>. The
+increment is a single SPARQL Update, so it can share a transaction with
+the data change (blue-green-load.py appends it to the graph swap).
+
+The version is then written to config/state/dataset-version, which is
+mounted into Varnish and nginx. default.vcl adds it to the cache hash
+and derives ETags from it, so cached SPARQL results can live for hours
+and stop matching exactly when the data changes. Varnish reads the file
+when a VCL is loaded, so publishing also runs `varnishreload` in the
+fuseki-cache container; if that fails, cached results are banned instead.
+
+A new version is always greater than both the Fuseki and the file copy,
+so the number never goes backwards (a rollback gets a new version too).
+
+Usage:
+    python scripts/dataset-version.py show
+    python scripts/dataset-version.py stamp      # after loading data by other means
+    python scripts/dataset-version.py sync       # rewrite the file from Fuseki and reload
+
+Environment variables (same defaults as load-data.sh):
+    FUSEKI_URL, FUSEKI_USER, FUSEKI_PASS, DATASET, VARNISH_URL
+    DATASET_VERSION_FILE - Version file (default: config/state/dataset-version)
+    VARNISH_RELOAD       - Command that reloads the VCL (default:
+                           "docker compose exec -T fuseki-cache varnishreload";
+                           set to empty to ban instead)
+"""
+
+import argparse
+import base64
+import json
+import os
+import shlex
+import subprocess
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+
+META_GRAPH = "urn:egms:meta"
+DATASET_NODE = "urn:egms:dataset"
+VERSION_INFO = "http://www.w3.org/2002/07/owl#versionInfo"
+MODIFIED = "http://purl.org/dc/terms/modified"
+
+DEFAULT_VERSION_FILE = os.path.join(PROJECT_DIR, "config", "state", "dataset-version")
+DEFAULT_RELOAD = "docker compose exec -T fuseki-cache varnishreload"
+
+
+def stamp_update(floor=0):
+    """SPARQL Update that sets the version to max(stored, floor) + 1."""
+    return (
+        f"DELETE {{ GRAPH <{META_GRAPH}> {{ <{DATASET_NODE}> <{VERSION_INFO}> ?old ;"
+        f" <{MODIFIED}> ?when }} }}\n"
+        f"INSERT {{ GRAPH <{META_GRAPH}> {{ <{DATASET_NODE}> <{VERSION_INFO}> ?next ;"
+        f" <{MODIFIED}> ?now }} }}\n"
+        f"WHERE {{\n"
+        f"  OPTIONAL {{ GRAPH <{META_GRAPH}> {{ <{DATASET_NODE}> <{VERSION_INFO}> ?old }} }}\n"
+        f"  OPTIONAL {{ GRAPH <{META_GRAPH}> {{ <{DATASET_NODE}> <{MODIFIED}> ?when }} }}\n"
+        f"  BIND (COALESCE(?old, 0) AS ?current)\n"
+        f"  BIND (IF(?current > {int(floor)}, ?current, {int(floor)}) + 1 AS ?next)\n"
+        f"  BIND (NOW() AS ?now)\n"
+        f"}}"
+    )
+
+
+def sparql(base_url, dataset, service, text, user=None, password=None, timeout=60):
+    """POST a query or update form to a Fuseki service; returns the body bytes."""
+    field = "update" if service == "update" else "query"
+    req = urllib.request.Request(
+        f"{base_url.rstrip('/')}/{dataset}/{service}",
+        data=urllib.parse.urlencode({field: text}).encode("utf-8"),
+        headers={"Content-Type": "application/x-www-form-urlencoded",
+                 "Accept": "application/sparql-results+json"},
+    )
+    if user:
+        token = base64.b64encode(f"{user}:{password or ''}".encode()).decode()
+        req.add_header("Authorization", f"Basic {token}")
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.read()
+
+
+def fuseki_version(base_url, dataset, user=None, password=None):
+    """Current version stored in Fuseki (0 if never stamped)."""
+    body = sparql(
+        base_url, dataset, "query",
+        f"SELECT ?v WHERE {{ GRAPH <{META_GRAPH}> {{ <{DATASET_NODE}> <{VERSION_INFO}> ?v }} }}",
+        user, password,
+    )
+    values = [b["v"]["value"] for b in json.loads(body)["results"]["bindings"]]
+    return max((int(v) for v in values if v.isdigit()), default=0)
+
+
+def read_version_file(path):
+    """Version recorded in the file (0 if missing or unreadable)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read().strip()
+    except OSError:
+        return 0
+    return int(text) if text.isdigit() else 0
+
+
+def write_version_file(path, version):
+    """Atomically replace the version file."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(f"{version}\n")
+    os.replace(tmp, path)
+
+
+def reload_varnish(command):
+    """Run the VCL reload command. Returns an error string or None."""
+    try:
+        result = subprocess.run(shlex.split(command), cwd=PROJECT_DIR, capture_output=True,
+                                text=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return str(e)
+    if result.returncode != 0:
+        lines = (result.stderr or result.stdout).strip().splitlines()
+        return lines[-1] if lines else f"exit status {result.returncode}"
+    return None
+
+
+def ban_cache(varnish_url):
+    """Ask Varnish to drop cached SPARQL results. Returns an error string or None."""
+    if not varnish_url:
+        return None
+    req = urllib.request.Request(varnish_url.rstrip("/") + "/skosmos/sparql", method="BAN")
+    try:
+        with urllib.request.urlopen(req, timeout=10):
+            return None
+    except (urllib.error.URLError, OSError) as e:
+        return str(e)
+
+
+def publish(version, version_file, reload_command, varnish_url):
+    """Write the version file and make Varnish key its cache on it."""
+    write_version_file(version_file, version)
+    print(f"Dataset version {version} written to {version_file}")
+    if reload_command:
+        error = reload_varnish(reload_command)
+        if not error:
+            print(f"Reloaded Varnish VCL; SPARQL results are now cached under version {version}")
+            return
+        print(f"WARNING: Could not reload Varnish VCL ({error}); banning instead", file=sys.stderr)
+    error = ban_cache(varnish_url)
+    if error:
+        print(f"WARNING: Could not ban Varnish cache at {varnish_url}: {error}", file=sys.stderr)
+    elif varnish_url:
+        print(f"Banned cached SPARQL results in {varnish_url}")
+
+
+def stamp(base_url, dataset, user, password, version_file):
+    """Bump the version in Fuseki past the file copy; returns the new version."""
+    sparql(base_url, dataset, "update", stamp_update(read_version_file(version_file)),
+           user, password)
+    return fuseki_version(base_url, dataset, user, password)
+
+
+def add_publish_arguments(parser):
+    """Options shared by every script that publishes a new version."""
+    parser.add_argument("--version-file",
+                        default=os.environ.get("DATASET_VERSION_FILE", DEFAULT_VERSION_FILE),
+                        help="Dataset version file read by Varnish and nginx")
+    parser.add_argument("--varnish-reload", default=os.environ.get("VARNISH_RELOAD", DEFAULT_RELOAD),
+                        help="Command that reloads the Varnish VCL (empty to ban instead)")
+    parser.add_argument("--varnish-url", default=os.environ.get("VARNISH_URL", "http://localhost:9031"),
+                        help="Varnish to ban if the reload fails (empty to skip)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stamp and publish the dataset version")
+    parser.add_argument("--fuseki-url", default=os.environ.get("FUSEKI_URL", "http://localhost:3030"))
+    parser.add_argument("--dataset", default=os.environ.get("DATASET", "skosmos"))
+    parser.add_argument("--user", default=os.environ.get("FUSEKI_USER", "admin"))
+    parser.add_argument("--password", default=os.environ.get("FUSEKI_PASS", "admin123"))
+    add_publish_arguments(parser)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("show", help="Show the Fuseki and file versions")
+    sub.add_parser("stamp", help="Bump the version after a load and publish it")
+    sub.add_parser("sync", help="Publish the version stored in Fuseki")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "show":
+            print(f"Fuseki: {fuseki_version(args.fuseki_url, args.dataset, args.user, args.password)}")
+            print(f"File:   {read_version_file(args.version_file)} ({args.version_file})")
+            return
+        if args.command == "stamp":
+            version = stamp(args.fuseki_url, args.dataset, args.user, args.password,
+                            args.version_file)
+        else:
+            version = fuseki_version(args.fuseki_url, args.dataset, args.user, args.password)
+    except (urllib.error.URLError, OSError) as e:
+        print(f"ERROR: Fuseki request failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    publish(version, args.version_file, args.varnish_reload, args.varnish_url)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""Fast reader for the project's own Turtle dialect, with rdflib as fallback.
+
+Every Turtle file in data/ (written by hand or by csv-to-skos.py) uses
+the same small subset of Turtle:
+
+    @prefix eg:   <http://glossary.example.org/terms/> .
+    eg:slug a skos:Concept ;
+        skos:prefLabel "Label"@en ;
+        skos:related eg:a, eg:b ;
+        skos:inScheme <http://glossary.example.org/terms/enterprise-glossary> .
+
+This reader handles that subset and N-Triples, which is a subset of it:
+
+  - @prefix / PREFIX directives
+  - prefixed names, absolute IRIs and the keyword "a"
+  - single-line "..." strings with escapes, language tags and ^^datatypes
+  - integers, decimals and booleans
+  - ";" predicate lists and "," object lists, across any line breaks
+  - comments
+
+Each line is tokenized with one compiled pattern and fed to a small state
+machine. No graph is built: triples (rdflib terms) are yielded as they
+are read, or grouped by subject. At the first construct outside the
+subset (blank nodes, collections, long or single-quoted strings,
+relative IRIs, @base, ...) the file is parsed again by rdflib, and only
+the triples not yet yielded are passed on. Real syntax errors therefore
+surface as rdflib's usual errors.
+
+A triple stated twice in a file is yielded twice on the fast path;
+rdflib collapses duplicates. Graph consumers (load_graph) see no
+difference.
+
+`check` reports which files take the fast path. `bench` scales a file up
+by repeating its statements under renamed subjects, then compares parse
+times with rdflib's and checks that both produce the same triples.
+
+Usage:
+    python scripts/fast-turtle.py check data/*.ttl
+    python scripts/fast-turtle.py bench data/imported-glossary.ttl --scale 100
+"""
+
+import argparse
+import gzip
+import itertools
+import os
+import re
+import sys
+import tempfile
+import time
+from operator import itemgetter
+
+try:
+    from rdflib import Graph, Literal, URIRef
+    from rdflib.namespace import RDF, XSD
+except ImportError:
+    print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+    sys.exit(1)
+
+IRI = r'<([^<>"{}|^`\\\x00-\x20]*)>'
+PNAME = r"([A-Za-z](?:[\w.-]*[\w-])?)?:(\w[\w-]*(?:\.+[\w-]+)*)?"
+
+TOKEN_RE = re.compile(
+    r"[ \t\r\n]+|#.*"
+    rf"|{IRI}"
+    r'|"([^"\\\n\r]*(?:\\.[^"\\\n\r]*)*)"'
+    rf"(?:@([A-Za-z]+(?:-[A-Za-z0-9]+)*)|\^\^(?:{IRI}|{PNAME}))?"
+    rf"|{PNAME}"
+    r"|([+-]?\d+(?:\.\d+)?)(?![\w.]\d)"
+    r"|(a|true|false)(?![\w:.-])"
+    r"|([;,.])"
+    r"|(@prefix|PREFIX)(?=[ \t])"
+)
+
+# The typical continuation line, "    skos:prefLabel "Label"@en ;" or
+# "    skos:broader eg:parent .", is read with a single match: 1/2 predicate,
+# 3 plain string, 4 language, 5/6 prefixed-name object, 7 punctuation
+LINE_RE = re.compile(
+    rf'[ \t]+{PNAME}[ \t]+(?:"([^"\\\n\r]*)"@([A-Za-z]+(?:-[A-Za-z0-9]+)*)|{PNAME})'
+    r"[ \t]*([;.])[ \t]*\n?"
+)
+
+# Token groups: 1 IRI, 2 string, 3 language, 4 datatype IRI, 5/6 datatype
+# prefixed name, 7/8 prefixed name, 9 number, 10 keyword, 11 punctuation,
+# 12 directive. The last group to match tells the token's kind.
+IRIREF, STRING, NAME, NUMBER, KEYWORD, PUNCT, DIRECTIVE = range(7)
+KINDS = {1: IRIREF, 2: STRING, 3: STRING, 4: STRING, 5: STRING, 6: STRING,
+         7: NAME, 8: NAME, 9: NUMBER, 10: KEYWORD, 11: PUNCT, 12: DIRECTIVE}
+
+ESCAPES = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f",
+           '"': '"', "'": "'", "\\": "\\"}
+ESCAPE_RE = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))")
+
+SUBJECT, PREDICATE, OBJECT, AFTER_OBJECT, PREFIX_NAME, PREFIX_IRI, PREFIX_END = range(7)
+
+
+class Unsupported(Exception):
+    """The file uses Turtle outside the fast reader's subset."""
+
+
+def unescape(match):
+    code = match.group(1) or match.group(2)
+    if code:
+        if int(code, 16) > 0x10FFFF:
+            raise Unsupported(f"string escape \\U{code}")
+        return chr(int(code, 16))
+    char = match.group(3)
+    if char not in ESCAPES:
+        raise Unsupported(f"string escape \\{char}")
+    return ESCAPES[char]
+
+
+def open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def parse_fast(path, prefixes=None):
+    """Yield the triples of a file in the dialect; raises Unsupported otherwise.
+
+    Declared prefixes are added to the prefixes dict, if one is given.
+    """
+    prefixes = {} if prefixes is None else prefixes
+    iris = {}
+    state = SUBJECT
+    subject = predicate = declared = None
+    after_semicolon = False
+    sparql_prefix = False
+
+    def iri(value):
+        term = iris.get(value)
+        if term is None:
+            if ":" not in value:
+                raise Unsupported(f"relative IRI <{value}>")
+            term = iris[value] = URIRef(value)
+        return term
+
+    def pname(prefix, local):
+        key = (prefix, local)
+        term = iris.get(key)
+        if term is None:
+            namespace = prefixes.get(prefix or "")
+            if namespace is None:
+                raise Unsupported(f"undeclared prefix {prefix or ''}:")
+            term = iris[key] = URIRef(namespace + (local or ""))
+        return term
+
+    with open_text(path) as f:
+        for number, line in enumerate(f, 1):
+            if '"""' in line or "'''" in line:
+                raise Unsupported(f"line {number}: long string")
+            if state == PREDICATE:
+                m = LINE_RE.fullmatch(line)
+                if m:
+                    predicate = pname(m.group(1), m.group(2))
+                    if m.group(4):
+                        obj = Literal(m.group(3), lang=m.group(4))
+                    else:
+                        obj = pname(m.group(5), m.group(6))
+                    yield subject, predicate, obj
+                    if m.group(7) == ".":
+                        state = SUBJECT
+                    else:
+                        after_semicolon = True
+                    continue
+            # A token the patterns cut short leaves characters over at the
+            # end of the line, so the line's triples wait for that check
+            pending = []
+            scanner = TOKEN_RE.scanner(line)
+            end = 0
+            for m in iter(scanner.match, None):
+                end = m.end()
+                kind = KINDS.get(m.lastindex)
+                if kind is None:
+                    if m.group(0) != ":":
+                        continue  # whitespace or comment
+                    kind = NAME  # the bare default-prefix name
+
+                if state == OBJECT:
+                    if kind == STRING:
+                        text = m.group(2)
+                        if "\\" in text:
+                            text = ESCAPE_RE.sub(unescape, text)
+                        if m.lastindex == 3:
+                            obj = Literal(text, lang=m.group(3))
+                        elif m.lastindex == 4:
+                            obj = Literal(text, datatype=iri(m.group(4)))
+                        elif m.lastindex > 4 or m.group(0).endswith(":"):
+                            obj = Literal(text, datatype=pname(m.group(5), m.group(6)))
+                        else:
+                            obj = Literal(text)
+                    elif kind == NAME:
+                        obj = pname(m.group(7), m.group(8))
+                    elif kind == IRIREF:
+                        obj = iri(m.group(1))
+                    elif kind == NUMBER:
+                        value = m.group(9)
+                        obj = Literal(value, datatype=XSD.decimal if "." in value else XSD.integer)
+                    elif kind == KEYWORD and m.group(10) != "a":
+                        obj = Literal(m.group(10), datatype=XSD.boolean)
+                    else:
+                        raise Unsupported(f"line {number}: unexpected {m.group(0)!r}")
+                    pending.append((subject, predicate, obj))
+                    state = AFTER_OBJECT
+                elif state == AFTER_OBJECT:
+                    punct = m.group(11) if kind == PUNCT else None
+                    if punct == ",":
+                        state = OBJECT
+                    elif punct == ";":
+                        state = PREDICATE
+                        after_semicolon = True
+                    elif punct == ".":
+                        state = SUBJECT
+                    else:
+                        raise Unsupported(f"line {number}: unexpected {m.group(0)!r}")
+                elif state == PREDICATE:
+                    if kind == NAME:
+                        predicate = pname(m.group(7), m.group(8))
+                    elif kind == IRIREF:
+                        predicate = iri(m.group(1))
+                    elif kind == KEYWORD and m.group(10) == "a":
+                        predicate = RDF.type
+                    elif kind == PUNCT and after_semicolon and m.group(11) in ";.":
+                        state = SUBJECT if m.group(11) == "." else PREDICATE
+                        continue
+                    else:
+                        raise Unsupported(f"line {number}: unexpected {m.group(0)!r}")
+                    after_semicolon = False
+                    state = OBJECT
+                elif state == SUBJECT:
+                    if kind == NAME:
+                        subject = pname(m.group(7), m.group(8))
+                    elif kind == IRIREF:
+                        subject = iri(m.group(1))
+                    elif kind == DIRECTIVE:
+                        sparql_prefix = m.group(12) == "PREFIX"
+                        state = PREFIX_NAME
+                        continue
+                    else:
+                        raise Unsupported(f"line {number}: unexpected {m.group(0)!r}")
+                    after_semicolon = False
+                    state = PREDICATE
+                elif state == PREFIX_NAME:
+                    if kind != NAME or m.group(8):
+                        raise Unsupported(f"line {number}: prefix declaration")
+                    declared = m.group(7) or ""
+                    state = PREFIX_IRI
+                elif state == PREFIX_IRI:
+                    if kind != IRIREF:
+                        raise Unsupported(f"line {number}: prefix declaration")
+                    prefixes[declared] = iri(m.group(1))
+                    state = SUBJECT if sparql_prefix else PREFIX_END
+                elif state == PREFIX_END:
+                    if kind != PUNCT or m.group(11) != ".":
+                        raise Unsupported(f"line {number}: prefix declaration")
+                    state = SUBJECT
+            if end != len(line):
+                raise Unsupported(f"line {number}: {line[end:end + 20].strip()!r}")
+            if pending:
+                yield from pending
+    if state != SUBJECT:
+        raise Unsupported("unterminated statement at end of file")
+
+
+def iter_triples(path, on_fallback=None):
+    """Yield a file's triples, from the fast reader or, if needed, from rdflib.
+
+    on_fallback(path, reason) is called when rdflib takes over.
+    """
+    emitted = 0
+    try:
+        for triple in parse_fast(path):
+            yield triple
+            emitted += 1
+        return
+    except Unsupported as e:
+        reason = str(e)
+    if on_fallback:
+        on_fallback(path, reason)
+    # The triples already yielded come from lines read in full before the
+    # unsupported one; they contain no blank nodes, so they compare equal
+    seen = set(itertools.islice(parse_fast(path), emitted))
+    g = Graph()
+    parse_with_rdflib(g, path)
+    for triple in g:
+        if triple not in seen:
+            yield triple
+
+
+def iter_subjects(path, on_fallback=None):
+    """Yield (subject, [(predicate, object), ...]) for each run of one subject's triples.
+
+    A subject stated in several places in a file yields several records.
+    """
+    for subject, triples in itertools.groupby(iter_triples(path, on_fallback), key=itemgetter(0)):
+        yield subject, [(p, o) for _, p, o in triples]
+
+
+def parse_with_rdflib(g, path):
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            g.parse(f, format="nt" if path.endswith(".nt.gz") else "turtle")
+    else:
+        g.parse(path, format="nt" if path.endswith(".nt") else "turtle")
+
+
+def load_graph(paths, graph=None, on_fallback=None):
+    """Parse files into an rdflib Graph (a new one unless given); returns it."""
+    g = Graph() if graph is None else graph
+    for path in paths:
+        prefixes = {}
+        try:
+            # A partial fast load is harmless: it holds only triples from lines
+            # read in full, which the rdflib parse adds again
+            g.addN((s, p, o, g) for s, p, o in parse_fast(path, prefixes))
+        except Unsupported as e:
+            if on_fallback:
+                on_fallback(path, str(e))
+            parse_with_rdflib(g, path)
+            continue
+        for prefix, namespace in prefixes.items():
+            g.bind(prefix, namespace, override=False)
+    return g
+
+
+# -- commands --------------------------------------------------------------------
+
+def scale_up(path, scale, out):
+    """Write a file's statements `scale` times, renaming eg: subjects in each copy."""
+    with open_text(path) as f:
+        lines = f.readlines()
+    header = [line for line in lines if line.lstrip().startswith(("@prefix", "PREFIX"))]
+    body = [line for line in lines if line not in header]
+    out.writelines(header)
+    local = re.compile(r"\beg:([\w-]+)")
+    for i in range(scale):
+        if i == 0:
+            out.writelines(body)
+            continue
+        suffix = f"-c{i}"
+        out.writelines(local.sub(lambda m: f"eg:{m.group(1)}{suffix}", line) for line in body)
+
+
+def timed(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def cmd_bench(args):
+    with tempfile.TemporaryDirectory(prefix="egms-turtle-") as tmp:
+        scaled = os.path.join(tmp, "scaled.ttl")
+        with open(scaled, "w", encoding="utf-8") as out:
+            scale_up(args.file, args.scale, out)
+        size = os.path.getsize(scaled)
+
+        fast_time, _ = timed(lambda: sum(1 for _ in parse_fast(scaled)), args.repeat)
+        graph_time, _ = timed(lambda: load_graph([scaled]), args.repeat)
+
+        def rdflib_parse():
+            g = Graph()
+            g.parse(scaled, format="turtle")
+            return g
+
+        rdflib_time, g = timed(rdflib_parse, args.repeat)
+        same = set(parse_fast(scaled)) == set(g)
+
+    print(f"{args.file} x{args.scale}: {size / 1e6:.1f} MB, {len(g)} triples")
+    print(f"  rdflib Graph.parse        {rdflib_time:8.2f}s")
+    print(f"  fast reader, streaming    {fast_time:8.2f}s  ({rdflib_time / fast_time:.1f}x)")
+    print(f"  fast reader into a Graph  {graph_time:8.2f}s  ({rdflib_time / graph_time:.1f}x)")
+    print(f"  Same triples: {'yes' if same else 'NO'}")
+    if not same:
+        sys.exit(1)
+
+
+def cmd_check(args):
+    fallbacks = 0
+    for path in args.files:
+        try:
+            count = sum(1 for _ in parse_fast(path))
+            print(f"{path}: fast, {count} triples")
+        except Unsupported as e:
+            fallbacks += 1
+            g = Graph()
+            try:
+                parse_with_rdflib(g, path)
+            except Exception as err:  # rdflib parse errors have no common base class
+                print(f"ERROR: Syntax error in {path}: {err}", file=sys.stderr)
+                sys.exit(1)
+            print(f"{path}: rdflib ({e}), {len(g)} triples")
+    print(f"{len(args.files) - fallbacks} of {len(args.files)} files read by the fast reader",
+          file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast reader for the project's Turtle dialect")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("check", help="Report which files the fast reader handles")
+    p.add_argument("files", nargs="+")
+
+    p = sub.add_parser("bench", help="Parse time against rdflib on a scaled-up file")
+    p.add_argument("file", help="Turtle file in the project dialect")
+    p.add_argument("--scale", type=int, default=100, help="Copies of the file (default: 100)")
+    p.add_argument("--repeat", type=int, default=1, help="Best of N runs (default: 1)")
+
+    args = parser.parse_args()
+    for path in args.files if args.command == "check" else [args.file]:
+        if not os.path.isfile(path):
+            print(f"ERROR: File not found: {path}", file=sys.stderr)
+            sys.exit(1)
+    {"check": cmd_check, "bench": cmd_bench}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
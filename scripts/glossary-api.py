@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""Read-replica glossary API served from an in-memory index.
+
+SKOSMOS's REST API is PHP in front of Fuseki, and every request is a
+SPARQL round trip. Machine consumers that only need concepts by slug or
+label can use this service instead. It loads the vocabulary once, from
+the Turtle files in data/ or from the newest snapshot in a snapshot
+manifest, and answers from memory:
+
+  GET  /concept/{slug}        concept JSON-LD (the document build-static-views.py
+                              writes), with an ETag; If-None-Match gets a 304
+  GET  /lookup?label=X        concepts whose prefLabel, altLabel or hiddenLabel
+                              matches X, ignoring case and accents; &lang=
+                              restricts the label language
+  POST /batch                 {"concepts": [slug or URI, ...], "labels": [...]}
+                              resolved in one request (at most --max-batch keys)
+  GET  /health                concept count, source and load time
+
+Concept documents are encoded once per load, so a request costs a dict
+lookup. The source is polled every --reload-interval seconds. When a data
+file or the manifest changes, the index is rebuilt in a worker thread and
+swapped in whole, and requests keep being answered from the old index
+until then. A failed reload keeps the old index and is reported on
+stderr.
+
+Replicas hold no state besides the index, so several of them can run
+behind the gateway's /api/ location (see config/nginx/nginx.conf).
+
+Usage:
+    python scripts/glossary-api.py                              # data/*.ttl on :8090
+    python scripts/glossary-api.py --snapshot-manifest snapshots/manifest.json
+    curl http://localhost:8090/concept/deployment-pipeline
+    curl 'http://localhost:8090/lookup?label=ci/cd'
+    curl -d '{"concepts": ["api", "ci-cd"]}' http://localhost:8090/batch
+
+Environment variables:
+    GLOSSARY_API_PORT - Port to listen on (default: 8090)
+    SNAPSHOT_MANIFEST - Serve the newest snapshot instead of data files
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, unquote, urlsplit
+
+try:
+    from rdflib import Graph
+    from rdflib.namespace import SKOS
+except ImportError:
+    print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+    sys.exit(1)
+
+from _egms import load_script
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+DEFAULT_BASE_URI = "http://glossary.example.org/terms/"
+
+# Request heads and bodies larger than this are refused
+MAX_HEADER_BYTES = 16384
+MAX_BODY_BYTES = 1 << 20
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+views = load_script("build-static-views")
+store = load_script("snapshot-store")
+
+
+def fold(label):
+    """Key under which a label is looked up (case- and accent-insensitive)."""
+    return " ".join(views.sort_key(label)[0].split())
+
+
+class Index:
+    """Encoded concept documents and the label index of one vocabulary load."""
+
+    def __init__(self, g, base_uri, source):
+        vocab = views.Vocabulary(g, base_uri)
+        self.source = source
+        self.loaded = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.documents = {}
+        self.etags = {}
+        self.slugs = {}
+        for c in vocab.concepts:
+            slug = vocab.slugs[c]
+            body = json.dumps(vocab.concept_document(c), ensure_ascii=False,
+                              separators=(",", ":")).encode("utf-8")
+            self.documents[slug] = body
+            self.etags[slug] = '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+            self.slugs[str(c)] = slug
+
+        self.labels = defaultdict(list)
+        for c in vocab.concepts:
+            for predicate, kind in ((SKOS.prefLabel, "prefLabel"), (SKOS.altLabel, "altLabel"),
+                                    (SKOS.hiddenLabel, "hiddenLabel")):
+                for o in g.objects(c, predicate):
+                    match = vocab.summary(c)
+                    match.update({"matched": str(o), "kind": kind,
+                                  "lang": getattr(o, "language", None)})
+                    self.labels[fold(str(o))].append(match)
+        for matches in self.labels.values():
+            matches.sort(key=lambda m: (m["kind"] != "prefLabel", m["@id"], m["lang"] or ""))
+
+    def slug_for(self, key):
+        """Slug of a concept given its slug or its URI."""
+        return key if key in self.documents else self.slugs.get(key)
+
+    def lookup(self, label, lang=None):
+        return [m for m in self.labels.get(fold(label), ())
+                if lang is None or m["lang"] == lang]
+
+
+def data_source(patterns):
+    """Files matched by the --data patterns, sorted."""
+    files = set()
+    for pattern in patterns:
+        files.update(glob.glob(pattern) if glob.has_magic(pattern) else [pattern])
+    return sorted(f for f in files if os.path.isfile(f))
+
+
+def source_stamp(files):
+    """Changes whenever a source file is added, removed, replaced or written."""
+    stamp = []
+    for path in files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stamp.append((path, st.st_mtime_ns, st.st_size, st.st_ino))
+    return tuple(stamp)
+
+
+def load_index(args):
+    """Build an Index from the snapshot manifest or the data files."""
+    g = Graph()
+    if args.snapshot_manifest:
+        buf = io.BytesIO()
+        entry = store.restore_version(args.snapshot_manifest, "latest", buf)
+        # Legacy manifest entries are full Turtle copies
+        g.parse(data=buf.getvalue(), format="nt" if entry.get("storage") else "turtle")
+        source = f"snapshot v{entry['version']}"
+    else:
+        files = data_source(args.data)
+        if not files:
+            raise FileNotFoundError(f"no data files match {' '.join(args.data)}")
+        for path in files:
+            g.parse(path, format="turtle")
+        source = f"{len(files)} data files"
+    return Index(g, args.base_uri, source)
+
+
+def watched_files(args):
+    if args.snapshot_manifest:
+        return [args.snapshot_manifest]
+    return data_source(args.data)
+
+
+class GlossaryAPI:
+    """HTTP/1.1 keep-alive server over the current Index."""
+
+    def __init__(self, args, index):
+        self.args = args
+        self.index = index
+        self.stamp = source_stamp(watched_files(args))
+        self.reloads = 0
+
+    # -- reload ------------------------------------------------------------
+
+    async def watch(self):
+        """Poll the source and swap in a rebuilt index when it changes."""
+        while True:
+            await asyncio.sleep(self.args.reload_interval)
+            stamp = source_stamp(watched_files(self.args))
+            if stamp == self.stamp:
+                continue
+            self.stamp = stamp
+            began = time.monotonic()
+            try:
+                index = await asyncio.to_thread(load_index, self.args)
+            except Exception as e:  # keep serving the old index
+                print(f"ERROR: reload failed, still serving {self.index.source}: {e}",
+                      file=sys.stderr)
+                continue
+            self.index = index
+            self.reloads += 1
+            print(f"Reloaded {index.source}: {len(index.documents)} concepts "
+                  f"in {time.monotonic() - began:.2f}s", file=sys.stderr)
+
+    # -- routes ------------------------------------------------------------
+
+    def route(self, method, target, headers, body):
+        """Return (status, extra headers, body bytes) for one request."""
+        url = urlsplit(target)
+        path = url.path
+        index = self.index
+
+        if path.startswith("/concept/"):
+            if method not in ("GET", "HEAD"):
+                return self.error(405, "use GET")
+            slug = index.slug_for(unquote(path[len("/concept/"):]))
+            if slug is None:
+                return self.error(404, "concept not found")
+            etag = index.etags[slug]
+            cache = {"ETag": etag, "Content-Type": "application/ld+json"}
+            if etag in headers.get("if-none-match", ""):
+                return 304, cache, b""
+            return 200, cache, index.documents[slug]
+
+        if path == "/lookup":
+            if method not in ("GET", "HEAD"):
+                return self.error(405, "use GET")
+            query = parse_qs(url.query)
+            label = query.get("label", [""])[0]
+            if not label.strip():
+                return self.error(400, "label parameter is required")
+            lang = query.get("lang", [None])[0]
+            return self.json(200, {"label": label, "results": index.lookup(label, lang)})
+
+        if path == "/batch":
+            if method != "POST":
+                return self.error(405, "use POST")
+            return self.batch(index, body)
+
+        if path == "/health":
+            return self.json(200, {"status": "ok", "concepts": len(index.documents),
+                                   "source": index.source, "loaded": index.loaded,
+                                   "reloads": self.reloads})
+
+        return self.error(404, "no such endpoint")
+
+    def batch(self, index, body):
+        try:
+            request = json.loads(body or b"{}")
+            concepts = request.get("concepts", [])
+            labels = request.get("labels", [])
+            lang = request.get("lang")
+            if not all(isinstance(k, str) for k in list(concepts) + list(labels)):
+                raise ValueError("keys must be strings")
+        except (ValueError, AttributeError, TypeError) as e:
+            return self.error(400, f"invalid batch request: {e}")
+        if len(concepts) + len(labels) > self.args.max_batch:
+            return self.error(413, f"at most {self.args.max_batch} keys per batch")
+
+        parts = []
+        for key in concepts:
+            slug = index.slug_for(key)
+            doc = index.documents[slug] if slug is not None else b"null"
+            parts.append(json.dumps(key, ensure_ascii=False).encode("utf-8") + b":" + doc)
+        found = {label: index.lookup(label, lang) for label in labels}
+        # Documents are spliced in already encoded rather than decoded and re-dumped
+        data = (b'{"concepts":{' + b",".join(parts) + b'},"labels":'
+                + json.dumps(found, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                + b"}")
+        return 200, {"Content-Type": "application/json"}, data
+
+    @staticmethod
+    def json(status, doc):
+        data = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return status, {"Content-Type": "application/json"}, data
+
+    def error(self, status, message):
+        return self.json(status, {"error": message})
+
+    # -- connection handling -----------------------------------------------
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.LimitOverrunError:
+                    await self.send(writer, "GET", *self.error(413, "request head too large"),
+                                    close=True)
+                    return
+                except asyncio.IncompleteReadError:
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self.send(writer, "GET", *self.error(400, "bad request line"),
+                                    close=True)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    await self.send(writer, method, *self.error(413, "request body too large"),
+                                    close=True)
+                    return
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                close = connection == "close" or (version == "HTTP/1.0" and
+                                                  connection != "keep-alive")
+                await self.send(writer, method, *self.route(method, target, headers, body),
+                                close=close)
+                if close:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, method, status, headers, data, close=False):
+        head = [f"HTTP/1.1 {status} {REASONS[status]}"]
+        headers = dict(headers)
+        if status != 304:
+            headers["Content-Length"] = str(len(data))
+        headers["Connection"] = "close" if close else "keep-alive"
+        head.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        if method != "HEAD" and status != 304:
+            writer.write(data)
+        await writer.drain()
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle, self.args.bind, self.args.port,
+                                            limit=MAX_HEADER_BYTES)
+        port = server.sockets[0].getsockname()[1]
+        if self.args.port_file:
+            with open(self.args.port_file, "w") as f:
+                f.write(str(port))
+        print(f"Serving {self.index.source} ({len(self.index.documents)} concepts) "
+              f"on {self.args.bind}:{port}", file=sys.stderr)
+        watcher = asyncio.create_task(self.watch()) if self.args.reload_interval > 0 else None
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if watcher:
+                watcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory read-replica glossary API")
+    parser.add_argument("data", nargs="*", default=[os.path.join(PROJECT_DIR, "data", "*.ttl")],
+                        help="Turtle files or globs to serve (default: data/*.ttl)")
+    parser.add_argument("--snapshot-manifest", default=os.environ.get("SNAPSHOT_MANIFEST"),
+                        help="Serve the newest version in this snapshot manifest instead")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("GLOSSARY_API_PORT", 8090)),
+                        help="Port to listen on, 0 for any (default: 8090)")
+    parser.add_argument("--bind", default="0.0.0.0", help="Address to listen on")
+    parser.add_argument("--port-file", help="Write the bound port to this file once listening")
+    parser.add_argument("--reload-interval", type=float, default=5.0,
+                        help="Seconds between source change checks, 0 to disable (default: 5)")
+    parser.add_argument("--max-batch", type=int, default=1000,
+                        help="Most keys in one /batch request (default: 1000)")
+    parser.add_argument("--base-uri", default=DEFAULT_BASE_URI,
+                        help=f"Concept namespace for slugs (default: {DEFAULT_BASE_URI})")
+    args = parser.parse_args()
+
+    try:
+        index = load_index(args)
+    except (OSError, KeyError, ValueError, store.VerificationError) as e:
+        print(f"ERROR: cannot load vocabulary: {e}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:  # rdflib parse errors have no common base class
+        print(f"ERROR: cannot parse vocabulary: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        asyncio.run(GlossaryAPI(args, index).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
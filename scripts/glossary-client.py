@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""Batching async client for resolving glossary terms over SPARQL.
+
+Services that resolve one term per HTTP request pay a round trip per term
+(thousands per page render). GlossaryClient coalesces the lookups made
+within a short --window into one SELECT with a VALUES block:
+
+  - concurrent lookups of the same term share one in-flight request
+  - results (including "not found") are kept in a size-bounded LRU cache
+    with a TTL
+  - expired entries are revalidated with If-None-Match against the ETag
+    they were fetched with; Varnish answers 304 while the dataset version
+    is unchanged (see dataset-version.py), and since that ETag is
+    version-wide, one 304 renews every entry fetched under it
+  - batches are split to keep GET URLs cacheable and under proxy limits,
+    and VALUES are sorted so identical batches hit the same cache entry
+
+Usage from a service (asyncio):
+
+    client_module = load_script("glossary-client")
+    async with client_module.GlossaryClient("http://gateway:80") as client:
+        term = await client.lookup("deployment-pipeline")   # slug or URI
+        terms = await client.lookup_many(slugs)
+
+Command line:
+    python scripts/glossary-client.py lookup deployment-pipeline ci-cd
+    python scripts/glossary-client.py bench --url http://localhost:9031 --endpoint /skosmos/sparql
+
+The benchmark renders --pages simulated pages of --terms-per-page lookups
+each (--concurrency pages at a time) twice: naive, one request per term,
+and through the client. It reports round trips and latency for both.
+
+Environment variables:
+    GATEWAY_URL - Gateway base URL (default: http://localhost:8080)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+from _egms import load_script
+
+SKOS = "http://www.w3.org/2004/02/skos/core#"
+SELECT_ACCEPT = "application/sparql-results+json"
+DEFAULT_BASE_URI = "http://glossary.example.org/terms/"
+
+# Keep request lines well under nginx's 8k large_client_header_buffers
+MAX_TARGET_LENGTH = 6000
+
+# ETags minted by default.vcl change only with the dataset version
+VERSION_ETAG_PREFIX = 'W/"egms-v'
+
+
+http = load_script("load-test")
+
+
+def batch_query(uris, lang):
+    """One SELECT resolving label and definition for every URI in the batch."""
+    values = " ".join(f"<{u}>" for u in sorted(uris))
+    return (
+        f"PREFIX skos: <{SKOS}>\n"
+        "SELECT ?concept ?label ?definition WHERE {\n"
+        f"  VALUES ?concept {{ {values} }}\n"
+        "  ?concept skos:prefLabel ?label .\n"
+        f'  FILTER(lang(?label) = "{lang}")\n'
+        "  OPTIONAL {\n"
+        "    ?concept skos:definition ?definition .\n"
+        f'    FILTER(lang(?definition) = "{lang}")\n'
+        "  }\n"
+        "}"
+    )
+
+
+def parse_terms(body, base_uri):
+    """{uri: term} from a batch query's JSON results (first label wins)."""
+    terms = {}
+    for b in json.loads(body)["results"]["bindings"]:
+        uri = b["concept"]["value"]
+        if uri in terms:
+            continue
+        terms[uri] = {
+            "uri": uri,
+            "slug": uri[len(base_uri):] if uri.startswith(base_uri) else uri,
+            "label": b["label"]["value"],
+            "definition": b.get("definition", {}).get("value"),
+        }
+    return terms
+
+
+class CacheEntry:
+    __slots__ = ("value", "expires", "etag")
+
+    def __init__(self, value, expires, etag):
+        self.value = value
+        self.expires = expires
+        self.etag = etag
+
+
+class GlossaryClient:
+    """Coalescing, caching term resolver; use one instance per event loop."""
+
+    def __init__(self, base_url=None, endpoint="/sparql", lang="en", window=0.005,
+                 max_batch=100, cache_size=10000, ttl=300.0, connections=4, timeout=10.0,
+                 base_uri=DEFAULT_BASE_URI):
+        self.base_url = base_url or os.environ.get("GATEWAY_URL", "http://localhost:8080")
+        self.endpoint = endpoint
+        self.lang = lang
+        self.window = window
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.timeout = timeout
+        self.base_uri = base_uri
+        self.cache = OrderedDict()
+        self.in_flight = {}
+        self.pending = {}
+        self.flush_handle = None
+        self.connections = asyncio.Queue()
+        for _ in range(connections):
+            self.connections.put_nowait(http.Connection(self.base_url, timeout))
+        self.tasks = set()
+        self.stats = {"lookups": 0, "cache_hits": 0, "coalesced": 0, "round_trips": 0,
+                      "revalidated": 0, "not_modified": 0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self.pending:
+            self.flush()
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        while not self.connections.empty():
+            await self.connections.get_nowait().close()
+
+    def uri_for(self, key):
+        return key if "://" in key else self.base_uri + key
+
+    # -- lookups -----------------------------------------------------------
+
+    async def lookup(self, key):
+        """Resolve a slug or URI to {uri, slug, label, definition}, or None."""
+        self.stats["lookups"] += 1
+        uri = self.uri_for(key)
+        entry = self.cache.get(uri)
+        if entry is not None and entry.expires > time.monotonic():
+            self.cache.move_to_end(uri)
+            self.stats["cache_hits"] += 1
+            return entry.value
+        future = self.in_flight.get(uri)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[uri] = future
+        self.pending[uri] = entry
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await asyncio.shield(future)
+
+    async def lookup_many(self, keys):
+        """Resolve several keys at once; returns {key: term or None}."""
+        results = await asyncio.gather(*(self.lookup(k) for k in keys))
+        return dict(zip(keys, results))
+
+    # -- batching ----------------------------------------------------------
+
+    def flush(self):
+        """Send everything pending: revalidations grouped by ETag, the rest as new fetches."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        pending, self.pending = self.pending, {}
+        groups = {}
+        for uri, entry in pending.items():
+            etag = entry.etag if entry is not None else None
+            groups.setdefault(etag, {})[uri] = entry
+        for etag, entries in groups.items():
+            for batch in self.split(entries):
+                task = asyncio.ensure_future(self.fetch(batch, etag, entries))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    def split(self, uris):
+        """Cut a batch so each GET stays under MAX_TARGET_LENGTH."""
+        batch = []
+        for uri in sorted(uris):
+            trial = batch + [uri]
+            target = self.target(trial)
+            if batch and (len(trial) > self.max_batch or len(target) > MAX_TARGET_LENGTH):
+                yield batch
+                batch = [uri]
+            else:
+                batch = trial
+        if batch:
+            yield batch
+
+    def target(self, uris):
+        return f"{self.endpoint}?query={quote(batch_query(uris, self.lang), safe='')}"
+
+    async def request(self, target, headers):
+        conn = await self.connections.get()
+        try:
+            for attempt in range(2):
+                try:
+                    self.stats["round_trips"] += 1
+                    return await conn.get(target, SELECT_ACCEPT, headers)
+                except (OSError, asyncio.IncompleteReadError, IndexError, ValueError) as e:
+                    # A keep-alive connection the server already closed; retry once
+                    await conn.close()
+                    if attempt:
+                        raise ConnectionError(f"SPARQL endpoint connection failed: {e!r}") from e
+        finally:
+            self.connections.put_nowait(conn)
+
+    async def fetch(self, uris, etag=None, entries=None):
+        """Resolve a batch; entries are the stale cache entries being revalidated."""
+        headers = {"If-None-Match": etag} if etag else None
+        if etag:
+            self.stats["revalidated"] += len(uris)
+        values = None
+        error = ConnectionError("lookup cancelled")
+        try:
+            status, response_headers, body = await self.request(self.target(uris), headers)
+            if status == 304 and etag:
+                self.stats["not_modified"] += 1
+                values = self.renew({uri: entries[uri] for uri in uris}, etag)
+            elif status == 200:
+                terms = parse_terms(body, self.base_uri)
+                values = {uri: terms.get(uri) for uri in uris}
+                self.store(values, response_headers.get("etag"))
+            else:
+                raise ConnectionError(f"SPARQL endpoint returned HTTP {status}")
+        except Exception as e:  # any failure is the waiters' to handle
+            error = e
+        finally:
+            # Every future in the batch resolves, or its lookups would wait forever
+            for uri in uris:
+                future = self.in_flight.pop(uri, None)
+                if future is None or future.done():
+                    continue
+                if values is None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(values[uri])
+
+    # -- cache -------------------------------------------------------------
+
+    def store(self, values, etag):
+        expires = time.monotonic() + self.ttl
+        for uri, value in values.items():
+            self.cache[uri] = CacheEntry(value, expires, etag)
+            self.cache.move_to_end(uri)
+        self.evict()
+
+    def renew(self, entries, etag):
+        """Extend entries confirmed by a 304; returns their values.
+
+        Entries evicted while the revalidation was in flight are put back;
+        a version-wide ETag also extends every other cached entry under it.
+        """
+        expires = time.monotonic() + self.ttl
+        for uri, entry in entries.items():
+            # A newer entry stored meanwhile is kept over the revalidated one
+            self.cache.setdefault(uri, entry)
+            self.cache.move_to_end(uri)
+        version_wide = etag.startswith(VERSION_ETAG_PREFIX)
+        for uri, entry in self.cache.items():
+            if entry.etag == etag and (version_wide or uri in entries):
+                entry.expires = expires
+        values = {uri: self.cache[uri].value for uri in entries}
+        self.evict()
+        return values
+
+    def evict(self):
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+
+# -- benchmark -------------------------------------------------------------------
+
+async def fetch_concept_uris(base_url, endpoint, limit, timeout):
+    query = f"SELECT ?c WHERE {{ ?c a <{SKOS}Concept> }} LIMIT {int(limit)}"
+    conn = http.Connection(base_url, timeout)
+    try:
+        status, _, body = await conn.get(f"{endpoint}?query={quote(query, safe='')}",
+                                         SELECT_ACCEPT)
+    finally:
+        await conn.close()
+    if status != 200:
+        raise ConnectionError(f"Concept query returned HTTP {status}")
+    return [b["c"]["value"] for b in json.loads(body)["results"]["bindings"]]
+
+
+def make_pages(uris, pages, per_page, rng):
+    """Term lists per page, skewed so popular terms repeat across pages."""
+    weights = [1.0 / (rank + 1) for rank in range(len(uris))]
+    return [rng.choices(uris, weights, k=per_page) for _ in range(pages)]
+
+
+async def run_pages(pages, concurrency, resolve_page):
+    """Render pages with `concurrency` in flight; returns per-page latencies."""
+    queue = list(enumerate(pages))
+    latencies = []
+
+    async def worker():
+        while queue:
+            _, terms = queue.pop()
+            began = time.monotonic()
+            await resolve_page(terms)
+            latencies.append(time.monotonic() - began)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(latencies)
+
+
+async def naive_run(args, pages, lang):
+    """One request per term, one keep-alive connection per concurrent page."""
+    round_trips = 0
+    pool = asyncio.Queue()
+    for _ in range(args.concurrency):
+        pool.put_nowait(http.Connection(args.url, args.timeout))
+
+    async def resolve_page(terms):
+        nonlocal round_trips
+        conn = await pool.get()
+        try:
+            for uri in terms:
+                round_trips += 1
+                status, _, body = await conn.get(
+                    f"{args.endpoint}?query={quote(batch_query([uri], lang), safe='')}",
+                    SELECT_ACCEPT,
+                )
+                if status != 200:
+                    raise ConnectionError(f"HTTP {status}")
+                parse_terms(body, DEFAULT_BASE_URI)
+        finally:
+            pool.put_nowait(conn)
+
+    start = time.monotonic()
+    latencies = await run_pages(pages, args.concurrency, resolve_page)
+    elapsed = time.monotonic() - start
+    while not pool.empty():
+        await pool.get_nowait().close()
+    return {"round_trips": round_trips, "seconds": elapsed, "latencies": latencies}
+
+
+async def batched_run(args, pages, lang):
+    async with GlossaryClient(args.url, args.endpoint, lang, window=args.window,
+                              max_batch=args.max_batch, connections=args.concurrency,
+                              timeout=args.timeout) as client:
+        async def resolve_page(terms):
+            await client.lookup_many(terms)
+
+        start = time.monotonic()
+        latencies = await run_pages(pages, args.concurrency, resolve_page)
+        elapsed = time.monotonic() - start
+    return {"round_trips": client.stats["round_trips"], "seconds": elapsed,
+            "latencies": latencies, "stats": client.stats}
+
+
+def percentile_ms(latencies, fraction):
+    return http.percentile(latencies, fraction) * 1000
+
+
+async def cmd_bench(args):
+    uris = await fetch_concept_uris(args.url, args.endpoint, args.vocabulary, args.timeout)
+    if not uris:
+        raise ValueError("no concepts found")
+    pages = make_pages(uris, args.pages, args.terms_per_page, random.Random(args.seed))
+    lookups = args.pages * args.terms_per_page
+    print(f"Workload:   {args.pages} pages x {args.terms_per_page} terms "
+          f"({lookups} lookups over {len(uris)} concepts, {args.concurrency} pages at a time)")
+    results = {}
+    for name, runner in (("naive", naive_run), ("batched", batched_run)):
+        r = await runner(args, pages, args.lang)
+        results[name] = r
+        print(f"{name.capitalize() + ':':<11} {r['round_trips']} round trips, "
+              f"{r['seconds']:.2f}s total, page p50 {percentile_ms(r['latencies'], 0.5):.1f}ms, "
+              f"p95 {percentile_ms(r['latencies'], 0.95):.1f}ms")
+    stats = results["batched"]["stats"]
+    print(f"Client:     {stats['cache_hits']} cache hits, {stats['coalesced']} coalesced in flight")
+    naive, batched = results["naive"], results["batched"]
+    print(f"Reduction:  {naive['round_trips'] / max(batched['round_trips'], 1):.1f}x fewer round "
+          f"trips, {naive['seconds'] / max(batched['seconds'], 1e-9):.1f}x faster")
+
+
+async def cmd_lookup(args):
+    async with GlossaryClient(args.url, args.endpoint, args.lang, timeout=args.timeout) as client:
+        terms = await client.lookup_many(args.keys)
+    print(json.dumps(terms, indent=2, ensure_ascii=False))
+    return all(terms.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batching SPARQL client for glossary terms")
+    parser.add_argument("--url", default=os.environ.get("GATEWAY_URL", "http://localhost:8080"),
+                        help="Gateway, Varnish or Fuseki base URL (default: $GATEWAY_URL)")
+    parser.add_argument("--endpoint", default="/sparql",
+                        help="Query path (default: /sparql; /skosmos/sparql for Varnish/Fuseki)")
+    parser.add_argument("--lang", default="en", help="Label language (default: en)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_lookup = sub.add_parser("lookup", help="Resolve slugs or URIs and print them as JSON")
+    p_lookup.add_argument("keys", nargs="+", help="Concept slugs or URIs")
+
+    p_bench = sub.add_parser("bench", help="Compare batched and per-term lookups")
+    p_bench.add_argument("--pages", type=int, default=200, help="Pages to render (default: 200)")
+    p_bench.add_argument("--terms-per-page", type=int, default=40,
+                         help="Lookups per page (default: 40)")
+    p_bench.add_argument("--concurrency", type=int, default=8,
+                         help="Pages rendered at once (default: 8)")
+    p_bench.add_argument("--vocabulary", type=int, default=500,
+                         help="Distinct concepts to draw terms from (default: 500)")
+    p_bench.add_argument("--window", type=float, default=0.005,
+                         help="Coalescing window in seconds (default: 0.005)")
+    p_bench.add_argument("--max-batch", type=int, default=100,
+                         help="Most terms per query (default: 100)")
+    p_bench.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "lookup":
+            if not asyncio.run(cmd_lookup(args)):
+                sys.exit(1)
+        else:
+            asyncio.run(cmd_bench(args))
+    except (OSError, ValueError, KeyError, asyncio.TimeoutError) as e:
+        print(f"ERROR: {args.url}{args.endpoint}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@
 #   3. SKOSMOS: home page, REST API, search latency
 #   4. Gateway: Nginx health endpoint
 #
-# Output: structured status suitable for monitoring/alerting.
+# Output: structured status suitable for monitoring/alerting. For continuous
+# monitoring, health-daemon.py probes the same endpoints concurrently and
+# exports latency, cache and dataset metrics in Prometheus format.
 #
 # Usage:
 #   ./scripts/health-check.sh              # Human-readable output
@@ -30,7 +32,7 @@ SKOSMOS_URL="${SKOSMOS_URL:-http://localhost:9090}"
 CACHE_URL="${CACHE_URL:-http://localhost:9031}"
 GATEWAY_URL="${GATEWAY_URL:-http://localhost:8080}"
 DATASET="${DATASET:-skosmos}"
-EXPECTED_SERVICES="fuseki fuseki-cache skosmos gateway"
+EXPECTED_SERVICES="fuseki fuseki-cache sparql-canon glossary-api skosmos gateway"
 
 JSON_MODE=false
 ALERT_MODE=false
@@ -60,7 +62,8 @@ check_containers() {
         local state="" health=""
         if [ -n "$ps_output" ]; then
             local line
-            line=$(echo "$ps_output" | grep "\"Service\":\"$svc\"" || true)
+            # Replicated services (glossary-api) report their first replica
+            line=$(echo "$ps_output" | grep "\"Service\":\"$svc\"" | head -n 1 || true)
             if [ -n "$line" ]; then
                 state=$(echo "$line" | sed -n 's/.*"State":"\([^"]*\)".*/\1/p')
                 health=$(echo "$line" | sed -n 's/.*"Health":"\([^"]*\)".*/\1/p')
@@ -128,6 +131,7 @@ check_service() {
     fi
 }
 
+# Single-request latency probe; use load-test.py for behaviour under load
 check_sparql_latency() {
     local query='SELECT (COUNT(?s) AS ?count) WHERE { ?s a <http://www.w3.org/2004/02/skos/core#Concept> }'
     local start_ms end_ms latency_ms
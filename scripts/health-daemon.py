@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""Probe EGMS services concurrently and export Prometheus metrics.
+
+health-check.sh probes one service after another with a 10 s curl
+timeout and prints a one-off report. This daemon probes Fuseki, Varnish,
+SKOSMOS, the gateway and a SPARQL query in parallel every --interval
+seconds (a hung service costs one --timeout per round, not one per
+service) and keeps what it sees:
+
+  - per-probe latency histograms (cumulative, for rate() in Prometheus)
+    and p50/p95/p99 over the last --window seconds
+  - Varnish hit/miss counters from `varnishstat -j` and the hit ratio
+    over the window
+  - triple and concept counts, refreshed every --count-interval seconds
+  - the dataset version and the age of the last load (both stamped by
+    dataset-version.py) and of the last snapshot in snapshots/manifest.json
+
+Everything is served on /metrics in the Prometheus text format. Example
+alert on a latency regression rather than an outage:
+
+    egms_probe_latency_seconds{service="varnish",quantile="0.95"} > 0.5
+
+Usage:
+    python scripts/health-daemon.py                    # serve on :9464
+    python scripts/health-daemon.py --port 9100 --interval 5
+    python scripts/health-daemon.py --once             # one round, print metrics
+
+Environment variables (same defaults as health-check.sh):
+    FUSEKI_URL, SKOSMOS_URL, CACHE_URL, GATEWAY_URL, DATASET
+    FUSEKI_USER, FUSEKI_PASS - Credentials for the count queries (optional)
+    VARNISHSTAT   - Command printing Varnish counters as JSON (default:
+                    "docker compose exec -T fuseki-cache varnishstat -j";
+                    set to empty to skip cache counters)
+    SNAPSHOT_MANIFEST - Snapshot manifest (default: snapshots/manifest.json)
+"""
+
+import argparse
+import bisect
+import json
+import math
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+from _egms import load_script
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+
+SKOS = "http://www.w3.org/2004/02/skos/core#"
+ASK_PATH = "/skosmos/sparql?query=ASK%20%7B%20%3Fs%20%3Fp%20%3Fo%20%7D"
+CONCEPT_COUNT_QUERY = f"SELECT (COUNT(?s) AS ?count) WHERE {{ ?s a <{SKOS}Concept> }}"
+TRIPLE_COUNT_QUERY = "SELECT (COUNT(*) AS ?count) WHERE { ?s ?p ?o }"
+
+DEFAULT_VARNISHSTAT = "docker compose exec -T fuseki-cache varnishstat -j"
+DEFAULT_MANIFEST = os.path.join(PROJECT_DIR, "snapshots", "manifest.json")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+versions = load_script("dataset-version")
+
+
+def default_probes(fuseki_url, cache_url, skosmos_url, gateway_url, dataset):
+    """(service, url) pairs matching health-check.sh's checks."""
+    return [
+        ("fuseki", f"{fuseki_url}/$/ping"),
+        ("varnish", f"{cache_url}{ASK_PATH}"),
+        ("skosmos", f"{skosmos_url}/"),
+        ("gateway", f"{gateway_url}/health"),
+        ("sparql", f"{fuseki_url}/{dataset}/sparql?query="
+                   + quote(CONCEPT_COUNT_QUERY, safe="")),
+    ]
+
+
+def probe(url, timeout):
+    """GET url; returns (up, seconds, error). Up means any status below 500."""
+    start = time.monotonic()
+    req = urllib.request.Request(url, headers={"Accept": "application/sparql-results+json, */*"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError) as e:
+        return False, time.monotonic() - start, str(getattr(e, "reason", e))
+    elapsed = time.monotonic() - start
+    if status >= 500:
+        return False, elapsed, f"HTTP {status}"
+    return True, elapsed, None
+
+
+def varnish_counters(command, timeout):
+    """(cache_hit, cache_miss) from `varnishstat -j`, or None if unavailable."""
+    try:
+        result = subprocess.run(shlex.split(command), cwd=PROJECT_DIR, capture_output=True,
+                                text=True, timeout=timeout)
+        stats = json.loads(result.stdout) if result.returncode == 0 else None
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+    if not isinstance(stats, dict):
+        return None
+    # Varnish 6.5+ nests counters under "counters"; older releases do not
+    counters = stats.get("counters", stats)
+    try:
+        return (int(counters["MAIN.cache_hit"]["value"]),
+                int(counters["MAIN.cache_miss"]["value"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def count(base_url, dataset, query, user, password, timeout):
+    body = versions.sparql(base_url, dataset, "query", query, user, password, timeout=timeout)
+    return int(json.loads(body)["results"]["bindings"][0]["count"]["value"])
+
+
+def dataset_stamp(base_url, dataset, user, password, timeout):
+    """(version, modified datetime or None) from the <urn:egms:meta> graph."""
+    body = versions.sparql(
+        base_url, dataset, "query",
+        f"SELECT ?v ?m WHERE {{ GRAPH <{versions.META_GRAPH}> {{ <{versions.DATASET_NODE}> "
+        f"<{versions.VERSION_INFO}> ?v . OPTIONAL {{ <{versions.DATASET_NODE}> "
+        f"<{versions.MODIFIED}> ?m }} }} }}",
+        user, password, timeout=timeout,
+    )
+    bindings = json.loads(body)["results"]["bindings"]
+    if not bindings:
+        return None, None
+    version = int(bindings[0]["v"]["value"])
+    modified = bindings[0].get("m", {}).get("value")
+    return version, parse_timestamp(modified) if modified else None
+
+
+def parse_timestamp(text):
+    """Parse an ISO-8601 timestamp ('Z' or offset) into an aware datetime."""
+    when = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    return when if when.tzinfo else when.replace(tzinfo=timezone.utc)
+
+
+def last_snapshot_time(manifest_path):
+    """Timestamp of the newest snapshot in the manifest, or None."""
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            entries = json.load(f).get("snapshots", [])
+        return parse_timestamp(entries[-1]["timestamp"]) if entries else None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def quantile(sorted_values, fraction):
+    """Nearest-rank quantile of an ascending list."""
+    return sorted_values[max(1, math.ceil(fraction * len(sorted_values))) - 1]
+
+
+class ProbeStats:
+    """Cumulative histogram plus a rolling window of latencies for one probe."""
+
+    def __init__(self, window):
+        self.window = window
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.failures = 0
+        self.up = 0
+        self.last_error = None
+        self.recent = deque()
+
+    def observe(self, now, up, seconds, error):
+        self.up = int(up)
+        self.last_error = error
+        if not up:
+            self.failures += 1
+            return
+        self.count += 1
+        self.total += seconds
+        index = bisect.bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            self.bucket_counts[index] += 1
+        self.recent.append((now, seconds))
+        self.expire(now)
+
+    def expire(self, now):
+        while self.recent and self.recent[0][0] < now - self.window:
+            self.recent.popleft()
+
+
+class Monitor:
+    """Runs probe rounds and renders the collected state as metrics."""
+
+    def __init__(self, probes, args):
+        self.probes = probes
+        self.args = args
+        self.lock = threading.Lock()
+        self.stats = {name: ProbeStats(args.window) for name, _ in probes}
+        self.pool = ThreadPoolExecutor(max_workers=len(probes) + 2)
+        self.rounds = 0
+        self.round_seconds = 0.0
+        self.cache_samples = deque()
+        self.counts = {}
+        self.counts_at = None
+        self.version = None
+        self.loaded_at = None
+        self.snapshot_at = None
+
+    def run_round(self):
+        """Probe every service at once; the round lasts as long as the slowest probe."""
+        start = time.monotonic()
+        futures = {name: self.pool.submit(probe, url, self.args.timeout)
+                   for name, url in self.probes}
+        cache_future = None
+        if self.args.varnishstat:
+            cache_future = self.pool.submit(varnish_counters, self.args.varnishstat,
+                                            self.args.timeout)
+        counts_future = None
+        if self.counts_at is None or start - self.counts_at >= self.args.count_interval:
+            counts_future = self.pool.submit(self.collect_counts)
+        snapshot_at = last_snapshot_time(self.args.snapshot_manifest)
+
+        results = {name: future.result() for name, future in futures.items()}
+        cache = cache_future.result() if cache_future else None
+        counts = counts_future.result() if counts_future else None
+        now = time.monotonic()
+        with self.lock:
+            for name, (up, seconds, error) in results.items():
+                self.stats[name].observe(now, up, seconds, error)
+            if cache:
+                self.cache_samples.append((now, *cache))
+            while len(self.cache_samples) > 1 and self.cache_samples[0][0] < now - self.args.window:
+                self.cache_samples.popleft()
+            if counts is not None:
+                self.counts, self.version, self.loaded_at = counts
+                self.counts_at = start
+            self.snapshot_at = snapshot_at
+            self.rounds += 1
+            self.round_seconds = now - start
+        return results
+
+    def collect_counts(self):
+        """Triple/concept counts and the dataset stamp; ({}, None, None) on failure."""
+        args = self.args
+        auth = (args.user, args.password, args.timeout)
+        try:
+            counts = {
+                "triples": count(args.fuseki_url, args.dataset, TRIPLE_COUNT_QUERY, *auth),
+                "concepts": count(args.fuseki_url, args.dataset, CONCEPT_COUNT_QUERY, *auth),
+            }
+            version, loaded_at = dataset_stamp(args.fuseki_url, args.dataset, *auth)
+        except (urllib.error.URLError, OSError, ValueError, KeyError, IndexError):
+            return {}, None, None
+        return counts, version, loaded_at
+
+    def run_forever(self, stop):
+        while not stop.is_set():
+            began = time.monotonic()
+            self.run_round()
+            stop.wait(max(0.0, self.args.interval - (time.monotonic() - began)))
+
+    def render(self):
+        """Current state in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            now = time.monotonic()
+            family("egms_probe_up", "gauge", "Whether the last probe got a non-5xx response.")
+            for name, s in self.stats.items():
+                lines.append(f'egms_probe_up{{service="{name}"}} {s.up}')
+
+            family("egms_probe_failures_total", "counter", "Probes that failed or timed out.")
+            for name, s in self.stats.items():
+                lines.append(f'egms_probe_failures_total{{service="{name}"}} {s.failures}')
+
+            family("egms_probe_duration_seconds", "histogram",
+                   "Latency of successful probes since the daemon started.")
+            for name, s in self.stats.items():
+                cumulative = 0
+                for bound, n in zip(BUCKETS, s.bucket_counts):
+                    cumulative += n
+                    lines.append(f'egms_probe_duration_seconds_bucket{{service="{name}",'
+                                 f'le="{bound}"}} {cumulative}')
+                lines.append(f'egms_probe_duration_seconds_bucket{{service="{name}",'
+                             f'le="+Inf"}} {s.count}')
+                lines.append(f'egms_probe_duration_seconds_sum{{service="{name}"}} {s.total:.6f}')
+                lines.append(f'egms_probe_duration_seconds_count{{service="{name}"}} {s.count}')
+
+            family("egms_probe_latency_seconds", "summary",
+                   f"Latency of successful probes over the last {self.args.window:g} seconds.")
+            for name, s in self.stats.items():
+                s.expire(now)
+                window = sorted(seconds for _, seconds in s.recent)
+                if window:
+                    for q in QUANTILES:
+                        lines.append(f'egms_probe_latency_seconds{{service="{name}",'
+                                     f'quantile="{q}"}} {quantile(window, q):.6f}')
+                lines.append(f'egms_probe_latency_seconds_sum{{service="{name}"}} '
+                             f'{sum(window):.6f}')
+                lines.append(f'egms_probe_latency_seconds_count{{service="{name}"}} {len(window)}')
+
+            family("egms_probe_round_seconds", "gauge",
+                   "Wall time of the last probe round (all services in parallel).")
+            lines.append(f"egms_probe_round_seconds {self.round_seconds:.6f}")
+
+            if self.cache_samples:
+                _, hits, misses = self.cache_samples[-1]
+                family("egms_varnish_cache_hits_total", "counter", "Varnish MAIN.cache_hit.")
+                lines.append(f"egms_varnish_cache_hits_total {hits}")
+                family("egms_varnish_cache_misses_total", "counter", "Varnish MAIN.cache_miss.")
+                lines.append(f"egms_varnish_cache_misses_total {misses}")
+                # Over the window once there are two samples, since Varnish start before that
+                _, first_hits, first_misses = self.cache_samples[0]
+                if len(self.cache_samples) > 1 and (hits + misses) > (first_hits + first_misses):
+                    hits, misses = hits - first_hits, misses - first_misses
+                if hits + misses:
+                    family("egms_cache_hit_ratio", "gauge",
+                           f"Varnish hit ratio over the last {self.args.window:g} seconds.")
+                    lines.append(f"egms_cache_hit_ratio {hits / (hits + misses):.4f}")
+
+            for key, help_text in (("triples", "Triples in the dataset."),
+                                   ("concepts", "skos:Concept resources in the dataset.")):
+                if key in self.counts:
+                    family(f"egms_{key}", "gauge", help_text)
+                    lines.append(f"egms_{key} {self.counts[key]}")
+
+            if self.version is not None:
+                family("egms_dataset_version", "gauge", "Dataset version stamped by the last load.")
+                lines.append(f"egms_dataset_version {self.version}")
+
+            wall = datetime.now(timezone.utc)
+            for key, when, help_text in (
+                ("load", self.loaded_at, "Seconds since the dataset version was stamped."),
+                ("snapshot", self.snapshot_at, "Seconds since the newest snapshot."),
+            ):
+                if when is not None:
+                    family(f"egms_last_{key}_age_seconds", "gauge", help_text)
+                    lines.append(f"egms_last_{key}_age_seconds "
+                                 f"{max(0.0, (wall - when).total_seconds()):.0f}")
+
+            family("egms_probe_rounds_total", "counter", "Probe rounds completed.")
+            lines.append(f"egms_probe_rounds_total {self.rounds}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body, content_type, code = self.server.monitor.render(), CONTENT_TYPE, 200
+        elif self.path == "/":
+            body, content_type, code = "EGMS health daemon: see /metrics\n", "text/plain", 200
+        else:
+            body, content_type, code = "Not found\n", "text/plain", 404
+        data = body.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe EGMS services and export Prometheus metrics")
+    parser.add_argument("--port", type=int, default=9464, help="Metrics port (default: 9464)")
+    parser.add_argument("--bind", default="0.0.0.0", help="Metrics address (default: 0.0.0.0)")
+    parser.add_argument("--port-file", help="Write the bound port to this file when ready")
+    parser.add_argument("--interval", type=float, default=15.0,
+                        help="Seconds between probe rounds (default: 15)")
+    parser.add_argument("--timeout", type=float, default=5.0,
+                        help="Per-probe timeout in seconds (default: 5)")
+    parser.add_argument("--window", type=float, default=300.0,
+                        help="Rolling window for quantiles and hit ratio (default: 300)")
+    parser.add_argument("--count-interval", type=float, default=60.0,
+                        help="Seconds between triple/concept count queries (default: 60)")
+    parser.add_argument("--once", action="store_true",
+                        help="Run one probe round, print the metrics and exit")
+    parser.add_argument("--fuseki-url", default=os.environ.get("FUSEKI_URL", "http://localhost:3030"))
+    parser.add_argument("--cache-url", default=os.environ.get("CACHE_URL", "http://localhost:9031"))
+    parser.add_argument("--skosmos-url", default=os.environ.get("SKOSMOS_URL", "http://localhost:9090"))
+    parser.add_argument("--gateway-url", default=os.environ.get("GATEWAY_URL", "http://localhost:8080"))
+    parser.add_argument("--dataset", default=os.environ.get("DATASET", "skosmos"))
+    parser.add_argument("--user", default=os.environ.get("FUSEKI_USER"))
+    parser.add_argument("--password", default=os.environ.get("FUSEKI_PASS"))
+    parser.add_argument("--varnishstat", default=os.environ.get("VARNISHSTAT", DEFAULT_VARNISHSTAT),
+                        help="Command printing Varnish counters as JSON (empty to skip)")
+    parser.add_argument("--snapshot-manifest",
+                        default=os.environ.get("SNAPSHOT_MANIFEST", DEFAULT_MANIFEST))
+    args = parser.parse_args()
+
+    probes = default_probes(*(u.rstrip("/") for u in (
+        args.fuseki_url, args.cache_url, args.skosmos_url, args.gateway_url)), args.dataset)
+    monitor = Monitor(probes, args)
+
+    if args.once:
+        results = monitor.run_round()
+        sys.stdout.write(monitor.render())
+        sys.exit(0 if all(up for up, _, _ in results.values()) else 1)
+
+    try:
+        server = ThreadingHTTPServer((args.bind, args.port), MetricsHandler)
+    except OSError as e:
+        print(f"ERROR: Could not listen on {args.bind}:{args.port}: {e}", file=sys.stderr)
+        sys.exit(1)
+    server.daemon_threads = True
+    server.monitor = monitor
+    stop = threading.Event()
+    threading.Thread(target=monitor.run_forever, args=(stop,), daemon=True).start()
+    port = server.server_address[1]
+    if args.port_file:
+        with open(args.port_file, "w") as f:
+            f.write(str(port))
+    print(f"Serving metrics on http://{args.bind}:{port}/metrics "
+          f"(probing {len(probes)} endpoints every {args.interval:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
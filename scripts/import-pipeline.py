@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""Run the markdown import pipeline in one process, skipping unchanged stages.
+
+The import runbook (docs/import-runbook.md) chains four programs, each
+re-reading and re-parsing what the previous one wrote:
+
+    md-to-csv.py -> csv-to-skos.py -> validate-skos.py -> load-data.sh
+
+This runner calls the same code as stages of one process and hands data
+on in memory: parsed terms become CSV rows, rows become the concept
+graph (csv-to-skos.rows_to_graph, no Turtle round trip), and the graph is
+validated together with the other data files. The Turtle files (and,
+optionally, the CSV and collision report) are still written for review
+and for load-data.sh.
+
+  parse     markdown files + category map -> rows     (md-to-csv.py)
+  skos      rows -> Turtle output file                (csv-to-skos.py)
+  infer     concept graph + --data files -> inferred
+            hierarchy triples (--inferred file)       (materialize-skos.py)
+  validate  concept graph + --data files + inferred
+            triples -> checks                         (validate-skos.py)
+  load      output + inferred + --data files -> Fuseki, then stamp the
+            dataset version and rebuild the static
+            views                                     (as load-data.sh)
+
+Each stage has a fingerprint: the sha256 of its input files, its
+configuration, the source of the script implementing it, and the
+fingerprints of the stages it depends on. A stage whose fingerprint
+matches its last successful run is not run again. Its output is read
+back from the cache directory only if a later stage needs it. A
+validation error stops the pipeline, and the failed stage is not
+recorded. The report lists every stage with its status and wall time.
+
+Usage:
+    python scripts/import-pipeline.py pages/*.md -o data/imported-glossary.ttl
+    python scripts/import-pipeline.py pages/*.md --inferred /tmp/inferred-hierarchy.ttl
+    python scripts/import-pipeline.py pages/*.md --stop-after validate --csv data/imported-terms.csv
+    python scripts/import-pipeline.py pages/*.md --force      # ignore the cache
+    python scripts/import-pipeline.py pages/*.md --json       # machine-readable report
+
+Environment variables (same defaults as load-data.sh):
+    FUSEKI_URL, FUSEKI_USER, FUSEKI_PASS, GRAPH_URI, DATASET
+    STATIC_VIEWS_DIR   - Static views rebuilt after loading (default: views/;
+                         empty to skip)
+    PIPELINE_CACHE_DIR - Stage fingerprints and outputs (default: .cache/pipeline)
+"""
+
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+
+from _egms import load_script
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_DIR, "data")
+DEFAULT_CACHE_DIR = os.path.join(PROJECT_DIR, ".cache", "pipeline")
+STATE_FILE = "state.json"
+
+STAGES = ["parse", "skos", "infer", "validate", "load"]
+
+
+md_to_csv = load_script("md-to-csv")
+csv_to_skos = load_script("csv-to-skos")
+validate_skos = load_script("validate-skos")
+materialize_skos = load_script("materialize-skos")
+
+# Scripts whose source is part of each stage's fingerprint
+STAGE_CODE = {
+    "parse": ["md-to-csv.py"],
+    "skos": ["csv-to-skos.py"],
+    "infer": ["materialize-skos.py", "csv-to-skos.py"],
+    "validate": ["validate-skos.py", "csv-to-skos.py"],
+    "load": ["bulk-load.py", "dataset-version.py"],
+}
+
+
+class PipelineError(Exception):
+    """A stage failed; the message is reported and later stages are not run."""
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_if_changed(path, text):
+    """Write text unless the file already holds it; returns True if written."""
+    data = text.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+class Pipeline:
+    """Fingerprints, cached outputs and the run loop for the stages."""
+
+    def __init__(self, args):
+        self.args = args
+        self.cache_dir = args.cache_dir
+        self.state = self.load_state()
+        self.outputs = {}
+        self.digests = {}
+        self.fingerprints = {}
+        self.report = []
+        self.data_graph = None
+
+    # -- cache ---------------------------------------------------------------
+
+    def load_state(self):
+        try:
+            with open(os.path.join(self.cache_dir, STATE_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, STATE_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+    def artifact(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def digest(self, path):
+        if path not in self.digests:
+            self.digests[path] = file_sha256(path)
+        return self.digests[path]
+
+    # -- fingerprints --------------------------------------------------------
+
+    def stage_inputs(self, stage):
+        """(input files, configuration, upstream stages) of a stage."""
+        args = self.args
+        if stage == "parse":
+            return (args.source_files + [args.category_map],
+                    {"dedup": not args.no_dedup}, [])
+        if stage == "skos":
+            return [], {"base_uri": args.base_uri, "scheme_uri": args.scheme_uri}, ["parse"]
+        if stage == "infer":
+            return args.data, {}, ["skos"]
+        if stage == "validate":
+            return args.data, {"strict": args.strict}, ["infer"]
+        return args.data, {"fuseki_url": args.fuseki_url, "dataset": args.dataset,
+                           "graph": args.graph}, ["validate"]
+
+    def fingerprint(self, stage):
+        if stage not in self.fingerprints:
+            files, config, upstream = self.stage_inputs(stage)
+            doc = {
+                "stage": stage,
+                "code": [self.digest(os.path.join(SCRIPT_DIR, s)) for s in STAGE_CODE[stage]],
+                # Sources are keyed by basename, as md-to-csv records them
+                "inputs": sorted((os.path.basename(f), self.digest(f)) for f in files),
+                "config": config,
+                "upstream": [self.fingerprint(u) for u in upstream],
+            }
+            encoded = json.dumps(doc, sort_keys=True).encode("utf-8")
+            self.fingerprints[stage] = hashlib.sha256(encoded).hexdigest()
+        return self.fingerprints[stage]
+
+    # -- stages --------------------------------------------------------------
+
+    def output(self, stage):
+        """A stage's output, read back from the cache if it was not run now."""
+        if stage not in self.outputs:
+            self.outputs[stage] = getattr(self, f"restore_{stage}")()
+        return self.outputs[stage]
+
+    def run_parse(self):
+        args = self.args
+        cat_map = md_to_csv.load_category_map(args.category_map)
+        all_terms = []
+        files = {}
+        for path in args.source_files:
+            fmt, terms = md_to_csv.parse_file(path)
+            files[os.path.basename(path)] = {"format": fmt, "count": len(terms)}
+            all_terms.extend(terms)
+        collisions = md_to_csv.detect_collisions(all_terms)
+        if not args.no_dedup:
+            all_terms = md_to_csv.deduplicate_terms(all_terms, cat_map)
+        rows, unmapped = md_to_csv.terms_to_rows(all_terms, cat_map)
+        output = {"rows": rows, "files": files, "collisions": collisions,
+                  "unmapped": sorted(unmapped)}
+        with open(self.artifact("parse.json"), "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False)
+        summary = (f"{len(rows)} terms from {len(files)} files, "
+                   f"{len(collisions)} collisions, {len(unmapped)} unmapped categories")
+        return output, summary
+
+    def restore_parse(self):
+        with open(self.artifact("parse.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def run_skos(self):
+        rows = self.output("parse")["rows"]
+        out = io.StringIO()
+        csv_to_skos.write_turtle(rows, self.args.base_uri, self.args.scheme_uri, out)
+        turtle = out.getvalue()
+        with open(self.artifact("skos.ttl"), "w", encoding="utf-8") as f:
+            f.write(turtle)
+        concepts = sum(1 for row in rows if row["uri_slug"].strip())
+        return {"turtle": turtle}, f"{concepts} concepts, {len(turtle.encode('utf-8'))} bytes of Turtle"
+
+    def restore_skos(self):
+        with open(self.artifact("skos.ttl"), encoding="utf-8") as f:
+            return {"turtle": f.read()}
+
+    def concept_graph(self):
+        """The skos stage's triples, built from the rows rather than parsed."""
+        return csv_to_skos.rows_to_graph(self.output("parse")["rows"],
+                                         self.args.base_uri, self.args.scheme_uri)
+
+    def full_graph(self):
+        """The concept graph plus the --data files, and the concept graph's size.
+
+        Built once per run and shared by the infer and validate stages.
+        """
+        if self.data_graph is None:
+            g = self.concept_graph()
+            generated = len(g)
+            for path in self.args.data:
+                try:
+                    g.parse(path, format="turtle")
+                except Exception as e:  # rdflib parse errors have no common base class
+                    raise PipelineError(f"Syntax error in {path}: {e}")
+            self.data_graph = g, generated
+        return self.data_graph
+
+    def run_infer(self):
+        triples, stats = materialize_skos.materialize(self.full_graph()[0])
+        out = io.StringIO()
+        materialize_skos.write_ntriples(triples, out)
+        ntriples = out.getvalue()
+        with open(self.artifact("infer.nt"), "w", encoding="utf-8") as f:
+            f.write(ntriples)
+        summary = materialize_skos.format_stats(stats)
+        if stats["cyclic"]:
+            summary += f", {stats['cyclic']} concepts on broader cycles"
+        return {"ntriples": ntriples, "triples": triples}, summary
+
+    def restore_infer(self):
+        with open(self.artifact("infer.nt"), encoding="utf-8") as f:
+            return {"ntriples": f.read()}
+
+    def run_validate(self):
+        # Validation is the graph's last user, so the inferred triples go
+        # straight into it
+        g, generated = self.full_graph()
+        stated = len(g)
+        infer = self.output("infer")
+        if "triples" in infer:
+            g.addN((s, p, o, g) for s, p, o in infer["triples"])
+        else:  # restored from infer.nt
+            g.parse(data=infer["ntriples"], format="nt")
+        errors, warnings = validate_skos.validate_graph(g)
+        for message in errors:
+            print(f"  ERROR: {message}", file=sys.stderr)
+        if errors or (self.args.strict and warnings):
+            for message in warnings:
+                print(f"  WARNING: {message}", file=sys.stderr)
+            raise PipelineError(f"validation failed: {len(errors)} error(s), "
+                                f"{len(warnings)} warning(s)")
+        output = {"errors": 0, "warnings": len(warnings), "triples": len(g)}
+        return output, (f"{len(g)} triples ({generated} generated, {len(g) - stated} inferred), "
+                        f"0 errors, {len(warnings)} warnings")
+
+    def restore_validate(self):
+        return self.state["validate"]["output"]
+
+    def run_load(self):
+        args = self.args
+        bulk = load_script("bulk-load")
+        versions = load_script("dataset-version")
+        files = [args.output, args.inferred] + args.data
+        results, elapsed, _ = bulk.bulk_load(
+            files, args.fuseki_url, args.dataset, args.graph,
+            user=args.user, password=args.password, concurrency=args.concurrency,
+        )
+        failed = [r for r in results if "error" in r]
+        if failed:
+            raise PipelineError("; ".join(f"{os.path.basename(r['file'])}: {r['error']}"
+                                          for r in failed))
+        triples = sum(r["triples"] or 0 for r in results)
+
+        try:
+            version = versions.stamp(args.fuseki_url, args.dataset, args.user, args.password,
+                                     args.version_file)
+        except (OSError, ValueError) as e:
+            raise PipelineError(f"loaded, but could not stamp the dataset version: {e}")
+        versions.publish(version, args.version_file, args.varnish_reload, args.varnish_url)
+
+        if args.views_dir:
+            views = load_script("build-static-views")
+            try:
+                g = views.fetch_graph(args.fuseki_url, args.dataset, args.graph,
+                                      args.user, args.password)
+                views.build_views(g, args.views_dir)
+            except Exception as e:  # views are derived data; keep the load
+                print(f"WARNING: Static view build failed: {e}", file=sys.stderr)
+
+        return ({"files": len(files), "triples": triples, "version": version},
+                f"{len(files)} files, {triples} triples in {elapsed:.2f}s, "
+                f"dataset version {version}")
+
+    def materialize(self, stage):
+        """Write a stage's files for review and load-data.sh, cached or not."""
+        args = self.args
+        if stage == "parse":
+            parsed = self.output("parse")
+            if args.csv:
+                md_to_csv.write_rows(parsed["rows"], args.csv)
+            if args.collision_report and parsed["collisions"]:
+                md_to_csv.write_collision_report(parsed["collisions"], args.collision_report)
+        elif stage == "skos":
+            write_if_changed(args.output, self.output("skos")["turtle"])
+        elif stage == "infer":
+            write_if_changed(args.inferred, self.output("infer")["ntriples"])
+
+    # -- run -----------------------------------------------------------------
+
+    def cached(self, stage):
+        entry = self.state.get(stage)
+        if self.args.force or not entry or entry["fingerprint"] != self.fingerprint(stage):
+            return False
+        artifact = {"parse": "parse.json", "skos": "skos.ttl", "infer": "infer.nt"}.get(stage)
+        return artifact is None or os.path.exists(self.artifact(artifact))
+
+    def run(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        stages = STAGES[:STAGES.index(self.args.stop_after) + 1]
+        for stage in stages:
+            began = time.monotonic()
+            if self.cached(stage):
+                status = "cached"
+                summary = self.state[stage]["summary"]
+            else:
+                status = "ran"
+                try:
+                    # Progress from the stage code goes to stderr; stdout is the report
+                    with contextlib.redirect_stdout(sys.stderr):
+                        self.outputs[stage], summary = getattr(self, f"run_{stage}")()
+                except PipelineError as e:
+                    self.record(stage, "failed", time.monotonic() - began, str(e))
+                    self.state.pop(stage, None)
+                    self.save_state()
+                    return False
+                self.state[stage] = {"fingerprint": self.fingerprint(stage), "summary": summary,
+                                     "output": self.outputs[stage] if stage == "validate" else None,
+                                     "finished": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+                self.save_state()
+            self.materialize(stage)
+            self.record(stage, status, time.monotonic() - began, summary)
+        for stage in STAGES[len(stages):]:
+            self.record(stage, "skipped", 0.0, f"--stop-after {self.args.stop_after}")
+        return True
+
+    def record(self, stage, status, seconds, summary):
+        self.report.append({"stage": stage, "status": status, "seconds": round(seconds, 4),
+                            "summary": summary})
+
+
+def print_report(report):
+    print(f"{'Stage':<10} {'Status':<8} {'Seconds':>8}  Result")
+    for r in report:
+        print(f"{r['stage']:<10} {r['status']:<8} {r['seconds']:>8.3f}  {r['summary']}")
+    print(f"{'Total':<19} {sum(r['seconds'] for r in report):>8.3f}")
+
+
+def default_data(*outputs):
+    """data/*.ttl, except the pipeline's own output files."""
+    outputs = {os.path.abspath(f) for f in outputs}
+    return [f for f in sorted(glob.glob(os.path.join(DATA_DIR, "*.ttl")))
+            if os.path.abspath(f) not in outputs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached markdown-to-Fuseki import pipeline")
+    parser.add_argument("source_files", nargs="+", help="Markdown glossary file(s) to import")
+    parser.add_argument("--category-map", default=os.path.join(DATA_DIR, "category-mapping.csv"),
+                        help="Path to category-mapping.csv (default: data/category-mapping.csv)")
+    parser.add_argument("-o", "--output", default=os.path.join(DATA_DIR, "imported-glossary.ttl"),
+                        help="Turtle output (default: data/imported-glossary.ttl)")
+    parser.add_argument("--inferred", default=os.path.join(DATA_DIR, "inferred-hierarchy.ttl"),
+                        help="Inferred hierarchy triples (default: data/inferred-hierarchy.ttl)")
+    parser.add_argument("--csv", help="Also write the intermediate CSV here")
+    parser.add_argument("--collision-report", help="Write the pre-dedup collision report CSV")
+    parser.add_argument("--no-dedup", action="store_true", help="Disable automatic deduplication")
+    parser.add_argument("--data", nargs="*", default=None,
+                        help="Other Turtle files validated and loaded with the output "
+                             "(default: data/*.ttl except the output files)")
+    parser.add_argument("--base-uri", default="http://glossary.example.org/terms/")
+    parser.add_argument("--scheme-uri", default="http://glossary.example.org/terms/enterprise-glossary")
+    parser.add_argument("--strict", action="store_true", help="Treat validation warnings as errors")
+    parser.add_argument("--stop-after", choices=STAGES, default="load",
+                        help="Last stage to run (default: load)")
+    parser.add_argument("--force", action="store_true", help="Run every stage, ignoring the cache")
+    parser.add_argument("--cache-dir", default=os.environ.get("PIPELINE_CACHE_DIR", DEFAULT_CACHE_DIR))
+    parser.add_argument("--json", action="store_true", help="Print the stage report as JSON")
+    parser.add_argument("--fuseki-url", default=os.environ.get("FUSEKI_URL", "http://localhost:3030"))
+    parser.add_argument("--dataset", default=os.environ.get("DATASET", "skosmos"))
+    parser.add_argument("--graph", default=os.environ.get("GRAPH_URI", "http://glossary.example.org/"))
+    parser.add_argument("--user", default=os.environ.get("FUSEKI_USER", "admin"))
+    parser.add_argument("--password", default=os.environ.get("FUSEKI_PASS", "admin123"))
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Parallel uploads in the load stage (default: 4)")
+    parser.add_argument("--views-dir",
+                        default=os.environ.get("STATIC_VIEWS_DIR", os.path.join(PROJECT_DIR, "views")),
+                        help="Static views rebuilt after loading (empty to skip)")
+    load_script("dataset-version").add_publish_arguments(parser)
+    args = parser.parse_args()
+
+    if args.data is None:
+        args.data = default_data(args.output, args.inferred)
+    # Stale inferences must not feed the next run
+    args.data = [f for f in args.data if os.path.abspath(f) != os.path.abspath(args.inferred)]
+    missing = [f for f in args.source_files + [args.category_map] + args.data
+               if not os.path.isfile(f)]
+    if missing:
+        print(f"ERROR: File not found: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    pipeline = Pipeline(args)
+    try:
+        ok = pipeline.run()
+    except OSError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps({"ok": ok, "stages": pipeline.report}, indent=2))
+    else:
+        print_report(pipeline.report)
+    if not ok:
+        failed = pipeline.report[-1]
+        print(f"ERROR: {failed['stage']} stage failed: {failed['summary']}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 #!/usr/bin/env bash
 # Load SKOS vocabulary data into Fuseki via the Graph Store Protocol.
 #
+# Uploads run through bulk-load.py (pooled keep-alive connections, concurrent
+# gzip-streamed uploads, retries with backoff). Without python3 and rdflib it
+# falls back to one curl upload per file.
+#
 # Usage:
 #   ./scripts/load-data.sh                    # Load all .ttl files from data/
 #   ./scripts/load-data.sh data/custom.ttl    # Load a specific file
@@ -11,6 +15,28 @@
 #   FUSEKI_PASS  - Fuseki admin password (default: admin123)
 #   GRAPH_URI    - Named graph URI (default: http://glossary.example.org/)
 #   DATASET      - Fuseki dataset name (default: skosmos)
+#   LOAD_CONCURRENCY - Parallel uploads for bulk-load.py (default: 4)
+#   LOAD_CHUNKED - Set to "true" to load each file in adaptive, resumable
+#                  transactional batches (for very large files)
+#   LOAD_MATERIALIZE - Set to "true" to also load the inferred skos:narrower,
+#                  broaderTransitive/narrowerTransitive and top concept
+#                  triples (see materialize-skos.py; requires rdflib)
+#   LOAD_BLUE_GREEN - Set to "true" to stage, validate and atomically swap in
+#                  the new data, keeping the old graph for rollback
+#                  (see blue-green-load.py; requires rdflib)
+#   WARM_ACCESS_LOG - Access log file(s) to replay through the cache after
+#                  loading (see warm-cache.py)
+#   VARNISH_URL  - Varnish base URL (default: http://localhost:9031)
+#   DATASET_VERSION_FILE, VARNISH_RELOAD - where the dataset version stamped
+#                  after each load is published (see dataset-version.py)
+#   FUSEKI_REPLICAS - Replica Fuseki base URLs (comma or space separated) to
+#                  load in parallel instead of FUSEKI_URL; they are verified
+#                  and re-synced afterwards (see replicate.py). LOAD_BLUE_GREEN
+#                  then replaces the graph with a staged MOVE on each replica
+#                  and LOAD_CHUNKED is ignored
+#   STATIC_VIEWS_DIR - Where the static JSON views served by the gateway are
+#                  rebuilt after each load (default: views/; set to empty to
+#                  skip; see build-static-views.py)
 
 set -euo pipefail
 
@@ -19,9 +45,17 @@ FUSEKI_USER="${FUSEKI_USER:-admin}"
 FUSEKI_PASS="${FUSEKI_PASS:-admin123}"
 GRAPH_URI="${GRAPH_URI:-http://glossary.example.org/}"
 DATASET="${DATASET:-skosmos}"
+LOAD_CONCURRENCY="${LOAD_CONCURRENCY:-4}"
+LOAD_CHUNKED="${LOAD_CHUNKED:-false}"
+LOAD_BLUE_GREEN="${LOAD_BLUE_GREEN:-false}"
+LOAD_MATERIALIZE="${LOAD_MATERIALIZE:-false}"
+WARM_ACCESS_LOG="${WARM_ACCESS_LOG:-}"
+VARNISH_URL="${VARNISH_URL-http://localhost:9031}"
+FUSEKI_REPLICAS="${FUSEKI_REPLICAS:-}"
 
 SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+STATIC_VIEWS_DIR="${STATIC_VIEWS_DIR-$PROJECT_DIR/views}"
 
 upload_file() {
     local file="$1"
@@ -46,17 +80,31 @@ upload_file() {
     fi
 }
 
-# Wait for Fuseki to be ready
-echo "Waiting for Fuseki at $FUSEKI_URL ..."
-retries=0
+# The Python loaders need rdflib as well as python3
+python_loader=false
+if command -v python3 > /dev/null 2>&1 && python3 -c 'import rdflib' > /dev/null 2>&1; then
+    python_loader=true
+fi
+
+if [ -n "$FUSEKI_REPLICAS" ] && [ "$python_loader" != true ]; then
+    echo "ERROR: Loading FUSEKI_REPLICAS requires python3 with rdflib (see replicate.py)." >&2
+    exit 1
+fi
+
+# Wait for Fuseki (every replica, with FUSEKI_REPLICAS) to be ready
 max_retries=30
-until curl -sf "$FUSEKI_URL/\$/ping" > /dev/null 2>&1; do
-    retries=$((retries + 1))
-    if [ "$retries" -ge "$max_retries" ]; then
-        echo "ERROR: Fuseki not reachable after ${max_retries} attempts." >&2
-        exit 1
-    fi
-    sleep 2
+wait_urls="${FUSEKI_REPLICAS:-$FUSEKI_URL}"
+for url in ${wait_urls//,/ }; do
+    echo "Waiting for Fuseki at $url ..."
+    retries=0
+    until curl -sf "$url/\$/ping" > /dev/null 2>&1; do
+        retries=$((retries + 1))
+        if [ "$retries" -ge "$max_retries" ]; then
+            echo "ERROR: Fuseki not reachable after ${max_retries} attempts." >&2
+            exit 1
+        fi
+        sleep 2
+    done
 done
 echo "Fuseki is ready."
 
@@ -72,6 +120,65 @@ if [ ${#files[@]} -eq 0 ]; then
     exit 0
 fi
 
+if [ "$python_loader" = true ]; then
+    export FUSEKI_URL FUSEKI_USER FUSEKI_PASS GRAPH_URI DATASET
+    mode_args=(--concurrency "$LOAD_CONCURRENCY")
+    if [ "$LOAD_CHUNKED" = true ]; then
+        mode_args=(--chunked)
+    fi
+    export VARNISH_URL
+    if [ "$LOAD_MATERIALIZE" = true ]; then
+        # Fresh inferences replace any written by import-pipeline.py
+        sources=()
+        for file in "${files[@]}"; do
+            [ "$(basename "$file")" = inferred-hierarchy.ttl ] || sources+=("$file")
+        done
+        INFERRED_FILE="$(mktemp "${TMPDIR:-/tmp}/egms-inferred.XXXXXX")"
+        trap 'rm -f "$INFERRED_FILE"' EXIT
+        python3 "$SCRIPT_DIR/materialize-skos.py" --format nt -o "$INFERRED_FILE" "${sources[@]}"
+        files=("${sources[@]}" "$INFERRED_FILE")
+        echo ""
+    fi
+    if [ -n "$FUSEKI_REPLICAS" ]; then
+        # Stamps the version once and copies it to every replica
+        export FUSEKI_REPLICAS
+        replace_args=()
+        if [ "$LOAD_BLUE_GREEN" = true ]; then
+            replace_args=(--replace)
+        fi
+        python3 "$SCRIPT_DIR/replicate.py" load --concurrency "$LOAD_CONCURRENCY" \
+            "${replace_args[@]}" "${files[@]}"
+    elif [ "$LOAD_BLUE_GREEN" = true ]; then
+        # Stamps the dataset version in the swap transaction
+        python3 "$SCRIPT_DIR/blue-green-load.py" load "${mode_args[@]}" "${files[@]}"
+    else
+        python3 "$SCRIPT_DIR/bulk-load.py" --no-wait "${mode_args[@]}" "${files[@]}"
+        echo ""
+        if ! python3 "$SCRIPT_DIR/dataset-version.py" stamp; then
+            echo "WARNING: Could not stamp the dataset version; cached results keep the old ETag" >&2
+        fi
+    fi
+
+    # Rewrite the static concept / hierarchy / index views that changed
+    if [ -n "$STATIC_VIEWS_DIR" ]; then
+        echo ""
+        if ! python3 "$SCRIPT_DIR/build-static-views.py" --output "$STATIC_VIEWS_DIR"; then
+            echo "WARNING: Static view build failed; the gateway serves the previous views" >&2
+        fi
+    fi
+
+    # Pre-populate the SPARQL cache with the most frequent recorded queries
+    if [ -n "$WARM_ACCESS_LOG" ]; then
+        echo ""
+        echo "Warming cache at $VARNISH_URL ..."
+        # shellcheck disable=SC2086  # WARM_ACCESS_LOG may list several files
+        if ! python3 "$SCRIPT_DIR/warm-cache.py" --cache-url "$VARNISH_URL" $WARM_ACCESS_LOG; then
+            echo "WARNING: Cache warm-up failed" >&2
+        fi
+    fi
+    exit 0
+fi
+
 echo ""
 echo "Loading ${#files[@]} file(s) into Fuseki dataset '$DATASET'..."
 echo "  Fuseki:  $FUSEKI_URL"
@@ -97,3 +204,8 @@ if [ "$errors" -gt 0 ]; then
 else
     echo "All files loaded successfully."
 fi
+
+# No dataset version without the Python loaders: drop cached results for the old data
+if [ -n "$VARNISH_URL" ] && ! curl -sf -o /dev/null -X BAN "$VARNISH_URL/skosmos/sparql"; then
+    echo "WARNING: Could not ban Varnish cache at $VARNISH_URL" >&2
+fi
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""Replay a SPARQL query mix at a given concurrency and rate, with latency percentiles.
+
+health-check.sh times a single ASK query with curl, which says nothing
+about behaviour under concurrent load. This harness drives Fuseki,
+Varnish or the gateway with a query mix:
+
+  - recorded (--log): query URLs taken from gateway / Varnish access
+    logs (as read by warm-cache.py), replayed in log order so the
+    frequency distribution is preserved
+  - builtin (default): a Skosmos-like workload of label searches (Jena
+    text query), concept fetches and hierarchy lookups over concepts
+    sampled from the endpoint itself
+
+Each of --concurrency workers keeps one keep-alive connection open. With
+--rate, requests start on an open-loop schedule (so a slow server builds
+a backlog, as it would with real users) and latency is measured from each
+request's scheduled start, so time spent waiting in that backlog counts;
+otherwise each worker sends its next request as soon as the previous one
+completes. The mix is cycled
+until --requests have been sent or --duration has elapsed.
+
+Reported: p50/p95/p99 latency, throughput, error rate and the X-Cache
+hit ratio (when the target is Varnish). Only the standard library is
+used (asyncio streams speaking HTTP/1.1).
+
+Usage:
+    python scripts/load-test.py --url http://localhost:9031 --requests 2000 --concurrency 16
+    python scripts/load-test.py --url http://localhost:8080 --endpoint /sparql --duration 60 --rate 50
+    python scripts/load-test.py --url http://localhost:3030 --log /var/log/nginx/access.log --json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import ssl
+import sys
+import time
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from _egms import load_script
+
+SKOS = "http://www.w3.org/2004/02/skos/core#"
+SELECT_ACCEPT = "application/sparql-results+json"
+GRAPH_ACCEPT = "text/turtle"
+
+# Share of each query kind in the builtin workload
+BUILTIN_MIX = (("search", 0.4), ("concept", 0.4), ("hierarchy", 0.2))
+
+SEED_QUERY = (
+    f"PREFIX skos: <{SKOS}>\n"
+    "SELECT ?concept ?label WHERE {\n"
+    "  ?concept a skos:Concept ; skos:prefLabel ?label .\n"
+    '  FILTER(lang(?label) = "en")\n'
+    "} LIMIT 500"
+)
+
+
+# -- workloads -----------------------------------------------------------------
+
+def search_query(term):
+    return (
+        f"PREFIX skos: <{SKOS}>\n"
+        "PREFIX text: <http://jena.apache.org/text#>\n"
+        "SELECT DISTINCT ?concept ?label WHERE {\n"
+        f'  (?concept ?score) text:query (skos:prefLabel "{term}*") .\n'
+        "  ?concept skos:prefLabel ?label .\n"
+        "} ORDER BY DESC(?score) LIMIT 20"
+    )
+
+
+def concept_query(uri):
+    return f"CONSTRUCT {{ <{uri}> ?p ?o }} WHERE {{ <{uri}> ?p ?o }}"
+
+
+def hierarchy_query(uri):
+    return (
+        f"PREFIX skos: <{SKOS}>\n"
+        "SELECT ?broader ?label WHERE {\n"
+        f"  <{uri}> skos:broader* ?broader .\n"
+        "  ?broader skos:prefLabel ?label .\n"
+        "}"
+    )
+
+
+def builtin_workload(concepts, count, rng):
+    """`count` (query, Accept) pairs mixing searches, fetches and hierarchy lookups."""
+    kinds = [k for k, _ in BUILTIN_MIX]
+    weights = [w for _, w in BUILTIN_MIX]
+    items = []
+    for kind in rng.choices(kinds, weights, k=count):
+        uri, label = rng.choice(concepts)
+        if kind == "search":
+            term = "".join(ch for ch in label if ch.isalnum())[:4]
+            items.append((search_query(term), SELECT_ACCEPT))
+        elif kind == "concept":
+            items.append((concept_query(uri), GRAPH_ACCEPT))
+        else:
+            items.append((hierarchy_query(uri), SELECT_ACCEPT))
+    return items
+
+
+def recorded_workload(log_files):
+    """(query, Accept) pairs from access logs, in log order."""
+    warm = load_script("warm-cache")
+    items = []
+    for path in warm.iter_query_paths(log_files):
+        query = dict(parse_qsl(urlsplit(path).query, keep_blank_values=True)).get("query")
+        if query:
+            items.append((query, SELECT_ACCEPT))
+    return items
+
+
+# -- HTTP client ---------------------------------------------------------------
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection on asyncio streams."""
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def get(self, target, accept, headers=None):
+        """Send one GET; returns (status, headers with lower-case names, body)."""
+        return await asyncio.wait_for(self._get(target, accept, headers), self.timeout)
+
+    async def _get(self, target, accept, extra_headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl
+            )
+        extra = "".join(f"{name}: {value}\r\n" for name, value in (extra_headers or {}).items())
+        self.writer.write(
+            f"GET {target} HTTP/1.1\r\nHost: {self.host_header}\r\nAccept: {accept}\r\n"
+            f"{extra}Connection: keep-alive\r\n\r\n".encode("latin-1")
+        )
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        body = b""
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                chunks.append(await self.reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            body = b"".join(c[:-2] for c in chunks)
+        elif status not in (204, 304) and status >= 200:
+            body = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, headers, body
+
+
+async def fetch_concepts(base_url, endpoint, timeout=30.0):
+    """(uri, English label) pairs to build the builtin workload from."""
+    conn = Connection(base_url, timeout)
+    try:
+        status, _, body = await conn.get(f"{endpoint}?query={quote(SEED_QUERY, safe='')}",
+                                         SELECT_ACCEPT)
+    finally:
+        await conn.close()
+    if status != 200:
+        raise ConnectionError(f"Seed query returned HTTP {status}")
+    bindings = json.loads(body)["results"]["bindings"]
+    return [(b["concept"]["value"], b["label"]["value"]) for b in bindings]
+
+
+# -- runner --------------------------------------------------------------------
+
+class Results:
+    """Per-request outcomes of one run."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+        self.cache_hits = 0
+        self.cache_reported = 0
+
+    def record(self, seconds, status, headers):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not (isinstance(status, int) and 200 <= status < 400):
+            self.errors += 1
+        x_cache = headers.get("x-cache")
+        if x_cache:
+            self.cache_reported += 1
+            if x_cache.upper().startswith("HIT"):
+                self.cache_hits += 1
+
+
+async def run_load(base_url, endpoint, items, concurrency, total=None, duration=None,
+                   rate=None, timeout=30.0):
+    """Replay `items` cyclically until `total` requests or `duration` seconds.
+
+    Returns (Results, elapsed seconds).
+    """
+    results = Results()
+    start = time.monotonic()
+    deadline = start + duration if duration else None
+    issued = 0
+
+    def claim():
+        nonlocal issued
+        if (total is not None and issued >= total) or (deadline and time.monotonic() >= deadline):
+            return None
+        issued += 1
+        return issued - 1
+
+    async def worker():
+        conn = Connection(base_url, timeout)
+        try:
+            while (index := claim()) is not None:
+                began = time.monotonic()
+                if rate:
+                    # Latency counts from the scheduled start, so a request
+                    # held up behind a slow one is not reported as fast
+                    began = start + index / rate
+                    if began > time.monotonic():
+                        await asyncio.sleep(began - time.monotonic())
+                query, accept = items[index % len(items)]
+                try:
+                    status, headers, _ = await conn.get(
+                        f"{endpoint}?query={quote(query, safe='')}", accept
+                    )
+                except (OSError, ValueError, IndexError, asyncio.TimeoutError,
+                        asyncio.IncompleteReadError) as e:
+                    await conn.close()
+                    status, headers = type(e).__name__, {}
+                results.record(time.monotonic() - began, status, headers)
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.monotonic() - start
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(1, math.ceil(fraction * len(sorted_values))) - 1]
+
+
+def summarize(results, elapsed):
+    latencies = sorted(results.latencies)
+    count = len(latencies)
+    summary = {
+        "requests": count,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "errors": results.errors,
+        "error_rate": round(results.errors / count, 4) if count else 0.0,
+        "latency_ms": {
+            name: round(percentile(latencies, q) * 1000, 1)
+            for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+        },
+        "statuses": {str(k): v for k, v in sorted(results.statuses.items(), key=lambda kv: str(kv[0]))},
+        "cache_hit_ratio": None,
+    }
+    if count:
+        summary["latency_ms"]["mean"] = round(sum(latencies) / count * 1000, 1)
+        summary["latency_ms"]["max"] = round(latencies[-1] * 1000, 1)
+    if results.cache_reported:
+        summary["cache_hit_ratio"] = round(results.cache_hits / results.cache_reported, 4)
+    return summary
+
+
+def print_summary(summary, target):
+    lat = summary["latency_ms"]
+    print(f"Target:     {target}")
+    print(f"Requests:   {summary['requests']} in {summary['seconds']:.2f}s "
+          f"({summary['throughput_rps']:.1f} req/s)")
+    print(f"Latency:    p50 {lat['p50']:.1f}ms, p95 {lat['p95']:.1f}ms, p99 {lat['p99']:.1f}ms"
+          + (f" (mean {lat['mean']:.1f}ms, max {lat['max']:.1f}ms)" if "mean" in lat else ""))
+    print(f"Errors:     {summary['errors']} ({summary['error_rate']:.1%})")
+    print("Statuses:   " + ", ".join(f"{k}: {v}" for k, v in summary["statuses"].items()))
+    ratio = summary["cache_hit_ratio"]
+    print(f"X-Cache:    {ratio:.1%} hit ratio" if ratio is not None else
+          "X-Cache:    not reported by target")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a SPARQL query mix under concurrent load")
+    parser.add_argument("--url", default=os.environ.get("VARNISH_URL", "http://localhost:9031"),
+                        help="Fuseki, Varnish or gateway base URL "
+                             "(default: $VARNISH_URL or http://localhost:9031)")
+    parser.add_argument("--endpoint", default=None,
+                        help="Query path (default: /{dataset}/sparql; use /sparql for the gateway)")
+    parser.add_argument("--dataset", default=os.environ.get("DATASET", "skosmos"))
+    parser.add_argument("--log", nargs="+", metavar="FILE",
+                        help="Replay queries from access logs instead of the builtin workload")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Parallel connections (default: 8)")
+    parser.add_argument("--requests", type=int, help="Requests to send (default: 1000, "
+                        "or one pass over the log; ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds")
+    parser.add_argument("--rate", type=float, help="Target request rate per second (open loop)")
+    parser.add_argument("--mix-size", type=int, default=500,
+                        help="Distinct requests generated for the builtin workload (default: 500)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the builtin workload")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout (default: 30)")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    endpoint = args.endpoint or f"/{args.dataset}/sparql"
+    target = args.url.rstrip("/") + endpoint
+    if args.log:
+        missing = [f for f in args.log if not os.path.isfile(f)]
+        if missing:
+            print(f"ERROR: Log file not found: {', '.join(missing)}", file=sys.stderr)
+            sys.exit(1)
+        items = recorded_workload(args.log)
+        if not items:
+            print("ERROR: No query requests found in the logs.", file=sys.stderr)
+            sys.exit(1)
+    else:
+        try:
+            concepts = asyncio.run(fetch_concepts(args.url, endpoint, args.timeout))
+        except (OSError, ValueError, KeyError, asyncio.TimeoutError) as e:
+            print(f"ERROR: Could not sample concepts from {target}: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not concepts:
+            print(f"ERROR: No concepts with English labels found at {target}", file=sys.stderr)
+            sys.exit(1)
+        items = builtin_workload(concepts, args.mix_size, random.Random(args.seed))
+
+    total = None
+    if not args.duration:
+        total = args.requests or (len(items) if args.log else 1000)
+    results, elapsed = asyncio.run(run_load(
+        args.url, endpoint, items, args.concurrency, total, args.duration, args.rate, args.timeout,
+    ))
+    summary = summarize(results, elapsed)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary, target)
+    if summary["requests"] and summary["errors"] == summary["requests"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""Materialize the SKOS hierarchy triples that are otherwise computed at query time.
+
+csv-to-skos.py writes only skos:broader. Hierarchy views therefore walk
+property paths (skos:broader+, ^skos:broader) over the whole graph on
+every request, and validate-skos.py warns about every broader link
+without its narrower inverse. This script adds the entailed triples
+instead:
+
+  - skos:narrower for every skos:broader, and skos:broader for every
+    skos:narrower
+  - skos:broaderTransitive / skos:narrowerTransitive: the full ancestor
+    closure, including the direct links
+  - skos:topConceptOf / skos:hasTopConcept for root concepts (no broader)
+    in the schemes they are inScheme of, or in the only scheme if they
+    name none, plus the inverse of either if it was stated alone
+
+Concepts are numbered and the hierarchy is held as integer adjacency
+lists. One pass over the parent links (Tarjan's strongly connected
+components, which come out ancestors first) extends each concept's
+ancestor set from its parents'. The work is linear in the concepts plus
+the closure it emits. Concepts on a broader cycle are ancestors of each
+other and are reported, since a cycle is usually a data error. Only
+triples missing from the input are written.
+
+`bench` builds deep (long chains) and wide (high fan-out) synthetic
+hierarchies. It times typical hierarchy queries written with property
+paths against the plain graph, then the same lookups against the
+materialized properties.
+
+Usage:
+    python scripts/materialize-skos.py data/*.ttl -o /tmp/inferred-hierarchy.ttl
+    python scripts/materialize-skos.py data/*.ttl --stats
+    python scripts/materialize-skos.py bench --depth 200 --fanout 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+try:
+    from rdflib import Graph, Namespace, RDF, URIRef
+    from rdflib.plugins.serializers.nt import _nt_row
+except ImportError:
+    print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+    sys.exit(1)
+
+SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
+
+
+class Hierarchy:
+    """Concepts as integers, with parent adjacency lists."""
+
+    def __init__(self, g):
+        ids = {}
+        nodes = []
+
+        def node(term):
+            if term not in ids:
+                ids[term] = len(nodes)
+                nodes.append(term)
+            return ids[term]
+
+        for c in sorted(g.subjects(RDF.type, SKOS.Concept)):
+            node(c)
+        edges = set()
+        for child, parent in g.subject_objects(SKOS.broader):
+            if isinstance(child, URIRef) and isinstance(parent, URIRef):
+                edges.add((node(child), node(parent)))
+        for parent, child in g.subject_objects(SKOS.narrower):
+            if isinstance(child, URIRef) and isinstance(parent, URIRef):
+                edges.add((node(child), node(parent)))
+
+        self.ids = ids
+        self.nodes = nodes
+        self.parents = [[] for _ in nodes]
+        for child, parent in sorted(edges):
+            if child != parent:
+                self.parents[child].append(parent)
+
+    def components(self):
+        """Strongly connected components over parent links, parents' first.
+
+        Iterative Tarjan: a component is emitted only after every component
+        reachable through broader links, i.e. after all of its ancestors.
+        """
+        n = len(self.nodes)
+        index = [None] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack = []
+        counter = 0
+        for start in range(n):
+            if index[start] is not None:
+                continue
+            work = [(start, 0)]
+            while work:
+                v, next_edge = work.pop()
+                if next_edge == 0:
+                    index[v] = low[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = True
+                parents = self.parents[v]
+                while next_edge < len(parents):
+                    p = parents[next_edge]
+                    next_edge += 1
+                    if index[p] is None:
+                        work.append((v, next_edge))
+                        work.append((p, 0))
+                        break
+                    if on_stack[p]:
+                        low[v] = min(low[v], index[p])
+                else:
+                    if low[v] == index[v]:
+                        component = []
+                        while True:
+                            w = stack.pop()
+                            on_stack[w] = False
+                            component.append(w)
+                            if w == v:
+                                break
+                        yield component
+                    if work:
+                        u = work[-1][0]
+                        low[u] = min(low[u], low[v])
+
+    def closure(self):
+        """(ancestor sets per concept, concepts on a broader cycle).
+
+        One pass over the components in ancestors-first order: a
+        component's ancestors are its members' outside parents plus their
+        ancestors, and members of a cycle are ancestors of each other.
+        """
+        ancestors = [None] * len(self.nodes)
+        cyclic = []
+        for component in self.components():
+            members = set(component)
+            shared = set(members) if len(component) > 1 else set()
+            for v in component:
+                for p in self.parents[v]:
+                    if p not in members:
+                        shared.add(p)
+                        shared |= ancestors[p]
+            for v in component:
+                ancestors[v] = shared - {v} if len(component) > 1 else shared
+            if len(component) > 1:
+                cyclic.extend(sorted(component))
+        return ancestors, cyclic
+
+
+def materialize(g):
+    """Return (list of entailed triples missing from g, stats)."""
+    began = time.monotonic()
+    h = Hierarchy(g)
+    # Stated triples of the inferred predicates, for cheap set lookups
+    stated = set()
+    for predicate in (SKOS.narrower, SKOS.broader, SKOS.broaderTransitive,
+                      SKOS.narrowerTransitive, SKOS.topConceptOf, SKOS.hasTopConcept):
+        stated.update(g.triples((None, predicate, None)))
+    inferred = {}
+    counts = {"narrower": 0, "broader": 0, "transitive": 0, "top": 0}
+
+    def add(triple, kind):
+        if triple not in inferred and triple not in stated:
+            inferred[triple] = True
+            counts[kind] += 1
+
+    nodes = h.nodes
+    for child, parents in enumerate(h.parents):
+        for parent in parents:
+            add((nodes[parent], SKOS.narrower, nodes[child]), "narrower")
+            add((nodes[child], SKOS.broader, nodes[parent]), "broader")
+
+    ancestors, cyclic = h.closure()
+    for i, ups in enumerate(ancestors):
+        for a in ups:
+            add((nodes[i], SKOS.broaderTransitive, nodes[a]), "transitive")
+            add((nodes[a], SKOS.narrowerTransitive, nodes[i]), "transitive")
+
+    schemes = sorted(g.subjects(RDF.type, SKOS.ConceptScheme))
+    unplaced = 0
+    for i, parents in enumerate(h.parents):
+        c = nodes[i]
+        if parents or (c, RDF.type, SKOS.Concept) not in g:
+            continue
+        in_schemes = sorted(g.objects(c, SKOS.inScheme))
+        if not in_schemes and len(schemes) == 1:
+            in_schemes = schemes
+        if not in_schemes:
+            unplaced += 1
+        for scheme in in_schemes:
+            add((c, SKOS.topConceptOf, scheme), "top")
+            add((scheme, SKOS.hasTopConcept, c), "top")
+    for c, scheme in g.subject_objects(SKOS.topConceptOf):
+        add((scheme, SKOS.hasTopConcept, c), "top")
+    for scheme, c in g.subject_objects(SKOS.hasTopConcept):
+        add((c, SKOS.topConceptOf, scheme), "top")
+
+    stats = dict(counts, concepts=len(nodes), inferred=len(inferred), cyclic=len(cyclic),
+                 unplaced_roots=unplaced, seconds=time.monotonic() - began)
+    stats["cycle_members"] = [str(nodes[i]) for i in cyclic[:10]]
+    return list(inferred), stats
+
+
+def to_graph(triples):
+    g = Graph()
+    g.bind("skos", SKOS)
+    g.addN(triple + (g,) for triple in triples)
+    return g
+
+
+def write_ntriples(triples, stream):
+    """N-Triples is valid Turtle; writing lines skips building a Graph."""
+    for triple in triples:
+        stream.write(_nt_row(triple))
+
+
+def format_stats(stats):
+    return (f"{stats['inferred']} triples inferred for {stats['concepts']} concepts "
+            f"({stats['narrower'] + stats['broader']} inverse, {stats['transitive']} transitive, "
+            f"{stats['top']} top concept) in {stats['seconds']:.2f}s")
+
+
+# -- benchmark -------------------------------------------------------------------
+
+BENCH_BASE = "http://bench.example.org/"
+
+QUERY_PREFIX = f"PREFIX skos: <{SKOS}>\n"
+
+# (name, before: property paths over skos:broader, after: materialized properties)
+BENCH_QUERIES = [
+    ("ancestors of a leaf",
+     "SELECT ?a WHERE { <%(leaf)s> skos:broader+ ?a }",
+     "SELECT ?a WHERE { <%(leaf)s> skos:broaderTransitive ?a }"),
+    ("descendant count of the root",
+     "SELECT (COUNT(DISTINCT ?d) AS ?n) WHERE { ?d skos:broader+ <%(root)s> }",
+     "SELECT (COUNT(?d) AS ?n) WHERE { <%(root)s> skos:narrowerTransitive ?d }"),
+    ("children of the root",
+     "SELECT ?c WHERE { ?c skos:broader <%(root)s> }",
+     "SELECT ?c WHERE { <%(root)s> skos:narrower ?c }"),
+    ("top concepts",
+     "SELECT ?c WHERE { ?c a skos:Concept FILTER NOT EXISTS { ?c skos:broader ?p } }",
+     "SELECT ?c WHERE { <%(scheme)s> skos:hasTopConcept ?c }"),
+]
+
+
+def synthetic_hierarchy(shape, depth, fanout):
+    """A scheme with one root; deep = `fanout` chains of `depth`, wide = a `fanout`-ary tree."""
+    g = Graph()
+    scheme = URIRef(BENCH_BASE + "scheme")
+    g.add((scheme, RDF.type, SKOS.ConceptScheme))
+    root = URIRef(BENCH_BASE + "c0")
+    g.add((root, RDF.type, SKOS.Concept))
+    g.add((root, SKOS.inScheme, scheme))
+    count = 1
+    leaf = root
+
+    def concept(parent):
+        nonlocal count
+        c = URIRef(f"{BENCH_BASE}c{count}")
+        count += 1
+        g.add((c, RDF.type, SKOS.Concept))
+        g.add((c, SKOS.inScheme, scheme))
+        g.add((c, SKOS.broader, parent))
+        return c
+
+    if shape == "deep":
+        for _ in range(fanout):
+            parent = root
+            for _ in range(depth):
+                parent = concept(parent)
+            leaf = parent
+    else:
+        level = [root]
+        for _ in range(depth):
+            level = [concept(parent) for parent in level for _ in range(fanout)]
+        leaf = level[-1]
+    return g, {"root": root, "leaf": leaf, "scheme": scheme}, count
+
+
+def time_query(g, query, repeat):
+    """Best-of-`repeat` seconds and result count of a SPARQL query."""
+    best = None
+    rows = 0
+    for _ in range(repeat):
+        began = time.perf_counter()
+        rows = len(list(g.query(QUERY_PREFIX + query)))
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best, rows
+
+
+def cmd_bench(args):
+    shapes = {"deep": (args.depth, args.chains), "wide": (args.levels, args.fanout)}
+    for shape in ([args.shape] if args.shape != "both" else ["deep", "wide"]):
+        depth, fanout = shapes[shape]
+        g, terms, concepts = synthetic_hierarchy(shape, depth, fanout)
+        label = (f"{fanout} chains of depth {depth}" if shape == "deep"
+                 else f"{depth} levels, fan-out {fanout}")
+        inferred, stats = materialize(g)
+        print(f"{shape.capitalize()} hierarchy ({label}): {concepts} concepts, {len(g)} triples")
+        print(f"  Materialized: {format_stats(stats)}")
+        enriched = g + to_graph(inferred)
+        for name, before, after in BENCH_QUERIES:
+            t_before, n_before = time_query(g, before % terms, args.repeat)
+            t_after, n_after = time_query(enriched, after % terms, args.repeat)
+            speedup = t_before / t_after if t_after > 0 else float("inf")
+            print(f"  {name:<30} {t_before * 1000:9.2f}ms -> {t_after * 1000:8.2f}ms "
+                  f"({speedup:.1f}x, {n_after} rows{'' if n_before == n_after else ' MISMATCH'})")
+
+
+def cmd_materialize(args):
+    output = os.path.abspath(args.output) if args.output else None
+    g = Graph()
+    for path in args.files:
+        if output and os.path.abspath(path) == output:
+            continue  # stale inferences must not feed the next run
+        try:
+            g.parse(path, format="turtle")
+        except Exception as e:  # rdflib parse errors have no common base class
+            print(f"ERROR: Syntax error in {path}: {e}", file=sys.stderr)
+            sys.exit(1)
+    inferred, stats = materialize(g)
+    if args.output or not args.stats:
+        stream = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        if args.format == "nt":
+            write_ntriples(inferred, stream)
+        else:
+            stream.write(to_graph(inferred).serialize(format="turtle"))
+        if args.output:
+            stream.close()
+    print(format_stats(stats), file=sys.stderr)
+    if stats["cyclic"]:
+        print(f"WARNING: {stats['cyclic']} concepts on broader cycles, e.g. "
+              f"{', '.join(stats['cycle_members'][:3])}", file=sys.stderr)
+    if stats["unplaced_roots"]:
+        print(f"WARNING: {stats['unplaced_roots']} root concepts without a scheme "
+              f"get no topConceptOf", file=sys.stderr)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        parser = argparse.ArgumentParser(prog="materialize-skos.py bench",
+                                         description="Hierarchy query latency before/after")
+        parser.add_argument("--shape", choices=["deep", "wide", "both"], default="both")
+        parser.add_argument("--depth", type=int, default=200,
+                            help="Deep shape: chain length (default: 200)")
+        parser.add_argument("--chains", type=int, default=5,
+                            help="Deep shape: chains under the root (default: 5)")
+        parser.add_argument("--levels", type=int, default=3,
+                            help="Wide shape: levels below the root (default: 3)")
+        parser.add_argument("--fanout", type=int, default=20,
+                            help="Wide shape: children per concept (default: 20)")
+        parser.add_argument("--repeat", type=int, default=3, help="Best of N runs per query")
+        cmd_bench(parser.parse_args(sys.argv[2:]))
+        return
+
+    parser = argparse.ArgumentParser(description="Materialize inferred SKOS hierarchy triples")
+    parser.add_argument("files", nargs="+", help="Turtle files (the output file is skipped)")
+    parser.add_argument("-o", "--output", help="Write inferred triples here (default: stdout)")
+    parser.add_argument("--format", choices=["turtle", "nt"], default="turtle",
+                        help="nt is much faster for large closures and still loads as Turtle")
+    parser.add_argument("--stats", action="store_true", help="Only report what would be inferred")
+    cmd_materialize(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
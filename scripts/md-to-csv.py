@@ -31,6 +31,12 @@ HEADING_BLOCKLIST = {
 # Values treated as empty
 NA_VALUES = {"n/a", "na", "none", "n.a.", ""}
 
+# Columns read by csv-to-skos.py
+FIELDNAMES = [
+    "uri_slug", "pref_label", "alt_labels", "hidden_labels",
+    "definition", "broader_slug", "related_slugs", "scope_note", "example"
+]
+
 
 def slugify(name):
     """Convert a term title to a kebab-case URI slug.
@@ -683,6 +689,28 @@ def map_to_row(term, cat_map):
     }, unmapped
 
 
+def terms_to_rows(all_terms, cat_map):
+    """Map parsed terms to CSV rows.
+
+    Returns (rows, set_of_unmapped_categories).
+    """
+    rows = []
+    all_unmapped = set()
+    for term in all_terms:
+        row, unmapped = map_to_row(term, cat_map)
+        rows.append(row)
+        all_unmapped.update(unmapped)
+    return rows, all_unmapped
+
+
+def write_rows(rows, path):
+    """Write rows as the CSV consumed by csv-to-skos.py."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
 def detect_collisions(all_terms):
     """Group terms by slug and return collision groups (slug -> list of terms)."""
     slug_groups = {}
@@ -709,6 +737,27 @@ def write_collision_report(collisions, path):
     ), file=sys.stderr)
 
 
+PARSERS = {
+    "STANDARD": parse_standard,
+    "UNBOLDED": parse_unbolded,
+    "SECTION_GROUPED": parse_section_grouped,
+    "PROCESS_MGMT": parse_process_mgmt,
+}
+
+
+def parse_file(filepath):
+    """Detect the format of one markdown file and parse it.
+
+    Returns (format_name, list_of_terms).
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    lines = [l.rstrip("\n").rstrip("\r") for l in lines]
+
+    fmt = detect_format(lines)
+    return fmt, PARSERS[fmt](lines, os.path.basename(filepath))
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Convert markdown glossary files to CSV for SKOS import"
@@ -744,22 +793,9 @@ def main():
     all_terms = []
     file_counts = {}
 
-    PARSERS = {
-        "STANDARD": parse_standard,
-        "UNBOLDED": parse_unbolded,
-        "SECTION_GROUPED": parse_section_grouped,
-        "PROCESS_MGMT": parse_process_mgmt,
-    }
-
     for filepath in args.source_files:
-        with open(filepath, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        lines = [l.rstrip("\n").rstrip("\r") for l in lines]
-
         basename = os.path.basename(filepath)
-        fmt = detect_format(lines)
-        parse_fn = PARSERS[fmt]
-        terms = parse_fn(lines, basename)
+        fmt, terms = parse_file(filepath)
 
         file_counts[basename] = {"format": fmt, "count": len(terms)}
         all_terms.extend(terms)
@@ -792,12 +828,7 @@ def main():
             print("All collisions resolved", file=sys.stderr)
 
     # Map to rows and collect unmapped categories
-    rows = []
-    all_unmapped = set()
-    for term in all_terms:
-        row, unmapped = map_to_row(term, cat_map)
-        rows.append(row)
-        all_unmapped.update(unmapped)
+    rows, all_unmapped = terms_to_rows(all_terms, cat_map)
 
     if all_unmapped:
         print("WARNING: {} unmapped categories: {}".format(
@@ -812,19 +843,11 @@ def main():
         return
 
     # Write output
-    fieldnames = [
-        "uri_slug", "pref_label", "alt_labels", "hidden_labels",
-        "definition", "broader_slug", "related_slugs", "scope_note", "example"
-    ]
-
     if args.output:
-        with open(args.output, "w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
+        write_rows(rows, args.output)
         print("Wrote {} terms to {}".format(len(rows), args.output), file=sys.stderr)
     else:
-        writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
+        writer = csv.DictWriter(sys.stdout, fieldnames=FIELDNAMES)
         writer.writeheader()
         writer.writerows(rows)
         print("Wrote {} terms to stdout".format(len(rows)), file=sys.stderr)
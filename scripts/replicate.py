@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""Fan loads and deltas out to several Fuseki read replicas and keep them converged.
+
+load-data.sh and backup.sh talk to one FUSEKI_URL. To serve reads from
+several Fuseki nodes behind the nginx fuseki_backend upstream, every
+node must hold the same data. This script writes to all of them in
+parallel and then checks that they agree.
+
+`load` uploads Turtle files to every replica at once, each through
+bulk-load.py's pooled, gzip-streamed uploads. With --replace the files
+are staged in the replica's stored default graph, which
+tdb2:unionDefaultGraph hides from readers, and one MOVE then swaps them
+in, so a replica never serves a half-replaced graph. Nothing else may
+write to that default graph meanwhile.
+
+`delta` applies a patch, as written by sorted-diff.py and
+snapshot-store.py (`D <triple> .` / `A <triple> .` lines, optionally
+gzipped), to the graph on every replica as DELETE DATA / INSERT DATA
+updates of --batch triples each.
+
+After a load or delta the dataset version is stamped on the first
+replica that took the change and its <urn:egms:meta> graph is copied to
+the others, so Varnish ETags do not depend on which node answered. Then
+the replicas are verified and, unless --no-resync, re-synced.
+
+`verify` lists the named graphs on every replica with their triple
+counts and hashes each graph. The hash is the sum of per-line BLAKE2b
+digests of its N-Triples, streamed without sorting and blind to
+blank-node labels, so it does not depend on the order Fuseki writes
+triples in. For each graph the digest held by most replicas is the
+reference (ties go to the replica listed first). Replicas whose load
+or delta failed do not vote.
+
+`sync` verifies and copies every diverged graph from a replica holding
+the reference: staged and MOVEd into place, or dropped if the reference
+has no such graph. --source takes one replica's graphs as the reference
+instead of voting. Replicas are verified again afterwards, and the exit
+status is 1 unless they all agree.
+
+Usage:
+    python scripts/replicate.py load data/*.ttl --replica http://fuseki-1:3030 \\
+        --replica http://fuseki-2:3030
+    FUSEKI_REPLICAS="http://fuseki-1:3030 http://fuseki-2:3030" python scripts/replicate.py load --replace data/*.ttl
+    python scripts/replicate.py delta changes.patch.gz
+    python scripts/replicate.py verify
+    python scripts/replicate.py sync --source http://fuseki-1:3030
+
+Environment variables (same defaults as load-data.sh):
+    FUSEKI_REPLICAS            Replica base URLs, comma or space separated
+    FUSEKI_USER, FUSEKI_PASS, GRAPH_URI, DATASET
+    DATASET_VERSION_FILE, VARNISH_RELOAD, VARNISH_URL  Where the version
+                               stamped after each load is published
+                               (see dataset-version.py)
+"""
+
+import argparse
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import urllib.error
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from _egms import load_script
+
+GRAPH_COUNTS = "SELECT ?g (COUNT(*) AS ?n) WHERE { GRAPH ?g { ?s ?p ?o } } GROUP BY ?g"
+HASH_MASK = (1 << 128) - 1
+
+BNODE_SUBJECT = re.compile(r"^_:\S+")
+BNODE_OBJECT = re.compile(r"_:\S+ \.$")
+
+
+bulk = load_script("bulk-load")
+versions = load_script("dataset-version")
+
+
+class Replica:
+    """Pooled keep-alive connections to one replica's dataset."""
+
+    def __init__(self, url, dataset, user=None, password=None, timeout=300, connections=4):
+        self.url = url.rstrip("/")
+        self.dataset = dataset
+        self.user = user
+        self.password = password
+        self.pool = bulk.ConnectionPool(self.url, connections, timeout)
+        self.headers = bulk.request_headers(user, password, "application/n-triples")
+        self.headers.pop("Content-Type")
+
+    def request(self, method, target, body=None, headers=None):
+        """Send one request; returns (status, data). Raises OSError or HTTPException."""
+        # A pooled keep-alive connection may have been closed by Fuseki;
+        # requests without a body are safe to send again
+        attempts = 2 if body is None else 1
+        for attempt in range(attempts):
+            conn = self.pool.acquire()
+            try:
+                conn.request(method, target, body=body, headers=dict(self.headers, **(headers or {})))
+                resp = conn.getresponse()
+                data = resp.read()
+            except (OSError, http.client.HTTPException):
+                self.pool.release(conn, reusable=False)
+                if attempt + 1 == attempts:
+                    raise
+                continue
+            self.pool.release(conn, not resp.will_close)
+            return resp.status, data
+
+    def sparql(self, service, text):
+        field = "update" if service == "update" else "query"
+        status, data = self.request(
+            "POST", f"/{self.dataset}/{service}", urlencode({field: text}).encode("utf-8"),
+            {"Content-Type": "application/x-www-form-urlencoded",
+             "Accept": "application/sparql-results+json"},
+        )
+        if not 200 <= status < 300:
+            raise RuntimeError(f"HTTP {status}: {data[:200].decode('utf-8', 'replace')}")
+        return data
+
+    def update(self, text):
+        self.sparql("update", text)
+
+    def graph_counts(self):
+        """Triple count of every named graph."""
+        body = json.loads(self.sparql("query", GRAPH_COUNTS))
+        return {b["g"]["value"]: int(b["n"]["value"]) for b in body["results"]["bindings"]}
+
+    def stream_graph(self, graph, consume):
+        """GET a graph as N-Triples and pass the response lines to consume().
+
+        Returns False if the replica has no such graph.
+        """
+        for attempt in range(2):
+            conn = self.pool.acquire()
+            try:
+                conn.request("GET", bulk.graph_target(self.dataset, graph),
+                             headers=dict(self.headers, Accept="application/n-triples"))
+                resp = conn.getresponse()
+                if resp.status == 404:
+                    resp.read()
+                    self.pool.release(conn, not resp.will_close)
+                    return False
+                if resp.status != 200:
+                    data = resp.read()
+                    self.pool.release(conn, not resp.will_close)
+                    raise RuntimeError(f"HTTP {resp.status}: {data[:200].decode('utf-8', 'replace')}")
+                consume(resp)
+                # Line iteration can stop short of marking the response done
+                resp.read()
+            except (OSError, http.client.HTTPException):
+                self.pool.release(conn, reusable=False)
+                if attempt == 1:
+                    raise
+                continue
+            self.pool.release(conn, not resp.will_close)
+            return True
+
+    def graph_digest(self, graph):
+        """(triple count, hash) of a graph, or None if the replica lacks it."""
+        state = {}
+
+        def consume(lines):
+            count = total = 0
+            for raw in lines:
+                line = raw.decode("utf-8").strip()
+                if not line or line.startswith("#"):
+                    continue
+                line = BNODE_SUBJECT.sub("_:b", line)
+                line = BNODE_OBJECT.sub("_:b .", line)
+                digest = hashlib.blake2b(line.encode("utf-8"), digest_size=16).digest()
+                total = (total + int.from_bytes(digest, "big")) & HASH_MASK
+                count += 1
+            state["digest"] = (count, f"{total:032x}")
+
+        if not self.stream_graph(graph, consume) or not state["digest"][0]:
+            return None
+        return state["digest"]
+
+    def close(self):
+        self.pool.close()
+
+
+def parse_replicas(values):
+    """Split --replica / FUSEKI_REPLICAS values into a de-duplicated URL list."""
+    urls = []
+    for value in values:
+        for url in re.split(r"[\s,]+", value.strip()):
+            if url and url.rstrip("/") not in urls:
+                urls.append(url.rstrip("/"))
+    return urls
+
+
+def parallel(replicas, fn):
+    """Run fn(replica) on every replica at once; returns {url: (ok, value or error)}."""
+    def run(replica):
+        try:
+            return replica.url, (True, fn(replica))
+        except (OSError, http.client.HTTPException, RuntimeError, ValueError) as e:
+            return replica.url, (False, str(e) or e.__class__.__name__)
+
+    with ThreadPoolExecutor(max_workers=len(replicas) or 1) as executor:
+        return dict(executor.map(run, replicas))
+
+
+def short(digest):
+    return "absent" if digest is None else f"{digest[0]} triples, digest {digest[1][:12]}"
+
+
+# -- verification and re-sync ------------------------------------------------------
+
+def survey(replicas):
+    """Count and hash every graph on every replica.
+
+    Returns ({url: {graph: digest or None}} for the replicas that answered,
+    {url: error} for those that did not).
+    """
+    counts = parallel(replicas, lambda r: r.graph_counts())
+    failed = {url: value for url, (ok, value) in counts.items() if not ok}
+    graphs = sorted({g for ok, value in counts.values() if ok for g in value})
+
+    def hash_all(replica):
+        return {g: replica.graph_digest(g) if g in counts[replica.url][1] else None
+                for g in graphs}
+
+    live = [r for r in replicas if r.url not in failed]
+    digests = {}
+    for url, (ok, value) in parallel(live, hash_all).items():
+        if ok:
+            digests[url] = value
+        else:
+            failed[url] = value
+    return digests, failed
+
+
+def reference_digests(replicas, digests, voters):
+    """Per graph, the digest most voting replicas hold and the first replica holding it."""
+    order = [r.url for r in replicas if r.url in digests and r.url in voters]
+    graphs = sorted({g for table in digests.values() for g in table})
+    reference = {}
+    for graph in graphs:
+        votes = Counter(digests[url][graph] for url in order)
+        if not votes:
+            continue
+        best = max(votes.values())
+        # Ties go to the replica listed first
+        source = next(url for url in order if votes[digests[url][graph]] == best)
+        reference[graph] = (digests[source][graph], source)
+    return reference
+
+
+def report(replicas, digests, failed, reference):
+    """Print the comparison; returns [(graph, stale url, source url)] to re-sync."""
+    for replica in replicas:
+        if replica.url in failed:
+            print(f"  {replica.url}: UNREACHABLE ({failed[replica.url]})")
+        else:
+            table = digests[replica.url]
+            present = [d for d in table.values() if d]
+            print(f"  {replica.url}: {len(present)} graph(s), "
+                  f"{sum(d[0] for d in present)} triples")
+    stale = []
+    for graph, (digest, source) in sorted(reference.items()):
+        behind = [url for url in digests if digests[url][graph] != digest]
+        agree = len(digests) - len(behind)
+        if not behind:
+            print(f"  <{graph}>: {short(digest)}; {agree}/{len(digests)} replicas agree")
+            continue
+        print(f"  <{graph}>: DIVERGED; {agree}/{len(digests)} replicas hold {short(digest)}")
+        for url in behind:
+            print(f"    {url}: {short(digests[url][graph])}")
+            stale.append((graph, url, source))
+    return stale
+
+
+def verify(replicas, voters=None):
+    """Survey and print the replicas; returns (stale copies, unreachable urls)."""
+    print(f"Verifying {len(replicas)} replica(s) of dataset '{replicas[0].dataset}'...")
+    digests, failed = survey(replicas)
+    voters = set(digests) if voters is None else set(voters) & set(digests)
+    if digests and not voters:
+        print("  No trusted replica answered; cannot choose a reference")
+        return [], sorted(failed) or sorted(digests)
+    reference = reference_digests(replicas, digests, voters)
+    stale = report(replicas, digests, failed, reference)
+    return stale, sorted(failed)
+
+
+def copy_graph(source, target, graph, retries=3, tmp_dir=None):
+    """Replace a graph on target with source's copy (drop it if source has none).
+
+    The copy is spooled to a temporary file, posted into the stored default
+    graph and moved into place in one update. Returns the triple count.
+    """
+    with tempfile.NamedTemporaryFile(prefix="egms-replica-", suffix=".nt", dir=tmp_dir,
+                                     delete=False) as f:
+        path = f.name
+    try:
+        with open(path, "wb") as out:
+            def spool(lines):
+                out.seek(0)
+                out.truncate()
+                for block in iter(lambda: lines.read(bulk.CHUNK_SIZE), b""):
+                    out.write(block)
+            present = source.stream_graph(graph, spool)
+        if not present or not os.path.getsize(path):
+            target.update(f"DROP SILENT GRAPH <{graph}>")
+            return 0
+        target.update("CLEAR SILENT DEFAULT")
+        result = bulk.post_body(target.pool, bulk.graph_target(target.dataset, None),
+                                dict(target.headers, **{"Content-Type": "application/n-triples"}),
+                                lambda: open(path, "rb"), os.path.getsize(path), retries=retries)
+        if "error" in result:
+            target.update("CLEAR SILENT DEFAULT")
+            raise RuntimeError(result["error"])
+        target.update(f"MOVE SILENT DEFAULT TO GRAPH <{graph}>")
+        return result["triples"]
+    finally:
+        os.unlink(path)
+
+
+def resync(replicas, stale, retries=3):
+    """Copy every stale graph from its source replica; returns the number that failed."""
+    by_url = {r.url: r for r in replicas}
+    print(f"Re-syncing {len(stale)} graph(s)...")
+
+    def copy(item):
+        graph, url, source = item
+        began = time.monotonic()
+        try:
+            triples = copy_graph(by_url[source], by_url[url], graph, retries)
+        except (OSError, http.client.HTTPException, RuntimeError) as e:
+            return False, f"  <{graph}> on {url}: FAILED ({e})"
+        what = f"{triples} triples" if triples else "dropped"
+        return True, (f"  <{graph}> on {url} <- {source}: {what} "
+                      f"({time.monotonic() - began:.2f}s)")
+
+    # One copy per target replica at a time; replicas in parallel
+    by_target = {}
+    for item in stale:
+        by_target.setdefault(item[1], []).append(item)
+    with ThreadPoolExecutor(max_workers=len(by_target) or 1) as executor:
+        results = [line for lines in executor.map(lambda items: [copy(i) for i in items],
+                                                  by_target.values())
+                   for line in lines]
+    for _, line in results:
+        print(line)
+    return sum(1 for ok, _ in results if not ok)
+
+
+def converge(replicas, voters=None, repair=True, retries=3):
+    """Verify and, if asked, re-sync and verify again. Returns True when all agree."""
+    stale, unreachable = verify(replicas, voters)
+    if stale and repair:
+        print("")
+        resync(replicas, stale, retries)
+        print("")
+        # The repaired replicas now hold the reference, so every replica may vote
+        stale, unreachable = verify(replicas)
+    print("")
+    if unreachable:
+        print(f"ERROR: {len(unreachable)} replica(s) could not be checked: {', '.join(unreachable)}",
+              file=sys.stderr)
+    if stale:
+        graphs = len({graph for graph, _, _ in stale})
+        print(f"ERROR: {graphs} graph(s) still differ between replicas", file=sys.stderr)
+    if stale or unreachable:
+        return False
+    print(f"All {len(replicas)} replica(s) agree.")
+    return True
+
+
+# -- writing -----------------------------------------------------------------------
+
+def load_replica(replica, files, graph, args):
+    """Upload files to one replica (replacing the graph with --replace); returns result lines."""
+    # --replace stages in the stored default graph (graph None), hidden from readers
+    if args.replace:
+        replica.update("CLEAR SILENT DEFAULT")
+    results, elapsed, _ = bulk.bulk_load(
+        files, replica.url, replica.dataset, None if args.replace else graph, user=replica.user,
+        password=replica.password, concurrency=args.concurrency,
+        use_gzip=not args.no_gzip, retries=args.retries, backoff=args.backoff,
+    )
+    errors = [f"{os.path.basename(r['file'])}: {r['error']}" for r in results if "error" in r]
+    if errors:
+        if args.replace:
+            replica.update("CLEAR SILENT DEFAULT")
+        raise RuntimeError("; ".join(errors))
+    if args.replace:
+        replica.update(f"MOVE SILENT DEFAULT TO GRAPH <{graph}>")
+    triples = sum(r["triples"] or 0 for r in results)
+    return f"{len(files)} file(s), {triples} triples in {elapsed:.2f}s"
+
+
+def read_patch(path):
+    """(deletes, adds) N-Triples lines of a sorted-diff / snapshot-store patch."""
+    opener = gzip.open if path.endswith(".gz") else open
+    deletes, adds = [], []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("D "):
+                deletes.append(line[2:])
+            elif line.startswith("A "):
+                adds.append(line[2:])
+    return deletes, adds
+
+
+def patch_updates(deletes, adds, graph, batch):
+    """DELETE DATA then INSERT DATA requests of at most batch triples each."""
+    for op, lines in (("DELETE", deletes), ("INSERT", adds)):
+        for i in range(0, len(lines), batch):
+            body = "\n".join(lines[i:i + batch])
+            yield f"{op} DATA {{ GRAPH <{graph}> {{\n{body}\n}} }}"
+
+
+def apply_delta(replica, updates):
+    began = time.monotonic()
+    for text in updates:
+        replica.update(text)
+    return f"{len(updates)} update(s) in {time.monotonic() - began:.2f}s"
+
+
+def fan_out(replicas, label, fn):
+    """Run a write on every replica in parallel; returns the urls where it succeeded."""
+    print(f"{label} on {len(replicas)} replica(s)...")
+    began = time.monotonic()
+    results = parallel(replicas, fn)
+    for replica in replicas:
+        ok, value = results[replica.url]
+        print(f"  {replica.url}: {'OK, ' + value if ok else 'FAILED (' + value + ')'}")
+    done = [r.url for r in replicas if results[r.url][0]]
+    print(f"{len(done)} of {len(replicas)} replica(s) updated in {time.monotonic() - began:.2f}s")
+    return done
+
+
+def stamp_version(replicas, done, args):
+    """Stamp the version on the first updated replica and copy it to the others."""
+    primary = next(r for r in replicas if r.url in done)
+    stored = parallel([r for r in replicas if r.url in done],
+                      lambda r: versions.fuseki_version(r.url, r.dataset, r.user, r.password))
+    floor = max([versions.read_version_file(args.version_file)]
+                + [value for ok, value in stored.values() if ok])
+    primary.update(versions.stamp_update(floor))
+    version = versions.fuseki_version(primary.url, primary.dataset, primary.user,
+                                      primary.password)
+    others = [r for r in replicas if r is not primary]
+    copied = parallel(others, lambda r: copy_graph(primary, r, versions.META_GRAPH, args.retries))
+    print(f"Stamped dataset version {version} on {primary.url}")
+    for url, (ok, value) in copied.items():
+        if not ok:
+            print(f"WARNING: Could not copy the version to {url}: {value}", file=sys.stderr)
+    return version
+
+
+def finish_write(replicas, done, args):
+    """Stamp, verify, re-sync and publish after a load or delta; exits non-zero on failure."""
+    if not done:
+        print("ERROR: No replica took the change", file=sys.stderr)
+        sys.exit(1)
+    version = None
+    if not args.no_stamp:
+        print("")
+        try:
+            version = stamp_version(replicas, done, args)
+        except (urllib.error.URLError, OSError, http.client.HTTPException, RuntimeError) as e:
+            print(f"ERROR: Could not stamp the dataset version: {e}", file=sys.stderr)
+            sys.exit(1)
+    print("")
+    converged = converge(replicas, voters=done, repair=not args.no_resync, retries=args.retries)
+    if version is not None:
+        print("")
+        versions.publish(version, args.version_file, args.varnish_reload, args.varnish_url)
+    if not converged:
+        sys.exit(1)
+
+
+def cmd_load(replicas, args):
+    mode = "Replacing" if args.replace else "Loading into"
+    done = fan_out(replicas, f"{mode} <{args.graph}> from {len(args.files)} file(s)",
+                   lambda r: load_replica(r, args.files, args.graph, args))
+    finish_write(replicas, done, args)
+
+
+def cmd_delta(replicas, args):
+    deletes, adds = read_patch(args.patch)
+    if any("_:" in line for line in deletes):
+        print("ERROR: The patch deletes blank-node triples, which DELETE DATA cannot match; "
+              "use `load --replace`", file=sys.stderr)
+        sys.exit(1)
+    if not deletes and not adds:
+        print(f"Patch {args.patch} is empty; nothing to apply")
+        return
+    updates = list(patch_updates(deletes, adds, args.graph, args.batch))
+    done = fan_out(replicas, f"Applying {len(deletes)} deletion(s) and {len(adds)} addition(s) "
+                             f"to <{args.graph}>",
+                   lambda r: apply_delta(r, updates))
+    finish_write(replicas, done, args)
+
+
+def cmd_verify(replicas, args):
+    stale, unreachable = verify(replicas)
+    print("")
+    if unreachable or stale:
+        print(f"ERROR: {len({g for g, _, _ in stale})} graph(s) differ; "
+              f"{len(unreachable)} replica(s) unreachable", file=sys.stderr)
+        sys.exit(1)
+    print(f"All {len(replicas)} replica(s) agree.")
+
+
+def cmd_sync(replicas, args):
+    voters = None
+    if args.source:
+        voters = parse_replicas([args.source])
+        if voters[0] not in [r.url for r in replicas]:
+            print(f"ERROR: --source {args.source} is not one of the replicas", file=sys.stderr)
+            sys.exit(1)
+    if not converge(replicas, voters=voters, retries=args.retries):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replicate loads to several Fuseki replicas")
+    parser.add_argument("--replica", action="append", default=[], metavar="URL",
+                        help="Replica Fuseki base URL (repeatable; default: $FUSEKI_REPLICAS)")
+    parser.add_argument("--dataset", default=os.environ.get("DATASET", "skosmos"))
+    parser.add_argument("--user", default=os.environ.get("FUSEKI_USER", "admin"))
+    parser.add_argument("--password", default=os.environ.get("FUSEKI_PASS", "admin123"))
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="Per-request timeout in seconds (default: 300)")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries per upload on transient failures (default: 3)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    default_graph = os.environ.get("GRAPH_URI", "http://glossary.example.org/")
+
+    p = sub.add_parser("load", help="Load Turtle files into every replica")
+    p.add_argument("files", nargs="+", help="Turtle files to load")
+    p.add_argument("--replace", action="store_true",
+                   help="Replace the graph (staged, then swapped in with MOVE) instead of adding")
+    p.add_argument("--concurrency", type=int, default=4,
+                   help="Parallel uploads per replica (default: 4)")
+    p.add_argument("--backoff", type=float, default=1.0,
+                   help="Initial retry delay in seconds, doubled per attempt (default: 1.0)")
+    p.add_argument("--no-gzip", action="store_true", help="Send uncompressed request bodies")
+
+    p = sub.add_parser("delta", help="Apply a D/A patch to every replica")
+    p.add_argument("patch", help="Patch from sorted-diff.py or snapshot-store.py (may be .gz)")
+    p.add_argument("--batch", type=int, default=10000,
+                   help="Triples per DELETE DATA / INSERT DATA request (default: 10000)")
+
+    for name in ("load", "delta"):
+        sub.choices[name].add_argument("--graph", default=default_graph,
+                                       help=f"Named graph (default: {default_graph})")
+        sub.choices[name].add_argument("--no-stamp", action="store_true",
+                                       help="Do not stamp and publish a new dataset version")
+        sub.choices[name].add_argument("--no-resync", action="store_true",
+                                       help="Only report replicas that diverged")
+        versions.add_publish_arguments(sub.choices[name])
+
+    sub.add_parser("verify", help="Compare per-graph counts and hashes across replicas")
+
+    p = sub.add_parser("sync", help="Verify and re-sync replicas that diverged")
+    p.add_argument("--source", metavar="URL",
+                   help="Copy from this replica instead of taking the majority")
+    args = parser.parse_args()
+
+    urls = parse_replicas(args.replica or [os.environ.get("FUSEKI_REPLICAS", "")])
+    if not urls:
+        print("ERROR: No replicas given (use --replica or FUSEKI_REPLICAS)", file=sys.stderr)
+        sys.exit(1)
+    for path in getattr(args, "files", []) + ([args.patch] if args.command == "delta" else []):
+        if not os.path.isfile(path):
+            print(f"ERROR: File not found: {path}", file=sys.stderr)
+            sys.exit(1)
+
+    replicas = [Replica(url, args.dataset, args.user, args.password, args.timeout)
+                for url in urls]
+    commands = {"load": cmd_load, "delta": cmd_delta, "verify": cmd_verify, "sync": cmd_sync}
+    try:
+        commands[args.command](replicas, args)
+    finally:
+        for replica in replicas:
+            replica.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,993 @@
+#!/usr/bin/env python3
+"""Partition vocabularies across several Fuseki datasets and route requests to them.
+
+Everything normally lives in one `skosmos` dataset: one TDB2 store, one
+JVM heap. This script spreads the vocabulary over several datasets
+(or Fuseki instances), called shards, and puts a router in front of them
+that answers the requests a union of shards can answer (graph-scoped
+requests, concept lookups, label search) as a single dataset would, and
+refuses the rest. Skosmos joins concepts (the labels of related or
+broader concepts), so it can only use the router for vocabularies scoped
+to a partition graph (skosmos:sparqlGraph, with --by scheme).
+
+`plan` partitions the concepts:
+
+  - by top concept (default): each concept goes with the top concept it
+    reaches by following skos:broader; roots that are not top concepts
+    go to an "unfiled" partition
+  - by concept scheme (--by scheme): each concept goes with its
+    skos:inScheme, and the scheme resource with it
+
+Each partition becomes a named graph, <graph-base><slug>/. Triples about
+anything else (the concept scheme, in top-concept mode) go once into the
+shared graph, <graph-base>shared/, on the default shard, so a query that
+fans out sees them once. Partitions are assigned to shards largest
+first, each to the least-loaded shard, unless pinned with --pin
+slug=shard. The result is a JSON shard map: shards, partition graphs,
+and the index of which graph holds each concept.
+
+`load` splits the source files along the map and replaces each
+partition graph, and the shared graph, on its shard. It stages in the
+shard's stored default graph, which tdb2:unionDefaultGraph hides from
+readers, and then uses one MOVE, so readers never see a half-loaded
+partition; nothing else may write to that default graph meanwhile.
+Shards load in parallel. Concepts that moved between existing partitions
+are re-indexed in the map. New partitions need a new `plan`.
+
+`serve` runs the router:
+
+  - Graph Store requests (/{dataset}/data?graph=...) go to the shard
+    holding the graph; the default graph and unknown graphs use the
+    default shard (the first one)
+  - SPARQL queries go to one shard when their FROM / GRAPH IRIs, or
+    failing that the IRIs they use as subjects, all live on it (subjects
+    that are not concepts live in the shared graph); a concept named in
+    any other position (the object of skos:related, say) can be linked
+    from every shard, so such queries fan out
+  - queries that join through a variable used as both object and
+    subject (<c> skos:related ?r . ?r skos:prefLabel ?l), or through a
+    sequence, repeated or inverse property path, are refused unless they
+    name a graph: ?r may live on any shard, and a union of per-shard
+    answers is not a join across shards
+  - other queries fan out to every shard in parallel and the answers
+    are merged: SELECT bindings are concatenated (DISTINCT, ORDER BY on
+    plain variables and LIMIT re-applied), ASK is true if any shard says
+    so, CONSTRUCT / DESCRIBE graphs are unioned. The merge is the union
+    of per-shard answers, so queries that aggregate or page (GROUP BY,
+    COUNT, OFFSET, ...) are refused unless they name a graph
+  - SPARQL Update must address graphs (or subject concepts) on a single
+    shard; updates spanning shards, addressing none or joining are
+    refused
+  - GET /search?q=...&lang=en&limit=20 looks up labels on every shard
+    in parallel and merges the per-shard top matches (exact, then
+    prefix, then substring; prefLabel before altLabel before
+    hiddenLabel). A shard that fails is reported and the others still
+    answer.
+
+Responses carry X-Shard with the shard(s) that answered. The router
+re-reads the map when the file changes, so `load` can re-index without
+a restart.
+
+Usage:
+    python scripts/shard-router.py plan data/*.ttl --shard core=http://fuseki:3030/skosmos \\
+        --shard business=http://fuseki-2:3030/skosmos -o config/shards.json
+    python scripts/shard-router.py load data/*.ttl --map config/shards.json
+    python scripts/shard-router.py serve --map config/shards.json --port 8082
+    python scripts/shard-router.py search --map config/shards.json deploy --lang en
+
+Environment variables:
+    SHARD_MAP                  Shard map file (default: config/shards.json)
+    FUSEKI_USER, FUSEKI_PASS   Credentials `load` uses on every shard
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+try:
+    from rdflib import Graph, Namespace, RDF
+except ImportError:
+    print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+    sys.exit(1)
+
+from _egms import load_script
+
+SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
+
+UNFILED = "unfiled"
+SHARED = "shared"
+
+SPARQL_JSON = "application/sparql-results+json"
+TURTLE = "text/turtle"
+
+# Words that make a union of per-shard answers differ from the real answer
+UNMERGEABLE = {"GROUP", "HAVING", "OFFSET", "COUNT", "SUM", "AVG", "MIN", "MAX",
+               "SAMPLE", "GROUP_CONCAT"}
+GRAPH_KEYWORDS = {"FROM", "NAMED", "GRAPH", "WITH", "USING"}
+NUMERIC_TYPES = {f"http://www.w3.org/2001/XMLSchema#{t}" for t in (
+    "integer", "decimal", "double", "float", "int", "long", "short", "byte",
+    "nonNegativeInteger", "positiveInteger", "negativeInteger", "nonPositiveInteger",
+    "unsignedInt", "unsignedLong", "unsignedShort", "unsignedByte")}
+
+MATCH_KINDS = ["exact", "prefix", "contains"]
+LABEL_PROPERTIES = ["prefLabel", "altLabel", "hiddenLabel"]
+
+
+bulk = load_script("bulk-load")
+canon = load_script("sparql-canon")
+materialize_skos = load_script("materialize-skos")
+turtle = load_script("fast-turtle")
+
+
+# -- planning --------------------------------------------------------------------
+
+def concept_units(g, by):
+    """Map each concept to its partition unit (an IRI, or None for unfiled)."""
+    concepts = set(g.subjects(RDF.type, SKOS.Concept))
+    if by == "scheme":
+        return {c: min(g.objects(c, SKOS.inScheme), default=None, key=str) for c in concepts}
+
+    tops = {c for c in g.subjects(SKOS.topConceptOf, None) if c in concepts}
+    tops |= {c for c in g.objects(None, SKOS.hasTopConcept) if c in concepts}
+    units = {c: c for c in tops}
+    for start in concepts:
+        path = []
+        node = start
+        while node is not None and node not in units and node not in path:
+            path.append(node)
+            parents = sorted((p for p in g.objects(node, SKOS.broader) if p in concepts), key=str)
+            node = parents[0] if parents else None
+        # A root that is not a top concept, or a broader cycle, is unfiled
+        unit = units[node] if node in units else None
+        for concept in path:
+            units[concept] = unit
+    return units
+
+
+def unit_slug(unit):
+    if unit is None:
+        return UNFILED
+    return re.split(r"[/#]", str(unit).rstrip("/#"))[-1] or UNFILED
+
+
+def shared_graph(graph_base):
+    return f"{graph_base}{SHARED}/"
+
+
+def partition(g, by, graph_base):
+    """Split a graph by unit; returns ({graph: {"unit", "triples"}}, shared triples, resources).
+
+    resources maps each partitioned subject (concepts, and schemes with
+    --by scheme) to its partition graph. A unit whose slug is "shared" gets
+    a suffix, so no partition takes the shared graph's name.
+    """
+    units = concept_units(g, by)
+    if by == "scheme":
+        for scheme in g.subjects(RDF.type, SKOS.ConceptScheme):
+            units[scheme] = scheme
+
+    graphs = {}
+    unit_graph = {}
+    for unit in sorted(set(units.values()), key=lambda u: (u is None, str(u))):
+        slug = unit_slug(unit)
+        graph = f"{graph_base}{slug}/"
+        suffix = 2
+        while graph in graphs or graph == shared_graph(graph_base):
+            graph = f"{graph_base}{slug}-{suffix}/"
+            suffix += 1
+        graphs[graph] = {"unit": unit, "triples": []}
+        unit_graph[unit] = graph
+
+    resources = {s: unit_graph[unit] for s, unit in units.items()}
+    shared = []
+    for triple in g:
+        graph = resources.get(triple[0])
+        if graph is None:
+            shared.append(triple)
+        else:
+            graphs[graph]["triples"].append(triple)
+    return graphs, shared, resources
+
+
+def assign(partitions, shards, pins):
+    """Assign partition graphs to shards, largest first to the least loaded; returns {graph: shard}."""
+    load = {name: 0 for name in shards}
+    assignment = {}
+    for graph, part in partitions.items():
+        pinned = pins.get(unit_slug(part["unit"]))
+        if pinned:
+            assignment[graph] = pinned
+            load[pinned] += len(part["triples"])
+    for graph, part in sorted(partitions.items(), key=lambda item: (-len(item[1]["triples"]), item[0])):
+        if graph not in assignment:
+            shard = min(load, key=lambda name: (load[name], list(shards).index(name)))
+            assignment[graph] = shard
+            load[shard] += len(part["triples"])
+    return assignment
+
+
+def build_map(by, graph_base, shards, partitions, shared, resources, assignment):
+    return {
+        "by": by,
+        "graph_base": graph_base,
+        "default_shard": next(iter(shards)),
+        "shards": shards,
+        "partitions": [
+            {
+                "graph": graph,
+                "unit": None if part["unit"] is None else str(part["unit"]),
+                "shard": assignment[graph],
+                "concepts": sum(1 for g in resources.values() if g == graph),
+                "triples": len(part["triples"]),
+            }
+            for graph, part in sorted(partitions.items())
+        ],
+        "shared_graph": shared_graph(graph_base),
+        "shared_triples": len(shared),
+        "resources": {str(s): graph for s, graph in sorted(resources.items())},
+    }
+
+
+def read_map(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_map(path, shard_map):
+    """Atomically rewrite the shard map."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(shard_map, f, indent=2)
+    os.replace(tmp, path)
+
+
+def parse_shard(value):
+    name, sep, url = value.partition("=")
+    if not sep or not name or not urlsplit(url).path.strip("/"):
+        raise argparse.ArgumentTypeError(f"expected NAME=URL/DATASET, got {value!r}")
+    return name, url.rstrip("/")
+
+
+# -- shard client -----------------------------------------------------------------
+
+class ShardClient:
+    """Pooled keep-alive connections to every shard, keyed by shard URL."""
+
+    def __init__(self, connections=8, timeout=60):
+        self.connections = connections
+        self.timeout = timeout
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def pool(self, url):
+        parts = urlsplit(url)
+        base = f"{parts.scheme}://{parts.netloc}"
+        with self.lock:
+            if base not in self.pools:
+                self.pools[base] = bulk.ConnectionPool(base, self.connections, self.timeout)
+            return self.pools[base]
+
+    def request(self, url, method, target, body=None, headers=None, idempotent=None):
+        """Send a request to the shard at url; target is relative to its dataset.
+
+        Returns (status, headers, data); raises OSError or HTTPException.
+        """
+        pool = self.pool(url)
+        path = urlsplit(url).path.rstrip("/") + target
+        # A pooled keep-alive connection may have been closed by the shard;
+        # requests without a body, and queries, are safe to send again
+        attempts = 2 if (body is None if idempotent is None else idempotent) else 1
+        for attempt in range(attempts):
+            conn = pool.acquire()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                data = resp.read()
+            except (OSError, http.client.HTTPException):
+                pool.release(conn, reusable=False)
+                if attempt + 1 == attempts:
+                    raise
+                continue
+            pool.release(conn, not resp.will_close)
+            return resp.status, resp.getheaders(), data
+
+    def query(self, url, text, accept, headers=None):
+        """POST a SPARQL query; returns the body, raising RuntimeError on HTTP errors."""
+        req = {"Content-Type": "application/x-www-form-urlencoded", "Accept": accept}
+        req.update(headers or {})
+        status, _, data = self.request(url, "POST", "/sparql",
+                                       urlencode({"query": text}).encode("utf-8"), req,
+                                       idempotent=True)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}: {data[:200].decode('utf-8', 'replace')}")
+        return data
+
+    def update(self, url, text, headers=None):
+        req = {"Content-Type": "application/x-www-form-urlencoded"}
+        req.update(headers or {})
+        status, _, data = self.request(url, "POST", "/update",
+                                       urlencode({"update": text}).encode("utf-8"), req)
+        if not 200 <= status < 300:
+            raise RuntimeError(f"HTTP {status}: {data[:200].decode('utf-8', 'replace')}")
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+
+# -- loading ----------------------------------------------------------------------
+
+def load_partition(client, url, graph, triples, headers, retries):
+    """Replace one graph on its shard, staged in the stored default graph and MOVEd.
+
+    With tdb2:unionDefaultGraph the query default graph is the union of the
+    named graphs only, so staged triples are invisible to readers.
+    """
+    if not triples:
+        client.update(url, f"DROP SILENT GRAPH <{graph}>", headers)
+        return
+    out = io.StringIO()
+    materialize_skos.write_ntriples(triples, out)
+    body = out.getvalue().encode("utf-8")
+    pool = client.pool(url)
+    target = urlsplit(url).path.rstrip("/") + "/data?default"
+    req = dict(headers, **{"Content-Type": "application/n-triples"})
+    client.update(url, "CLEAR SILENT DEFAULT", headers)
+    result = bulk.post_body(pool, target, req, lambda: io.BytesIO(body), len(body),
+                            retries=retries)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    client.update(url, f"MOVE SILENT DEFAULT TO GRAPH <{graph}>", headers)
+
+
+def cmd_load(args):
+    shard_map = read_map(args.map)
+    g = turtle.load_graph(args.files)
+    partitions, shared, resources = partition(g, shard_map["by"], shard_map["graph_base"])
+    assignment = {p["graph"]: p["shard"] for p in shard_map["partitions"]}
+
+    unknown = sorted(set(partitions) - set(assignment))
+    if unknown:
+        print(f"ERROR: Partitions not in {args.map}: {', '.join(unknown)}", file=sys.stderr)
+        print("Re-run `plan` (with --pin to keep existing assignments)", file=sys.stderr)
+        sys.exit(1)
+    for p in shard_map["partitions"]:
+        partitions.setdefault(p["graph"], {"unit": p["unit"], "triples": []})
+    graphs = {graph: part["triples"] for graph, part in partitions.items()}
+    graphs[shared_graph(shard_map["graph_base"])] = shared
+    assignment[shared_graph(shard_map["graph_base"])] = shard_map["default_shard"]
+
+    headers = bulk.request_headers(args.user, args.password, "text/plain")
+    headers.pop("Content-Type")
+    client = ShardClient(timeout=args.timeout)
+    by_shard = {}
+    for graph in sorted(graphs):
+        by_shard.setdefault(assignment[graph], []).append(graph)
+
+    def load_shard(shard):
+        url = shard_map["shards"][shard]
+        lines = []
+        for graph in by_shard[shard]:
+            triples = graphs[graph]
+            began = time.monotonic()
+            try:
+                load_partition(client, url, graph, triples, headers, args.retries)
+            except (OSError, http.client.HTTPException, RuntimeError) as e:
+                lines.append((False, f"  {graph} -> {shard}: FAILED ({e})"))
+                continue
+            lines.append((True, f"  {graph} -> {shard}: {len(triples)} triples "
+                                f"({time.monotonic() - began:.2f}s)"))
+        return lines
+
+    print(f"Loading {len(partitions)} partitions and the shared graph onto {len(by_shard)} shards...")
+    began = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=len(by_shard) or 1) as executor:
+            results = [line for lines in executor.map(load_shard, sorted(by_shard)) for line in lines]
+    finally:
+        client.close()
+    for _, line in results:
+        print(line)
+    failures = sum(1 for ok, _ in results if not ok)
+
+    # Concepts may have moved between partitions since the map was planned
+    fresh = build_map(shard_map["by"], shard_map["graph_base"], shard_map["shards"],
+                      partitions, shared, resources, assignment)
+    fresh["default_shard"] = shard_map["default_shard"]
+    if fresh != shard_map and not failures:
+        save_map(args.map, fresh)
+        print(f"Updated concept index in {args.map}")
+
+    print(f"{len(results) - failures} of {len(results)} graphs loaded "
+          f"in {time.monotonic() - began:.2f}s")
+    if failures:
+        sys.exit(1)
+
+
+def cmd_plan(args):
+    shards = dict(args.shard)
+    pins = {}
+    for pin in args.pin:
+        slug, _, shard = pin.partition("=")
+        if shard not in shards:
+            print(f"ERROR: --pin {pin}: unknown shard {shard!r}", file=sys.stderr)
+            sys.exit(1)
+        pins[slug] = shard
+
+    g = turtle.load_graph(args.files)
+    partitions, shared, resources = partition(g, args.by, args.graph_base)
+    assignment = assign(partitions, shards, pins)
+    shard_map = build_map(args.by, args.graph_base, shards, partitions, shared, resources,
+                          assignment)
+    save_map(args.output, shard_map)
+
+    for shard in shards:
+        parts = [p for p in shard_map["partitions"] if p["shard"] == shard]
+        print(f"{shard}: {len(parts)} partitions, {sum(p['concepts'] for p in parts)} concepts, "
+              f"{sum(p['triples'] for p in parts)} triples")
+        for p in parts:
+            print(f"  {p['graph']}  {p['concepts']} concepts, {p['triples']} triples")
+    print(f"{shard_map['shared_triples']} shared triples in {shard_map['shared_graph']} "
+          f"on {shard_map['default_shard']}")
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+
+# -- query analysis and merging ---------------------------------------------------
+
+QueryPlan = namedtuple("QueryPlan",
+                       "form graphs subjects objects joined distinct order limit unmergeable")
+
+# Tokens after which an IRI starts a triple pattern, i.e. is a subject
+SUBJECT_AFTER = {"{", "}", ".", "DESCRIBE"}
+TERM_KINDS = {"iri", "var", "bnode", "string", "number"}
+# Path operators that follow a predicate to another node (sequence, repetition)
+PATH_HOPS = {"/", "*", "+"}
+
+
+def analyze(text):
+    """Read what routing and merging need from a query or update; None if it does not tokenize."""
+    try:
+        tokens = canon.tokenize(canon.canonicalize(text))
+    except ValueError:
+        return None
+
+    form = None
+    graphs, subjects, objects = set(), set(), set()
+    values_depth = None
+    distinct = False
+    order, order_ok = [], True
+    limit = None
+    unmergeable = None
+    depth = parens = 0
+    # Position of the next term in the current triple pattern (0 subject,
+    # 1 predicate, 2 object), None outside one
+    position = None
+    subject_vars, object_vars = set(), set()
+    joined = False
+    for i, (kind, value) in enumerate(tokens):
+        word = value.upper() if kind == "word" else None
+        previous = tokens[i - 1][1].upper() if i else ""
+        if depth and not parens and values_depth is None:
+            if kind in TERM_KINDS and previous not in GRAPH_KEYWORDS:
+                if previous in SUBJECT_AFTER or previous == ")":
+                    position = 0
+                if position == 0 and kind == "var":
+                    subject_vars.add(value)
+                elif position == 2 and kind == "var":
+                    object_vars.add(value)
+                if position is not None:
+                    position += 1
+            elif value == ";":
+                position = 1
+            elif value in (",", "|"):
+                position = 2 if value == "," else 1
+            elif value == "[":
+                position = 1
+            elif (position == 2 and value in PATH_HOPS) or (position == 1 and value == "^"):
+                joined = True
+                position = 1 if value == "/" else position
+            elif kind == "word":
+                position = None
+        if value == "(":
+            parens += 1
+        elif value == ")":
+            parens -= 1
+        if kind == "iri":
+            if previous in GRAPH_KEYWORDS:
+                graphs.add(value[1:-1])
+            elif previous in SUBJECT_AFTER and values_depth is None:
+                subjects.add(value[1:-1])
+            else:
+                objects.add(value[1:-1])
+        elif value == "{":
+            depth += 1
+        elif value == "}":
+            depth -= 1
+            if depth == values_depth:
+                values_depth = None
+        elif word == "VALUES":
+            values_depth = depth
+        elif word in canon.QUERY_FORMS and form is None:
+            form = word
+            nxt = tokens[i + 1][1].upper() if i + 1 < len(tokens) else ""
+            distinct = nxt in ("DISTINCT", "REDUCED")
+        elif word in UNMERGEABLE and unmergeable is None:
+            unmergeable = word
+        elif word == "LIMIT" and depth == 0 and i + 1 < len(tokens) and tokens[i + 1][0] == "number":
+            limit = int(float(tokens[i + 1][1]))
+        elif word == "ORDER" and depth == 0:
+            order, order_ok = order_keys(tokens[i + 2:])
+
+    if not order_ok and unmergeable is None:
+        unmergeable = "ORDER BY on expressions"
+    joined = joined or bool(subject_vars & object_vars)
+    return QueryPlan(form, graphs, subjects, objects, joined, distinct, order, limit, unmergeable)
+
+
+def order_keys(tokens):
+    """Parse ORDER BY keys on plain variables; returns ([(var, descending)], ok)."""
+    keys = []
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        upper = value.upper()
+        if kind == "var":
+            keys.append((value[1:], False))
+            i += 1
+        elif (upper in ("ASC", "DESC") and i + 3 < len(tokens) and tokens[i + 1][1] == "("
+              and tokens[i + 2][0] == "var" and tokens[i + 3][1] == ")"):
+            keys.append((tokens[i + 2][1][1:], upper == "DESC"))
+            i += 4
+        elif upper in ("LIMIT", "OFFSET", "VALUES"):
+            break
+        else:
+            return keys, False
+    return keys, bool(keys)
+
+
+def term_key(term):
+    """SPARQL ORDER BY rank of a JSON result term: unbound, blank, IRI, then literals."""
+    if term is None:
+        return (0, 0, "")
+    if term["type"] == "bnode":
+        return (1, 0, term["value"])
+    if term["type"] == "uri":
+        return (2, 0, term["value"])
+    if term.get("datatype") in NUMERIC_TYPES:
+        try:
+            return (3, 0, float(term["value"]))
+        except ValueError:
+            pass
+    return (3, 1, term["value"])
+
+
+def merge_select(answers, plan):
+    variables = []
+    for answer in answers:
+        for var in answer.get("head", {}).get("vars", []):
+            if var not in variables:
+                variables.append(var)
+    rows = [row for answer in answers for row in answer.get("results", {}).get("bindings", [])]
+    if plan.distinct:
+        seen = set()
+        unique = []
+        for row in rows:
+            key = json.dumps(row, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                unique.append(row)
+        rows = unique
+    for var, descending in reversed(plan.order):
+        rows.sort(key=lambda row: term_key(row.get(var)), reverse=descending)
+    if plan.limit is not None:
+        rows = rows[:plan.limit]
+    return {"head": {"vars": variables}, "results": {"bindings": rows}}
+
+
+def merge_answers(plan, bodies):
+    """Merge per-shard response bodies; returns (body, content type)."""
+    if plan.form == "ASK":
+        answer = any(json.loads(body).get("boolean") for body in bodies)
+        return json.dumps({"head": {}, "boolean": answer}), SPARQL_JSON
+    if plan.form == "SELECT":
+        return json.dumps(merge_select([json.loads(body) for body in bodies], plan)), SPARQL_JSON
+    g = Graph()
+    for body in bodies:
+        g.parse(data=body.decode("utf-8"), format="turtle")
+    return g.serialize(format="turtle"), TURTLE
+
+
+# -- label search -----------------------------------------------------------------
+
+SEARCH_QUERY = """PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+SELECT ?concept (MIN(?score) AS ?best) (SAMPLE(?pref) AS ?prefLabel) WHERE {{
+  VALUES (?prop ?weight) {{ (skos:prefLabel 0) (skos:altLabel 1) (skos:hiddenLabel 2) }}
+  ?concept ?prop ?label .
+  BIND(LCASE(STR(?label)) AS ?text)
+  FILTER(CONTAINS(?text, {needle}){label_lang})
+  BIND(IF(?text = {needle}, 0, IF(STRSTARTS(?text, {needle}), 3, 6)) + ?weight AS ?score)
+  OPTIONAL {{ ?concept skos:prefLabel ?pref {pref_lang}}}
+}}
+GROUP BY ?concept
+ORDER BY ?best ?concept
+LIMIT {limit}"""
+
+
+def search_query(text, lang, limit):
+    needle = json.dumps(text.lower(), ensure_ascii=False)
+    label_lang = pref_lang = ""
+    if lang:
+        tag = json.dumps(lang)
+        label_lang = f" && LANGMATCHES(LANG(?label), {tag})"
+        pref_lang = f"FILTER(LANGMATCHES(LANG(?pref), {tag})) "
+    return SEARCH_QUERY.format(needle=needle, label_lang=label_lang, pref_lang=pref_lang,
+                               limit=int(limit))
+
+
+def search(client, executor, shards, text, lang=None, limit=20, headers=None):
+    """Fan a label search out to every shard; returns the merged JSON document."""
+    query = search_query(text, lang, limit)
+
+    def ask(name):
+        began = time.monotonic()
+        try:
+            body = client.query(shards[name], query, SPARQL_JSON, headers)
+            rows = json.loads(body)["results"]["bindings"]
+        except (OSError, http.client.HTTPException, RuntimeError, ValueError, KeyError) as e:
+            return name, None, {"error": str(e)}
+        return name, rows, {"results": len(rows), "seconds": round(time.monotonic() - began, 3)}
+
+    hits = []
+    report = {}
+    for name, rows, status in executor.map(ask, list(shards)):
+        report[name] = status
+        for row in rows or []:
+            if "concept" not in row or "best" not in row:
+                continue  # the empty group some stores return when nothing matches
+            best = int(row["best"]["value"])
+            hits.append((best, row["concept"]["value"], row.get("prefLabel", {}).get("value"), name))
+    hits.sort()
+    return {
+        "query": text,
+        "lang": lang,
+        "results": [
+            {"uri": uri, "prefLabel": label, "match": MATCH_KINDS[best // 3],
+             "property": LABEL_PROPERTIES[best % 3], "shard": shard}
+            for best, uri, label, shard in hits[:limit]
+        ],
+        "shards": report,
+    }
+
+
+# -- router -----------------------------------------------------------------------
+
+RoutingTable = namedtuple("RoutingTable", "shards default graph_shard resource_shard")
+
+
+class ShardMapFile:
+    """The shard map as a routing table, re-read whenever the file changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.table = None
+        self.lock = threading.Lock()
+        self.current()
+
+    def current(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with self.lock:
+            if mtime != self.mtime:
+                shard_map = read_map(self.path)
+                graph_shard = {p["graph"]: p["shard"] for p in shard_map["partitions"]}
+                self.table = RoutingTable(
+                    shard_map["shards"], shard_map["default_shard"], graph_shard,
+                    {iri: graph_shard[graph] for iri, graph in shard_map["resources"].items()},
+                )
+                self.mtime = mtime
+            return self.table
+
+
+def choose_shards(plan, table):
+    """Shards a request must reach: by graph IRIs if any, else by subject IRIs.
+
+    A partition holds the triples whose subject is one of its concepts, so
+    only subject-position IRIs locate the data; other subjects live in the
+    shared graph on the default shard. A concept named anywhere else (e.g.
+    as the object of skos:related) may be linked from any shard, and the
+    request gets no shard of its own ([]). So does a join, whose
+    intermediate nodes can live on any shard.
+    """
+    if plan.graphs:
+        return sorted({table.graph_shard.get(g, table.default) for g in plan.graphs})
+    if plan.joined or any(iri in table.resource_shard for iri in plan.objects):
+        return []
+    return sorted({table.resource_shard.get(iri, table.default) for iri in plan.subjects})
+
+
+class RouterHandler(BaseHTTPRequestHandler):
+    """Route Fuseki-style requests to the shard(s) holding the data."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def reply(self, status, headers, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD" and status != 304:
+            self.wfile.write(data)
+
+    def error(self, status, message):
+        self.reply(status, {"Content-Type": "text/plain; charset=utf-8"}, message + "\n")
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else None
+
+    def passthrough_headers(self):
+        return {k: v for k, v in self.headers.items() if k.lower() not in canon.HOP_BY_HOP}
+
+    def forward(self, shard, target, body, idempotent=None):
+        table = self.server.shard_map.current()
+        try:
+            status, headers, data = self.server.client.request(
+                table.shards[shard], self.command, target, body, self.passthrough_headers(),
+                idempotent)
+        except (OSError, http.client.HTTPException) as e:
+            self.error(502, f"Shard {shard} unavailable: {e}")
+            return
+        headers = {k: v for k, v in headers if k.lower() not in canon.HOP_BY_HOP}
+        headers["X-Shard"] = shard
+        self.reply(status, headers, data)
+
+    def fan_out(self, shards, plan, text):
+        table = self.server.shard_map.current()
+        accept = SPARQL_JSON if plan.form in ("SELECT", "ASK") else TURTLE
+        auth = {k: v for k, v in self.headers.items() if k.lower() == "authorization"}
+
+        def ask(name):
+            try:
+                return name, self.server.client.query(table.shards[name], text, accept, auth), None
+            except (OSError, http.client.HTTPException, RuntimeError) as e:
+                return name, None, str(e)
+
+        answers = list(self.server.executor.map(ask, shards))
+        failed = [f"{name}: {error}" for name, _, error in answers if error]
+        if failed:
+            self.error(502, "Shard query failed: " + "; ".join(failed))
+            return
+        try:
+            body, content_type = merge_answers(plan, [body for _, body, _ in answers])
+        except Exception as e:  # rdflib parse errors have no common base class
+            self.error(502, f"Cannot merge shard answers: {e}")
+            return
+        self.reply(200, {"Content-Type": content_type, "X-Shard": ",".join(shards)}, body)
+
+    def route_sparql(self, service, params, body):
+        if self.command == "POST":
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+            if content_type == "application/x-www-form-urlencoded":
+                form = parse_qs((body or b"").decode("utf-8"))
+                text = (form.get("update") or form.get("query") or [""])[0]
+            else:
+                text = (body or b"").decode("utf-8")
+        else:
+            text = params.get("query", [""])[0]
+
+        table = self.server.shard_map.current()
+        plan = analyze(text)
+        if plan is None or (plan.form is None and service != "update"):
+            # Let a shard report the syntax error
+            self.forward(table.default, self.target(service), body)
+            return
+        shards = choose_shards(plan, table)
+
+        if service == "update":
+            if not plan.graphs and not plan.subjects <= table.resource_shard.keys():
+                # Without a graph the write would land in the stored default
+                # graph, which readers never see, not in the shared graph
+                shards = []
+            if len(shards) > 1:
+                self.error(400, f"Update addresses graphs on shards {', '.join(shards)}; "
+                                "send one update per shard")
+                return
+            if not shards:
+                self.error(400, "Update does not address a graph or concept on one shard; "
+                                "name the graph (GRAPH / WITH) or the concept as a subject"
+                                + (", without joining through variables" if plan.joined else ""))
+                return
+            self.forward(shards[0], self.target(service), body)
+            return
+
+        if len(shards) == 1:
+            self.forward(shards[0], self.target(service), body, idempotent=True)
+            return
+        shards = shards or sorted(table.shards)
+        if plan.joined:
+            self.error(400, "Query joins through a variable used as both object and subject "
+                            "(or a property path), and the nodes it reaches may live on other "
+                            "shards; name a graph (FROM / GRAPH) to send it to one shard")
+            return
+        if plan.unmergeable:
+            self.error(400, f"Query spans shards {', '.join(shards)} and uses {plan.unmergeable}, "
+                            "which cannot be merged across shards; name a graph "
+                            "(FROM / GRAPH) to send it to one shard")
+            return
+        self.fan_out(shards, plan, text)
+
+    def target(self, service):
+        query = urlsplit(self.path).query
+        return f"/{service}" + (f"?{query}" if query else "")
+
+    def route_search(self, params):
+        text = params.get("q", [""])[0].strip()
+        if not text:
+            self.error(400, "Missing q parameter")
+            return
+        try:
+            limit = max(1, min(int(params.get("limit", ["20"])[0]), 1000))
+        except ValueError:
+            self.error(400, "limit must be an integer")
+            return
+        table = self.server.shard_map.current()
+        auth = {k: v for k, v in self.headers.items() if k.lower() == "authorization"}
+        result = search(self.server.client, self.server.executor, table.shards, text,
+                        params.get("lang", [None])[0], limit, auth)
+        ok = [name for name, status in result["shards"].items() if "error" not in status]
+        self.reply(200 if ok else 502,
+                   {"Content-Type": "application/json", "X-Shard": ",".join(ok)},
+                   json.dumps(result, ensure_ascii=False))
+
+    def route(self):
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query, keep_blank_values=True)
+        segments = [s for s in parts.path.split("/") if s]
+        body = self.read_body()
+
+        if parts.path == "/$/ping":
+            self.reply(200, {"Content-Type": "text/plain"}, "pong")
+        elif parts.path == "/search" and self.command in ("GET", "HEAD"):
+            self.route_search(params)
+        elif len(segments) != 2:
+            self.error(404, "Unknown endpoint")
+        elif segments[1] in ("sparql", "query", "update"):
+            self.route_sparql(segments[1], params, body)
+        elif segments[1] in ("data", "get"):
+            table = self.server.shard_map.current()
+            graph = params.get("graph", [None])[0]
+            self.forward(table.graph_shard.get(graph, table.default), self.target(segments[1]), body)
+        else:
+            self.error(404, "Unknown endpoint")
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = route
+
+
+def make_router(port, map_path, connections=8, timeout=60, verbose=False):
+    server = ThreadingHTTPServer(("0.0.0.0", port), RouterHandler)
+    server.daemon_threads = True
+    server.shard_map = ShardMapFile(map_path)
+    server.client = ShardClient(connections, timeout)
+    server.executor = ThreadPoolExecutor(max_workers=4 * max(len(server.shard_map.current().shards), 1))
+    server.verbose = verbose
+    return server
+
+
+def cmd_serve(args):
+    server = make_router(args.port, args.map, args.connections, args.timeout, args.verbose)
+    port = server.server_address[1]
+    if args.port_file:
+        tmp = args.port_file + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(port))
+        os.replace(tmp, args.port_file)
+    shards = server.shard_map.current().shards
+    print(f"Shard router on :{port} -> {len(shards)} shards ({', '.join(shards)})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.executor.shutdown(wait=False)
+        server.client.close()
+
+
+def cmd_search(args):
+    shard_map = read_map(args.map)
+    client = ShardClient(timeout=args.timeout)
+    headers = bulk.request_headers(args.user, args.password, "text/plain")
+    auth = {"Authorization": headers["Authorization"]} if "Authorization" in headers else {}
+    with ThreadPoolExecutor(max_workers=len(shard_map["shards"])) as executor:
+        result = search(client, executor, shard_map["shards"], args.text, args.lang, args.limit, auth)
+    client.close()
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        for hit in result["results"]:
+            print(f"{hit['match']:8} {hit['property']:11} {hit['shard']:12} {hit['uri']}  "
+                  f"{hit['prefLabel'] or ''}")
+    for name, status in result["shards"].items():
+        if "error" in status:
+            print(f"WARNING: shard {name}: {status['error']}", file=sys.stderr)
+    if not any("error" not in status for status in result["shards"].values()):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard vocabularies across Fuseki datasets")
+    sub = parser.add_subparsers(dest="command", required=True)
+    default_map = os.environ.get("SHARD_MAP", "config/shards.json")
+
+    p = sub.add_parser("plan", help="Partition the vocabulary and assign partitions to shards")
+    p.add_argument("files", nargs="+", help="Turtle files with the whole vocabulary")
+    p.add_argument("--shard", action="append", type=parse_shard, required=True,
+                   metavar="NAME=URL", help="Shard dataset URL, e.g. core=http://fuseki:3030/skosmos "
+                                            "(repeat; the first is the default shard)")
+    p.add_argument("--by", choices=["top-concept", "scheme"], default="top-concept",
+                   help="Partition unit (default: top-concept)")
+    p.add_argument("--pin", action="append", default=[], metavar="SLUG=SHARD",
+                   help="Keep a partition on a shard (repeatable)")
+    p.add_argument("--graph-base", default="http://glossary.example.org/",
+                   help="Partition graphs are <graph-base><slug>/ (default: http://glossary.example.org/)")
+    p.add_argument("-o", "--output", default=default_map, help=f"Shard map to write (default: {default_map})")
+
+    p = sub.add_parser("load", help="Replace every partition graph on its shard")
+    p.add_argument("files", nargs="+", help="Turtle files with the whole vocabulary")
+    p.add_argument("--map", default=default_map, help=f"Shard map (default: {default_map})")
+    p.add_argument("--retries", type=int, default=3, help="Upload retries per partition (default: 3)")
+
+    p = sub.add_parser("serve", help="Run the query router")
+    p.add_argument("--map", default=default_map, help=f"Shard map (default: {default_map})")
+    p.add_argument("--port", type=int, default=8082, help="Port to listen on (default: 8082; 0 = any)")
+    p.add_argument("--port-file", help="Write the bound port to this file when ready")
+    p.add_argument("--connections", type=int, default=8,
+                   help="Idle keep-alive connections kept per shard host (default: 8)")
+    p.add_argument("-v", "--verbose", action="store_true", help="Log each request")
+
+    p = sub.add_parser("search", help="Label search across all shards")
+    p.add_argument("text", help="Text to look for in labels")
+    p.add_argument("--map", default=default_map, help=f"Shard map (default: {default_map})")
+    p.add_argument("--lang", help="Only match labels in this language")
+    p.add_argument("--limit", type=int, default=20, help="Results (default: 20)")
+    p.add_argument("--json", action="store_true", help="Print the merged JSON document")
+
+    for name in ("load", "serve", "search"):
+        sub.choices[name].add_argument("--timeout", type=float, default=60,
+                                       help="Per-request timeout in seconds (default: 60)")
+    for name in ("load", "search"):
+        sub.choices[name].add_argument("--user", default=os.environ.get("FUSEKI_USER", "admin"))
+        sub.choices[name].add_argument("--password", default=os.environ.get("FUSEKI_PASS", "admin123"))
+    args = parser.parse_args()
+
+    for path in getattr(args, "files", []):
+        if not os.path.isfile(path):
+            print(f"ERROR: File not found: {path}", file=sys.stderr)
+            sys.exit(1)
+    if args.command != "plan" and not os.path.isfile(args.map):
+        print(f"ERROR: Shard map not found: {args.map} (run `plan` first)", file=sys.stderr)
+        sys.exit(1)
+
+    {"plan": cmd_plan, "load": cmd_load, "serve": cmd_serve, "search": cmd_search}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
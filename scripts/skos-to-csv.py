@@ -11,11 +11,13 @@ import csv
 import sys
 
 try:
-    from rdflib import Graph, Namespace, RDF
+    from rdflib import Namespace, RDF
 except ImportError:
     print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
     sys.exit(1)
 
+from _egms import load_script
+
 SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
 
 
@@ -27,17 +29,26 @@ def get_slug(uri, base_uri):
     return uri_str
 
 
-def collect_values(g, subject, predicate):
+def collect_values(props, predicate):
     """Collect all string values for a predicate, pipe-separated."""
-    values = [str(o) for o in g.objects(subject, predicate)]
-    return "|".join(values)
+    return "|".join(str(o) for o in props.get(predicate, []))
+
+
+def read_properties(files):
+    """Map each subject to {predicate: [objects]}, in file order, without a graph."""
+    turtle = load_script("fast-turtle")
+    subjects = {}
+    for f in files:
+        for s, p, o in turtle.iter_triples(f):
+            values = subjects.setdefault(s, {}).setdefault(p, [])
+            if o not in values:
+                values.append(o)
+    return subjects
 
 
 def export_csv(files, base_uri, out):
     """Export SKOS concepts from Turtle files to CSV."""
-    g = Graph()
-    for f in files:
-        g.parse(f, format="turtle")
+    subjects = read_properties(files)
 
     writer = csv.writer(out)
     writer.writerow([
@@ -45,26 +56,30 @@ def export_csv(files, base_uri, out):
         "definition", "broader_slug", "related_slugs", "scope_note", "example"
     ])
 
-    concepts = sorted(g.subjects(RDF.type, SKOS.Concept), key=str)
+    concepts = sorted(
+        (s for s, props in subjects.items() if SKOS.Concept in props.get(RDF.type, [])),
+        key=str,
+    )
     count = 0
 
     for concept in concepts:
-        pref_labels = list(g.objects(concept, SKOS.prefLabel))
+        props = subjects[concept]
+        pref_labels = props.get(SKOS.prefLabel, [])
         if not pref_labels:
             continue
 
         slug = get_slug(concept, base_uri)
         pref_label = str(pref_labels[0])
-        alt_labels = collect_values(g, concept, SKOS.altLabel)
-        hidden_labels = collect_values(g, concept, SKOS.hiddenLabel)
-        definition = str(next(g.objects(concept, SKOS.definition), ""))
-        scope_note = str(next(g.objects(concept, SKOS.scopeNote), ""))
-        example = str(next(g.objects(concept, SKOS.example), ""))
+        alt_labels = collect_values(props, SKOS.altLabel)
+        hidden_labels = collect_values(props, SKOS.hiddenLabel)
+        definition = str(next(iter(props.get(SKOS.definition, [])), ""))
+        scope_note = str(next(iter(props.get(SKOS.scopeNote, [])), ""))
+        example = str(next(iter(props.get(SKOS.example, [])), ""))
 
-        broader_uris = list(g.objects(concept, SKOS.broader))
+        broader_uris = props.get(SKOS.broader, [])
         broader_slug = get_slug(broader_uris[0], base_uri) if broader_uris else ""
 
-        related_uris = list(g.objects(concept, SKOS.related))
+        related_uris = props.get(SKOS.related, [])
         related_slugs = "|".join(get_slug(r, base_uri) for r in related_uris)
 
         writer.writerow([
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""Delta-chain storage for glossary snapshots and backups.
+
+Instead of a full Turtle copy per snapshot, versions are stored as
+periodic full bases plus RDF-Patch-style deltas, both gzip-compressed:
+
+  glossary-v1.0.1-<ts>.nt.gz     base: canonical (sorted, unique) N-Triples
+  glossary-v1.0.2-<ts>.rdfp.gz   delta: "D <triple> ." / "A <triple> ." lines
+
+Every version's manifest entry records the sha256 of its canonical
+N-Triples form, so any version can be reconstructed byte-for-byte and
+verified. Reconstruction streams: the base and each delta are merged line
+by line, holding one line per chain level in memory.
+
+capture reads the Graph Store export (N-Triples) once, as it arrives: each
+triple is canonicalized, counted and fed to audit-log.py's concept hasher,
+so the manifest entry (sha256, sizes, term and triple counts) and the
+per-concept hash sidecar are written together with the stored version,
+without an export file on disk or a second parse.
+
+Commands:
+  capture  Stream the graph from Fuseki and store it as the next version
+  add      Store an exported Turtle file as the next version
+  restore  Reconstruct a version as canonical N-Triples (verifies sha256)
+  verify   Reconstruct and check one or all versions without writing
+  prune    Drop chains older than the last N versions
+
+Usage:
+    python scripts/snapshot-store.py capture --manifest snapshots/manifest.json --message "Q1 terms"
+    python scripts/snapshot-store.py add export.ttl --manifest snapshots/manifest.json --version 1.0.2
+    python scripts/snapshot-store.py restore 1.0.2 --manifest snapshots/manifest.json -o v1.0.2.nt
+    python scripts/snapshot-store.py verify --manifest snapshots/manifest.json --all
+    python scripts/snapshot-store.py prune --manifest backups/manifest.json --keep 14
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+
+try:
+    from rdflib import Graph
+    from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+    from rdflib.plugins.serializers.nt import _nt_row
+except ImportError:
+    print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+    sys.exit(1)
+
+from _egms import load_script
+
+CONCEPT_TYPE = (
+    " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+    " <http://www.w3.org/2004/02/skos/core#Concept> ."
+)
+
+# A new base is written after this many deltas, or when a delta would
+# touch more than BASE_RATIO of the version's triples.
+DEFAULT_BASE_EVERY = 10
+BASE_RATIO = 0.5
+
+
+class VerificationError(Exception):
+    """Reconstructed content does not match the manifest checksum."""
+
+
+# ---------------------------------------------------------------------------
+# Manifest helpers
+# ---------------------------------------------------------------------------
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"snapshots": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    """Atomically rewrite manifest.json."""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def find_entry(manifest, version):
+    entries = manifest.get("snapshots", [])
+    if version == "latest" and entries:
+        return entries[-1]
+    for entry in entries:
+        if entry["version"] == version:
+            return entry
+    raise KeyError(version)
+
+
+def next_version(manifest):
+    """Patch increment of the newest version (0.0.1 for an empty manifest)."""
+    entries = manifest.get("snapshots", [])
+    last = entries[-1]["version"] if entries else "0.0.0"
+    parts = last.split(".")
+    try:
+        parts[-1] = str(int(parts[-1]) + 1)
+    except ValueError:
+        parts.append("1")
+    return ".".join(parts)
+
+
+def chain_for(manifest, entry):
+    """Return [base, delta, ...] entries needed to rebuild entry."""
+    by_version = {e["version"]: e for e in manifest.get("snapshots", [])}
+    chain = [entry]
+    while chain[-1].get("storage") == "delta":
+        chain.append(by_version[chain[-1]["parent"]])
+    return list(reversed(chain))
+
+
+# ---------------------------------------------------------------------------
+# Canonical form and patches
+# ---------------------------------------------------------------------------
+
+def canonical_lines(turtle_file):
+    """Parse a Turtle export into sorted, unique N-Triples lines."""
+    g = Graph()
+    g.parse(turtle_file, format="turtle")
+    nt = g.serialize(format="nt")
+    return sorted({line for line in nt.splitlines() if line.strip()})
+
+
+def read_lines(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def read_patch(path, op):
+    """Yield the triples of one operation ('A' or 'D') from a patch file."""
+    prefix = op + " "
+    for line in read_lines(path):
+        if line.startswith(prefix):
+            yield line[2:]
+
+
+def apply_patch(lines, deletes, adds):
+    """Merge sorted delete/add streams into a sorted line stream."""
+    d = next(deletes, None)
+    a = next(adds, None)
+    for line in lines:
+        while d is not None and d < line:
+            d = next(deletes, None)
+        if d == line:
+            d = next(deletes, None)
+            continue
+        while a is not None and a < line:
+            yield a
+            a = next(adds, None)
+        if a == line:
+            a = next(adds, None)
+        yield line
+    while a is not None:
+        yield a
+        a = next(adds, None)
+
+
+def diff_lines(old, new):
+    """Sorted-merge two sorted line streams into (deletes, adds)."""
+    deletes, adds = [], []
+    old = iter(old)
+    o = next(old, None)
+    for n in new:
+        while o is not None and o < n:
+            deletes.append(o)
+            o = next(old, None)
+        if o == n:
+            o = next(old, None)
+        else:
+            adds.append(n)
+    while o is not None:
+        deletes.append(o)
+        o = next(old, None)
+    return deletes, adds
+
+
+def stream_version(base_dir, manifest, entry):
+    """Stream the canonical N-Triples lines of a stored version."""
+    chain = chain_for(manifest, entry)
+    lines = read_lines(os.path.join(base_dir, chain[0]["file"]))
+    for delta in chain[1:]:
+        path = os.path.join(base_dir, delta["file"])
+        lines = apply_patch(lines, read_patch(path, "D"), read_patch(path, "A"))
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Commands
+# ---------------------------------------------------------------------------
+
+def write_gzip(path, lines):
+    """Write lines to a gzip file atomically; returns (bytes written, sha256 of text)."""
+    digest = hashlib.sha256()
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wb") as f:
+        for line in lines:
+            data = (line + "\n").encode("utf-8")
+            digest.update(data)
+            f.write(data)
+    os.replace(tmp, path)
+    return os.path.getsize(path), digest.hexdigest()
+
+
+def add_version(manifest_path, export_file, version, message="", timestamp=None,
+                prefix="glossary", base_every=DEFAULT_BASE_EVERY):
+    """Store an export as the next version. Returns the new manifest entry."""
+    return store_version(manifest_path, canonical_lines(export_file), version, message,
+                         timestamp, prefix, base_every)
+
+
+def store_version(manifest_path, new_lines, version, message="", timestamp=None,
+                  prefix="glossary", base_every=DEFAULT_BASE_EVERY, extra=None,
+                  concept_hashes=None):
+    """Store sorted, unique canonical lines as the next version.
+
+    extra fields are added to the manifest entry; concept_hashes (from
+    audit-log.py) are written as the entry's hash sidecar.
+    """
+    manifest = load_manifest(manifest_path)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = manifest["snapshots"]
+    if any(e["version"] == version for e in entries):
+        raise ValueError(f"version {version} already exists in {manifest_path}")
+
+    timestamp = timestamp or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    safe_ts = timestamp.replace("-", "").replace(":", "").replace("T", "-").rstrip("Z")
+
+    entry = {
+        "version": version,
+        "timestamp": timestamp,
+        "message": message,
+        "term_count": sum(1 for line in new_lines if line.endswith(CONCEPT_TYPE)),
+        "triple_count": len(new_lines),
+    }
+    entry.update(extra or {})
+
+    parent = entries[-1] if entries and entries[-1].get("storage") else None
+    deletes = adds = None
+    if parent is not None:
+        depth = len(chain_for(manifest, parent))
+        if depth < base_every:
+            deletes, adds = diff_lines(stream_version(base_dir, manifest, parent), new_lines)
+            if len(deletes) + len(adds) > BASE_RATIO * max(len(new_lines), 1):
+                deletes = adds = None
+
+    if deletes is None:
+        entry["storage"] = "base"
+        entry["file"] = f"{prefix}-v{version}-{safe_ts}.nt.gz"
+        # The base file is the canonical content, so it is hashed as it is written
+        size, entry["sha256"] = write_gzip(os.path.join(base_dir, entry["file"]), new_lines)
+    else:
+        entry["storage"] = "delta"
+        entry["parent"] = parent["version"]
+        entry["file"] = f"{prefix}-v{version}-{safe_ts}.rdfp.gz"
+        patch = [
+            f"H id <urn:egms:version:{version}> .",
+            f"H prev <urn:egms:version:{parent['version']}> .",
+            "TX .",
+        ]
+        patch += ["D " + line for line in deletes]
+        patch += ["A " + line for line in adds]
+        patch.append("TC .")
+        size, _ = write_gzip(os.path.join(base_dir, entry["file"]), patch)
+        digest = hashlib.sha256()
+        for line in new_lines:
+            digest.update((line + "\n").encode("utf-8"))
+        entry["sha256"] = digest.hexdigest()
+        entry["deleted"] = len(deletes)
+        entry["added"] = len(adds)
+
+    entry["file_size"] = size
+    if concept_hashes is not None:
+        load_script("audit-log").save_hashes(base_dir, entry, concept_hashes)
+    entries.append(entry)
+    save_manifest(manifest_path, manifest)
+    return entry
+
+
+class CountingReader:
+    """File-like wrapper that counts the bytes read through it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.bytes += len(data)
+        return data
+
+
+class CaptureSink:
+    """N-Triples parser sink: canonical lines plus concept hashing, per triple."""
+
+    def __init__(self, hasher):
+        self.lines = set()
+        self.hasher = hasher
+
+    def triple(self, s, p, o):
+        line = _nt_row((s, p, o)).rstrip("\n")
+        if line not in self.lines:
+            self.lines.add(line)
+            self.hasher.add(s, p, o)
+
+
+def capture_version(manifest_path, fuseki_url, dataset, graph_uri, version=None, message="",
+                    timestamp=None, prefix="glossary", base_every=DEFAULT_BASE_EVERY,
+                    user=None, password=None):
+    """Stream a graph from Fuseki once and store it as the next version."""
+    audit = load_script("audit-log")
+    timestamp = timestamp or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    url = (f"{fuseki_url.rstrip('/')}/{dataset}/data?graph="
+           f"{urllib.parse.quote(graph_uri, safe='')}")
+    req = urllib.request.Request(url, headers={"Accept": "application/n-triples",
+                                               "Accept-Encoding": "gzip"})
+    if user:
+        token = base64.b64encode(f"{user}:{password or ''}".encode()).decode()
+        req.add_header("Authorization", f"Basic {token}")
+
+    sink = CaptureSink(audit.ConceptHasher())
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        if "n-triples" not in resp.headers.get("Content-Type", "application/n-triples"):
+            raise ValueError(f"expected N-Triples, got {resp.headers.get('Content-Type')}")
+        wire = CountingReader(resp)
+        body = wire
+        if resp.headers.get("Content-Encoding") == "gzip":
+            body = CountingReader(gzip.GzipFile(fileobj=wire))
+        W3CNTriplesParser(sink).parse(body, bnode_context={})
+
+    manifest = load_manifest(manifest_path)
+    return store_version(
+        manifest_path, sorted(sink.lines), version or next_version(manifest), message,
+        timestamp, prefix, base_every,
+        extra={"export_bytes": body.bytes, "transfer_bytes": wire.bytes},
+        concept_hashes=sink.hasher.hashes(),
+    )
+
+
+def restore_version(manifest_path, version, out):
+    """Write a version's canonical N-Triples to a binary stream and verify it.
+
+    Legacy entries (full Turtle copies without "storage") are copied as-is
+    and verified against their file checksum.
+    """
+    manifest = load_manifest(manifest_path)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entry = find_entry(manifest, version)
+    digest = hashlib.sha256()
+
+    if entry.get("storage"):
+        for line in stream_version(base_dir, manifest, entry):
+            data = (line + "\n").encode("utf-8")
+            digest.update(data)
+            if out is not None:
+                out.write(data)
+    else:
+        with open(os.path.join(base_dir, entry["file"]), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+                if out is not None:
+                    out.write(chunk)
+
+    if digest.hexdigest() != entry.get("sha256"):
+        raise VerificationError(
+            f"v{entry['version']}: sha256 {digest.hexdigest()} does not match "
+            f"manifest {entry.get('sha256')}"
+        )
+    return entry
+
+
+def prune(manifest_path, keep):
+    """Delete stored files no longer needed to restore the last `keep` versions."""
+    manifest = load_manifest(manifest_path)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = manifest["snapshots"]
+    if len(entries) <= keep:
+        return []
+
+    oldest_kept = entries[-keep] if keep > 0 else None
+    if oldest_kept is not None and oldest_kept.get("storage"):
+        cutoff = entries.index(chain_for(manifest, oldest_kept)[0])
+    else:
+        cutoff = len(entries) - keep
+
+    removed = entries[:cutoff]
+    for entry in removed:
+        for name in (entry["file"], entry.get("concept_hashes")):
+            if name and os.path.exists(os.path.join(base_dir, name)):
+                os.remove(os.path.join(base_dir, name))
+    manifest["snapshots"] = entries[cutoff:]
+    save_manifest(manifest_path, manifest)
+    return removed
+
+
+def print_entry(entry):
+    detail = "full base" if entry["storage"] == "base" else (
+        f"delta from v{entry['parent']}: +{entry['added']} -{entry['deleted']} triples"
+    )
+    print(f"Stored v{entry['version']} as {detail}")
+    print(f"  File:       {entry['file']}")
+    print(f"  Terms:      {entry['term_count']}")
+    print(f"  Triples:    {entry['triple_count']}")
+    print(f"  Size:       {entry['file_size']} bytes")
+    print(f"  SHA-256:    {entry['sha256']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta-chain snapshot storage")
+    sub = parser.add_subparsers(dest="command", required=True)
+    base_every = int(os.environ.get("SNAPSHOT_BASE_EVERY", DEFAULT_BASE_EVERY))
+
+    p_capture = sub.add_parser("capture", help="Stream the graph from Fuseki into a new version")
+    p_capture.add_argument("--manifest", required=True, help="Manifest to append to")
+    p_capture.add_argument("--version", help="Version label (default: next patch version)")
+    p_capture.add_argument("--message", default="", help="Description")
+    p_capture.add_argument("--timestamp", help="ISO-8601 UTC timestamp (default: now)")
+    p_capture.add_argument("--prefix", default="glossary", help="File name prefix (default: glossary)")
+    p_capture.add_argument("--base-every", type=int, default=base_every,
+                           help=f"Write a full base after this many versions in a chain "
+                                f"(default: {DEFAULT_BASE_EVERY})")
+    p_capture.add_argument("--fuseki-url", default=os.environ.get("FUSEKI_URL", "http://localhost:3030"))
+    p_capture.add_argument("--dataset", default=os.environ.get("DATASET", "skosmos"))
+    p_capture.add_argument("--graph", default=os.environ.get("GRAPH_URI", "http://glossary.example.org/"))
+    p_capture.add_argument("--user", default=os.environ.get("FUSEKI_USER"))
+    p_capture.add_argument("--password", default=os.environ.get("FUSEKI_PASS"))
+
+    p_add = sub.add_parser("add", help="Store an exported Turtle file as a new version")
+    p_add.add_argument("export_file", help="Turtle export to store")
+    p_add.add_argument("--manifest", required=True, help="Manifest to append to")
+    p_add.add_argument("--version", required=True, help="Version label")
+    p_add.add_argument("--message", default="", help="Description")
+    p_add.add_argument("--timestamp", help="ISO-8601 UTC timestamp (default: now)")
+    p_add.add_argument("--prefix", default="glossary", help="File name prefix (default: glossary)")
+    p_add.add_argument(
+        "--base-every",
+        type=int,
+        default=base_every,
+        help=f"Write a full base after this many versions in a chain (default: {DEFAULT_BASE_EVERY})",
+    )
+
+    p_restore = sub.add_parser("restore", help="Reconstruct a version as N-Triples")
+    p_restore.add_argument("version", help="Version label or 'latest'")
+    p_restore.add_argument("--manifest", required=True)
+    p_restore.add_argument("-o", "--output", help="Output file (default: stdout)")
+
+    p_verify = sub.add_parser("verify", help="Check stored versions against their sha256")
+    p_verify.add_argument("--manifest", required=True)
+    group = p_verify.add_mutually_exclusive_group(required=True)
+    group.add_argument("--version", help="Version label or 'latest'")
+    group.add_argument("--all", action="store_true", help="Verify every version")
+
+    p_prune = sub.add_parser("prune", help="Keep only what is needed for the last N versions")
+    p_prune.add_argument("--manifest", required=True)
+    p_prune.add_argument("--keep", type=int, required=True)
+    args = parser.parse_args()
+
+    if args.command == "capture":
+        try:
+            entry = capture_version(args.manifest, args.fuseki_url, args.dataset, args.graph,
+                                    args.version, args.message, args.timestamp, args.prefix,
+                                    args.base_every, args.user, args.password)
+        except (urllib.error.URLError, OSError) as e:
+            print(f"ERROR: Could not export <{args.graph}> from {args.fuseki_url}: {e}",
+                  file=sys.stderr)
+            sys.exit(1)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        print_entry(entry)
+        print(f"  Export:     {entry['export_bytes']} bytes streamed "
+              f"({entry['transfer_bytes']} on the wire)")
+        print(f"  Hashes:     {entry['concept_hashes']}")
+
+    elif args.command == "add":
+        try:
+            entry = add_version(args.manifest, args.export_file, args.version, args.message,
+                                args.timestamp, args.prefix, args.base_every)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        print_entry(entry)
+
+    elif args.command == "restore":
+        tmp = args.output + ".tmp" if args.output else None
+        try:
+            if tmp:
+                with open(tmp, "wb") as out:
+                    entry = restore_version(args.manifest, args.version, out)
+                os.replace(tmp, args.output)
+                print(f"Restored v{entry['version']} to {args.output}", file=sys.stderr)
+            else:
+                restore_version(args.manifest, args.version, sys.stdout.buffer)
+        except KeyError:
+            print(f"ERROR: Version {args.version} not in manifest.", file=sys.stderr)
+            sys.exit(1)
+        except VerificationError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            # Left behind only when the restore failed
+            if tmp and os.path.exists(tmp):
+                os.remove(tmp)
+
+    elif args.command == "verify":
+        manifest = load_manifest(args.manifest)
+        versions = [e["version"] for e in manifest["snapshots"]] if args.all else [args.version]
+        failures = 0
+        for version in versions:
+            try:
+                entry = restore_version(args.manifest, version, None)
+                print(f"  OK: v{entry['version']}")
+            except (KeyError, OSError, VerificationError) as e:
+                print(f"  FAIL: v{version}: {e}")
+                failures += 1
+        print(f"Verified {len(versions) - failures}/{len(versions)} version(s)")
+        sys.exit(1 if failures else 0)
+
+    elif args.command == "prune":
+        removed = prune(args.manifest, args.keep)
+        for entry in removed:
+            print(f"  Removed: v{entry['version']} ({entry['file']})")
+        print(f"Pruned {len(removed)} version(s), keeping {args.keep}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 #!/usr/bin/env bash
 # Create a versioned, timestamped glossary snapshot for audit purposes.
 #
-# Each snapshot is a Turtle export with metadata (version, timestamp, term count).
-# Snapshots are stored in snapshots/ with a manifest for tracking.
+# Each snapshot is a single streamed export with metadata (version, timestamp,
+# term and triple counts, sha256) and a sidecar of per-concept content hashes
+# used by audit-log.py.
+# Snapshots are stored in snapshots/ with a manifest for tracking, as periodic
+# full bases plus compressed deltas (see snapshot-store.py). Reconstruct any
+# version with:
+#   python scripts/snapshot-store.py restore 2.1.0 --manifest snapshots/manifest.json
 #
 # Usage:
-#   ./scripts/snapshot.sh                          # Auto-increment version
+#   ./scripts/snapshot.sh                          # Auto-increment patch version
 #   ./scripts/snapshot.sh --version 2.1.0          # Explicit version
 #   ./scripts/snapshot.sh --message "Added Q1 terms"  # Add description
 #
@@ -15,6 +20,9 @@
 #   FUSEKI_PASS  - Fuseki admin password (default: admin123)
 #   GRAPH_URI    - Named graph URI (default: http://glossary.example.org/)
 #   DATASET      - Fuseki dataset name (default: skosmos)
+#   SNAPSHOT_BASE_EVERY - Versions per delta chain before a new full base (default: 10)
+#   SNAPSHOT_DIR - Snapshot store directory, also holding the change history
+#                  database history.db (default: snapshots/)
 
 set -euo pipefail
 
@@ -26,7 +34,7 @@ DATASET="${DATASET:-skosmos}"
 
 SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
-SNAPSHOT_DIR="$PROJECT_DIR/snapshots"
+SNAPSHOT_DIR="${SNAPSHOT_DIR:-$PROJECT_DIR/snapshots}"
 MANIFEST="$SNAPSHOT_DIR/manifest.json"
 
 VERSION=""
@@ -42,85 +50,37 @@ done
 
 mkdir -p "$SNAPSHOT_DIR"
 
-# Initialize manifest if missing
-if [ ! -f "$MANIFEST" ]; then
-    echo '{"snapshots":[]}' > "$MANIFEST"
-fi
-
-# Auto-increment version if not specified
-if [ -z "$VERSION" ]; then
-    LAST_VERSION=$(python3 -c "
-import json, sys
-try:
-    with open(sys.argv[1]) as f:
-        m = json.load(f)
-    if m['snapshots']:
-        print(m['snapshots'][-1]['version'])
-    else:
-        print('0.0.0')
-except Exception:
-    print('0.0.0')
-" "$MANIFEST" 2>/dev/null || echo "0.0.0")
-
-    # Increment patch version
-    IFS='.' read -r MAJOR MINOR PATCH <<< "$LAST_VERSION"
-    PATCH=$((PATCH + 1))
-    VERSION="$MAJOR.$MINOR.$PATCH"
-fi
-
 TIMESTAMP=$(date -u +%Y-%m-%dT%H:%M:%SZ)
-SAFE_TS=$(date -u +%Y%m%d-%H%M%S)
-SNAPSHOT_FILE="$SNAPSHOT_DIR/glossary-v${VERSION}-${SAFE_TS}.ttl"
 
-echo "Creating snapshot v${VERSION}..."
+echo "Creating snapshot${VERSION:+ v$VERSION}..."
 echo "  Fuseki:    $FUSEKI_URL"
 echo "  Graph:     $GRAPH_URI"
-echo "  Output:    $SNAPSHOT_FILE"
+echo "  Store:     $SNAPSHOT_DIR"
 echo ""
 
-# Export data
-HTTP_CODE=$(curl -s -o "$SNAPSHOT_FILE" -w "%{http_code}" \
-    -u "$FUSEKI_USER:$FUSEKI_PASS" \
-    -H "Accept: text/turtle" \
-    "$FUSEKI_URL/$DATASET/data?graph=$GRAPH_URI")
-
-if [ "$HTTP_CODE" -lt 200 ] || [ "$HTTP_CODE" -ge 300 ]; then
-    echo "Export FAILED (HTTP $HTTP_CODE)" >&2
-    rm -f "$SNAPSHOT_FILE"
+# Stream the export once: canonical form, counts, sha256 and per-concept
+# hashes (for audit-log.py) are computed as it arrives, and the version is
+# stored as a full base or a compressed delta against the previous one
+export FUSEKI_URL FUSEKI_USER FUSEKI_PASS GRAPH_URI DATASET
+capture_args=(--manifest "$MANIFEST" --message "$MESSAGE" --timestamp "$TIMESTAMP")
+if [ -n "$VERSION" ]; then
+    capture_args+=(--version "$VERSION")
+fi
+if ! CAPTURE_OUTPUT=$(python3 "$SCRIPT_DIR/snapshot-store.py" capture "${capture_args[@]}"); then
+    echo "Export FAILED" >&2
     exit 1
 fi
+echo "$CAPTURE_OUTPUT"
+VERSION=$(echo "$CAPTURE_OUTPUT" | sed -n 's/^Stored v\([^ ]*\) as .*/\1/p')
 
-# Count terms in export
-TERM_COUNT=$(grep -c "a skos:Concept" "$SNAPSHOT_FILE" 2>/dev/null || true)
-if [ -z "$TERM_COUNT" ]; then TERM_COUNT=0; fi
-FILE_SIZE=$(wc -c < "$SNAPSHOT_FILE" | tr -d ' ')
-CHECKSUM=$(sha256sum "$SNAPSHOT_FILE" | cut -d' ' -f1)
-
-# Update manifest
-SNAPSHOT_BASENAME=$(basename "$SNAPSHOT_FILE")
-python3 -c "
-import json, sys
-manifest_path = sys.argv[1]
-with open(manifest_path) as f:
-    m = json.load(f)
-m['snapshots'].append({
-    'version': sys.argv[2],
-    'timestamp': sys.argv[3],
-    'file': sys.argv[4],
-    'message': sys.argv[5],
-    'term_count': int(sys.argv[6]),
-    'file_size': int(sys.argv[7]),
-    'sha256': sys.argv[8]
-})
-with open(manifest_path, 'w') as f:
-    json.dump(m, f, indent=2)
-" "$MANIFEST" "$VERSION" "$TIMESTAMP" "$SNAPSHOT_BASENAME" "$MESSAGE" "$TERM_COUNT" "$FILE_SIZE" "$CHECKSUM"
+# Append the diff against the previous snapshot to the change history store
+if ! python3 "$SCRIPT_DIR/change-history.py" --db "$SNAPSHOT_DIR/history.db" \
+        record --manifest "$MANIFEST"; then
+    echo "WARNING: Could not record change history" >&2
+fi
 
 echo "Snapshot created successfully."
 echo "  Version:    v${VERSION}"
-echo "  Terms:      ${TERM_COUNT}"
-echo "  Size:       ${FILE_SIZE} bytes"
-echo "  SHA-256:    ${CHECKSUM}"
 echo "  Timestamp:  ${TIMESTAMP}"
 if [ -n "$MESSAGE" ]; then
     echo "  Message:    ${MESSAGE}"
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""Diff glossary snapshots larger than memory as sorted N-Triples.
+
+audit-log.py parses both snapshots into rdflib graphs and keeps both
+concept maps. This engine holds neither:
+
+  1. Each snapshot is streamed one triple at a time. N-Triples is read
+     line by line; Turtle goes through rdflib's parser into a sink instead
+     of a graph. Each triple is canonicalized to an N-Triples line and
+     buffered. Whenever the buffer reaches --buffer-mb it is sorted and
+     spilled as a run file into a temporary directory (--tmp-dir). The
+     runs are then merged, at most MERGE_FAN_IN files at a time, into one
+     sorted stream with duplicates removed. Versions stored by
+     snapshot-store.py are already canonical and sorted, so they are
+     streamed as they are.
+  2. The two sorted streams are merge-joined. All lines of a subject
+     start with "<subject> ". A space sorts before any character allowed
+     in an IRI, so each subject's lines are contiguous and subjects come
+     out in the same order on both sides. Only subjects whose lines
+     differ are parsed back into terms.
+
+Memory holds one sort buffer per snapshot and the added and removed
+concepts, which rename matching needs. Modified concepts are spooled to
+the temporary directory until the added, removed and renamed records
+have been written. The Turtle parser still reads a file's text at once;
+use the N-Triples export for the largest snapshots.
+
+audit-log.py --external writes its usual audit JSON / JSON Lines from
+this engine. On its own the script writes a canonical sorted snapshot,
+or the triple-level diff grouped by subject.
+
+Commands:
+  sort  Write a snapshot as canonical, sorted, unique N-Triples
+  diff  Write removed ("D") and added ("A") triples grouped by subject,
+        as in snapshot-store.py deltas
+
+Usage:
+    python scripts/sorted-diff.py sort snapshots/big.ttl -o big.nt --buffer-mb 256
+    python scripts/sorted-diff.py diff old.nt.gz new.nt.gz -o changes.rdfp --tmp-dir /scratch
+    python scripts/audit-log.py old.nt.gz new.nt.gz --external --jsonl -o audit.jsonl
+"""
+
+import argparse
+import contextlib
+import gzip
+import heapq
+import io
+import itertools
+import json
+import os
+import sys
+import tempfile
+
+try:
+    from rdflib import Graph
+    from rdflib.parser import create_input_source
+    from rdflib.plugins.parsers.notation3 import TurtleParser
+    from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+    from rdflib.plugins.serializers.nt import _nt_row
+except ImportError:
+    print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+    sys.exit(1)
+
+from _egms import load_script
+
+DEFAULT_BUFFER_MB = 64
+
+# Run files merged at once; more runs are merged in passes
+MERGE_FAN_IN = 64
+
+# Approximate per-line cost of a buffered str beyond its characters
+LINE_OVERHEAD = 64
+
+
+audit = load_script("audit-log")
+store = load_script("snapshot-store")
+
+
+# ---------------------------------------------------------------------------
+# Streaming parse and external sort
+# ---------------------------------------------------------------------------
+
+class SinkGraph(Graph):
+    """A Graph that passes each parsed triple to a callback instead of storing it."""
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def add(self, triple):
+        self.callback(triple)
+        return self
+
+
+class TripleSink:
+    """N-Triples parser sink that passes each triple to a callback."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def triple(self, s, p, o):
+        self.callback((s, p, o))
+
+
+def stream_triples(path, callback):
+    """Parse an N-Triples or Turtle file (optionally .gz) without building a graph."""
+    name = path[:-3] if path.endswith(".gz") else path
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        try:
+            if name.endswith(".nt"):
+                W3CNTriplesParser(TripleSink(callback)).parse(f, bnode_context={})
+            else:
+                source = create_input_source(file=f, publicID=os.path.abspath(path))
+                TurtleParser().parse(source, SinkGraph(callback))
+        except OSError:
+            raise
+        except Exception as e:  # rdflib parse errors have no common base class
+            raise ValueError(f"Syntax error in {path}: {e}")
+
+
+def unique(lines):
+    """Drop consecutive duplicates from a sorted line stream."""
+    previous = None
+    for line in lines:
+        if line != previous:
+            yield line
+            previous = line
+
+
+def read_run(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line[:-1]
+
+
+def write_run(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+
+
+class ExternalSorter:
+    """Sorted, unique lines from a stream of any length, in bounded memory."""
+
+    def __init__(self, work_dir, buffer_bytes=DEFAULT_BUFFER_MB << 20):
+        self.work_dir = work_dir
+        self.buffer_bytes = buffer_bytes
+        self.buffer = []
+        self.size = 0
+        self.runs = []
+        self.count = 0
+        self.merge_passes = 0
+
+    def add(self, line):
+        self.buffer.append(line)
+        self.count += 1
+        self.size += len(line) + LINE_OVERHEAD
+        if self.size >= self.buffer_bytes:
+            self.spill()
+
+    def add_triple(self, triple):
+        self.add(_nt_row(triple)[:-1])
+
+    def spill(self):
+        if not self.buffer:
+            return
+        self.buffer.sort()
+        path = os.path.join(self.work_dir, f"run-{len(self.runs):05d}.nt")
+        write_run(path, unique(self.buffer))
+        self.runs.append(path)
+        self.buffer = []
+        self.size = 0
+
+    def merge(self, paths):
+        return unique(heapq.merge(*(read_run(path) for path in paths)))
+
+    def lines(self):
+        """The sorted stream, merged from the spilled runs if there are any."""
+        if not self.runs:
+            self.buffer.sort()
+            yield from unique(self.buffer)
+            return
+        self.spill()
+        runs = self.runs
+        while len(runs) > MERGE_FAN_IN:
+            self.merge_passes += 1
+            merged = []
+            for i in range(0, len(runs), MERGE_FAN_IN):
+                group = runs[i:i + MERGE_FAN_IN]
+                path = os.path.join(self.work_dir, f"pass{self.merge_passes}-{i:05d}.nt")
+                write_run(path, self.merge(group))
+                for run in group:
+                    os.remove(run)
+                merged.append(path)
+            runs = merged
+        yield from self.merge(runs)
+
+
+def sorted_snapshot(path, work_dir, buffer_bytes, presorted=False):
+    """Canonical sorted N-Triples lines of a snapshot file.
+
+    presorted marks files already in that form (snapshot-store.py restores),
+    which are streamed without sorting.
+    """
+    if presorted:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+        return
+    sorter = ExternalSorter(tempfile.mkdtemp(dir=work_dir), buffer_bytes)
+    stream_triples(path, sorter.add_triple)
+    yield from sorter.lines()
+
+
+# ---------------------------------------------------------------------------
+# Merge-join
+# ---------------------------------------------------------------------------
+
+def subject_of(line):
+    return line[:line.index(" ")]
+
+
+def diff_subjects(old_lines, new_lines):
+    """Merge-join two sorted line streams.
+
+    Yields (subject, old lines, new lines) for every subject whose lines
+    differ; either list is empty when the subject is on one side only.
+    """
+    old = itertools.groupby(old_lines, key=subject_of)
+    new = itertools.groupby(new_lines, key=subject_of)
+    o = next(old, None)
+    n = next(new, None)
+    while o is not None or n is not None:
+        if n is None or (o is not None and o[0] < n[0]):
+            yield o[0], list(o[1]), []
+            o = next(old, None)
+        elif o is None or n[0] < o[0]:
+            yield n[0], [], list(n[1])
+            n = next(new, None)
+        else:
+            old_group = list(o[1])
+            new_group = list(n[1])
+            if old_group != new_group:
+                yield o[0], old_group, new_group
+            o = next(old, None)
+            n = next(new, None)
+
+
+TRACKED = dict(audit.TRACKED_PROPERTIES)
+TRACKED_NT = {f"<{prop}>" for prop in TRACKED}
+
+
+class ConceptSink:
+    """Collects the subject and tracked property values of one subject's lines."""
+
+    def __init__(self):
+        self.subject = None
+        self.data = {}
+
+    def triple(self, s, p, o):
+        self.subject = s
+        name = TRACKED.get(p)
+        if name:
+            self.data.setdefault(name, []).append(str(o))
+
+
+def concept_data(lines):
+    """(URI, tracked properties) of a subject's lines, or None if it is not a concept."""
+    if not any(line.endswith(store.CONCEPT_TYPE) for line in lines):
+        return None
+    wanted = [line for line in lines
+              if line.endswith(store.CONCEPT_TYPE) or line.split(" ", 2)[1] in TRACKED_NT]
+    sink = ConceptSink()
+    W3CNTriplesParser(sink).parse(io.BytesIO("\n".join(wanted).encode("utf-8")),
+                                  bnode_context={})
+    # Distinct values, as audit-log.py reports them
+    return str(sink.subject), {name: sorted(set(v)) for name, v in sink.data.items()}
+
+
+def iter_changes(old_file, new_file, detect_renames=True,
+                 rename_threshold=audit.DEFAULT_RENAME_THRESHOLD, tmp_dir=None,
+                 buffer_mb=DEFAULT_BUFFER_MB, presorted=(False, False)):
+    """Yield audit-log.py change records (added, removed, renamed, modified)."""
+    buffer_bytes = int(buffer_mb * (1 << 20))
+    with tempfile.TemporaryDirectory(prefix="egms-diff-", dir=tmp_dir) as work_dir:
+        added, removed = {}, {}
+        spool_path = os.path.join(work_dir, "modified.jsonl")
+        with open(spool_path, "w", encoding="utf-8") as spool:
+            old_lines = sorted_snapshot(old_file, work_dir, buffer_bytes, presorted[0])
+            new_lines = sorted_snapshot(new_file, work_dir, buffer_bytes, presorted[1])
+            for _, old_group, new_group in diff_subjects(old_lines, new_lines):
+                old = concept_data(old_group) if old_group else None
+                new = concept_data(new_group) if new_group else None
+                if old and new:
+                    if old[1] != new[1]:
+                        spool.write(json.dumps(audit.modified_change(new[0], old[1], new[1]),
+                                               ensure_ascii=False))
+                        spool.write("\n")
+                elif new:
+                    added[new[0]] = new[1]
+                elif old:
+                    removed[old[0]] = old[1]
+
+        renames = []
+        if detect_renames and added and removed:
+            renames = audit.match_renames(
+                sorted(added), sorted(removed),
+                {uri: audit.concept_digest(data) for uri, data in removed.items()},
+                {uri: audit.concept_digest(data) for uri, data in added.items()},
+                removed.__getitem__, added.__getitem__, rename_threshold,
+            )
+        renamed_old = {old for old, _, _ in renames}
+        renamed_new = {new for _, new, _ in renames}
+
+        for uri in sorted(added):
+            if uri not in renamed_new:
+                data = added[uri]
+                yield {"action": "added", "uri": uri,
+                       "label": data.get("prefLabel", [uri])[0], "details": data}
+        for uri in sorted(removed):
+            if uri not in renamed_old:
+                data = removed[uri]
+                yield {"action": "removed", "uri": uri,
+                       "label": data.get("prefLabel", [uri])[0], "details": data}
+        for old_uri, uri, confidence in sorted(renames, key=lambda r: r[1]):
+            change = audit.modified_change(uri, removed[old_uri], added[uri])
+            yield {"action": "renamed", "uri": uri, "old_uri": old_uri,
+                   "label": change["label"], "confidence": confidence,
+                   "details": added[uri], "changes": change["changes"]}
+        # Modified concepts follow in N-Triples subject order
+        with open(spool_path, encoding="utf-8") as spool:
+            for line in spool:
+                yield json.loads(line)
+
+
+# ---------------------------------------------------------------------------
+# Commands
+# ---------------------------------------------------------------------------
+
+def output_stream(path):
+    if not path:
+        return contextlib.nullcontext(sys.stdout)
+    opener = gzip.open if path.endswith(".gz") else open
+    return opener(path, "wt", encoding="utf-8")
+
+
+def cmd_sort(args):
+    buffer_bytes = int(args.buffer_mb * (1 << 20))
+    with tempfile.TemporaryDirectory(prefix="egms-sort-", dir=args.tmp_dir) as work_dir:
+        sorter = ExternalSorter(work_dir, buffer_bytes)
+        stream_triples(args.snapshot, sorter.add_triple)
+        written = 0
+        with output_stream(args.output) as out:
+            for line in sorter.lines():
+                out.write(line)
+                out.write("\n")
+                written += 1
+    where = (f"{len(sorter.runs)} run(s), {sorter.merge_passes} intermediate merge pass(es)"
+             if sorter.runs else "memory")
+    print(f"{written} unique triples of {sorter.count} sorted in {where}", file=sys.stderr)
+
+
+def cmd_diff(args):
+    buffer_bytes = int(args.buffer_mb * (1 << 20))
+    subjects = deletes = adds = 0
+    with tempfile.TemporaryDirectory(prefix="egms-diff-", dir=args.tmp_dir) as work_dir, \
+            output_stream(args.output) as out:
+        old_lines = sorted_snapshot(args.old_file, work_dir, buffer_bytes)
+        new_lines = sorted_snapshot(args.new_file, work_dir, buffer_bytes)
+        for _, old_group, new_group in diff_subjects(old_lines, new_lines):
+            removed, added = store.diff_lines(old_group, new_group)
+            subjects += 1
+            deletes += len(removed)
+            adds += len(added)
+            for line in removed:
+                out.write(f"D {line}\n")
+            for line in added:
+                out.write(f"A {line}\n")
+    print(f"{subjects} subjects changed: {deletes} triples removed, {adds} added",
+          file=sys.stderr)
+
+
+def add_sort_arguments(parser):
+    parser.add_argument("--tmp-dir", default=os.environ.get("SORTED_DIFF_TMP_DIR") or None,
+                        help="Directory for sorted runs (default: SORTED_DIFF_TMP_DIR or "
+                             "the system temp directory)")
+    parser.add_argument("--buffer-mb", type=float, default=DEFAULT_BUFFER_MB,
+                        help=f"Sort buffer per snapshot in MB (default: {DEFAULT_BUFFER_MB})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="External-memory sorted N-Triples diff")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("sort", help="Write canonical, sorted, unique N-Triples")
+    p.add_argument("snapshot", help="N-Triples or Turtle file (optionally .gz)")
+    p.add_argument("-o", "--output", help="Output file, gzipped if it ends in .gz (default: stdout)")
+    add_sort_arguments(p)
+
+    p = sub.add_parser("diff", help="Removed / added triples grouped by subject")
+    p.add_argument("old_file")
+    p.add_argument("new_file")
+    p.add_argument("-o", "--output", help="Output file, gzipped if it ends in .gz (default: stdout)")
+    add_sort_arguments(p)
+
+    args = parser.parse_args()
+    for path in ([args.snapshot] if args.command == "sort" else [args.old_file, args.new_file]):
+        if not os.path.isfile(path):
+            print(f"ERROR: File not found: {path}", file=sys.stderr)
+            sys.exit(1)
+    try:
+        {"sort": cmd_sort, "diff": cmd_diff}[args.command](args)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""Canonicalize SPARQL queries so equivalent queries share one Varnish entry.
+
+default.vcl hashes the raw URL, so the same query with different
+whitespace, comments, keyword case, PREFIX declarations, variable names
+or URL parameter order is a separate cache entry and a trip to Fuseki.
+This module rewrites a query into a canonical form:
+
+  - comments and optional trailing '.' dropped, tokens separated by
+    single spaces
+  - prefixed names expanded to full IRIs and PREFIX declarations dropped
+    ("a" becomes rdf:type)
+  - keywords and built-in function names upper-cased, '...' strings
+    written as "..." where possible, $var written as ?var, and the
+    optional WHERE keyword dropped
+  - variables that never appear in the results (everything except the
+    projection of a SELECT) and blank-node labels renamed in order of
+    first use, so result variable names are preserved
+  - URL parameters sorted and percent-encoded uniformly
+
+Anything that does not tokenize, or uses an undeclared prefix, is passed
+through unchanged, leaving Fuseki to report the error.
+
+`serve` runs it as a small proxy stage in front of fuseki-cache: GET
+queries are canonicalized, everything else is forwarded untouched.
+`bench` replays a captured query mix (access logs, as for warm-cache.py)
+through a simulated LRU cache keyed on raw and on canonical URLs, and
+reports both hit ratios plus the per-request canonicalization cost.
+
+Usage:
+    python scripts/sparql-canon.py canonicalize 'select ?x { ?x a skos:Concept }'
+    python scripts/sparql-canon.py serve --port 8081 --upstream http://localhost:9031
+    python scripts/sparql-canon.py bench /var/log/nginx/access.log* --cache-size 1000
+"""
+
+import argparse
+import http.client
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from _egms import load_script
+
+RDF_TYPE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+CACHEABLE = re.compile(r"^/[^/?]+/(sparql|query)$")
+
+TOKEN = re.compile(r"""
+    (?P<ws>\s+|\#[^\n]*)
+  | (?P<string>\"\"\"(?:[^"\\]|\\.|"(?!""))*\"\"\"|'''(?:[^'\\]|\\.|'(?!''))*'''
+              |"(?:[^"\\\n\r]|\\.)*"|'(?:[^'\\\n\r]|\\.)*')
+  | (?P<iri><[^<>"{}|^`\\\x00-\x20]*>)
+  | (?P<var>[?$]\w+)
+  | (?P<bnode>_:\w(?:[\w.-]*[\w-])?)
+  | (?P<langtag>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | (?P<number>[+-]?(?:\d*\.\d+(?:[eE][+-]?\d+)?|\d+\.\d*[eE][+-]?\d+|\d+(?:[eE][+-]?\d+)?))
+  | (?P<pname>(?:[^\W\d_](?:[\w.-]*[\w-])?)?:(?:(?:[\w:%]|\\[^\s])(?:(?:[\w.:%-]|\\[^\s])*(?:[\w:%-]|\\[^\s]))?)?)
+  | (?P<word>[A-Za-z_]\w*)
+  | (?P<punct>\^\^|&&|\|\||!=|<=|>=|[{}()\[\].,;*=<>!+\-/^|?])
+""", re.VERBOSE)
+
+PNAME_ESCAPE = re.compile(r"\\(.)")
+
+# Bare words that are case-sensitive in SPARQL
+CASE_SENSITIVE = {"a", "true", "false"}
+QUERY_FORMS = {"SELECT", "CONSTRUCT", "ASK", "DESCRIBE"}
+
+
+bulk = load_script("bulk-load")
+
+
+def tokenize(text):
+    """List of (kind, text) tokens; raises ValueError on anything unrecognized."""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        m = TOKEN.match(text, pos)
+        if not m:
+            raise ValueError(f"Unexpected character at offset {pos}: {text[pos]!r}")
+        pos = m.end()
+        if m.lastgroup != "ws":
+            tokens.append((m.lastgroup, m.group()))
+    return tokens
+
+
+def projected_variables(tokens):
+    """Names a SELECT returns, or None when every variable is visible (SELECT *)."""
+    forms = [t for k, t in tokens if k == "word" and t in QUERY_FORMS]
+    if not forms or forms[0] != "SELECT":
+        return set()
+    start = tokens.index(("word", "SELECT")) + 1
+    names = set()
+    depth = 0
+    for i in range(start, len(tokens)):
+        kind, text = tokens[i]
+        if depth == 0 and (text in ("FROM", "{") and kind in ("word", "punct")):
+            break
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif text == "*" and depth == 0:
+            return None
+        elif kind == "var" and (depth == 0 or tokens[i - 1] == ("word", "AS")):
+            names.add(text[1:])
+    return names
+
+
+def normalize_string(text):
+    """Write short single-quoted strings with double quotes."""
+    if text.startswith("'") and not text.startswith("'''") and '"' not in text:
+        return '"' + text[1:-1].replace("\\'", "'") + '"'
+    return text
+
+
+def canonicalize(query):
+    """Canonical form of a SPARQL query (the input itself if it cannot be parsed)."""
+    try:
+        tokens = tokenize(query)
+    except ValueError:
+        return query
+
+    prefixes = {}
+    prologue = []
+    i = 0
+    while i < len(tokens) and tokens[i][0] == "word" and tokens[i][1].upper() in ("PREFIX", "BASE"):
+        if tokens[i][1].upper() == "BASE" and i + 1 < len(tokens) and tokens[i + 1][0] == "iri":
+            prologue.append(f"BASE {tokens[i + 1][1]}")
+            i += 2
+        elif (i + 2 < len(tokens) and tokens[i + 1][0] == "pname"
+              and tokens[i + 1][1].endswith(":") and tokens[i + 2][0] == "iri"):
+            prefixes[tokens[i + 1][1][:-1]] = tokens[i + 2][1][1:-1]
+            i += 3
+        else:
+            return query
+
+    body = []
+    for kind, text in tokens[i:]:
+        if kind == "pname":
+            prefix, _, local = text.partition(":")
+            if prefix not in prefixes:
+                return query
+            local = PNAME_ESCAPE.sub(r"\1", local)
+            body.append(("iri", f"<{prefixes[prefix]}{local}>"))
+        elif kind == "word":
+            word = text if text in CASE_SENSITIVE else text.upper()
+            if word == "a":
+                body.append(("iri", RDF_TYPE))
+            elif word != "WHERE" or (body and body[-1][1] == "CONSTRUCT"):
+                # WHERE is optional except in the short CONSTRUCT WHERE form
+                body.append((kind, word))
+        elif kind == "string":
+            body.append((kind, normalize_string(text)))
+        elif kind == "var":
+            body.append((kind, "?" + text[1:]))
+        else:
+            body.append((kind, text))
+
+    keep = projected_variables(body)
+    variables = {}
+    bnodes = {}
+    counter = 0
+    for index, (kind, text) in enumerate(body):
+        if kind == "var" and keep is not None and text[1:] not in keep:
+            if text not in variables:
+                while f"v{counter}" in keep:
+                    counter += 1
+                variables[text] = f"?v{counter}"
+                counter += 1
+            body[index] = (kind, variables[text])
+        elif kind == "bnode":
+            bnodes.setdefault(text, f"_:b{len(bnodes)}")
+            body[index] = (kind, bnodes[text])
+
+    # A '.' closing the last triple pattern of a group is optional
+    body = [t for i, t in enumerate(body)
+            if not (t == ("punct", ".") and i + 1 < len(body) and body[i + 1][1] == "}")]
+
+    out = []
+    for index, (kind, text) in enumerate(body):
+        previous = body[index - 1] if index else ("", "")
+        glued = (kind == "langtag" or text == "^^" or previous[1] == "^^"
+                 # Property path modifiers, e.g. skos:broader+
+                 or (text in ("*", "+", "?") and (previous[0] == "iri" or previous[1] == ")")))
+        if out and glued:
+            out[-1] += text
+        else:
+            out.append(text)
+    return " ".join(prologue + out)
+
+
+def canonical_path(path):
+    """Request target with a canonical query and sorted, uniformly encoded parameters."""
+    parts = urlsplit(path)
+    if not parts.query or not CACHEABLE.match(parts.path):
+        return path
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    params = sorted((k, canonicalize(v) if k == "query" else v) for k, v in params)
+    return parts.path + "?" + "&".join(
+        f"{quote(k, safe='')}={quote(v, safe='')}" for k, v in params
+    )
+
+
+# -- proxy ---------------------------------------------------------------------
+
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+              "te", "trailer", "transfer-encoding", "upgrade", "content-length"}
+
+
+class CanonProxyHandler(BaseHTTPRequestHandler):
+    """Forward requests to the upstream cache, canonicalizing GET queries."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def read_body(self):
+        """The request body, decoding chunked transfer encoding; None if there is none."""
+        if "chunked" not in self.headers.get("Transfer-Encoding", "").lower():
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else None
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            if not size:
+                break
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+        # Trailer fields, up to the blank line ending the message
+        while self.rfile.readline().strip():
+            pass
+        return b"".join(chunks)
+
+    def forward(self):
+        target = self.path
+        if self.command in ("GET", "HEAD"):
+            target = canonical_path(self.path)
+        try:
+            body = self.read_body()
+        except ValueError:
+            self.close_connection = True
+            self.reply(400, {"Content-Type": "text/plain"}, b"Malformed request body")
+            return
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+
+        # A pooled keep-alive connection may have been closed by the upstream
+        attempts = 2 if body is None else 1
+        for attempt in range(attempts):
+            conn = self.server.pool.acquire()
+            try:
+                conn.request(self.command, target, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                self.server.pool.release(conn, reusable=False)
+                if attempt + 1 == attempts:
+                    self.reply(502, {"Content-Type": "text/plain"}, f"Upstream error: {e}".encode())
+                    return
+                continue
+            self.server.pool.release(conn, not resp.will_close)
+            self.reply(resp.status, {k: v for k, v in resp.getheaders()
+                                     if k.lower() not in HOP_BY_HOP}, data)
+            return
+
+    def reply(self, status, headers, data):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD" and status != 304:
+            self.wfile.write(data)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = do_BAN = forward
+
+
+def make_proxy(port, upstream, connections=16, verbose=False):
+    server = ThreadingHTTPServer(("0.0.0.0", port), CanonProxyHandler)
+    server.daemon_threads = True
+    server.pool = bulk.ConnectionPool(upstream, connections, timeout=120)
+    server.verbose = verbose
+    return server
+
+
+# -- benchmark -----------------------------------------------------------------
+
+def lru_hit_ratio(keys, capacity):
+    """Hit ratio of an LRU cache of `capacity` entries (0 = unbounded) over `keys`."""
+    cache = OrderedDict()
+    hits = 0
+    for key in keys:
+        if key in cache:
+            hits += 1
+            cache.move_to_end(key)
+        else:
+            cache[key] = True
+            if capacity and len(cache) > capacity:
+                cache.popitem(last=False)
+    return hits / len(keys) if keys else 0.0
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_bench(paths, capacity):
+    """Returns (raw ratio, canonical ratio, distinct raw, distinct canonical, timings)."""
+    canonical = []
+    timings = []
+    for path in paths:
+        start = time.perf_counter()
+        canonical.append(canonical_path(path))
+        timings.append(time.perf_counter() - start)
+    return (lru_hit_ratio(paths, capacity), lru_hit_ratio(canonical, capacity),
+            len(set(paths)), len(set(canonical)), sorted(timings))
+
+
+def cmd_bench(args):
+    warm = load_script("warm-cache")
+    missing = [f for f in args.logs if not os.path.isfile(f)]
+    if missing:
+        print(f"ERROR: Log file not found: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+    paths = list(warm.iter_query_paths(args.logs))
+    if not paths:
+        print("No cacheable query requests found in the logs.")
+        return
+
+    raw, canon, raw_keys, canon_keys, timings = run_bench(paths, args.cache_size)
+    size = f"{args.cache_size} entries" if args.cache_size else "unbounded"
+    print(f"Query mix:  {len(paths)} requests, LRU cache {size}")
+    print(f"Raw URLs:   {raw_keys} distinct, hit ratio {raw:.1%}")
+    print(f"Canonical:  {canon_keys} distinct, hit ratio {canon:.1%} "
+          f"({(canon - raw) * 100:+.1f} points)")
+    print(f"Overhead:   mean {sum(timings) / len(timings) * 1e6:.0f}us, "
+          f"p50 {percentile(timings, 0.50) * 1e6:.0f}us, "
+          f"p99 {percentile(timings, 0.99) * 1e6:.0f}us per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Canonicalize SPARQL queries for caching")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_canon = sub.add_parser("canonicalize", help="Print the canonical form of a query")
+    p_canon.add_argument("query", nargs="?", help="Query text (default: read stdin)")
+
+    p_serve = sub.add_parser("serve", help="Run the canonicalizing proxy")
+    p_serve.add_argument("--port", type=int, default=8081, help="Port to listen on (default: 8081)")
+    p_serve.add_argument("--upstream", default=os.environ.get("VARNISH_URL", "http://localhost:9031"),
+                         help="Cache to forward to (default: $VARNISH_URL or http://localhost:9031)")
+    p_serve.add_argument("--connections", type=int, default=16,
+                         help="Idle keep-alive connections kept to the upstream (default: 16)")
+    p_serve.add_argument("-v", "--verbose", action="store_true", help="Log each request")
+
+    p_bench = sub.add_parser("bench", help="Compare cache hit ratios on a captured query mix")
+    p_bench.add_argument("logs", nargs="+", help="Access log files (combined format, may be .gz)")
+    p_bench.add_argument("--cache-size", type=int, default=0,
+                         help="Simulated LRU cache entries (default: 0 = unbounded)")
+    args = parser.parse_args()
+
+    if args.command == "canonicalize":
+        print(canonicalize(args.query if args.query is not None else sys.stdin.read()))
+    elif args.command == "bench":
+        cmd_bench(args)
+    else:
+        server = make_proxy(args.port, args.upstream, args.connections, args.verbose)
+        print(f"SPARQL canonicalizing proxy on :{args.port} -> {args.upstream}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
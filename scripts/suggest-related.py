@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Suggest skos:related candidates from definition and label similarity.
+
+md-to-csv.py leaves related_slugs empty, so imported terms have almost no
+skos:related links. This script proposes them for review:
+
+  1. Each term becomes a TF-IDF vector over the words of its definition
+     and labels. Labels count LABEL_WEIGHT times, stopwords are dropped,
+     and tf is sublinear (1 + log tf). Words found in only one term
+     cannot link two terms and are dropped. So are words found in more
+     than --max-df of the terms or --max-postings terms in all: they say
+     little about relatedness, and their cost grows with the square of
+     their frequency. Rows are L2-normalized and stored as a sparse CSR
+     matrix (indptr / indices / data arrays), together with its
+     transpose, the postings of each word.
+  2. Cosine similarity is the product of the matrix with its transpose.
+     It is computed one block of --block-size rows at a time: for each row,
+     the postings of its words are accumulated into a sparse score map,
+     and a heap keeps the --top-k best neighbors above --min-score.
+     Each block is written out before the next one starts, so memory
+     holds the matrix and one block of results, never all pairs.
+
+A term's own broader concept, its narrower terms, and terms it is
+already related to are not suggested.
+
+The review CSV has one row per candidate (uri_slug, pref_label,
+related_slug, related_label, score, rank). Delete the rows that are
+wrong, then `apply` merges the remaining ones into the related_slugs
+column of the terms CSV for csv-to-skos.py. `bench` times synthetic
+vocabularies.
+
+Usage:
+    python scripts/suggest-related.py suggest data/imported-terms.csv -o related-review.csv
+    python scripts/suggest-related.py apply data/imported-terms.csv related-review.csv \\
+        -o data/imported-terms.csv --min-score 0.3
+    python scripts/suggest-related.py bench --terms 100000
+"""
+
+import argparse
+import csv
+import heapq
+import math
+import os
+import random
+import re
+import sys
+import time
+from array import array
+from collections import Counter
+from itertools import accumulate
+from operator import itemgetter
+
+from _egms import load_script
+
+DEFAULT_TOP_K = 5
+DEFAULT_MIN_SCORE = 0.2
+DEFAULT_BLOCK_SIZE = 1024
+DEFAULT_MAX_DF = 0.05
+DEFAULT_MAX_POSTINGS = 1000
+
+# Label words count this many times as often as definition words
+LABEL_WEIGHT = 2
+
+REVIEW_FIELDS = ["uri_slug", "pref_label", "related_slug", "related_label", "score", "rank"]
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all also an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each etc few for from further had has have having he her here hers him his how
+i if in into is it its itself just may me might more most must my no nor not of
+off on once one only or other our ours out over own same she should so some such
+than that the their theirs them then there these they this those through to too
+under until up upon us used uses using very via was we were what when where which
+while who whom why will with within without would you your
+""".split())
+
+
+def split_list(value):
+    return [v.strip() for v in (value or "").split("|") if v.strip()]
+
+
+def tokens(text):
+    """Lowercased words without stopwords; a plural 's' is dropped."""
+    words = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def term_words(row):
+    """Bag of words of a terms-CSV row: labels LABEL_WEIGHT times, then the definition."""
+    labels = " ".join([row.get("pref_label", "")] + split_list(row.get("alt_labels")))
+    return tokens(labels) * LABEL_WEIGHT + tokens(row.get("definition", ""))
+
+
+class TfidfMatrix:
+    """L2-normalized TF-IDF rows in CSR form, plus the CSC postings."""
+
+    def __init__(self, documents, max_df=DEFAULT_MAX_DF, max_postings=DEFAULT_MAX_POSTINGS):
+        n = len(documents)
+        df = Counter()
+        for words in documents:
+            df.update(set(words))
+        limit = min(max_df * n, max_postings)
+        vocab = {}
+        for word, count in df.items():
+            if 2 <= count <= max(limit, 2):
+                vocab[word] = len(vocab)
+        self.vocab = vocab
+        self.dropped_common = sum(1 for c in df.values() if c > max(limit, 2))
+        idf = {w: math.log((1 + n) / (1 + df[w])) + 1 for w in vocab}
+
+        self.indptr = array("l", [0])
+        self.indices = array("l")
+        self.data = array("d")
+        for words in documents:
+            counts = Counter(w for w in words if w in vocab)
+            weights = [(vocab[w], (1 + math.log(c)) * idf[w]) for w, c in counts.items()]
+            norm = math.sqrt(sum(x * x for _, x in weights)) or 1.0
+            for feature, x in sorted(weights):
+                self.indices.append(feature)
+                self.data.append(x / norm)
+            self.indptr.append(len(self.indices))
+        self.rows = n
+        self.transpose()
+
+    def transpose(self):
+        """Column-major copy: for each word, the rows containing it and their weights."""
+        counts = [0] * (len(self.vocab) + 1)
+        for feature in self.indices:
+            counts[feature + 1] += 1
+        colptr = array("l", accumulate(counts))
+        fill = array("l", colptr)
+        rowind = array("l", [0]) * len(self.indices)
+        values = array("d", [0.0]) * len(self.indices)
+        for row in range(self.rows):
+            for k in range(self.indptr[row], self.indptr[row + 1]):
+                feature = self.indices[k]
+                slot = fill[feature]
+                rowind[slot] = row
+                values[slot] = self.data[k]
+                fill[feature] = slot + 1
+        self.colptr, self.rowind, self.values = colptr, rowind, values
+
+    def nnz(self):
+        return len(self.indices)
+
+    def neighbors(self, row, top_k, min_score, exclude=()):
+        """The top_k (score, row) pairs most similar to a row, best first."""
+        scores = {}
+        get = scores.get
+        colptr, rowind, values = self.colptr, self.rowind, self.values
+        for k in range(self.indptr[row], self.indptr[row + 1]):
+            feature = self.indices[k]
+            x = self.data[k]
+            start, end = colptr[feature], colptr[feature + 1]
+            for other, y in zip(rowind[start:end], values[start:end]):
+                scores[other] = get(other, 0.0) + x * y
+        scores.pop(row, None)
+        for other in exclude:
+            scores.pop(other, None)
+        best = heapq.nlargest(top_k, scores.items(), key=itemgetter(1))
+        return [(score, other) for other, score in best if score >= min_score]
+
+
+def blocked_neighbors(matrix, top_k, min_score, block_size, exclusions):
+    """Yield one list of (row, [(score, other), ...]) per block of rows."""
+    for start in range(0, matrix.rows, block_size):
+        block = []
+        for row in range(start, min(start + block_size, matrix.rows)):
+            block.append((row, matrix.neighbors(row, top_k, min_score, exclusions.get(row, ()))))
+        yield block
+
+
+def exclusions_for(rows):
+    """Per row index: broader, narrower and already-related terms."""
+    index = {row["uri_slug"].strip(): i for i, row in enumerate(rows)}
+    excluded = {}
+    for i, row in enumerate(rows):
+        linked = [row.get("broader_slug", "").strip()] + split_list(row.get("related_slugs"))
+        for slug in linked:
+            j = index.get(slug)
+            if j is not None:
+                excluded.setdefault(i, set()).add(j)
+                excluded.setdefault(j, set()).add(i)
+    return excluded
+
+
+def read_terms(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return [row for row in csv.DictReader(f) if row.get("uri_slug", "").strip()]
+
+
+def suggest(rows, out, top_k=DEFAULT_TOP_K, min_score=DEFAULT_MIN_SCORE,
+            block_size=DEFAULT_BLOCK_SIZE, max_df=DEFAULT_MAX_DF,
+            max_postings=DEFAULT_MAX_POSTINGS, progress=None):
+    """Write review rows for the candidates of every term; returns stats."""
+    began = time.monotonic()
+    matrix = TfidfMatrix([term_words(row) for row in rows], max_df, max_postings)
+    built = time.monotonic()
+    writer = csv.DictWriter(out, fieldnames=REVIEW_FIELDS)
+    writer.writeheader()
+    candidates = 0
+    done = 0
+    for block in blocked_neighbors(matrix, top_k, min_score, block_size, exclusions_for(rows)):
+        for row, best in block:
+            for rank, (score, other) in enumerate(best, 1):
+                writer.writerow({
+                    "uri_slug": rows[row]["uri_slug"].strip(),
+                    "pref_label": rows[row].get("pref_label", ""),
+                    "related_slug": rows[other]["uri_slug"].strip(),
+                    "related_label": rows[other].get("pref_label", ""),
+                    "score": f"{score:.4f}",
+                    "rank": rank,
+                })
+            candidates += len(best)
+        done += len(block)
+        if progress:
+            progress(done, matrix.rows)
+    return {"terms": matrix.rows, "words": len(matrix.vocab), "nnz": matrix.nnz(),
+            "dropped_common": matrix.dropped_common, "candidates": candidates,
+            "build_seconds": built - began, "search_seconds": time.monotonic() - built}
+
+
+def format_stats(stats):
+    return (f"{stats['candidates']} candidates for {stats['terms']} terms "
+            f"({stats['words']} words, {stats['nnz']} non-zeros, "
+            f"{stats['dropped_common']} common words skipped); "
+            f"matrix {stats['build_seconds']:.2f}s, top-k {stats['search_seconds']:.2f}s")
+
+
+def apply_review(rows, review_rows, min_score=0.0):
+    """Merge reviewed candidates into related_slugs; returns the number added."""
+    slugs = {row["uri_slug"].strip() for row in rows}
+    chosen = {}
+    for r in review_rows:
+        slug, related = r["uri_slug"].strip(), r["related_slug"].strip()
+        try:
+            score = float(r.get("score") or 0)
+        except ValueError:
+            score = 0.0
+        if related in slugs and related != slug and score >= min_score:
+            chosen.setdefault(slug, []).append(related)
+    added = 0
+    for row in rows:
+        current = split_list(row.get("related_slugs"))
+        for related in chosen.get(row["uri_slug"].strip(), []):
+            if related not in current:
+                current.append(related)
+                added += 1
+        row["related_slugs"] = "|".join(current)
+    return added
+
+
+# -- benchmark -------------------------------------------------------------------
+
+def synthetic_terms(count, vocabulary, seed=1):
+    """Terms whose words follow a Zipf distribution over a made-up vocabulary."""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocabulary)]
+    cumulative = list(accumulate(1 / (i + 1) ** 1.05 for i in range(vocabulary)))
+    rows = []
+    for i in range(count):
+        rows.append({
+            "uri_slug": f"term-{i}",
+            "pref_label": " ".join(rng.choices(words, cum_weights=cumulative, k=2)),
+            "alt_labels": "",
+            "definition": " ".join(rng.choices(words, cum_weights=cumulative,
+                                               k=rng.randint(12, 30))),
+            "broader_slug": "",
+            "related_slugs": "",
+        })
+    return rows
+
+
+def cmd_bench(args):
+    rows = synthetic_terms(args.terms, args.vocabulary)
+    with open(os.devnull, "w", encoding="utf-8", newline="") as out:
+        stats = suggest(rows, out, args.top_k, args.min_score, args.block_size,
+                        args.max_df, args.max_postings)
+    total = stats["build_seconds"] + stats["search_seconds"]
+    print(f"{args.terms} synthetic terms, {args.vocabulary}-word vocabulary")
+    print(f"  {format_stats(stats)}")
+    print(f"  {total:.1f}s total, {args.terms / stats['search_seconds']:.0f} terms/s searched")
+
+
+def cmd_suggest(args):
+    rows = read_terms(args.terms_csv)
+
+    def progress(done, total):
+        if args.verbose:
+            print(f"  {done}/{total} terms", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            stats = suggest(rows, out, args.top_k, args.min_score, args.block_size,
+                            args.max_df, args.max_postings, progress)
+        print(f"Review file written to {args.output}", file=sys.stderr)
+    else:
+        stats = suggest(rows, sys.stdout, args.top_k, args.min_score, args.block_size,
+                        args.max_df, args.max_postings, progress)
+    print(format_stats(stats), file=sys.stderr)
+
+
+def cmd_apply(args):
+    rows = read_terms(args.terms_csv)
+    with open(args.review_csv, encoding="utf-8", newline="") as f:
+        review = list(csv.DictReader(f))
+    added = apply_review(rows, review, args.min_score)
+    load_script("md-to-csv").write_rows(rows, args.output)
+    print(f"Added {added} related links from {len(review)} reviewed candidates "
+          f"to {args.output}", file=sys.stderr)
+
+
+def add_search_arguments(parser):
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K,
+                        help=f"Candidates per term (default: {DEFAULT_TOP_K})")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE,
+                        help=f"Minimum cosine similarity (default: {DEFAULT_MIN_SCORE})")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE,
+                        help=f"Terms searched per block (default: {DEFAULT_BLOCK_SIZE})")
+    parser.add_argument("--max-df", type=float, default=DEFAULT_MAX_DF,
+                        help=f"Skip words in more than this share of terms (default: {DEFAULT_MAX_DF})")
+    parser.add_argument("--max-postings", type=int, default=DEFAULT_MAX_POSTINGS,
+                        help=f"Skip words in more than this many terms (default: {DEFAULT_MAX_POSTINGS})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggest skos:related candidates for review")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("suggest", help="Write a review CSV of related-term candidates")
+    p.add_argument("terms_csv", help="Terms CSV (md-to-csv.py / csv-to-skos.py columns)")
+    p.add_argument("-o", "--output", help="Review CSV (default: stdout)")
+    p.add_argument("-v", "--verbose", action="store_true", help="Report progress per block")
+    add_search_arguments(p)
+
+    p = sub.add_parser("apply", help="Merge a reviewed CSV into related_slugs")
+    p.add_argument("terms_csv")
+    p.add_argument("review_csv")
+    p.add_argument("-o", "--output", required=True, help="Terms CSV to write (may be terms_csv)")
+    p.add_argument("--min-score", type=float, default=0.0,
+                   help="Only apply candidates scoring at least this (default: all)")
+
+    p = sub.add_parser("bench", help="Time the search on synthetic terms")
+    p.add_argument("--terms", type=int, default=100000)
+    p.add_argument("--vocabulary", type=int, default=30000)
+    add_search_arguments(p)
+
+    args = parser.parse_args()
+    inputs = {"suggest": [getattr(args, "terms_csv", None)],
+              "apply": [getattr(args, "terms_csv", None), getattr(args, "review_csv", None)]}
+    for path in inputs.get(args.command, []):
+        if not os.path.isfile(path):
+            print(f"ERROR: File not found: {path}", file=sys.stderr)
+            sys.exit(1)
+    {"suggest": cmd_suggest, "apply": cmd_apply, "bench": cmd_bench}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
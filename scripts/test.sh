@@ -56,6 +56,28 @@ if [ -f "$SCRIPT_DIR/requirements.txt" ] && command -v python3 > /dev/null 2>&1;
         TOTAL_FAIL=$((TOTAL_FAIL + 1))
         echo ">> SUITE FAILED: SKOS Validation"
     fi
+
+    run_test "Change History" "$PROJECT_DIR/tests/test-change-history.sh"
+    run_test "Snapshot Store" "$PROJECT_DIR/tests/test-snapshot-store.sh"
+    run_test "Endpoint Validation" "$PROJECT_DIR/tests/test-validate-endpoint.sh"
+    run_test "Bulk Loader" "$PROJECT_DIR/tests/test-bulk-load.sh"
+    run_test "Blue/Green Load" "$PROJECT_DIR/tests/test-blue-green.sh"
+    run_test "Cache Warmer" "$PROJECT_DIR/tests/test-warm-cache.sh"
+    run_test "Dataset Version" "$PROJECT_DIR/tests/test-dataset-version.sh"
+    run_test "SPARQL Canonicalizer" "$PROJECT_DIR/tests/test-sparql-canon.sh"
+    run_test "Load Test Harness" "$PROJECT_DIR/tests/test-load-test.sh"
+    run_test "Health Daemon" "$PROJECT_DIR/tests/test-health-daemon.sh"
+    run_test "Static Views" "$PROJECT_DIR/tests/test-static-views.sh"
+    run_test "Snapshot Capture" "$PROJECT_DIR/tests/test-snapshot-capture.sh"
+    run_test "Glossary Client" "$PROJECT_DIR/tests/test-glossary-client.sh"
+    run_test "Glossary API" "$PROJECT_DIR/tests/test-glossary-api.sh"
+    run_test "Import Pipeline" "$PROJECT_DIR/tests/test-import-pipeline.sh"
+    run_test "SKOS Materialization" "$PROJECT_DIR/tests/test-materialize-skos.sh"
+    run_test "Sorted Diff" "$PROJECT_DIR/tests/test-sorted-diff.sh"
+    run_test "Related Term Suggestion" "$PROJECT_DIR/tests/test-suggest-related.sh"
+    run_test "Fast Turtle Reader" "$PROJECT_DIR/tests/test-fast-turtle.sh"
+    run_test "Shard Router" "$PROJECT_DIR/tests/test-shard-router.sh"
+    run_test "Replication" "$PROJECT_DIR/tests/test-replicate.sh"
 else
     echo "WARNING: Skipping SKOS validation (python3 or rdflib not available)"
 fi
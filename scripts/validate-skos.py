@@ -10,13 +10,22 @@ Checks:
   6. At least one skos:ConceptScheme exists
   7. Reciprocal broader/narrower relationships (warning only)
 
+With --endpoint, checks 2-7 run server-side instead: each rule is compiled
+into an aggregate SPARQL query (offender COUNT plus a small sample) and the
+queries run concurrently, so only violations cross the wire.
+
 Usage:
     python scripts/validate-skos.py data/*.ttl
     python scripts/validate-skos.py data/enterprise-glossary.ttl data/concept-scheme.ttl
+    python scripts/validate-skos.py --endpoint http://localhost:3030/skosmos/sparql
 """
 
 import argparse
+import json
 import sys
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from rdflib import Graph, Namespace, RDF, URIRef
@@ -24,6 +33,8 @@ except ImportError:
     print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
     sys.exit(1)
 
+from _egms import load_script
+
 SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
 
 
@@ -33,14 +44,24 @@ def validate(files):
     errors = []
     warnings = []
 
-    # Parse all files into a single graph
+    # Parse all files into a single graph; anything outside the project's
+    # Turtle dialect, including syntax errors, goes through rdflib
+    turtle = load_script("fast-turtle")
     for f in files:
         try:
-            g.parse(f, format="turtle")
+            turtle.load_graph([f], g)
         except Exception as e:
             errors.append(f"Syntax error in {f}: {e}")
             return errors, warnings
 
+    return validate_graph(g)
+
+
+def validate_graph(g):
+    """Run checks 2-7 on an already parsed graph. Returns (errors, warnings)."""
+    errors = []
+    warnings = []
+
     # Check for at least one ConceptScheme
     schemes = list(g.subjects(RDF.type, SKOS.ConceptScheme))
     if not schemes:
@@ -97,18 +118,207 @@ def validate(files):
     return errors, warnings
 
 
+SPARQL_PREFIXES = "PREFIX skos: <http://www.w3.org/2004/02/skos/core#>\n"
+
+# Server-side equivalents of the checks in validate(). Each "where" pattern
+# binds one row per offender; "vars" are the offending resources, and the
+# message is formatted with each var's label (prefLabel, falling back to URI).
+# "expect" rules are violated when the pattern matches nothing at all.
+ENDPOINT_RULES = [
+    {
+        "name": "scheme",
+        "severity": "error",
+        "expect": True,
+        "where": "?c a skos:ConceptScheme .",
+        "message": "No skos:ConceptScheme found in the data.",
+    },
+    {
+        "name": "concepts",
+        "severity": "warning",
+        "expect": True,
+        "where": "?c a skos:Concept .",
+        "message": "No skos:Concept instances found.",
+    },
+    {
+        "name": "prefLabel",
+        "severity": "error",
+        "vars": ["c"],
+        "where": "?c a skos:Concept . FILTER NOT EXISTS { ?c skos:prefLabel ?any }",
+        "message": "Missing skos:prefLabel on <{c_uri}>",
+    },
+    {
+        "name": "definition",
+        "severity": "warning",
+        "vars": ["c"],
+        "where": "?c a skos:Concept . FILTER NOT EXISTS { ?c skos:definition ?any }",
+        "message": "Missing skos:definition on '{c}'",
+    },
+    {
+        "name": "inScheme",
+        "severity": "warning",
+        "vars": ["c"],
+        "where": "?c a skos:Concept . FILTER NOT EXISTS { ?c skos:inScheme ?any }",
+        "message": "Missing skos:inScheme on '{c}'",
+    },
+    {
+        "name": "orphan",
+        "severity": "warning",
+        "vars": ["c"],
+        "where": (
+            "?c a skos:Concept . "
+            "FILTER NOT EXISTS { ?c skos:broader ?any } "
+            "FILTER NOT EXISTS { ?s a skos:ConceptScheme ; skos:hasTopConcept ?c } "
+            "FILTER NOT EXISTS { ?c skos:topConceptOf ?any2 }"
+        ),
+        "message": "Orphan concept '{c}' (no broader, not a top concept)",
+    },
+    {
+        "name": "reciprocal",
+        "severity": "warning",
+        "vars": ["c", "o"],
+        "where": "?c skos:broader ?o . FILTER NOT EXISTS { ?o skos:narrower ?c }",
+        "message": (
+            "Non-reciprocal: '{c}' has broader '{o}' "
+            "but '{o}' does not declare narrower '{c}'"
+        ),
+    },
+]
+
+
+def compile_rule(rule, sample_size):
+    """Compile a rule into (count_query, sample_query); sample_query may be None."""
+    variables = rule.get("vars", ["c"])
+    projection = " ".join(f"?{v}" for v in variables)
+    count_query = (
+        SPARQL_PREFIXES
+        + "SELECT (COUNT(*) AS ?count) WHERE { "
+        + f"SELECT DISTINCT {projection} WHERE {{ {rule['where']} }} }}"
+    )
+    if rule.get("expect") or sample_size <= 0:
+        return count_query, None
+
+    labels = " ".join(f"(SAMPLE(?{v}_l) AS ?{v}_label)" for v in variables)
+    optionals = " ".join(f"OPTIONAL {{ ?{v} skos:prefLabel ?{v}_l }}" for v in variables)
+    sample_query = (
+        SPARQL_PREFIXES
+        + f"SELECT {projection} {labels} WHERE {{ {rule['where']} {optionals} }} "
+        + f"GROUP BY {projection} ORDER BY {projection} LIMIT {sample_size}"
+    )
+    return count_query, sample_query
+
+
+def run_sparql(endpoint, query, timeout=30):
+    """POST a SELECT query and return (bindings, response size in bytes)."""
+    data = urllib.parse.urlencode({"query": query}).encode("utf-8")
+    req = urllib.request.Request(
+        endpoint,
+        data=data,
+        headers={
+            "Accept": "application/sparql-results+json",
+            "Content-Type": "application/x-www-form-urlencoded",
+        },
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        body = resp.read()
+    return json.loads(body)["results"]["bindings"], len(body)
+
+
+def check_rule(endpoint, rule, sample_size):
+    """Run one rule. Returns (violation count, sample messages, bytes received)."""
+    count_query, sample_query = compile_rule(rule, sample_size)
+    rows, received = run_sparql(endpoint, count_query)
+    count = int(rows[0]["count"]["value"]) if rows else 0
+
+    if rule.get("expect"):
+        return (0, [], received) if count else (1, [rule["message"]], received)
+    if not count or sample_query is None:
+        return count, [], received
+
+    rows, sample_bytes = run_sparql(endpoint, sample_query)
+    messages = []
+    for row in rows:
+        fields = {}
+        for v in rule.get("vars", ["c"]):
+            uri = row[v]["value"]
+            fields[f"{v}_uri"] = uri
+            fields[v] = row.get(f"{v}_label", {}).get("value", uri)
+        messages.append(rule["message"].format(**fields))
+    return count, messages, received + sample_bytes
+
+
+def validate_endpoint(endpoint, sample_size=20, workers=4):
+    """Validate the data behind a SPARQL endpoint.
+
+    Returns (errors, warnings, counts): sample messages per severity plus the
+    total number of violations, which may exceed the samples shown.
+    """
+    errors = []
+    warnings = []
+    counts = {"error": 0, "warning": 0, "bytes": 0}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (rule, pool.submit(check_rule, endpoint, rule, sample_size))
+            for rule in ENDPOINT_RULES
+        ]
+        for rule, future in futures:
+            target = errors if rule["severity"] == "error" else warnings
+            try:
+                count, messages, received = future.result()
+            except Exception as e:
+                errors.append(f"Endpoint query failed for rule '{rule['name']}': {e}")
+                counts["error"] += 1
+                continue
+            counts[rule["severity"]] += count
+            counts["bytes"] += received
+            target.extend(messages)
+            if count > len(messages):
+                target.append(
+                    f"... {count - len(messages)} more '{rule['name']}' "
+                    f"violation(s) not shown"
+                )
+
+    return errors, warnings, counts
+
+
 def main():
     parser = argparse.ArgumentParser(description="Validate SKOS vocabulary files")
-    parser.add_argument("files", nargs="+", help="Turtle (.ttl) files to validate")
+    parser.add_argument("files", nargs="*", help="Turtle (.ttl) files to validate")
     parser.add_argument(
         "--strict",
         action="store_true",
         help="Treat warnings as errors",
     )
+    parser.add_argument(
+        "--endpoint",
+        help="Validate data behind a SPARQL endpoint instead of local files",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=20,
+        help="Offenders to fetch per rule in --endpoint mode (default: 20)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Concurrent rule queries in --endpoint mode (default: 4)",
+    )
     args = parser.parse_args()
 
-    print(f"Validating {len(args.files)} file(s)...")
-    errors, warnings = validate(args.files)
+    if args.endpoint:
+        print(f"Validating {args.endpoint} ({len(ENDPOINT_RULES)} rules)...")
+        errors, warnings, counts = validate_endpoint(
+            args.endpoint, args.sample, args.workers
+        )
+        error_count, warning_count = counts["error"], counts["warning"]
+    elif args.files:
+        print(f"Validating {len(args.files)} file(s)...")
+        errors, warnings = validate(args.files)
+        error_count, warning_count = len(errors), len(warnings)
+    else:
+        parser.error("Provide Turtle files or --endpoint")
 
     for w in warnings:
         print(f"  WARNING: {w}")
@@ -116,9 +326,11 @@ def main():
         print(f"  ERROR: {e}")
 
     print()
-    print(f"Results: {len(errors)} error(s), {len(warnings)} warning(s)")
+    if args.endpoint:
+        print(f"Transferred {counts['bytes']} bytes of query results")
+    print(f"Results: {error_count} error(s), {warning_count} warning(s)")
 
-    if errors or (args.strict and warnings):
+    if error_count or (args.strict and warning_count):
         print("VALIDATION FAILED")
         sys.exit(1)
     else:
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Warm the Varnish SPARQL cache by replaying the most frequent recorded queries.
+
+After a data load, restart or TTL expiry the first users pay full Fuseki
+latency. This script reads gateway (nginx) or Varnish (varnishncsa)
+access logs in combined format, plain or gzipped. It picks the top-N most
+frequent successful GET query URLs and replays them through fuseki-cache
+with bounded concurrency over keep-alive connections. Gateway /sparql
+paths are mapped to the /skosmos/sparql path Varnish serves, and queries
+are canonicalized as by the sparql-canon proxy, so variants of the same
+query count together and warm the entry the proxy will look up.
+
+It then re-requests the same URLs and reports warm-up time and the
+post-warm hit ratio from the X-Cache header set in default.vcl.
+
+Usage:
+    python scripts/warm-cache.py /var/log/varnish/varnishncsa.log
+    python scripts/warm-cache.py logs/access.log* --top 500 --concurrency 8
+    python scripts/warm-cache.py logs/access.log --list          # show top queries only
+
+Environment variables:
+    VARNISH_URL - Varnish base URL (default: http://localhost:9031)
+"""
+
+import argparse
+import gzip
+import http.client
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from _egms import load_script
+
+# "GET /skosmos/sparql?query=... HTTP/1.1" 200
+REQUEST_LINE = re.compile(r'"(?:GET|HEAD) (\S+) HTTP/[^"]*" (\d{3})')
+CACHEABLE = re.compile(r"^/skosmos/(sparql|query)\?")
+GATEWAY_PREFIX = "/sparql?"
+
+# Fuseki varies responses on Accept, so replay with what Skosmos sends
+DEFAULT_ACCEPT = "application/sparql-results+json"
+
+
+bulk = load_script("bulk-load")
+canon = load_script("sparql-canon")
+
+
+def normalize_path(raw):
+    """Map a logged request target to the Varnish path, or None if not cacheable."""
+    parts = urlsplit(raw)
+    path = parts.path + ("?" + parts.query if parts.query else "")
+    if path.startswith(GATEWAY_PREFIX):
+        path = "/skosmos" + path
+    return path if CACHEABLE.match(path) else None
+
+
+def iter_query_paths(log_files):
+    """Cacheable, successful query paths across access logs, in log order."""
+    for log_file in log_files:
+        opener = gzip.open if log_file.endswith(".gz") else open
+        with opener(log_file, "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                m = REQUEST_LINE.search(line)
+                if not m or not m.group(2).startswith("2"):
+                    continue
+                path = normalize_path(m.group(1))
+                if path:
+                    yield path
+
+
+def count_queries(log_files):
+    """Frequency of canonical query paths across access logs."""
+    return Counter(canon.canonical_path(path) for path in iter_query_paths(log_files))
+
+
+def fetch(pool, path, accept):
+    """GET one path; returns (status or None, X-Cache value, seconds)."""
+    start = time.monotonic()
+    conn = pool.acquire()
+    try:
+        conn.request("GET", path, headers={"Accept": accept, "Connection": "keep-alive"})
+        resp = conn.getresponse()
+        resp.read()
+        pool.release(conn, not resp.will_close)
+        return resp.status, resp.getheader("X-Cache", ""), time.monotonic() - start
+    except (OSError, http.client.HTTPException):
+        pool.release(conn, reusable=False)
+        return None, "", time.monotonic() - start
+
+
+def replay(pool, paths, accept, concurrency):
+    """Request every path with bounded concurrency; returns (results, seconds)."""
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda p: fetch(pool, p, accept), paths))
+    return results, time.monotonic() - start
+
+
+def summarize(results):
+    ok = [r for r in results if r[0] is not None and 200 <= r[0] < 300]
+    hits = sum(1 for r in ok if r[1].upper() == "HIT")
+    return len(ok), hits, len(results) - len(ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the Varnish SPARQL cache from access logs")
+    parser.add_argument("logs", nargs="+", help="Access log files (combined format, may be .gz)")
+    parser.add_argument("--cache-url", default=os.environ.get("VARNISH_URL", "http://localhost:9031"),
+                        help="Varnish base URL (default: $VARNISH_URL or http://localhost:9031)")
+    parser.add_argument("--top", type=int, default=200, help="Number of queries to replay (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Parallel requests (default: 4)")
+    parser.add_argument("--accept", default=DEFAULT_ACCEPT,
+                        help=f"Accept header to replay with (default: {DEFAULT_ACCEPT})")
+    parser.add_argument("--list", action="store_true", help="Only print the top queries")
+    args = parser.parse_args()
+
+    missing = [f for f in args.logs if not os.path.isfile(f)]
+    if missing:
+        print(f"ERROR: Log file not found: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    counts = count_queries(args.logs)
+    top = counts.most_common(args.top)
+    covered = sum(n for _, n in top)
+    total = sum(counts.values())
+    print(f"Found {len(counts)} distinct queries in {total} cacheable requests; "
+          f"top {len(top)} cover {covered / total:.0%} of traffic" if total else
+          "No cacheable query requests found in the logs.")
+    if args.list:
+        for path, n in top:
+            print(f"{n:8d}  {path}")
+        return
+    if not top:
+        return
+
+    paths = [path for path, _ in top]
+    pool = bulk.ConnectionPool(args.cache_url, args.concurrency, timeout=60)
+    try:
+        warm, warm_seconds = replay(pool, paths, args.accept, args.concurrency)
+        check, _ = replay(pool, paths, args.accept, args.concurrency)
+    finally:
+        pool.close()
+
+    ok, already, errors = summarize(warm)
+    print(f"Warm-up:   {len(paths)} queries in {warm_seconds:.2f}s "
+          f"({ok - already} fetched, {already} already cached, {errors} failed)")
+    ok, hits, errors = summarize(check)
+    ratio = hits / len(paths)
+    print(f"Post-warm: {hits}/{len(paths)} X-Cache hits ({ratio:.0%} hit ratio)")
+
+    if errors == len(paths):
+        print(f"ERROR: No query could be replayed through {args.cache_url}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Local rdflib-backed stand-in for a Fuseki dataset, used by offline tests.
+
+Implements the subset of Fuseki that the EGMS scripts talk to:
+  - GET  /$/ping
+  - GET/POST /{dataset}/sparql and /{dataset}/query (SPARQL 1.1 Query)
+  - POST /{dataset}/update (SPARQL 1.1 Update)
+  - GET/PUT/POST/DELETE /{dataset}/data (Graph Store Protocol)
+  - GET  /$/stats (connection, request and ban counters, for loader tests)
+
+With --cache it also plays the Varnish layer in front of Fuseki: GET
+query responses are cached by URL and Accept, marked with an X-Cache
+HIT/MISS header as in default.vcl, and dropped by a BAN request. With
+--version-file the dataset version is read from that file on every
+request (as after a VCL reload) and added to the cache key; responses
+carry the weak ETag default.vcl derives from it and If-None-Match gets
+a 304.
+
+As in Fuseki with tdb2:unionDefaultGraph, queries see the union of the
+graphs while SPARQL Update DEFAULT and Graph Store ?default address the
+stored default graph.
+
+Request bodies may be sent chunked and/or with Content-Encoding: gzip.
+--fail-first N makes the first N Graph Store writes return 503, and
+--fail-after N makes every write after the first N successful ones return
+503, to exercise client retries and resumable loads.
+
+The server binds to an ephemeral port unless --port is given, and writes
+the chosen port to --port-file once it is accepting requests, so test
+scripts can start it in the background and wait for that file.
+
+Usage:
+    python tests/fuseki-stand-in.py --port-file /tmp/port data/*.ttl
+    python tests/fuseki-stand-in.py --port 3030 --graph http://glossary.example.org/ data/*.ttl
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import rdflib.plugins.sparql
+    from rdflib import Dataset, Graph, URIRef
+    from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+except ImportError:
+    print("ERROR: rdflib is required. Install with: pip install rdflib", file=sys.stderr)
+    sys.exit(1)
+
+RESULT_TYPES = {
+    "json": "application/sparql-results+json",
+    "turtle": "text/turtle",
+    "nt": "application/n-triples",
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Route Fuseki-style requests to the shared rdflib Dataset."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.stats["connections"] += 1
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if self.command:
+            with self.server.lock:
+                self.server.stats["requests"] += 1
+
+    # -- helpers -----------------------------------------------------------
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = self.read_chunked()
+        else:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    def read_chunked(self):
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+            if size == 0:
+                # Skip trailers up to the terminating blank line
+                while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def send(self, code, body=b"", content_type="text/plain; charset=utf-8", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(code)
+        if code != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD" and code != 304:
+            self.wfile.write(body)
+
+    def route(self):
+        """Split the request path into (dataset, service, query params)."""
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query, keep_blank_values=True)
+        segments = [s for s in parts.path.split("/") if s]
+        if len(segments) != 2:
+            return None, None, params
+        return segments[0], segments[1], params
+
+    def target_graph(self, params):
+        """Resolve ?graph= / ?default to an rdflib graph in the dataset."""
+        if "graph" in params:
+            return self.server.dataset.graph(URIRef(params["graph"][0]))
+        return self.server.dataset.graph(DATASET_DEFAULT_GRAPH_ID)
+
+    # -- SPARQL ------------------------------------------------------------
+
+    def query_response(self, query):
+        """Evaluate a query; returns (body, content type)."""
+        with self.server.lock:
+            result = self.server.dataset.query(query)
+        if result.type in ("SELECT", "ASK"):
+            return result.serialize(format="json"), RESULT_TYPES["json"]
+        return result.serialize(format="turtle"), RESULT_TYPES["turtle"]
+
+    def run_query(self, query):
+        self.send(200, *self.query_response(query))
+
+    def dataset_version(self):
+        """Version default.vcl would hash on ("0" without a version file)."""
+        try:
+            with open(self.server.version_file, encoding="utf-8") as f:
+                return f.read().strip() or "0"
+        except (OSError, TypeError):
+            return "0"
+
+    def run_cached_query(self, query):
+        version = self.dataset_version()
+        key = (self.path, self.headers.get("Accept", ""), version)
+        with self.server.lock:
+            cached = self.server.cache.get(key)
+        headers = {"X-Cache": "HIT" if cached else "MISS"}
+        if self.server.version_file:
+            headers["ETag"] = f'W/"egms-v{version}"'
+            headers["X-Dataset-Version"] = version
+        if not cached:
+            cached = self.query_response(query)
+            with self.server.lock:
+                self.server.cache[key] = cached
+        if headers.get("ETag") and headers["ETag"] in self.headers.get("If-None-Match", ""):
+            self.send(304, headers=headers)
+            return
+        self.send(200, *cached, headers=headers)
+
+    def run_update(self, update):
+        with self.server.lock:
+            rdflib.plugins.sparql.SPARQL_DEFAULT_GRAPH_UNION = False
+            try:
+                self.server.dataset.update(update)
+            finally:
+                rdflib.plugins.sparql.SPARQL_DEFAULT_GRAPH_UNION = True
+        self.send(204)
+
+    # -- verbs -------------------------------------------------------------
+
+    def do_GET(self):
+        if self.path.startswith("/$/ping"):
+            self.send(200, "pong")
+            return
+        if self.path.startswith("/$/stats"):
+            with self.server.lock:
+                body = json.dumps(self.server.stats)
+            self.send(200, body, "application/json")
+            return
+
+        dataset, service, params = self.route()
+        if dataset != self.server.dataset_name:
+            self.send(404, "Unknown dataset")
+        elif service in ("sparql", "query") and "query" in params:
+            if self.server.cache is not None:
+                try:
+                    self.run_cached_query(params["query"][0])
+                except Exception as e:
+                    self.send(400, f"Parse error: {e}")
+            else:
+                self.handle_sparql(params["query"][0])
+        elif service in ("data", "get"):
+            fmt = "nt" if RESULT_TYPES["nt"] in self.headers.get("Accept", "") else "turtle"
+            with self.server.lock:
+                body = self.target_graph(params).serialize(format=fmt)
+            self.send(200, body, RESULT_TYPES[fmt])
+        else:
+            self.send(400, "Unsupported request")
+
+    do_HEAD = do_GET
+
+    def do_BAN(self):
+        if self.server.cache is None:
+            self.send(405, "Not allowed")
+            return
+        with self.server.lock:
+            self.server.cache.clear()
+            self.server.stats["bans"] += 1
+        self.send(200, "Ban added")
+
+    def do_POST(self):
+        dataset, service, params = self.route()
+        if dataset != self.server.dataset_name:
+            self.send(404, "Unknown dataset")
+            return
+
+        body = self.read_body()
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+
+        if service in ("sparql", "query", "update"):
+            if content_type == "application/x-www-form-urlencoded":
+                form = parse_qs(body.decode("utf-8"))
+                text = (form.get("query") or form.get("update") or [""])[0]
+            else:
+                text = body.decode("utf-8")
+            if service == "update":
+                self.handle_sparql(text, update=True)
+            else:
+                self.handle_sparql(text)
+        elif service == "data":
+            self.handle_graph_store(body, replace=False, params=params)
+        else:
+            self.send(400, "Unsupported request")
+
+    def do_PUT(self):
+        dataset, service, params = self.route()
+        if dataset != self.server.dataset_name or service != "data":
+            self.send(404, "Unknown endpoint")
+            return
+        self.handle_graph_store(self.read_body(), replace=True, params=params)
+
+    def do_DELETE(self):
+        dataset, service, params = self.route()
+        if dataset != self.server.dataset_name or service != "data":
+            self.send(404, "Unknown endpoint")
+            return
+        with self.server.lock:
+            graph = self.target_graph(params)
+            existed = len(graph) > 0
+            graph.remove((None, None, None))
+        self.send(204 if existed else 404)
+
+    def handle_sparql(self, text, update=False):
+        try:
+            if update:
+                self.run_update(text)
+            else:
+                self.run_query(text)
+        except Exception as e:
+            self.send(400, f"Parse error: {e}")
+
+    def handle_graph_store(self, body, replace, params):
+        with self.server.lock:
+            failing = self.server.fail_remaining > 0
+            if failing:
+                self.server.fail_remaining -= 1
+            elif self.server.fail_after is not None:
+                failing = self.server.writes >= self.server.fail_after
+            if not failing:
+                self.server.writes += 1
+        if failing:
+            self.send(503, "Service temporarily unavailable")
+            return
+        try:
+            parsed = Graph().parse(data=body.decode("utf-8"), format="turtle")
+        except Exception as e:
+            self.send(400, f"Parse error: {e}")
+            return
+        with self.server.lock:
+            graph = self.target_graph(params)
+            if replace:
+                graph.remove((None, None, None))
+            for triple in parsed:
+                graph.add(triple)
+        # Like Fuseki, report the number of triples in the upload
+        count = len(parsed)
+        self.send(200, json.dumps({"count": count, "tripleCount": count, "quadCount": 0}),
+                  "application/json")
+
+
+def make_server(port, dataset_name, graph_uri, files, verbose=False, fail_first=0,
+                fail_after=None, cache=False, version_file=None):
+    """Create a stand-in server with the given Turtle files preloaded."""
+    ds = Dataset(default_union=True)
+    target = ds.graph(URIRef(graph_uri)) if graph_uri else ds.graph(DATASET_DEFAULT_GRAPH_ID)
+    for f in files:
+        target.parse(f, format="turtle")
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    server.daemon_threads = True
+    server.dataset = ds
+    server.dataset_name = dataset_name
+    server.lock = threading.Lock()
+    server.verbose = verbose
+    server.stats = {"connections": 0, "requests": 0, "bans": 0}
+    server.fail_remaining = fail_first
+    server.fail_after = fail_after
+    server.cache = {} if cache else None
+    server.version_file = version_file
+    server.writes = 0
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rdflib-backed Fuseki stand-in for tests")
+    parser.add_argument("files", nargs="*", help="Turtle files to preload")
+    parser.add_argument("--port", type=int, default=0, help="Port to bind (default: ephemeral)")
+    parser.add_argument("--port-file", help="Write the bound port to this file when ready")
+    parser.add_argument("--dataset", default="skosmos", help="Dataset name (default: skosmos)")
+    parser.add_argument("--graph", default="http://glossary.example.org/",
+                        help="Named graph to preload files into")
+    parser.add_argument("--fail-first", type=int, default=0,
+                        help="Answer the first N Graph Store writes with 503")
+    parser.add_argument("--fail-after", type=int,
+                        help="Answer every Graph Store write after the first N with 503")
+    parser.add_argument("--cache", action="store_true",
+                        help="Emulate the Varnish cache (X-Cache header, BAN)")
+    parser.add_argument("--version-file",
+                        help="With --cache, key cached results on this dataset version file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log each request")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.dataset, args.graph, args.files, args.verbose,
+                         args.fail_first, args.fail_after, args.cache, args.version_file)
+    port = server.server_address[1]
+
+    if args.port_file:
+        tmp = args.port_file + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(port))
+        os.replace(tmp, args.port_file)
+    print(f"Fuseki stand-in listening on http://127.0.0.1:{port}/{args.dataset}", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
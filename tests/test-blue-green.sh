@@ -0,0 +1,175 @@
+#!/usr/bin/env bash
+# Test blue-green-load.py against a local Fuseki stand-in.
+#
+# Runs offline: checks that a concurrent reader only ever sees the old or
+# the new live graph during a reload, that rollback restores the previous
+# graph, that failed staging leaves the live graph untouched, and that a
+# rerun after a failed chunked staging stages the whole source again.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-blue-green-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+GRAPH="http://glossary.example.org/"
+BLUE_GREEN="$PROJECT_DIR/scripts/blue-green-load.py"
+export VARNISH_URL=""
+# Keep stamped dataset versions out of config/state; no Varnish to reload
+export DATASET_VERSION_FILE="$TEMP_DIR/dataset-version"
+export VARNISH_RELOAD=""
+export STATIC_VIEWS_DIR=""
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+live_count() {
+    curl -s "$1/skosmos/sparql" \
+        --data-urlencode "query=SELECT (COUNT(*) AS ?n) WHERE { GRAPH <$GRAPH> { ?s ?p ?o } }" \
+        | python3 -c "import json, sys; print(json.load(sys.stdin)['results']['bindings'][0]['n']['value'])"
+}
+
+echo "=== Blue/Green Load Tests ==="
+echo ""
+
+start_stand_in old "$PROJECT_DIR/data/enterprise-glossary.ttl"
+OLD_COUNT=$(live_count "$STAND_IN_URL")
+start_stand_in reference "$PROJECT_DIR"/data/*.ttl
+NEW_COUNT=$(live_count "$STAND_IN_URL")
+
+# Test 1: Readers never see a partially loaded graph
+echo "Test: Concurrent reads see only the old or the new graph"
+start_stand_in serving "$PROJECT_DIR/data/enterprise-glossary.ttl"
+SERVING_URL="$STAND_IN_URL"
+(
+    while [ ! -f "$TEMP_DIR/stop-reader" ]; do
+        live_count "$SERVING_URL" >> "$TEMP_DIR/reads" 2>/dev/null || true
+    done
+) &
+READER_PID=$!
+LOAD_OUTPUT=$(FUSEKI_URL="$SERVING_URL" LOAD_BLUE_GREEN=true LOAD_CHUNKED=true \
+    bash "$PROJECT_DIR/scripts/load-data.sh" 2>&1 || true)
+live_count "$SERVING_URL" >> "$TEMP_DIR/reads"
+touch "$TEMP_DIR/stop-reader"
+wait "$READER_PID" 2>/dev/null || true
+assert_contains "Staged graph validated and swapped" "$LOAD_OUTPUT" "now serves $NEW_COUNT triples"
+SEEN=$(sort -un "$TEMP_DIR/reads" | tr '\n' ' ' | sed 's/ $//')
+assert_equals "Reader saw only old and new counts" "$SEEN" "$OLD_COUNT $NEW_COUNT"
+
+# Test 2: Rollback swaps the previous graph back, and is reversible
+echo "Test: Rollback restores the previous graph"
+python3 "$BLUE_GREEN" --fuseki-url "$SERVING_URL" rollback > /dev/null
+assert_equals "Old graph live after rollback" "$(live_count "$SERVING_URL")" "$OLD_COUNT"
+python3 "$BLUE_GREEN" --fuseki-url "$SERVING_URL" rollback > /dev/null
+assert_equals "New graph live after second rollback" "$(live_count "$SERVING_URL")" "$NEW_COUNT"
+
+# Test 3: A failed staging load never touches the live graph
+echo "Test: Failed staging leaves the live graph untouched"
+start_stand_in failing --fail-after 0 "$PROJECT_DIR/data/enterprise-glossary.ttl"
+set +e
+FAILED_OUTPUT=$(python3 "$BLUE_GREEN" --fuseki-url "$STAND_IN_URL" load --retries 0 \
+    "$PROJECT_DIR"/data/*.ttl 2>&1)
+FAILED_EXIT=$?
+set -e
+assert_equals "Non-zero exit" "$FAILED_EXIT" "1"
+assert_contains "Failure reported" "$FAILED_OUTPUT" "live graph untouched"
+assert_equals "Live graph unchanged" "$(live_count "$STAND_IN_URL")" "$OLD_COUNT"
+
+# Test 4: An unreachable cache only warns
+echo "Test: Unreachable Varnish does not fail the swap"
+start_stand_in nocache "$PROJECT_DIR/data/enterprise-glossary.ttl"
+NOCACHE_OUTPUT=$(VARNISH_URL="http://127.0.0.1:9" python3 "$BLUE_GREEN" \
+    --fuseki-url "$STAND_IN_URL" load "$PROJECT_DIR"/data/*.ttl 2>&1 || true)
+assert_contains "Ban failure is a warning" "$NOCACHE_OUTPUT" "WARNING: Could not ban Varnish cache"
+assert_equals "Swap still applied" "$(live_count "$STAND_IN_URL")" "$NEW_COUNT"
+
+# Test 5: a chunked staging run that failed part-way does not poison the next run
+echo "Test: Rerun after a failed chunked staging stages everything"
+# Several initial batches' worth of subject-grouped N-Triples
+python3 -c '
+for i in range(2000):
+    s = f"<http://glossary.example.org/bulk-{i}>"
+    print(f"{s} <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/2004/02/skos/core#Concept> .")
+    print(f"{s} <http://www.w3.org/2004/02/skos/core#prefLabel> \"Bulk {i}\"@en .")
+    print(f"{s} <http://www.w3.org/2004/02/skos/core#notation> \"B{i}\" .")
+' > "$TEMP_DIR/glossary.nt"
+start_stand_in partial --fail-after 1
+set +e
+PARTIAL_OUTPUT=$(python3 "$BLUE_GREEN" --fuseki-url "$STAND_IN_URL" load --chunked --retries 0 \
+    "$TEMP_DIR/glossary.nt" 2>&1)
+PARTIAL_EXIT=$?
+set -e
+assert_equals "Failed staging exits 1" "$PARTIAL_EXIT" "1"
+assert_equals "Progress checkpointed" "$(test -f "$TEMP_DIR/glossary.nt.load-state.json" && echo yes)" "yes"
+start_stand_in healthy
+HEALTHY_URL="$STAND_IN_URL"
+set +e
+RERUN_OUTPUT=$(python3 "$BLUE_GREEN" --fuseki-url "$HEALTHY_URL" load --chunked \
+    "$TEMP_DIR/glossary.nt" 2>&1)
+RERUN_EXIT=$?
+set -e
+assert_equals "Rerun exits 0" "$RERUN_EXIT" "0"
+assert_contains "Whole file staged and swapped" "$RERUN_OUTPUT" "now serves 6000 triples"
+assert_equals "Live graph complete" "$(live_count "$HEALTHY_URL")" "6000"
+assert_equals "Checkpoint removed" "$(test -f "$TEMP_DIR/glossary.nt.load-state.json" && echo yes || echo no)" "no"
+
+echo ""
+echo "Blue/Green Load Tests: $PASS passed, $FAIL failed"
+exit $FAIL
@@ -0,0 +1,183 @@
+#!/usr/bin/env bash
+# Test bulk-load.py / load-data.sh against a local Fuseki stand-in.
+#
+# Runs offline: starts tests/fuseki-stand-in.py instances and checks that
+# the loader delivers every triple over pooled connections, that
+# load-data.sh falls back to curl without rdflib, that it retries
+# transient failures, and that it resumes interrupted chunked loads.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-bulk-load-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+# Keep stamped dataset versions out of config/state; no Varnish to reload
+export DATASET_VERSION_FILE="$TEMP_DIR/dataset-version"
+export VARNISH_RELOAD=""
+export STATIC_VIEWS_DIR=""
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+triple_count() {
+    curl -s "$1/skosmos/sparql" \
+        --data-urlencode 'query=SELECT (COUNT(*) AS ?n) WHERE { GRAPH <http://glossary.example.org/> { ?s ?p ?o } }' \
+        | python3 -c "import json, sys; print(json.load(sys.stdin)['results']['bindings'][0]['n']['value'])"
+}
+
+echo "=== Bulk Loader Tests ==="
+echo ""
+
+# Test 1: load-data.sh delivers every triple
+echo "Test: load-data.sh loads all data files"
+start_stand_in reference "$PROJECT_DIR"/data/*.ttl
+EXPECTED=$(triple_count "$STAND_IN_URL")
+start_stand_in empty
+LOAD_OUTPUT=$(FUSEKI_URL="$STAND_IN_URL" bash "$PROJECT_DIR/scripts/load-data.sh" 2>&1 || true)
+assert_contains "Load succeeds" "$LOAD_OUTPUT" "All files loaded successfully"
+assert_contains "Throughput reported" "$LOAD_OUTPUT" "triples/s, .* MB/s"
+assert_equals "Triple count matches source files" "$(triple_count "$STAND_IN_URL")" "$EXPECTED"
+# A python3 without rdflib (no site-packages) falls back to curl uploads
+mkdir -p "$TEMP_DIR/bin"
+printf '#!/bin/sh\nexec %s -S "$@"\n' "$(command -v python3)" > "$TEMP_DIR/bin/python3"
+chmod +x "$TEMP_DIR/bin/python3"
+start_stand_in no-rdflib
+FALLBACK_OUTPUT=$(PATH="$TEMP_DIR/bin:$PATH" FUSEKI_URL="$STAND_IN_URL" VARNISH_URL="" \
+    bash "$PROJECT_DIR/scripts/load-data.sh" 2>&1 || true)
+assert_contains "Without rdflib, curl uploads each file" "$FALLBACK_OUTPUT" "Loading enterprise-glossary.ttl into"
+assert_equals "Fallback loads every triple" "$(triple_count "$STAND_IN_URL")" "$EXPECTED"
+
+# Test 2: Connections are reused across files
+echo "Test: Uploads share pooled keep-alive connections"
+start_stand_in pooled
+POOL_OUTPUT=$(python3 "$PROJECT_DIR/scripts/bulk-load.py" --fuseki-url "$STAND_IN_URL" \
+    --no-wait --concurrency 1 "$PROJECT_DIR"/data/*.ttl 2>&1 || true)
+assert_contains "Three files over one connection" "$POOL_OUTPUT" "Loaded 3 file(s).* over 1 connection(s)"
+# One pooled connection for the uploads, plus this stats request
+assert_contains "Server saw one upload connection" "$(curl -s "$STAND_IN_URL/\$/stats")" '"connections": 2,'
+
+# Test 3: Transient failures are retried
+echo "Test: 503 responses are retried with backoff"
+start_stand_in flaky --fail-first 2
+RETRY_OUTPUT=$(python3 "$PROJECT_DIR/scripts/bulk-load.py" --fuseki-url "$STAND_IN_URL" \
+    --no-wait --backoff 0.05 --no-gzip "$PROJECT_DIR"/data/*.ttl 2>&1 || true)
+assert_contains "Load succeeds after retries" "$RETRY_OUTPUT" "All files loaded successfully"
+assert_contains "Retries reported" "$RETRY_OUTPUT" "1 retry"
+
+# Test 4: Client errors are not retried
+echo "Test: Invalid Turtle fails without retrying"
+echo "this is not turtle" > "$TEMP_DIR/broken.ttl"
+start_stand_in strict
+set +e
+BROKEN_OUTPUT=$(python3 "$PROJECT_DIR/scripts/bulk-load.py" --fuseki-url "$STAND_IN_URL" \
+    --no-wait --backoff 0.05 "$TEMP_DIR/broken.ttl" 2>&1)
+BROKEN_EXIT=$?
+set -e
+assert_contains "HTTP 400 reported" "$BROKEN_OUTPUT" "broken.ttl: FAILED (HTTP 400)"
+assert_equals "Non-zero exit" "$BROKEN_EXIT" "1"
+
+# Test 5: Chunked mode commits subject-complete batches
+echo "Test: Chunked load delivers every triple in batches"
+cp "$PROJECT_DIR/data/imported-glossary.ttl" "$TEMP_DIR/big.ttl"
+start_stand_in big_reference "$TEMP_DIR/big.ttl"
+BIG_EXPECTED=$(triple_count "$STAND_IN_URL")
+start_stand_in chunked
+CHUNKED_OUTPUT=$(python3 "$PROJECT_DIR/scripts/bulk-load.py" --fuseki-url "$STAND_IN_URL" \
+    --no-wait --chunked --initial-batch 1000 --max-batch 1000 "$TEMP_DIR/big.ttl" 2>&1 || true)
+assert_contains "Multiple batches committed" "$CHUNKED_OUTPUT" "OK ($BIG_EXPECTED triples in [0-9]* batches)"
+assert_equals "Triple count matches source" "$(triple_count "$STAND_IN_URL")" "$BIG_EXPECTED"
+
+# Test 6: A failed chunked load resumes from its checkpoint
+echo "Test: Failed chunked load resumes where it stopped"
+start_stand_in dying --fail-after 3
+DYING_URL="$STAND_IN_URL"
+set +e
+python3 "$PROJECT_DIR/scripts/bulk-load.py" --fuseki-url "$DYING_URL" --no-wait --chunked \
+    --initial-batch 1000 --max-batch 1000 --retries 0 "$TEMP_DIR/big.ttl" > /dev/null 2>&1
+DYING_EXIT=$?
+set -e
+assert_equals "Interrupted load exits non-zero" "$DYING_EXIT" "1"
+if [ -f "$TEMP_DIR/big.ttl.load-state.json" ]; then
+    echo "  PASS: Checkpoint written"
+    PASS=$((PASS + 1))
+else
+    echo "  FAIL: Checkpoint written"
+    FAIL=$((FAIL + 1))
+fi
+start_stand_in resumed
+RESUME_OUTPUT=$(python3 "$PROJECT_DIR/scripts/bulk-load.py" --fuseki-url "$STAND_IN_URL" \
+    --no-wait --chunked --max-batch 1000 "$TEMP_DIR/big.ttl" 2>&1 || true)
+assert_contains "Resume reported" "$RESUME_OUTPUT" "Resuming after"
+# The two servers together hold every triple: nothing was re-sent or skipped
+FIRST_PART=$(triple_count "$DYING_URL")
+SECOND_PART=$(triple_count "$STAND_IN_URL")
+assert_equals "Resumed load completes the remainder" "$((FIRST_PART + SECOND_PART))" "$BIG_EXPECTED"
+if [ ! -f "$TEMP_DIR/big.ttl.load-state.json" ]; then
+    echo "  PASS: Checkpoint removed on success"
+    PASS=$((PASS + 1))
+else
+    echo "  FAIL: Checkpoint removed on success"
+    FAIL=$((FAIL + 1))
+fi
+
+echo ""
+echo "Bulk Loader Tests: $PASS passed, $FAIL failed"
+exit $FAIL
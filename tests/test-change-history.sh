@@ -0,0 +1,215 @@
+#!/usr/bin/env bash
+# Test change-history.py.
+#
+# Runs offline: records a three-snapshot manifest into a temporary history
+# database, and checks that recording continues after older snapshots are
+# pruned, the append-only guard, the per-concept history across a rename,
+# the raw and net change feeds, and that feed queries stay fast over
+# hundreds of recorded versions.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-change-history-$$"
+mkdir -p "$TEMP_DIR/store"
+HISTORY="$PROJECT_DIR/scripts/change-history.py"
+MANIFEST="$TEMP_DIR/store/manifest.json"
+DB="$TEMP_DIR/history.db"
+TERMS="http://glossary.example.org/terms"
+
+cleanup() {
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# Prints one "<action> <uri> [<property>]..." line per change in a feed
+summarize_feed() {
+    python3 -c '
+import json, sys
+for c in json.load(open(sys.argv[1]))["changes"]:
+    keys = sorted((c.get("changes") or {}).keys())
+    print(c["action"], c["uri"].rsplit("/", 1)[-1], *keys)
+' "$1"
+}
+
+# v0.0.2 relabels alpha, re-slugs delta-old to delta and adds epsilon;
+# v0.0.3 relabels alpha again, gives beta an altLabel and drops epsilon.
+cat > "$TEMP_DIR/v1.ttl" <<'TTL'
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+@prefix eg: <http://glossary.example.org/terms/> .
+eg:alpha a skos:Concept ; skos:prefLabel "Alpha"@en ; skos:definition "First letter"@en .
+eg:beta a skos:Concept ; skos:prefLabel "Beta"@en ; skos:definition "Second letter"@en .
+eg:gamma a skos:Concept ; skos:prefLabel "Gamma"@en .
+eg:delta-old a skos:Concept ; skos:prefLabel "Delta"@en ; skos:definition "Fourth letter of the alphabet"@en .
+TTL
+sed -e 's/"Alpha"@en/"Alpha One"@en/' -e 's/eg:delta-old/eg:delta/' "$TEMP_DIR/v1.ttl" > "$TEMP_DIR/v2.ttl"
+echo 'eg:epsilon a skos:Concept ; skos:prefLabel "Epsilon"@en .' >> "$TEMP_DIR/v2.ttl"
+sed -e 's/"Alpha One"@en/"Alpha Two"@en/' -e 's/"Beta"@en ;/"Beta"@en ; skos:altLabel "B"@en ;/' \
+    "$TEMP_DIR/v2.ttl" | grep -v epsilon > "$TEMP_DIR/v3.ttl"
+for v in 1 2 3; do
+    cp "$TEMP_DIR/v$v.ttl" "$TEMP_DIR/store/glossary-v0.0.$v.ttl"
+done
+python3 -c '
+import json, sys
+snapshots = [{"version": f"0.0.{v}", "timestamp": f"2026-01-0{v}T00:00:00Z",
+              "file": f"glossary-v0.0.{v}.ttl"} for v in (1, 2, 3)]
+json.dump({"snapshots": snapshots}, open(sys.argv[1], "w"), indent=2)
+' "$MANIFEST"
+
+# Test 1: Record
+echo "Test: Record"
+RECORD=$(python3 "$HISTORY" --db "$DB" record --manifest "$MANIFEST" 2>&1)
+assert_contains "First version is the baseline" "$RECORD" "v0.0.1: baseline"
+assert_contains "Second version diffed" "$RECORD" "v0.0.2: 1 added, 0 removed, 1 renamed, 1 modified"
+assert_contains "Third version diffed" "$RECORD" "v0.0.3: 0 added, 1 removed, 0 renamed, 2 modified"
+assert_contains "Three versions recorded" "$RECORD" "Recorded 3 new version(s)"
+RECORD=$(python3 "$HISTORY" --db "$DB" record --manifest "$MANIFEST" 2>&1)
+assert_contains "Re-recording adds nothing" "$RECORD" "Recorded 0 new version(s)"
+VERSIONS=$(python3 "$HISTORY" --db "$DB" versions 2>&1 | cut -f1 | tr '\n' ' ')
+assert_equals "Versions listed in order" "$VERSIONS" "v0.0.1 v0.0.2 v0.0.3 "
+
+python3 -c '
+import json, sys
+m = json.load(open(sys.argv[1]))
+del m["snapshots"][2]
+json.dump(m, open(sys.argv[2], "w"))
+' "$MANIFEST" "$TEMP_DIR/store/truncated.json"
+set +e
+REFUSED=$(python3 "$HISTORY" --db "$DB" record --manifest "$TEMP_DIR/store/truncated.json" 2>&1)
+STATUS=$?
+set -e
+assert_equals "Manifest without the last recorded version refused" "$STATUS" "1"
+assert_contains "Refusal explains why" "$REFUSED" "last recorded version v0.0.3 is missing"
+
+# Test 2: Append-only
+echo "Test: Append-only"
+GUARD=$(python3 - "$DB" <<'PY'
+import sqlite3, sys
+db = sqlite3.connect(sys.argv[1])
+for sql in ("UPDATE versions SET version = 'x'", "DELETE FROM versions",
+            "UPDATE changes SET label = 'x'", "DELETE FROM changes"):
+    try:
+        db.execute(sql)
+        print("allowed")
+    except sqlite3.DatabaseError as e:
+        print(e)
+PY
+)
+assert_equals "Updates and deletes rejected" "$(echo "$GUARD" | sort -u)" "history is append-only"
+
+# Test 3: Concept history
+echo "Test: Concept history"
+python3 "$HISTORY" --db "$DB" concept "$TERMS/alpha" -o "$TEMP_DIR/alpha.json" 2>/dev/null
+assert_equals "Both relabels of alpha listed" "$(summarize_feed "$TEMP_DIR/alpha.json" | tr '\n' ';')" \
+    "modified alpha prefLabel;modified alpha prefLabel;"
+python3 "$HISTORY" --db "$DB" concept "$TERMS/delta-old" -o "$TEMP_DIR/old.json" 2>/dev/null
+python3 "$HISTORY" --db "$DB" concept "$TERMS/delta" -o "$TEMP_DIR/new.json" 2>/dev/null
+assert_equals "Rename found under the old URI" "$(summarize_feed "$TEMP_DIR/old.json")" "renamed delta"
+assert_equals "Rename found under the new URI" "$(summarize_feed "$TEMP_DIR/new.json")" "renamed delta"
+UNTOUCHED=$(python3 "$HISTORY" --db "$DB" concept "$TERMS/gamma" 2>&1 >/dev/null)
+assert_contains "Unchanged concept has no history" "$UNTOUCHED" "0 change(s)"
+
+# Test 4: Change feed
+echo "Test: Change feed"
+python3 "$HISTORY" --db "$DB" since 0.0.1 -o "$TEMP_DIR/feed.json" 2>/dev/null
+assert_equals "Raw feed keeps every change" "$(summarize_feed "$TEMP_DIR/feed.json" | wc -l)" "6"
+python3 "$HISTORY" --db "$DB" since 0.0.1 --net -o "$TEMP_DIR/net.json" 2>/dev/null
+NET=$(summarize_feed "$TEMP_DIR/net.json" | tr '\n' ';')
+assert_equals "Net feed folds, cancels and splits renames" "$NET" \
+    "modified alpha prefLabel;modified beta altLabel;added delta;removed delta-old;"
+MERGED=$(python3 -c '
+import json, sys
+c = json.load(open(sys.argv[1]))["changes"][0]["changes"]["prefLabel"]
+print(c["old"][0], "->", c["new"][0])
+' "$TEMP_DIR/net.json")
+assert_equals "Consecutive modifications merged" "$MERGED" "Alpha -> Alpha Two"
+python3 "$HISTORY" --db "$DB" since 0.0.3 -o "$TEMP_DIR/latest.json" 2>/dev/null
+assert_equals "Nothing after the latest version" "$(summarize_feed "$TEMP_DIR/latest.json" | wc -l)" "0"
+set +e
+UNKNOWN=$(python3 "$HISTORY" --db "$DB" since 9.9.9 2>&1)
+STATUS=$?
+set -e
+assert_equals "Unknown version exits 1" "$STATUS" "1"
+assert_contains "Unknown version reported" "$UNKNOWN" "Version 9.9.9 is not in the history"
+
+# Test 5: Recording after a prune
+echo "Test: Recording after a prune"
+# v0.0.4 relabels gamma; v0.0.1 and v0.0.2 are pruned from the manifest first
+sed 's/"Gamma"@en/"Gamma Ray"@en/' "$TEMP_DIR/v3.ttl" > "$TEMP_DIR/store/glossary-v0.0.4.ttl"
+python3 -c '
+import json, sys
+m = json.load(open(sys.argv[1]))
+m["snapshots"] = m["snapshots"][2:] + [{"version": "0.0.4", "timestamp": "2026-01-04T00:00:00Z",
+                                        "file": "glossary-v0.0.4.ttl"}]
+json.dump(m, open(sys.argv[2], "w"))
+' "$MANIFEST" "$TEMP_DIR/store/pruned.json"
+PRUNED=$(python3 "$HISTORY" --db "$DB" record --manifest "$TEMP_DIR/store/pruned.json" 2>&1 || true)
+assert_contains "Recording continues after a prune" "$PRUNED" "v0.0.4: 0 added, 0 removed, 0 renamed, 1 modified"
+assert_contains "Only the new version recorded" "$PRUNED" "Recorded 1 new version(s)"
+assert_equals "Pruned versions keep their history" "$(python3 "$HISTORY" --db "$DB" versions 2>&1 | cut -f1 | tr '\n' ' ')" \
+    "v0.0.1 v0.0.2 v0.0.3 v0.0.4 "
+
+# Test 6: Query speed over many versions
+echo "Test: Query speed"
+TIMING=$(python3 - "$HISTORY" "$TEMP_DIR/many.db" <<'PY'
+import importlib.util, os, sys, time
+sys.path.insert(0, os.path.dirname(sys.argv[1]))
+spec = importlib.util.spec_from_file_location("change_history", sys.argv[1])
+history = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(history)
+db = history.open_store(sys.argv[2])
+terms = "http://glossary.example.org/terms/"
+for v in range(500):
+    changes = [
+        {"action": "modified", "uri": f"{terms}term-{(v * 7 + i) % 2000}",
+         "label": f"Term {i}", "changes": {"definition": {"old": [str(v)], "new": [str(v + 1)]}}}
+        for i in range(40)
+    ]
+    history.append_version(db, {"version": f"1.{v}"}, changes)
+touched = {f"{terms}term-{(v * 7 + i) % 2000}" for v in range(491, 500) for i in range(40)}
+history.net_changes(history.changes_since(db, "1.490"))  # warm the page cache
+start = time.perf_counter()
+found = history.concept_history(db, f"{terms}term-7")
+net = history.net_changes(history.changes_since(db, "1.490"))
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(len(found) > 0, len(net) == len(touched), "fast" if elapsed_ms < 250 else f"{elapsed_ms:.0f}ms")
+PY
+)
+assert_equals "Concept history and net feed read from the index" "$TIMING" "True True fast"
+
+echo ""
+echo "Change History Tests: $PASS passed, $FAIL failed"
+exit $FAIL
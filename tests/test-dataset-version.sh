@@ -0,0 +1,159 @@
+#!/usr/bin/env bash
+# Test dataset-version.py and version-keyed caching against a local stand-in.
+#
+# Runs offline: the stand-in plays both Fuseki and Varnish (--cache with
+# --version-file), so the checks cover version stamping in Fuseki and the
+# version file, cache keys that change with the version, ETag/304
+# revalidation, and the ban fallback when the VCL cannot be reloaded.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-dataset-version-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+VERSIONS="$PROJECT_DIR/scripts/dataset-version.py"
+export DATASET_VERSION_FILE="$TEMP_DIR/state/dataset-version"
+# "true" stands in for a successful varnishreload
+export VARNISH_RELOAD="true"
+export STATIC_VIEWS_DIR=""
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# cached_get URL [CURL_ARGS...] -- status line and headers of a cached query
+cached_get() {
+    local url="$1"
+    shift
+    curl -s -o /dev/null -D - "$url/skosmos/sparql?query=ASK%20%7B%20%3Fs%20%3Fp%20%3Fo%20%7D" \
+        -H "Accept: application/sparql-results+json" "$@" | tr -d '\r'
+}
+
+bans() {
+    curl -s "$1/\$/stats" | python3 -c "import json, sys; print(json.load(sys.stdin)['bans'])"
+}
+
+echo "=== Dataset Version Tests ==="
+echo ""
+
+start_stand_in cache --cache --version-file "$DATASET_VERSION_FILE" "$PROJECT_DIR"/data/*.ttl
+CACHE_URL="$STAND_IN_URL"
+export FUSEKI_URL="$CACHE_URL" VARNISH_URL="$CACHE_URL"
+
+# Test 1: Stamping bumps the version in Fuseki and in the file
+echo "Test: Stamp records the same version in Fuseki and the file"
+python3 "$VERSIONS" stamp > /dev/null
+STAMP_OUTPUT=$(python3 "$VERSIONS" stamp 2>&1)
+assert_contains "Second stamp is version 2" "$STAMP_OUTPUT" "Dataset version 2 written"
+assert_equals "File holds the version" "$(cat "$DATASET_VERSION_FILE")" "2"
+SHOW_OUTPUT=$(python3 "$VERSIONS" show)
+assert_contains "Fuseki holds the version" "$SHOW_OUTPUT" "Fuseki: 2"
+
+# Test 2: The version never goes backwards
+echo "Test: A newer file version is never undercut"
+echo 10 > "$DATASET_VERSION_FILE"
+python3 "$VERSIONS" stamp > /dev/null
+assert_contains "Stamped past the file" "$(python3 "$VERSIONS" show)" "Fuseki: 11"
+
+# Test 3: A new version stops old cache entries matching without a ban
+echo "Test: Cache entries are keyed on the dataset version"
+cached_get "$CACHE_URL" > /dev/null
+assert_contains "Cached under the current version" "$(cached_get "$CACHE_URL")" "X-Cache: HIT"
+RELOAD_OUTPUT=$(python3 "$VERSIONS" stamp 2>&1)
+assert_contains "VCL reloaded" "$RELOAD_OUTPUT" "cached under version 12"
+assert_contains "Miss after the new version" "$(cached_get "$CACHE_URL")" "X-Cache: MISS"
+assert_equals "No ban needed" "$(bans "$CACHE_URL")" "0"
+
+# Test 4: Clients revalidate against the version ETag
+echo "Test: ETag revalidation"
+HEADERS=$(cached_get "$CACHE_URL")
+assert_contains "Weak version ETag" "$HEADERS" 'ETag: W/"egms-v12"'
+assert_contains "304 for the current ETag" \
+    "$(cached_get "$CACHE_URL" -H 'If-None-Match: W/"egms-v12"')" "HTTP/1.1 304"
+assert_contains "200 for an old ETag" \
+    "$(cached_get "$CACHE_URL" -H 'If-None-Match: W/"egms-v11"')" "HTTP/1.1 200"
+
+# Test 5: A failed VCL reload falls back to a ban
+echo "Test: Failed reload bans the cache instead"
+FALLBACK_OUTPUT=$(VARNISH_RELOAD="false" python3 "$VERSIONS" stamp 2>&1)
+assert_contains "Reload failure reported" "$FALLBACK_OUTPUT" "WARNING: Could not reload Varnish VCL"
+assert_equals "Cache banned once" "$(bans "$CACHE_URL")" "1"
+
+# Test 6: Loaders stamp a new version after every successful load
+echo "Test: load-data.sh and blue-green-load.py stamp new versions"
+LOAD_OUTPUT=$(bash "$PROJECT_DIR/scripts/load-data.sh" "$PROJECT_DIR/data/enterprise-glossary.ttl" 2>&1 || true)
+assert_contains "Bulk load stamped" "$LOAD_OUTPUT" "Dataset version 14 written"
+SWAP_OUTPUT=$(python3 "$PROJECT_DIR/scripts/blue-green-load.py" load "$PROJECT_DIR"/data/*.ttl 2>&1 || true)
+assert_contains "Swap stamped" "$SWAP_OUTPUT" "now serves .* triples (version 15)"
+ROLLBACK_OUTPUT=$(python3 "$PROJECT_DIR/scripts/blue-green-load.py" rollback 2>&1 || true)
+assert_contains "Rollback gets a new version" "$ROLLBACK_OUTPUT" "(version 16)"
+# A version file that cannot be written fails the stamp after the load
+touch "$TEMP_DIR/not-a-directory"
+set +e
+UNSTAMPED=$(DATASET_VERSION_FILE="$TEMP_DIR/not-a-directory/version" bash "$PROJECT_DIR/scripts/load-data.sh" \
+    "$PROJECT_DIR/data/enterprise-glossary.ttl" 2>&1)
+UNSTAMPED_EXIT=$?
+set -e
+assert_contains "Failed stamp is a warning" "$UNSTAMPED" "WARNING: Could not stamp the dataset version"
+assert_equals "Load still succeeds" "$UNSTAMPED_EXIT" "0"
+
+echo ""
+echo "Dataset Version Tests: $PASS passed, $FAIL failed"
+exit $FAIL
@@ -378,22 +378,25 @@ assert_latency_under "Cached query response time" "$LATENCY" 1000
 echo ""
 
 # =========================================================================
-# Section 4: Snapshot and Audit Trail (3 tests)
+# Section 4: Snapshot and Audit Trail (4 tests)
 # =========================================================================
 
 echo "-- Section 4: Snapshot and Audit Trail --"
 
 SNAPSHOT_DIR="$PROJECT_DIR/snapshots"
 
-# Back up manifest if it exists
+# Back up manifest and change history if they exist
 if [ -f "$SNAPSHOT_DIR/manifest.json" ]; then
     cp "$SNAPSHOT_DIR/manifest.json" "$TEMP_DIR/manifest-backup.json"
 fi
+if [ -f "$SNAPSHOT_DIR/history.db" ]; then
+    cp "$SNAPSHOT_DIR/history.db" "$TEMP_DIR/history-backup.db"
+fi
 
-# 4.1 Snapshot creates versioned file
+# 4.1 Snapshot creates versioned, verifiable entry
 echo "Test 4.1: Snapshot creates versioned file"
 if bash "$PROJECT_DIR/scripts/snapshot.sh" --version "99.0.1" --message "E2E test snapshot 1" 2>/dev/null; then
-    SNAP_FILE=$(ls "$SNAPSHOT_DIR"/glossary-v99.0.1-*.ttl 2>/dev/null | head -1)
+    SNAP_FILE=$(ls "$SNAPSHOT_DIR"/glossary-v99.0.1-* 2>/dev/null | head -1)
     if [ -n "$SNAP_FILE" ] && [ -s "$SNAP_FILE" ]; then
         MANIFEST_CONTENT=$(cat "$SNAPSHOT_DIR/manifest.json")
         assert_contains "Manifest contains test version" "$MANIFEST_CONTENT" "99.0.1"
@@ -408,17 +411,14 @@ fi
 
 # 4.2 Audit log compares two snapshots
 echo "Test 4.2: Audit log compares two snapshots"
-# Create a second snapshot (identical data)
+# Create a second snapshot (identical data, stored as an empty delta)
 if bash "$PROJECT_DIR/scripts/snapshot.sh" --version "99.0.2" --message "E2E test snapshot 2" 2>/dev/null; then
-    SNAP1=$(ls "$SNAPSHOT_DIR"/glossary-v99.0.1-*.ttl 2>/dev/null | head -1)
-    SNAP2=$(ls "$SNAPSHOT_DIR"/glossary-v99.0.2-*.ttl 2>/dev/null | head -1)
-    if [ -n "$SNAP1" ] && [ -n "$SNAP2" ]; then
-        AUDIT_OUTPUT=$(python3 "$PROJECT_DIR/scripts/audit-log.py" "$SNAP1" "$SNAP2" 2>/dev/null)
-        assert_contains "Audit log shows zero additions" "$AUDIT_OUTPUT" '"added": 0'
-    else
-        echo "  FAIL: Could not find both snapshot files"
-        FAIL=$((FAIL + 1))
-    fi
+    VERIFY_OUTPUT=$(python3 "$PROJECT_DIR/scripts/snapshot-store.py" verify \
+        --manifest "$SNAPSHOT_DIR/manifest.json" --version 99.0.2 2>&1 || true)
+    assert_contains "Delta snapshot reconstructs and verifies" "$VERIFY_OUTPUT" "OK: v99.0.2"
+    AUDIT_OUTPUT=$(python3 "$PROJECT_DIR/scripts/audit-log.py" \
+        --manifest "$SNAPSHOT_DIR/manifest.json" 2>/dev/null)
+    assert_contains "Audit log shows zero additions" "$AUDIT_OUTPUT" '"added": 0'
 else
     echo "  FAIL: Second snapshot failed"
     FAIL=$((FAIL + 1))
@@ -426,8 +426,14 @@ fi
 
 # 4.3 Cleanup snapshots
 echo "Test 4.3: Cleanup test snapshots"
-# Remove 99.0.x snapshot files
+# Remove 99.0.x snapshot files (and their hash sidecars)
 rm -f "$SNAPSHOT_DIR"/glossary-v99.0.*
+# Restore the change history, which is append-only
+if [ -f "$TEMP_DIR/history-backup.db" ]; then
+    cp "$TEMP_DIR/history-backup.db" "$SNAPSHOT_DIR/history.db"
+else
+    rm -f "$SNAPSHOT_DIR/history.db"
+fi
 # Filter 99.0.x entries from manifest
 if [ -f "$TEMP_DIR/manifest-backup.json" ]; then
     cp "$TEMP_DIR/manifest-backup.json" "$SNAPSHOT_DIR/manifest.json"
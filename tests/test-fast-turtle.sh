@@ -0,0 +1,188 @@
+#!/usr/bin/env bash
+# Test fast-turtle.py.
+#
+# Runs offline: checks that the fast reader gives the same triples as
+# rdflib on the data files and on the dialect's edge cases, that files
+# outside the dialect fall back to rdflib without duplicates, and that
+# skos-to-csv.py, validate-skos.py and audit-log.py see no difference
+# between the two paths.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-fast-turtle-$$"
+mkdir -p "$TEMP_DIR"
+READER="$PROJECT_DIR/scripts/fast-turtle.py"
+GLOSSARY="$PROJECT_DIR/data/enterprise-glossary.ttl"
+
+cleanup() {
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# Prints "<path-taken> <triples> <rdflib triples> <same|different> <duplicates>"
+compare_with_rdflib() {
+    python3 - "$READER" "$1" <<'PY'
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("fast_turtle", sys.argv[1])
+reader = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(reader)
+from rdflib import Graph, BNode
+fallbacks = []
+triples = list(reader.iter_triples(sys.argv[2], on_fallback=lambda *a: fallbacks.append(a)))
+g = Graph()
+g.parse(sys.argv[2], format="turtle")
+ground = lambda ts: {t for t in ts if not any(isinstance(x, BNode) for x in t)}
+same = ground(triples) == ground(g) and len(set(triples)) == len(g)
+print("rdflib" if fallbacks else "fast", len(set(triples)), len(g),
+      "same" if same else "different", len(triples) - len(set(triples)))
+PY
+}
+
+cat > "$TEMP_DIR/dialect.ttl" <<'TTL'
+@prefix eg: <http://glossary.example.org/terms/> .
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+PREFIX dct: <http://purl.org/dc/terms/>
+@prefix : <http://example.org/default#> .
+
+# Comment line
+eg:escapes a skos:Concept ;
+    skos:prefLabel "Quote \" tab \t newline \n unicode é \U0001F600"@en-GB ;
+    skos:altLabel "Plain", "Zweite"@de ,
+        "Third"@en ;   # trailing comment
+    dct:created "2026-02-20"^^xsd:date ;
+    dct:modified "2026-02-21"^^<http://www.w3.org/2001/XMLSchema#date> ;
+    eg:count 12, -3.5, +7, true ;
+    :local : ;
+    skos:related eg:with.dots , eg: ;
+    .
+<http://glossary.example.org/terms/iri-subject> <http://www.w3.org/2004/02/skos/core#broader> eg:escapes.
+eg:split
+    skos:broader
+        eg:escapes
+    .
+TTL
+
+cat > "$TEMP_DIR/outside.ttl" <<'TTL'
+@prefix eg: <http://glossary.example.org/terms/> .
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+eg:first skos:prefLabel "Read by the fast reader"@en .
+eg:second skos:note [ skos:prefLabel "Blank node"@en ] .
+eg:third skos:definition """A long
+string"""@en .
+TTL
+
+# Valid local names the fast reader's pattern stops short of
+cat > "$TEMP_DIR/escaped.ttl" <<'TTL'
+@prefix e: <http://example.org/e/> .
+e:a e:p e:b%20c .
+e:a e:p e:d\.e, e:f .
+TTL
+
+echo "=== Fast Turtle Reader Tests ==="
+echo ""
+
+# Test 1: The data files take the fast path and match rdflib
+echo "Test: Data files"
+CHECK=$(python3 "$READER" check "$PROJECT_DIR"/data/*.ttl 2>&1)
+assert_contains "All data files read by the fast reader" "$CHECK" "3 of 3 files read by the fast reader"
+for f in concept-scheme enterprise-glossary imported-glossary; do
+    assert_contains "$f.ttl matches rdflib" "$(compare_with_rdflib "$PROJECT_DIR/data/$f.ttl")" "^fast \([0-9]*\) \1 same"
+done
+
+# Test 2: Every construct of the dialect
+echo "Test: Dialect edge cases"
+DIALECT=$(compare_with_rdflib "$TEMP_DIR/dialect.ttl")
+assert_contains "Fast path taken" "$DIALECT" "^fast "
+assert_contains "Same triples as rdflib" "$DIALECT" "^fast 16 16 same 0"
+
+# Test 3: Constructs outside the dialect fall back to rdflib
+echo "Test: Fallback"
+OUTSIDE=$(compare_with_rdflib "$TEMP_DIR/outside.ttl")
+assert_contains "rdflib takes over" "$OUTSIDE" "^rdflib "
+assert_contains "Same triples, none yielded twice" "$OUTSIDE" "^rdflib 4 4 same 0"
+CHECK=$(python3 "$READER" check "$TEMP_DIR/outside.ttl" 2>&1)
+assert_contains "Reason reported" "$CHECK" "outside.ttl: rdflib (line 4: .*), 4 triples"
+assert_contains "Escaped local names: no truncated triple kept" \
+    "$(compare_with_rdflib "$TEMP_DIR/escaped.ttl")" "^rdflib 3 3 same 0"
+LOADED=$(python3 - "$READER" "$TEMP_DIR/escaped.ttl" <<'PY'
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("fast_turtle", sys.argv[1])
+reader = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(reader)
+print(sorted(str(o) for o in reader.load_graph([sys.argv[2]]).objects()))
+PY
+)
+assert_equals "load_graph keeps only rdflib's triples" "$LOADED" \
+    "['http://example.org/e/b%20c', 'http://example.org/e/d.e', 'http://example.org/e/f']"
+printf '@prefix eg: <http://glossary.example.org/terms/> .\neg:a eg:p "x" ;\n' > "$TEMP_DIR/broken.ttl"
+set +e
+BROKEN=$(python3 "$READER" check "$TEMP_DIR/broken.ttl" 2>&1)
+BROKEN_EXIT=$?
+set -e
+assert_equals "Syntax error exits 1" "$BROKEN_EXIT" "1"
+assert_contains "Syntax error reported by rdflib" "$BROKEN" "ERROR: Syntax error in .*broken.ttl"
+
+# Test 4: Consumers see no difference between the two paths
+echo "Test: Consumers"
+cp "$GLOSSARY" "$TEMP_DIR/glossary-fast.ttl"
+{ cat "$GLOSSARY"; echo '[] a <http://example.org/Unrelated> .'; } > "$TEMP_DIR/glossary-rdflib.ttl"
+assert_contains "Variant forces the fallback" "$(compare_with_rdflib "$TEMP_DIR/glossary-rdflib.ttl")" "^rdflib "
+python3 "$PROJECT_DIR/scripts/skos-to-csv.py" "$TEMP_DIR/glossary-fast.ttl" -o "$TEMP_DIR/fast.csv" 2>/dev/null
+python3 "$PROJECT_DIR/scripts/skos-to-csv.py" "$TEMP_DIR/glossary-rdflib.ttl" -o "$TEMP_DIR/rdflib.csv" 2>/dev/null
+assert_equals "skos-to-csv.py output identical" "$(cmp -s "$TEMP_DIR/fast.csv" "$TEMP_DIR/rdflib.csv" && echo same)" "same"
+assert_equals "skos-to-csv.py exported every concept" "$(($(wc -l < "$TEMP_DIR/fast.csv") - 1))" \
+    "$(grep -c ' a skos:Concept' "$GLOSSARY")"
+VALIDATE=$(python3 "$PROJECT_DIR/scripts/validate-skos.py" "$PROJECT_DIR"/data/*.ttl 2>&1)
+assert_contains "validate-skos.py passes the data files" "$VALIDATE" "VALIDATION PASSED"
+set +e
+VALIDATE=$(python3 "$PROJECT_DIR/scripts/validate-skos.py" "$TEMP_DIR/broken.ttl" 2>&1)
+set -e
+assert_contains "validate-skos.py reports the syntax error" "$VALIDATE" "Syntax error in .*broken.ttl"
+AUDIT=$(python3 "$PROJECT_DIR/scripts/audit-log.py" "$TEMP_DIR/glossary-rdflib.ttl" "$TEMP_DIR/glossary-fast.ttl" 2>&1)
+assert_contains "audit-log.py finds no changes between the paths" "$AUDIT" "Changes: 0 added, 0 removed, 0 renamed, 0 modified"
+
+# Test 5: Benchmark
+echo "Test: Benchmark"
+BENCH=$(python3 "$READER" bench "$PROJECT_DIR/data/imported-glossary.ttl" --scale 2 2>&1)
+assert_contains "Scaled file parsed" "$BENCH" "x2: .* [0-9]* triples"
+assert_contains "Fast reader timed" "$BENCH" "fast reader, streaming *[0-9.]*s"
+assert_contains "Same triples as rdflib" "$BENCH" "Same triples: yes"
+
+echo ""
+echo "Fast Turtle Reader Tests: $PASS passed, $FAIL failed"
+exit $FAIL
@@ -0,0 +1,196 @@
+#!/usr/bin/env bash
+# Test glossary-api.py, the in-memory read-replica API.
+#
+# Runs offline: serves data/*.ttl and a snapshot manifest on local ports
+# and checks concept, lookup and batch responses, conditional requests,
+# error statuses, keep-alive, and hot reload of changed data files and
+# new snapshots (including a broken reload that keeps the old index).
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-glossary-api-$$"
+mkdir -p "$TEMP_DIR"
+API_PIDS=""
+API="$PROJECT_DIR/scripts/glossary-api.py"
+STORE="$PROJECT_DIR/scripts/snapshot-store.py"
+
+cleanup() {
+    for pid in $API_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_api NAME [ARGS...] -- sets API_URL to the service base URL
+start_api() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$API" --port 0 --bind 127.0.0.1 --port-file "$port_file" "$@" \
+        > /dev/null 2> "$TEMP_DIR/$name.log" &
+    API_PIDS="$API_PIDS $!"
+    for _ in $(seq 1 300); do
+        if [ -f "$port_file" ]; then
+            API_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: glossary API '$name' did not start" >&2
+    cat "$TEMP_DIR/$name.log" >&2
+    exit 1
+}
+
+# wait_for URL EXPECTED -- poll until the response contains EXPECTED (up to 15s)
+wait_for() {
+    for _ in $(seq 1 150); do
+        if curl -s "$1" | grep -q -- "$2"; then
+            return 0
+        fi
+        sleep 0.1
+    done
+    return 1
+}
+
+status_of() {
+    curl -s -o /dev/null -w '%{http_code}' "$@"
+}
+
+echo "=== Glossary API Tests ==="
+echo ""
+
+start_api data --reload-interval 0 "$PROJECT_DIR"/data/*.ttl
+DATA_URL="$API_URL"
+
+# Test 1: Concepts by slug and URI
+echo "Test: Concept documents"
+CONCEPT=$(curl -s -D "$TEMP_DIR/headers" "$DATA_URL/concept/deployment-pipeline")
+assert_equals "Concept served as JSON-LD" \
+    "$(curl -s -o /dev/null -w '%{content_type}' "$DATA_URL/concept/deployment-pipeline")" "application/ld+json"
+assert_contains "Same document as the static views" "$CONCEPT" '"prefLabel":{"en":"Deployment Pipeline"'
+assert_contains "Narrower summaries embedded" "$CONCEPT" '"narrower":\[{"@id":"http://glossary.example.org/terms/canary-release"'
+ETAG=$(sed -n 's/^ETag: \(.*\)\r$/\1/p' "$TEMP_DIR/headers")
+assert_equals "If-None-Match gets 304" "$(status_of -H "If-None-Match: $ETAG" "$DATA_URL/concept/deployment-pipeline")" "304"
+assert_contains "Concept by URI" "$(curl -s "$DATA_URL/concept/http%3A%2F%2Fglossary.example.org%2Fterms%2Fci-cd")" '"slug":"ci-cd"'
+assert_equals "Unknown concept is 404" "$(status_of "$DATA_URL/concept/no-such-term")" "404"
+
+# Test 2: Label lookup
+echo "Test: Label lookup"
+LOOKUP=$(curl -s "$DATA_URL/lookup?label=release%20PIPELINE")
+assert_contains "altLabel matched ignoring case" "$LOOKUP" '"slug":"deployment-pipeline".*"matched":"Release Pipeline","kind":"altLabel"'
+LANG_LOOKUP=$(curl -s "$DATA_URL/lookup?label=pipeline%20de%20despliegue&lang=es")
+assert_contains "Language-filtered lookup" "$LANG_LOOKUP" '"kind":"prefLabel","lang":"es"'
+assert_equals "Other languages filtered out" \
+    "$(curl -s "$DATA_URL/lookup?label=CI/CD&lang=fr" | grep -o '"lang":"' | wc -l | tr -d ' ')" "1"
+assert_equals "Missing label is 400" "$(status_of "$DATA_URL/lookup")" "400"
+
+# Test 3: Batch resolution
+echo "Test: Batch endpoint"
+BATCH=$(curl -s -d '{"concepts": ["api", "no-such-term"], "labels": ["Deploy Pipeline"]}' "$DATA_URL/batch")
+assert_equals "Batch resolves concepts and labels" "$(echo "$BATCH" | python3 -c "
+import json, sys
+b = json.load(sys.stdin)
+print(b['concepts']['api']['slug'], b['concepts']['no-such-term'], b['labels']['Deploy Pipeline'][0]['slug'])")" \
+    "api None deployment-pipeline"
+assert_equals "Invalid JSON is 400" "$(status_of -d '{"concepts": ' "$DATA_URL/batch")" "400"
+assert_equals "Non-string keys are 400" "$(status_of -d '{"concepts": [1]}' "$DATA_URL/batch")" "400"
+BIG=$(python3 -c "import json; print(json.dumps({'concepts': ['api'] * 1001}))")
+assert_equals "Oversized batch is 413" "$(status_of -d "$BIG" "$DATA_URL/batch")" "413"
+assert_equals "GET /batch is 405" "$(status_of "$DATA_URL/batch")" "405"
+
+# Test 4: Health and keep-alive
+echo "Test: Health and keep-alive"
+assert_contains "Health reports the index" "$(curl -s "$DATA_URL/health")" '"concepts":638,"source":"3 data files"'
+KEEPALIVE=$(curl -sv "$DATA_URL/concept/api" "$DATA_URL/concept/ci-cd" "$DATA_URL/health" 2>&1 >/dev/null)
+assert_contains "Connection reused across requests" "$KEEPALIVE" "Re-using existing connection"
+
+# Test 5: Hot reload of data files
+echo "Test: Data files are hot-reloaded"
+mkdir -p "$TEMP_DIR/data"
+cp "$PROJECT_DIR"/data/concept-scheme.ttl "$PROJECT_DIR"/data/enterprise-glossary.ttl "$TEMP_DIR/data/"
+start_api reload --reload-interval 0.2 "$TEMP_DIR/data/*.ttl"
+RELOAD_URL="$API_URL"
+sed -i 's/"Deployment Pipeline"@en/"Delivery Pipeline"@en/' "$TEMP_DIR/data/enterprise-glossary.ttl"
+wait_for "$RELOAD_URL/concept/deployment-pipeline" '"en":"Delivery Pipeline"' || true
+assert_contains "Edited label served after reload" \
+    "$(curl -s "$RELOAD_URL/lookup?label=delivery%20pipeline")" '"slug":"deployment-pipeline"'
+cp "$PROJECT_DIR/data/imported-glossary.ttl" "$TEMP_DIR/data/"
+wait_for "$RELOAD_URL/health" '"concepts":638' || true
+assert_contains "New data file picked up" "$(curl -s "$RELOAD_URL/health")" '"concepts":638,"source":"3 data files"'
+echo "this is not turtle" >> "$TEMP_DIR/data/enterprise-glossary.ttl"
+for _ in $(seq 1 50); do
+    grep -q "reload failed" "$TEMP_DIR/reload.log" && break
+    sleep 0.1
+done
+assert_contains "Broken reload reported" "$(cat "$TEMP_DIR/reload.log")" "ERROR: reload failed, still serving 3 data files"
+assert_equals "Old index still served" "$(status_of "$RELOAD_URL/concept/deployment-pipeline")" "200"
+
+# Test 6: Snapshot source
+echo "Test: Newest snapshot is served and followed"
+mkdir -p "$TEMP_DIR/snapshots"
+cp "$PROJECT_DIR/data/concept-scheme.ttl" "$TEMP_DIR/v1.ttl"
+python3 "$STORE" add "$TEMP_DIR/v1.ttl" --manifest "$TEMP_DIR/snapshots/manifest.json" --version 0.0.1 > /dev/null
+start_api snapshot --reload-interval 0.2 --snapshot-manifest "$TEMP_DIR/snapshots/manifest.json"
+SNAPSHOT_URL="$API_URL"
+assert_contains "Snapshot version served" "$(curl -s "$SNAPSHOT_URL/health")" '"source":"snapshot v0.0.1"'
+assert_equals "Concept from a later version absent" "$(status_of "$SNAPSHOT_URL/concept/deployment-pipeline")" "404"
+python3 - "$PROJECT_DIR"/data/concept-scheme.ttl "$PROJECT_DIR"/data/enterprise-glossary.ttl <<'PY' > "$TEMP_DIR/v2.ttl"
+import sys
+from rdflib import Graph
+g = Graph()
+for path in sys.argv[1:]:
+    g.parse(path, format="turtle")
+print(g.serialize(format="turtle"))
+PY
+python3 "$STORE" add "$TEMP_DIR/v2.ttl" --manifest "$TEMP_DIR/snapshots/manifest.json" --version 0.0.2 > /dev/null
+wait_for "$SNAPSHOT_URL/health" "snapshot v0.0.2" || true
+assert_contains "New snapshot picked up" "$(curl -s "$SNAPSHOT_URL/health")" '"source":"snapshot v0.0.2"'
+assert_equals "Concept from the new version served" "$(status_of "$SNAPSHOT_URL/concept/deployment-pipeline")" "200"
+
+# Test 7: Startup failures
+echo "Test: Unloadable sources"
+set +e
+python3 "$API" --port 0 "$TEMP_DIR/missing/*.ttl" > /dev/null 2>&1
+MISSING_EXIT=$?
+set -e
+assert_equals "No data files fails" "$MISSING_EXIT" "1"
+
+echo ""
+echo "Glossary API Tests: $PASS passed, $FAIL failed"
+exit $FAIL
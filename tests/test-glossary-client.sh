@@ -0,0 +1,224 @@
+#!/usr/bin/env bash
+# Test glossary-client.py against a local Fuseki stand-in.
+#
+# Runs offline: checks that concurrent lookups are coalesced into batched
+# VALUES queries, duplicates share one request, the LRU cache answers
+# repeats, batches are split at --max-batch, expired entries are
+# revalidated with If-None-Match until the dataset version changes, and a
+# response cut short fails its lookups instead of leaving them waiting.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-glossary-client-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+CLIENT="$PROJECT_DIR/scripts/glossary-client.py"
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# client_run URL SCRIPT -- run an asyncio snippet with `gc` (the module) and `url` bound
+client_run() {
+    python3 - "$PROJECT_DIR/scripts" "$1" <<PY
+import asyncio, importlib.util, json, os, sys
+sys.path.insert(0, sys.argv[1])
+spec = importlib.util.spec_from_file_location("glossary_client", os.path.join(sys.argv[1], "glossary-client.py"))
+gc = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(gc)
+url = sys.argv[2]
+$2
+PY
+}
+
+echo "=== Glossary Client Tests ==="
+echo ""
+
+export VERSION_FILE="$TEMP_DIR/version"
+echo "3" > "$VERSION_FILE"
+start_stand_in cache --cache --version-file "$VERSION_FILE" "$PROJECT_DIR"/data/*.ttl
+CACHE_URL="$STAND_IN_URL"
+
+# Test 1: Command-line lookup by slug and URI
+echo "Test: Lookup resolves slugs and URIs"
+set +e
+LOOKUP=$(python3 "$CLIENT" --url "$CACHE_URL" --endpoint /skosmos/sparql lookup \
+    deployment-pipeline http://glossary.example.org/terms/ci-cd no-such-term)
+LOOKUP_EXIT=$?
+set -e
+assert_contains "Slug resolved" "$LOOKUP" '"label": "Deployment Pipeline"'
+assert_contains "URI resolved" "$LOOKUP" '"label": "CI/CD"'
+assert_contains "Unknown term is null" "$LOOKUP" '"no-such-term": null'
+assert_equals "Unknown term fails the lookup" "$LOOKUP_EXIT" "1"
+
+# Test 2: Coalescing, in-flight dedup and the LRU cache
+echo "Test: Concurrent lookups share one batched query"
+COALESCED=$(client_run "$CACHE_URL" '
+async def main():
+    uris = await gc.fetch_concept_uris(url, "/skosmos/sparql", 30, 10)
+    async with gc.GlossaryClient(url, "/skosmos/sparql", cache_size=25) as client:
+        first = await asyncio.gather(*(client.lookup(u) for u in uris + uris[:10]))
+        trips = client.stats["round_trips"]
+        again = await client.lookup_many(sorted(uris)[-5:])
+    print(trips, client.stats["coalesced"], client.stats["cache_hits"],
+          client.stats["round_trips"], len(client.cache), sum(t is not None for t in first),
+          all(t is not None for t in again.values()))
+asyncio.run(main())
+')
+assert_equals "40 lookups, 1 round trip, 10 coalesced, 5 cache hits, LRU bounded" \
+    "$COALESCED" "1 10 5 1 25 40 True"
+
+# Test 3: Batches are split at --max-batch
+echo "Test: Large batches are split"
+SPLIT=$(client_run "$CACHE_URL" '
+async def main():
+    uris = await gc.fetch_concept_uris(url, "/skosmos/sparql", 30, 10)
+    async with gc.GlossaryClient(url, "/skosmos/sparql", max_batch=10) as client:
+        terms = await client.lookup_many(uris)
+    print(client.stats["round_trips"], sum(t is not None for t in terms.values()))
+asyncio.run(main())
+')
+assert_equals "30 terms in 3 queries" "$SPLIT" "3 30"
+
+# Test 4: Revalidation against the version-wide ETag
+echo "Test: Expired entries are revalidated with If-None-Match"
+REVALIDATED=$(client_run "$CACHE_URL" '
+async def main():
+    async with gc.GlossaryClient(url, "/skosmos/sparql", ttl=0.2) as client:
+        await client.lookup_many(["deployment-pipeline", "ci-cd"])
+        await asyncio.sleep(0.3)
+        renewed = await client.lookup("ci-cd")
+        renewed_other = await client.lookup("deployment-pipeline")
+        print(client.stats["not_modified"], client.stats["round_trips"],
+              renewed["label"], renewed_other["label"])
+        open(os.environ["VERSION_FILE"], "w").write("4")
+        await asyncio.sleep(0.3)
+        await client.lookup("ci-cd")
+        print(client.stats["not_modified"], client.stats["round_trips"],
+              client.cache[client.uri_for("ci-cd")].etag)
+asyncio.run(main())
+' | tr '\n' ' ')
+assert_contains "304 renews every entry under the version ETag" "$REVALIDATED" "^1 2 CI/CD Deployment Pipeline "
+assert_contains "New version refetches" "$REVALIDATED" '1 3 W/"egms-v4"'
+echo "4" > "$VERSION_FILE"
+EVICTED=$(client_run "$CACHE_URL" '
+async def main():
+    async with gc.GlossaryClient(url, "/skosmos/sparql", ttl=0.2, cache_size=2) as client:
+        await client.lookup_many(["deployment-pipeline", "ci-cd"])
+        await asyncio.sleep(0.3)
+        task = asyncio.ensure_future(client.lookup("ci-cd"))
+        await asyncio.sleep(0)
+        # Other terms push the entry out of the LRU while it is being revalidated
+        client.store({"urn:x:1": None, "urn:x:2": None}, None)
+        renewed = await task
+        print(client.stats["not_modified"], (renewed or {}).get("label"), client.uri_for("ci-cd") in client.cache)
+asyncio.run(main())
+')
+assert_equals "304 restores an entry evicted in flight" "$EVICTED" "1 CI/CD True"
+
+# Test 5: Benchmark against per-term requests
+echo "Test: Benchmark reports the round-trip reduction"
+BENCH=$(python3 "$CLIENT" --url "$CACHE_URL" --endpoint /skosmos/sparql bench \
+    --pages 20 --terms-per-page 10 --concurrency 4 --vocabulary 100)
+assert_contains "Naive run is one request per term" "$BENCH" "Naive:      200 round trips"
+assert_contains "Latency percentiles" "$BENCH" "page p50 [0-9.]*ms, p95 [0-9.]*ms"
+assert_contains "Reduction reported" "$BENCH" "x fewer round trips"
+
+# A server that cuts every response body short
+python3 - "$TEMP_DIR/truncating.port" <<'PY' > /dev/null 2>&1 &
+import socket, sys
+server = socket.socket()
+server.bind(("127.0.0.1", 0))
+server.listen()
+open(sys.argv[1], "w").write(str(server.getsockname()[1]))
+while True:
+    conn, _ = server.accept()
+    conn.recv(65536)
+    conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/sparql-results+json\r\n"
+                 b"Content-Length: 1000\r\n\r\n{\"head\": ")
+    conn.close()
+PY
+STAND_IN_PIDS="$STAND_IN_PIDS $!"
+for _ in $(seq 1 100); do
+    [ -f "$TEMP_DIR/truncating.port" ] && break
+    sleep 0.1
+done
+TRUNCATED=$(client_run "http://127.0.0.1:$(cat "$TEMP_DIR/truncating.port")" '
+async def main():
+    async with gc.GlossaryClient(url, "/skosmos/sparql") as client:
+        try:
+            await asyncio.wait_for(client.lookup_many(["ci-cd", "api"]), 5)
+        except asyncio.TimeoutError:
+            print("hung")
+        except ConnectionError as e:
+            print("failed", len(client.in_flight))
+asyncio.run(main())
+')
+assert_equals "Truncated response fails every lookup in the batch" "$TRUNCATED" "failed 0"
+
+set +e
+python3 "$CLIENT" --url "http://127.0.0.1:9" lookup ci-cd > /dev/null 2>&1
+UNREACHABLE_EXIT=$?
+set -e
+assert_equals "Unreachable endpoint fails" "$UNREACHABLE_EXIT" "1"
+
+echo ""
+echo "Glossary Client Tests: $PASS passed, $FAIL failed"
+exit $FAIL
@@ -0,0 +1,194 @@
+#!/usr/bin/env bash
+# Test health-daemon.py against local Fuseki stand-ins.
+#
+# Runs offline: stand-ins play Fuseki, Varnish, SKOSMOS and the gateway,
+# a listener that never answers plays a hung service, and a fixture file
+# stands in for varnishstat. Checks that probes run concurrently, and the
+# up/latency/cache/count/age metrics served on /metrics.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-health-daemon-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+DAEMON="$PROJECT_DIR/scripts/health-daemon.py"
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# start_hung_service -- sets HUNG_URL to a listener that accepts but never replies
+start_hung_service() {
+    local port_file="$TEMP_DIR/hung.port"
+    python3 - "$port_file" > /dev/null 2>&1 <<'PY' &
+import socket, sys, time
+s = socket.socket()
+s.bind(("127.0.0.1", 0))
+s.listen(16)
+with open(sys.argv[1], "w") as f:
+    f.write(str(s.getsockname()[1]))
+held = []
+while True:
+    held.append(s.accept()[0])
+PY
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -s "$port_file" ]; then
+            HUNG_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: hung service did not start" >&2
+    exit 1
+}
+
+# metric TEXT NAME -- value of the first sample whose name and labels start with NAME
+metric() {
+    echo "$1" | grep -F -- "$2" | grep -v '^#' | head -n 1 | awk '{print $NF}'
+}
+
+echo "=== Health Daemon Tests ==="
+echo ""
+
+start_stand_in fuseki "$PROJECT_DIR"/data/*.ttl
+FUSEKI="$STAND_IN_URL"
+start_stand_in cache --cache "$PROJECT_DIR"/data/*.ttl
+CACHE="$STAND_IN_URL"
+start_hung_service
+
+# Stamp a dataset version and record a snapshot for the age metrics
+FUSEKI_URL="$FUSEKI" VARNISH_URL="" DATASET_VERSION_FILE="$TEMP_DIR/dataset-version" VARNISH_RELOAD="" \
+    python3 "$PROJECT_DIR/scripts/dataset-version.py" stamp > /dev/null
+STAMP_TIME=$(date -u -d "-2 hours" +%Y-%m-%dT%H:%M:%SZ 2>/dev/null \
+    || python3 -c "import datetime; print((datetime.datetime.utcnow() - datetime.timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M:%SZ'))")
+echo "{\"snapshots\": [{\"version\": \"1.0.0\", \"timestamp\": \"$STAMP_TIME\"}]}" > "$TEMP_DIR/manifest.json"
+echo '{"version": 1, "counters": {"MAIN.cache_hit": {"value": 90}, "MAIN.cache_miss": {"value": 10}}}' \
+    > "$TEMP_DIR/varnishstat.json"
+
+export FUSEKI_URL="$FUSEKI" CACHE_URL="$CACHE" SKOSMOS_URL="$CACHE" GATEWAY_URL="$CACHE"
+export VARNISHSTAT="cat $TEMP_DIR/varnishstat.json" SNAPSHOT_MANIFEST="$TEMP_DIR/manifest.json"
+
+# Test 1: One round against healthy services
+echo "Test: Metrics for healthy services"
+set +e
+ONCE=$(python3 "$DAEMON" --once)
+ONCE_EXIT=$?
+set -e
+assert_equals "All probes up" "$ONCE_EXIT" "0"
+assert_equals "Fuseki up" "$(metric "$ONCE" 'egms_probe_up{service="fuseki"}')" "1"
+assert_contains "Latency histogram" "$ONCE" 'egms_probe_duration_seconds_bucket{service="varnish",le="+Inf"} 1'
+assert_contains "Window quantiles" "$ONCE" 'egms_probe_latency_seconds{service="sparql",quantile="0.95"} [0-9.]*'
+assert_equals "Cache hit ratio" "$(metric "$ONCE" "egms_cache_hit_ratio")" "0.9000"
+EXPECTED_CONCEPTS=$(python3 -c "
+import sys
+from rdflib import Graph
+from rdflib.namespace import RDF, SKOS
+g = Graph()
+for path in sys.argv[1:]:
+    g.parse(path, format='turtle')
+print(len(set(g.subjects(RDF.type, SKOS.Concept))))" "$PROJECT_DIR"/data/*.ttl)
+assert_equals "Concept count" "$(metric "$ONCE" "egms_concepts ")" "$EXPECTED_CONCEPTS"
+assert_equals "Dataset version" "$(metric "$ONCE" "egms_dataset_version")" "1"
+LOAD_AGE=$(metric "$ONCE" "egms_last_load_age_seconds")
+assert_equals "Load age from the stamp" "$([ "$LOAD_AGE" -lt 60 ] && echo fresh)" "fresh"
+SNAPSHOT_AGE=$(metric "$ONCE" "egms_last_snapshot_age_seconds")
+assert_equals "Snapshot age from the manifest" \
+    "$([ "$SNAPSHOT_AGE" -ge 7200 ] && [ "$SNAPSHOT_AGE" -lt 7300 ] && echo "2h")" "2h"
+
+# Test 2: Hung services time out in parallel, not one after another
+echo "Test: Hung services are probed concurrently"
+START=$(date +%s%N)
+set +e
+HUNG=$(SKOSMOS_URL="$HUNG_URL" GATEWAY_URL="$HUNG_URL" VARNISHSTAT="" \
+    python3 "$DAEMON" --once --timeout 1)
+HUNG_EXIT=$?
+set -e
+ELAPSED_MS=$(( ($(date +%s%N) - START) / 1000000 ))
+assert_equals "Down service fails --once" "$HUNG_EXIT" "1"
+assert_equals "Hung SKOSMOS down" "$(metric "$HUNG" 'egms_probe_up{service="skosmos"}')" "0"
+assert_equals "Failure counted" "$(metric "$HUNG" 'egms_probe_failures_total{service="gateway"}')" "1"
+assert_equals "Healthy Fuseki still up" "$(metric "$HUNG" 'egms_probe_up{service="fuseki"}')" "1"
+assert_equals "Two timeouts cost one" "$([ "$ELAPSED_MS" -lt 1900 ] && echo parallel)" "parallel"
+
+# Test 3: Daemon mode serves /metrics and keeps accumulating
+echo "Test: /metrics endpoint"
+python3 "$DAEMON" --port 0 --port-file "$TEMP_DIR/daemon.port" --interval 0.2 > /dev/null 2>&1 &
+STAND_IN_PIDS="$STAND_IN_PIDS $!"
+for _ in $(seq 1 100); do
+    [ -s "$TEMP_DIR/daemon.port" ] && break
+    sleep 0.1
+done
+METRICS_URL="http://127.0.0.1:$(cat "$TEMP_DIR/daemon.port")/metrics"
+sleep 1
+echo '{"version": 1, "counters": {"MAIN.cache_hit": {"value": 120}, "MAIN.cache_miss": {"value": 30}}}' \
+    > "$TEMP_DIR/varnishstat.json"
+sleep 0.5
+CONTENT_TYPE=$(curl -s -o /dev/null -w "%{content_type}" "$METRICS_URL")
+assert_contains "Prometheus content type" "$CONTENT_TYPE" "text/plain; version=0.0.4"
+SCRAPE=$(curl -s "$METRICS_URL")
+assert_equals "Rounds accumulate" "$(metric "$SCRAPE" "egms_probe_rounds_total" | awk '{print ($1 >= 3)}')" "1"
+# 30 hits and 20 misses since the first sample in the window
+assert_equals "Hit ratio over the window" "$(metric "$SCRAPE" "egms_cache_hit_ratio")" "0.6000"
+assert_equals "Lifetime hit counter" "$(metric "$SCRAPE" "egms_varnish_cache_hits_total")" "120"
+
+echo ""
+echo "Health Daemon Tests: $PASS passed, $FAIL failed"
+exit $FAIL
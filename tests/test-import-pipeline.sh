@@ -0,0 +1,227 @@
+#!/usr/bin/env bash
+# Test import-pipeline.py against a local Fuseki stand-in.
+#
+# Runs offline: imports two markdown pages and checks that the in-process
+# stages produce what the md-to-csv.py -> csv-to-skos.py chain writes,
+# that unchanged stages are served from the cache, that a changed input
+# re-runs exactly the stages downstream of it, and that a validation
+# error stops the pipeline before loading.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-import-pipeline-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+PIPELINE="$PROJECT_DIR/scripts/import-pipeline.py"
+# Keep stamped dataset versions out of config/state; no Varnish to reload
+export DATASET_VERSION_FILE="$TEMP_DIR/dataset-version"
+export VARNISH_RELOAD=""
+export VARNISH_URL=""
+export STATIC_VIEWS_DIR=""
+export PIPELINE_CACHE_DIR="$TEMP_DIR/cache"
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# statuses JSON -- "stage=status ..." from a --json report
+statuses() {
+    echo "$1" | python3 -c "
+import json, sys
+print(' '.join(f\"{s['stage']}={s['status']}\" for s in json.load(sys.stdin)['stages']))"
+}
+
+# triple_count URL -- triples in the stand-in's glossary graph
+triple_count() {
+    curl -s "$1/skosmos/query" -H "Accept: application/sparql-results+json" \
+        --data-urlencode "query=SELECT (COUNT(*) AS ?n) WHERE { GRAPH <http://glossary.example.org/> { ?s ?p ?o } }" |
+        python3 -c "import json, sys; print(json.load(sys.stdin)['results']['bindings'][0]['n']['value'])"
+}
+
+echo "=== Import Pipeline Tests ==="
+echo ""
+
+mkdir -p "$TEMP_DIR/pages"
+cat > "$TEMP_DIR/pages/dev-glossary.md" <<'MD'
+---
+title: Dev Glossary
+---
+
+# Dev Glossary
+
+## Feature Flag (FF)
+
+A switch that turns functionality on or off at runtime without deploying new code.
+
+**Categories**: Access Control
+**Synonyms**: Feature Toggle
+
+---
+
+## Blue-Green Deployment
+
+Running two identical production environments and switching traffic between them.
+
+**Categories**: Accessibility
+
+---
+MD
+cat > "$TEMP_DIR/pages/seo-glossary.md" <<'MD'
+# SEO Glossary
+
+## Backlink
+
+A link from another website to a page on this one.
+
+**Categories**: Acquisition Metrics
+
+---
+
+## Feature Flag
+
+A runtime switch for functionality, used in experiments.
+
+**Categories**: Access Control
+
+---
+MD
+cp "$PROJECT_DIR/data/concept-scheme.ttl" "$TEMP_DIR/scheme.ttl"
+
+start_stand_in fuseki
+export FUSEKI_URL="$STAND_IN_URL"
+
+run_pipeline() {
+    python3 "$PIPELINE" "$TEMP_DIR"/pages/*.md -o "$TEMP_DIR/out.ttl" \
+        --inferred "$TEMP_DIR/inferred.ttl" --data "$TEMP_DIR/scheme.ttl" "$@"
+}
+
+# Test 1: Full run matches the separate-process chain and loads the result
+echo "Test: First run executes every stage"
+FIRST=$(run_pipeline --csv "$TEMP_DIR/out.csv" --collision-report "$TEMP_DIR/collisions.csv" --json 2>/dev/null)
+assert_equals "All stages ran" "$(statuses "$FIRST")" "parse=ran skos=ran infer=ran validate=ran load=ran"
+python3 "$PROJECT_DIR/scripts/md-to-csv.py" "$TEMP_DIR"/pages/*.md \
+    --category-map "$PROJECT_DIR/data/category-mapping.csv" -o "$TEMP_DIR/chain.csv" 2>/dev/null
+python3 "$PROJECT_DIR/scripts/csv-to-skos.py" "$TEMP_DIR/chain.csv" -o "$TEMP_DIR/chain.ttl" 2>/dev/null
+assert_equals "CSV identical to md-to-csv.py" "$(cmp -s "$TEMP_DIR/chain.csv" "$TEMP_DIR/out.csv" && echo same)" "same"
+assert_equals "Turtle identical to csv-to-skos.py" "$(cmp -s "$TEMP_DIR/chain.ttl" "$TEMP_DIR/out.ttl" && echo same)" "same"
+assert_contains "Inferred narrower triples written" "$(cat "$TEMP_DIR/inferred.ttl")" \
+    "core#narrower> <http://glossary.example.org/terms/"
+assert_contains "Collision report written" "$(cat "$TEMP_DIR/collisions.csv")" "^feature-flag,Feature Flag,seo-glossary.md"
+EXPECTED_TRIPLES=$(python3 -c "
+import sys
+from rdflib import Graph
+g = Graph()
+for path in sys.argv[1:]:
+    g.parse(path, format='turtle')
+print(len(g))" "$TEMP_DIR/out.ttl" "$TEMP_DIR/inferred.ttl" "$TEMP_DIR/scheme.ttl")
+assert_equals "Output, inferred and data files loaded" "$(triple_count "$FUSEKI_URL")" "$EXPECTED_TRIPLES"
+assert_equals "Dataset version stamped" "$(cat "$DATASET_VERSION_FILE")" "1"
+
+# Test 2: Nothing changed
+echo "Test: Unchanged inputs are served from the cache"
+SECOND=$(run_pipeline --json 2>/dev/null)
+assert_equals "Every stage cached" "$(statuses "$SECOND")" "parse=cached skos=cached infer=cached validate=cached load=cached"
+assert_equals "No second load" "$(cat "$DATASET_VERSION_FILE")" "1"
+rm "$TEMP_DIR/out.ttl"
+run_pipeline > /dev/null 2>&1
+assert_equals "Cached Turtle rewritten when missing" \
+    "$(cmp -s "$TEMP_DIR/chain.ttl" "$TEMP_DIR/out.ttl" && echo same)" "same"
+
+# Test 3: Changed inputs re-run only their downstream stages
+echo "Test: Changes re-run downstream stages only"
+echo "# reviewed" >> "$TEMP_DIR/scheme.ttl"
+DATA_CHANGED=$(run_pipeline --json 2>/dev/null)
+assert_equals "Data file change skips parse and skos" "$(statuses "$DATA_CHANGED")" \
+    "parse=cached skos=cached infer=ran validate=ran load=ran"
+sed -i 's/A link from another website/An inbound link from another website/' "$TEMP_DIR/pages/seo-glossary.md"
+PAGE_CHANGED=$(run_pipeline --stop-after validate --json 2>/dev/null)
+assert_equals "Markdown change re-runs from parse" "$(statuses "$PAGE_CHANGED")" \
+    "parse=ran skos=ran infer=ran validate=ran load=skipped"
+assert_contains "New definition in the output" "$(cat "$TEMP_DIR/out.ttl")" "An inbound link from another website"
+FORCED=$(run_pipeline --stop-after skos --force --json 2>/dev/null)
+assert_equals "--force ignores the cache" "$(statuses "$FORCED")" "parse=ran skos=ran infer=skipped validate=skipped load=skipped"
+
+# Test 4: Validation errors stop the pipeline
+echo "Test: Validation failure stops before loading"
+cat > "$TEMP_DIR/broken.ttl" <<'TTL'
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+<http://glossary.example.org/terms/unlabelled> a skos:Concept .
+TTL
+set +e
+BROKEN=$(run_pipeline --data "$TEMP_DIR/scheme.ttl" "$TEMP_DIR/broken.ttl" 2>&1)
+BROKEN_EXIT=$?
+set -e
+assert_equals "Failed run exits 1" "$BROKEN_EXIT" "1"
+assert_contains "Offending concept reported" "$BROKEN" "ERROR: Missing skos:prefLabel on <http://glossary.example.org/terms/unlabelled>"
+assert_contains "Stage marked failed" "$BROKEN" "validate   failed"
+assert_contains "Load not attempted" "$BROKEN" "ERROR: validate stage failed: validation failed: 1 error"
+RECOVERED=$(run_pipeline --json 2>/dev/null)
+assert_equals "Failed stage not cached" "$(statuses "$RECOVERED")" \
+    "parse=cached skos=cached infer=ran validate=ran load=ran"
+
+# Test 5: Text report
+echo "Test: Per-stage timing report"
+REPORT=$(run_pipeline 2>/dev/null)
+assert_contains "Stage rows with timings" "$REPORT" "^parse      cached *[0-9.]*  2 terms\|^parse      cached *[0-9.]*  3 terms"
+assert_contains "Total line" "$REPORT" "^Total *[0-9.]*$"
+
+echo ""
+echo "Import Pipeline Tests: $PASS passed, $FAIL failed"
+exit $FAIL
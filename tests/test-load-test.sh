@@ -0,0 +1,145 @@
+#!/usr/bin/env bash
+# Test load-test.py against a local Fuseki stand-in.
+#
+# Runs offline: drives the builtin and recorded workloads at small scale
+# and checks request accounting, percentiles, error counting, the X-Cache
+# hit ratio, the rate / duration limits, and that open-loop latency counts
+# the time a request waits behind a backlog.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-load-test-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+LOAD_TEST="$PROJECT_DIR/scripts/load-test.py"
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# field JSON EXPRESSION -- evaluate a Python expression over the parsed summary `s`
+field() {
+    echo "$1" | python3 -c "import json, sys; s = json.load(sys.stdin); print($2)"
+}
+
+echo "=== Load Test Harness Tests ==="
+echo ""
+
+start_stand_in cache --cache "$PROJECT_DIR"/data/*.ttl
+CACHE_URL="$STAND_IN_URL"
+
+# Test 1: Builtin Skosmos-like workload
+echo "Test: Builtin workload is replayed and measured"
+SUMMARY=$(python3 "$LOAD_TEST" --url "$CACHE_URL" --requests 120 --mix-size 40 --concurrency 4 --json)
+assert_equals "Every request sent" "$(field "$SUMMARY" "s['requests']")" "120"
+assert_equals "No errors" "$(field "$SUMMARY" "s['errors']")" "0"
+assert_equals "Percentiles ordered" \
+    "$(field "$SUMMARY" "s['latency_ms']['p50'] <= s['latency_ms']['p95'] <= s['latency_ms']['p99']")" "True"
+# 40 distinct requests cycled three times: at least the last two passes hit
+assert_equals "X-Cache hit ratio measured" "$(field "$SUMMARY" "s['cache_hit_ratio'] >= 2 / 3")" "True"
+
+# Test 2: Recorded query mix, with a broken query counted as an error
+echo "Test: Recorded workload from an access log"
+python3 - "$TEMP_DIR/access.log" <<'PY'
+import sys
+from urllib.parse import quote
+
+fmt = '10.0.0.1 - - [19/Oct/2026:10:00:00 +0000] "GET {path}?query={q} HTTP/1.1" 200 99 "-" "EasyRdf"\n'
+queries = [("/skosmos/sparql", "ASK { ?s ?p ?o }")] * 6 + [
+    ("/sparql", "SELECT (COUNT(*) AS ?n) WHERE { ?s ?p ?o }"),
+    ("/skosmos/sparql", "SELECT WHERE {"),
+]
+with open(sys.argv[1], "w") as f:
+    for path, query in queries:
+        f.write(fmt.format(path=path, q=quote(query)))
+PY
+RECORDED=$(python3 "$LOAD_TEST" --url "$CACHE_URL" --log "$TEMP_DIR/access.log" --concurrency 2)
+assert_contains "One pass over the log" "$RECORDED" "Requests:   8 in"
+assert_contains "Percentiles reported" "$RECORDED" "Latency:    p50 [0-9.]*ms, p95 [0-9.]*ms, p99 [0-9.]*ms"
+assert_contains "Broken query counted as error" "$RECORDED" "Errors:     1 (12.5%)"
+assert_contains "Status breakdown" "$RECORDED" "400: 1"
+
+# Test 3: Rate and duration limits
+echo "Test: Open-loop rate and duration"
+RATED=$(python3 "$LOAD_TEST" --url "$CACHE_URL" --log "$TEMP_DIR/access.log" \
+    --requests 20 --rate 40 --concurrency 4 --json)
+assert_equals "Rate paces the run" "$(field "$RATED" "s['seconds'] >= 0.45")" "True"
+BACKLOG=$(python3 "$LOAD_TEST" --url "$CACHE_URL" --log "$TEMP_DIR/access.log" \
+    --requests 40 --rate 100000 --concurrency 1 --json)
+assert_equals "Backlog counted in latency" \
+    "$(field "$BACKLOG" "s['latency_ms']['max'] >= 0.7 * s['seconds'] * 1000")" "True"
+TIMED=$(python3 "$LOAD_TEST" --url "$CACHE_URL" --log "$TEMP_DIR/access.log" \
+    --duration 1 --concurrency 2 --json)
+assert_equals "Duration bounds the run" "$(field "$TIMED" "1.0 <= s['seconds'] < 3 and s['requests'] > 8")" "True"
+
+# Test 4: Targets without a cache header
+echo "Test: Direct Fuseki target"
+start_stand_in plain "$PROJECT_DIR"/data/*.ttl
+PLAIN=$(python3 "$LOAD_TEST" --url "$STAND_IN_URL" --requests 10 --mix-size 10)
+assert_contains "No X-Cache header" "$PLAIN" "X-Cache:    not reported by target"
+set +e
+python3 "$LOAD_TEST" --url "http://127.0.0.1:9" --requests 5 > /dev/null 2>&1
+UNREACHABLE_EXIT=$?
+set -e
+assert_equals "Unreachable target fails" "$UNREACHABLE_EXIT" "1"
+
+echo ""
+echo "Load Test Harness Tests: $PASS passed, $FAIL failed"
+exit $FAIL
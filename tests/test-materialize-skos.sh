@@ -0,0 +1,170 @@
+#!/usr/bin/env bash
+# Test materialize-skos.py and LOAD_MATERIALIZE against a local Fuseki stand-in.
+#
+# Runs offline: materializes the repository data and a small hand-built
+# hierarchy, checks the inverse, transitive and top concept triples, the
+# cycle warning, that validate-skos.py stops warning about missing
+# reciprocals, that the benchmark queries agree before and after, and
+# that load-data.sh loads the inferred triples with the data.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-materialize-skos-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+MATERIALIZE="$PROJECT_DIR/scripts/materialize-skos.py"
+# Keep stamped dataset versions out of config/state; no Varnish to reload
+export DATASET_VERSION_FILE="$TEMP_DIR/dataset-version"
+export VARNISH_RELOAD=""
+export VARNISH_URL=""
+export STATIC_VIEWS_DIR=""
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# triple_count URL -- triples in the stand-in's glossary graph
+triple_count() {
+    curl -s "$1/skosmos/query" -H "Accept: application/sparql-results+json" \
+        --data-urlencode "query=SELECT (COUNT(*) AS ?n) WHERE { GRAPH <http://glossary.example.org/> { ?s ?p ?o } }" |
+        python3 -c "import json, sys; print(json.load(sys.stdin)['results']['bindings'][0]['n']['value'])"
+}
+
+# count FILE PREDICATE -- lines of an N-Triples file using a SKOS predicate
+count() {
+    grep -c "core#$2> " "$1" || true
+}
+
+echo "=== SKOS Materialization Tests ==="
+echo ""
+
+# a -> b -> c (stated as broader), d narrower of a (stated as narrower),
+# e <-> f a broader cycle, all in the one scheme
+cat > "$TEMP_DIR/small.ttl" <<'TTL'
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+@prefix t: <http://example.org/t/> .
+t:scheme a skos:ConceptScheme .
+t:a a skos:Concept ; skos:prefLabel "A"@en .
+t:b a skos:Concept ; skos:prefLabel "B"@en ; skos:broader t:a .
+t:c a skos:Concept ; skos:prefLabel "C"@en ; skos:broader t:b .
+t:a skos:narrower t:d .
+t:d a skos:Concept ; skos:prefLabel "D"@en .
+t:e a skos:Concept ; skos:prefLabel "E"@en ; skos:broader t:f .
+t:f a skos:Concept ; skos:prefLabel "F"@en ; skos:broader t:e .
+TTL
+
+# Test 1: Inverses, closure and top concepts
+echo "Test: Inferred triples on a small hierarchy"
+SMALL=$(python3 "$MATERIALIZE" --format nt -o "$TEMP_DIR/small.nt" "$TEMP_DIR/small.ttl" 2>&1)
+assert_contains "Summary reported" "$SMALL" "^1[0-9]* triples inferred for 6 concepts"
+assert_equals "narrower inverse of each broader" "$(count "$TEMP_DIR/small.nt" narrower)" "4"
+assert_equals "broader inverse of the stated narrower" "$(count "$TEMP_DIR/small.nt" broader)" "1"
+assert_contains "Transitive closure" "$(cat "$TEMP_DIR/small.nt")" \
+    "<http://example.org/t/c> <http://www.w3.org/2004/02/skos/core#broaderTransitive> <http://example.org/t/a>"
+assert_contains "Reverse closure" "$(cat "$TEMP_DIR/small.nt")" \
+    "<http://example.org/t/a> <http://www.w3.org/2004/02/skos/core#narrowerTransitive> <http://example.org/t/d>"
+assert_equals "Root is the only top concept" "$(count "$TEMP_DIR/small.nt" hasTopConcept)" "1"
+assert_contains "Cycle reported" "$SMALL" "WARNING: 2 concepts on broader cycles"
+python3 "$MATERIALIZE" -o "$TEMP_DIR/small.ttl.out" "$TEMP_DIR/small.ttl" 2>/dev/null
+assert_equals "Turtle and N-Triples outputs agree" "$(python3 -c "
+import sys
+from rdflib import Graph
+from rdflib.compare import isomorphic
+print(isomorphic(Graph().parse(sys.argv[1], format='nt'), Graph().parse(sys.argv[2], format='turtle')))" \
+    "$TEMP_DIR/small.nt" "$TEMP_DIR/small.ttl.out")" "True"
+
+# Test 2: Repository data
+echo "Test: Repository data"
+DATA=$(python3 "$MATERIALIZE" --format nt -o "$TEMP_DIR/inferred.ttl" "$PROJECT_DIR"/data/*.ttl 2>&1)
+assert_contains "Data materialized" "$DATA" "triples inferred for [0-9]* concepts"
+AGAIN=$(python3 "$MATERIALIZE" --format nt -o "$TEMP_DIR/inferred.ttl" "$PROJECT_DIR"/data/*.ttl "$TEMP_DIR/inferred.ttl" 2>&1)
+assert_equals "Output file is not read back as input" "$(echo "$AGAIN" | head -n 1 | cut -d' ' -f1)" \
+    "$(echo "$DATA" | head -n 1 | cut -d' ' -f1)"
+BEFORE=$(python3 "$PROJECT_DIR/scripts/validate-skos.py" "$PROJECT_DIR"/data/*.ttl 2>&1 | grep -c "Non-reciprocal" || true)
+AFTER=$(python3 "$PROJECT_DIR/scripts/validate-skos.py" "$PROJECT_DIR"/data/*.ttl "$TEMP_DIR/inferred.ttl" 2>&1 | grep -c "Non-reciprocal" || true)
+if [ "$BEFORE" -gt 0 ] && [ "$AFTER" -eq 0 ]; then
+    echo "  PASS: Reciprocal warnings resolved ($BEFORE -> 0)"
+    PASS=$((PASS + 1))
+else
+    echo "  FAIL: Reciprocal warnings resolved (expected $BEFORE -> 0, got $AFTER)"
+    FAIL=$((FAIL + 1))
+fi
+
+# Test 3: Benchmark queries agree before and after
+echo "Test: Benchmark"
+BENCH=$(python3 "$MATERIALIZE" bench --depth 20 --chains 2 --levels 2 --fanout 4 --repeat 1 2>&1)
+assert_contains "Deep hierarchy timed" "$BENCH" "^Deep hierarchy (2 chains of depth 20): 41 concepts"
+assert_contains "Wide hierarchy timed" "$BENCH" "^Wide hierarchy (2 levels, fan-out 4): 21 concepts"
+assert_contains "Ancestors of the deep leaf" "$BENCH" "ancestors of a leaf .*20 rows)"
+assert_equals "Every query agrees" "$(echo "$BENCH" | grep -c MISMATCH || true)" "0"
+
+# Test 4: load-data.sh loads the inferred triples
+echo "Test: LOAD_MATERIALIZE"
+start_stand_in reference "$PROJECT_DIR"/data/*.ttl "$TEMP_DIR/inferred.ttl"
+EXPECTED=$(triple_count "$STAND_IN_URL")
+start_stand_in empty
+LOAD_OUTPUT=$(FUSEKI_URL="$STAND_IN_URL" LOAD_MATERIALIZE=true \
+    bash "$PROJECT_DIR/scripts/load-data.sh" 2>&1 || true)
+assert_contains "Load succeeds" "$LOAD_OUTPUT" "All files loaded successfully"
+assert_equals "Data and inferred triples loaded" "$(triple_count "$STAND_IN_URL")" "$EXPECTED"
+
+echo ""
+echo "SKOS Materialization Tests: $PASS passed, $FAIL failed"
+exit $FAIL
@@ -0,0 +1,235 @@
+#!/usr/bin/env bash
+# Test replicate.py against several local Fuseki stand-ins.
+#
+# Runs offline: loads and a delta reach every replica in parallel with one
+# dataset version, an injected divergence is detected and repaired from the
+# majority (or from --source), a replica whose load failed is re-synced from
+# the others, and an unreachable replica fails verification.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-replicate-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+GRAPH="http://glossary.example.org/"
+REPLICATE="$PROJECT_DIR/scripts/replicate.py"
+export VARNISH_URL=""
+# Keep stamped dataset versions out of config/state; no Varnish to reload
+export DATASET_VERSION_FILE="$TEMP_DIR/dataset-version"
+export VARNISH_RELOAD=""
+export STATIC_VIEWS_DIR=""
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+graph_count() {
+    curl -s "$1/skosmos/sparql" \
+        --data-urlencode "query=SELECT (COUNT(*) AS ?n) WHERE { GRAPH <$GRAPH> { ?s ?p ?o } }" \
+        | python3 -c "import json, sys; print(json.load(sys.stdin)['results']['bindings'][0]['n']['value'])"
+}
+
+# ask URL QUERY -- prints true or false
+ask() {
+    curl -s "$1/skosmos/sparql" --data-urlencode "query=$2" \
+        | python3 -c "import json, sys; print(str(json.load(sys.stdin)['boolean']).lower())"
+}
+
+stored_version() {
+    curl -s "$1/skosmos/sparql" \
+        --data-urlencode "query=SELECT ?v WHERE { GRAPH <urn:egms:meta> { <urn:egms:dataset> <http://www.w3.org/2002/07/owl#versionInfo> ?v } }" \
+        | python3 -c "import json, sys; print(','.join(b['v']['value'] for b in json.load(sys.stdin)['results']['bindings']))"
+}
+
+# counts URL... -- graph counts of several replicas, space separated
+counts() {
+    local out=""
+    for url in "$@"; do
+        out="$out $(graph_count "$url")"
+    done
+    echo "${out# }"
+}
+
+update() {
+    curl -sf -o /dev/null "$1/skosmos/update" --data-urlencode "update=$2"
+}
+
+NEW_TRIPLE='<http://glossary.example.org/replica-test> <http://www.w3.org/2004/02/skos/core#prefLabel> "Replica test"@en .'
+STRAY_TRIPLE='<http://glossary.example.org/stray> <http://www.w3.org/2004/02/skos/core#prefLabel> "Stray"@en .'
+
+echo "=== Replication Tests ==="
+echo ""
+
+start_stand_in reference "$PROJECT_DIR"/data/*.ttl
+FULL=$(graph_count "$STAND_IN_URL")
+start_stand_in a
+A="$STAND_IN_URL"
+start_stand_in b
+B="$STAND_IN_URL"
+start_stand_in c
+C="$STAND_IN_URL"
+
+# Test 1: load-data.sh fans out to every replica
+echo "Test: load-data.sh loads every replica in FUSEKI_REPLICAS"
+LOAD_OUTPUT=$(FUSEKI_URL="http://127.0.0.1:9" FUSEKI_REPLICAS="$A,$B $C" \
+    bash "$PROJECT_DIR/scripts/load-data.sh" 2>&1 || true)
+assert_contains "Loaded in parallel" "$LOAD_OUTPUT" "3 of 3 replica(s) updated"
+assert_equals "Every replica holds the data" "$(counts "$A" "$B" "$C")" "$FULL $FULL $FULL"
+assert_contains "Converged after loading" "$LOAD_OUTPUT" "All 3 replica(s) agree"
+assert_equals "One version copied to every replica" \
+    "$(stored_version "$A") $(stored_version "$B") $(stored_version "$C")" "1 1 1"
+assert_equals "Version published" "$(cat "$DATASET_VERSION_FILE")" "1"
+export FUSEKI_REPLICAS="$A $B $C"
+
+# Test 2: verify compares counts and hashes
+echo "Test: Verify reports agreement"
+set +e
+VERIFY_OUTPUT=$(python3 "$REPLICATE" verify 2>&1)
+VERIFY_EXIT=$?
+set -e
+assert_equals "Exit 0 when replicas agree" "$VERIFY_EXIT" "0"
+assert_contains "Graph agrees on all replicas" "$VERIFY_OUTPUT" "<$GRAPH>: $FULL triples, digest [0-9a-f]*; 3/3 replicas agree"
+assert_contains "Version graph compared too" "$VERIFY_OUTPUT" "<urn:egms:meta>: 2 triples"
+
+# Test 3: a gzipped delta is applied to every replica
+echo "Test: Delta reaches every replica"
+curl -s -H "Accept: application/n-triples" "$A/skosmos/data?graph=$GRAPH" > "$TEMP_DIR/a.nt"
+OLD_TRIPLE=$(grep prefLabel "$TEMP_DIR/a.nt" | grep -v '_:' | sort | sed -n 1p)
+printf 'D %s\nA %s\nTC .\n' "$OLD_TRIPLE" "$NEW_TRIPLE" | gzip > "$TEMP_DIR/change.patch.gz"
+DELTA_OUTPUT=$(python3 "$REPLICATE" delta "$TEMP_DIR/change.patch.gz" 2>&1 || true)
+assert_contains "Delta applied" "$DELTA_OUTPUT" "Applying 1 deletion(s) and 1 addition(s)"
+assert_equals "Counts unchanged" "$(counts "$A" "$B" "$C")" "$FULL $FULL $FULL"
+ASKS=""
+for url in "$A" "$B" "$C"; do
+    ASKS="$ASKS $(ask "$url" "ASK { GRAPH <$GRAPH> { ${NEW_TRIPLE%.} } FILTER NOT EXISTS { GRAPH <$GRAPH> { ${OLD_TRIPLE%.} } } }")"
+done
+assert_equals "Addition and deletion on every replica" "${ASKS# }" "true true true"
+assert_equals "Version bumped everywhere" \
+    "$(stored_version "$A") $(stored_version "$B") $(stored_version "$C")" "2 2 2"
+
+# Test 4: divergence on the first replica is detected and repaired from the majority
+echo "Test: A diverged replica is detected and re-synced"
+update "$A" "INSERT DATA { GRAPH <$GRAPH> { $STRAY_TRIPLE } }"
+set +e
+VERIFY_OUTPUT=$(python3 "$REPLICATE" verify 2>&1)
+VERIFY_EXIT=$?
+set -e
+assert_equals "Exit 1 on divergence" "$VERIFY_EXIT" "1"
+assert_contains "Divergence reported" "$VERIFY_OUTPUT" "<$GRAPH>: DIVERGED; 2/3 replicas hold $FULL triples"
+assert_contains "Stale replica named" "$VERIFY_OUTPUT" "$A: $((FULL + 1)) triples"
+set +e
+SYNC_OUTPUT=$(python3 "$REPLICATE" sync 2>&1)
+SYNC_EXIT=$?
+set -e
+assert_equals "Sync exits 0" "$SYNC_EXIT" "0"
+assert_contains "Copied from the majority" "$SYNC_OUTPUT" "<$GRAPH> on $A <- $B: $FULL triples"
+assert_equals "Replica repaired" "$(counts "$A" "$B" "$C")" "$FULL $FULL $FULL"
+assert_equals "Stray triple gone" "$(ask "$A" "ASK { ${STRAY_TRIPLE%.} }")" "false"
+
+# Test 5: --source overrides the vote, and graphs missing on the source are dropped
+echo "Test: Sync from an explicit source"
+update "$C" "INSERT DATA { GRAPH <$GRAPH> { $STRAY_TRIPLE } }"
+update "$A" "INSERT DATA { GRAPH <urn:egms:scratch> { $STRAY_TRIPLE } }"
+SYNC_OUTPUT=$(python3 "$REPLICATE" sync --source "$C" 2>&1 || true)
+assert_equals "Source copy everywhere" "$(counts "$A" "$B" "$C")" "$((FULL + 1)) $((FULL + 1)) $((FULL + 1))"
+assert_contains "Extra graph dropped" "$SYNC_OUTPUT" "<urn:egms:scratch> on $A <- $C: dropped"
+assert_contains "Converged" "$SYNC_OUTPUT" "All 3 replica(s) agree"
+
+# Test 6: a replica whose load failed does not vote and is re-synced
+echo "Test: A failed replica load is repaired from the others"
+start_stand_in failing --fail-first 1 "$PROJECT_DIR/data/enterprise-glossary.ttl"
+D="$STAND_IN_URL"
+set +e
+FAILED_OUTPUT=$(python3 "$REPLICATE" --replica "$A" --replica "$D" --replica "$B" --retries 0 \
+    load --replace "$PROJECT_DIR"/data/*.ttl 2>&1)
+FAILED_EXIT=$?
+set -e
+assert_contains "Failure reported" "$FAILED_OUTPUT" "$D: FAILED (.*HTTP 503"
+assert_contains "Other replicas loaded" "$FAILED_OUTPUT" "2 of 3 replica(s) updated"
+assert_contains "Failed replica re-synced" "$FAILED_OUTPUT" "<$GRAPH> on $D <- $A: $FULL triples"
+assert_equals "Exit 0 once converged" "$FAILED_EXIT" "0"
+assert_equals "Replaced everywhere" "$(counts "$A" "$D" "$B")" "$FULL $FULL $FULL"
+for replica in "$A" "$D"; do
+    assert_equals "Staging default graph left empty" "$(curl -s -H "Accept: application/n-triples" \
+        "$replica/skosmos/data?default" | grep -c . || true)" "0"
+done
+
+# Test 7: an unreachable replica fails verification
+echo "Test: Unreachable replica"
+set +e
+DOWN_OUTPUT=$(python3 "$REPLICATE" --replica "$A" --replica "http://127.0.0.1:9" verify 2>&1)
+DOWN_EXIT=$?
+set -e
+assert_equals "Exit 1" "$DOWN_EXIT" "1"
+assert_contains "Reported unreachable" "$DOWN_OUTPUT" "http://127.0.0.1:9: UNREACHABLE"
+
+# Test 8: DELETE DATA cannot match blank nodes
+echo "Test: Blank-node deletions are refused"
+printf 'D _:b1 <http://www.w3.org/2004/02/skos/core#note> "x" .\n' > "$TEMP_DIR/bnode.patch"
+set +e
+BNODE_OUTPUT=$(python3 "$REPLICATE" delta "$TEMP_DIR/bnode.patch" 2>&1)
+BNODE_EXIT=$?
+set -e
+assert_equals "Exit 1" "$BNODE_EXIT" "1"
+assert_contains "Explained" "$BNODE_OUTPUT" "use \`load --replace\`"
+
+echo ""
+echo "Replication Tests: $PASS passed, $FAIL failed"
+exit $FAIL
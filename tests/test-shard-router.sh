@@ -0,0 +1,263 @@
+#!/usr/bin/env bash
+# Test shard-router.py.
+#
+# Runs offline against three rdflib Fuseki stand-ins: two shards and a
+# reference dataset holding the whole vocabulary. Plans and loads the
+# partitions, then checks that the router sends requests to the shard
+# holding the data, that fanned-out queries and label searches give the
+# same answers as the reference, that joins across shards are refused,
+# and that a failed shard is reported.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-shard-router-$$"
+mkdir -p "$TEMP_DIR"
+ROUTER="$PROJECT_DIR/scripts/shard-router.py"
+MAP="$TEMP_DIR/shards.json"
+STAND_IN_PIDS=""
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# Prints the response body, then the status code and X-Shard header
+sparql() {
+    local url="$1"
+    local query="$2"
+    curl -s -D "$TEMP_DIR/headers" "$url/skosmos/sparql" --data-urlencode "query=$query" \
+        -H "Accept: application/sparql-results+json"
+    echo ""
+    tr -d '\r' < "$TEMP_DIR/headers" | grep -i "^HTTP\|^X-Shard" || true
+}
+
+# The bindings of a SPARQL JSON result, in order
+bindings() {
+    python3 -c "import json, sys; print(json.dumps(json.loads(sys.stdin.readline())['results']['bindings']))"
+}
+
+# Sorted values of the first variable in a SPARQL JSON result
+values() {
+    python3 -c "
+import json, sys
+doc = json.loads(sys.stdin.readline())
+var = doc['head']['vars'][0]
+print('\n'.join(sorted(row[var]['value'] for row in doc['results']['bindings'] if var in row)))"
+}
+
+search_uris() {
+    python3 "$ROUTER" search --map "$1" "$2" --lang en --limit 10 --json \
+        | python3 -c "import json, sys; print(' '.join(r['uri'] for r in json.load(sys.stdin)['results']))"
+}
+
+PREFIXES="PREFIX skos: <http://www.w3.org/2004/02/skos/core#> PREFIX eg: <http://glossary.example.org/terms/>"
+
+start_stand_in shard-a
+SHARD_A="$STAND_IN_URL"
+SHARD_A_PID="${STAND_IN_PIDS##* }"
+start_stand_in shard-b
+SHARD_B="$STAND_IN_URL"
+start_stand_in reference
+REFERENCE="$STAND_IN_URL"
+
+echo "=== Shard Router Tests ==="
+echo ""
+
+# Test 1: Planning
+echo "Test: Plan partitions by top concept"
+PLAN=$(python3 "$ROUTER" plan "$PROJECT_DIR"/data/*.ttl --shard "a=$SHARD_A/skosmos" --shard "b=$SHARD_B/skosmos" \
+    --pin engineering=a -o "$MAP" 2>&1)
+assert_contains "Partitions reported per shard" "$PLAN" "^a: [0-9]* partitions"
+assert_contains "Pinned partition on its shard" "$(python3 -c "
+import json; m = json.load(open('$MAP'))
+print([p['shard'] for p in m['partitions'] if p['graph'].endswith('/engineering/')])")" "\['a'\]"
+assert_equals "Both shards used" "$(python3 -c "
+import json; print(len({p['shard'] for p in json.load(open('$MAP'))['partitions']}))")" "2"
+assert_equals "Every concept indexed once" "$(python3 -c "
+import json; m = json.load(open('$MAP'))
+print(sum(p['concepts'] for p in m['partitions']) == len(m['resources']))")" "True"
+assert_equals "Top concepts are their own partition" "$(python3 -c "
+import json; m = json.load(open('$MAP'))
+print(m['resources']['http://glossary.example.org/terms/legal'])")" "http://glossary.example.org/legal/"
+python3 "$ROUTER" plan "$PROJECT_DIR"/data/*.ttl --shard "reference=$REFERENCE/skosmos" -o "$TEMP_DIR/reference.json" > /dev/null 2>&1
+
+# Test 2: Loading
+echo "Test: Load partitions onto their shards"
+LOAD=$(python3 "$ROUTER" load "$PROJECT_DIR"/data/*.ttl --map "$MAP" 2>&1)
+assert_contains "All partitions loaded" "$LOAD" "\([0-9]*\) of \1 graphs loaded"
+python3 "$ROUTER" load "$PROJECT_DIR"/data/*.ttl --map "$TEMP_DIR/reference.json" > /dev/null 2>&1
+COUNT="SELECT DISTINCT ?c WHERE { ?c a <http://www.w3.org/2004/02/skos/core#Concept> }"
+A_CONCEPTS=$(sparql "$SHARD_A" "$COUNT" | head -n 1 | values | wc -l)
+B_CONCEPTS=$(sparql "$SHARD_B" "$COUNT" | head -n 1 | values | wc -l)
+assert_equals "Concepts split between the shards" "$((A_CONCEPTS + B_CONCEPTS))" \
+    "$(sparql "$REFERENCE" "$COUNT" | head -n 1 | values | wc -l)"
+SCHEME_GRAPHS="SELECT DISTINCT ?g WHERE { GRAPH ?g { ?s a <http://www.w3.org/2004/02/skos/core#ConceptScheme> } }"
+assert_equals "Scheme stored once, in the shared graph on the default shard" \
+    "$(sparql "$SHARD_A" "$SCHEME_GRAPHS" | head -n 1 | values) $(sparql "$SHARD_B" "$SCHEME_GRAPHS" | head -n 1 | values)" \
+    "http://glossary.example.org/shared/ "
+for shard in "$SHARD_A" "$SHARD_B"; do
+    assert_equals "Staging default graph left empty" "$(curl -s -H "Accept: application/n-triples" \
+        "$shard/skosmos/data?default" | grep -c . || true)" "0"
+done
+
+python3 "$ROUTER" serve --map "$MAP" --port 0 --port-file "$TEMP_DIR/router.port" > /dev/null 2>&1 &
+STAND_IN_PIDS="$STAND_IN_PIDS $!"
+for _ in $(seq 1 100); do
+    [ -f "$TEMP_DIR/router.port" ] && break
+    sleep 0.1
+done
+ROUTER_URL="http://127.0.0.1:$(cat "$TEMP_DIR/router.port")"
+
+# Test 3: Requests that name a graph or a concept go to one shard
+echo "Test: Routing to one shard"
+OWNER=$(python3 -c "
+import json; m = json.load(open('$MAP'))
+graph = m['resources']['http://glossary.example.org/terms/api']
+print([p['shard'] for p in m['partitions'] if p['graph'] == graph][0])")
+CONCEPT=$(sparql "$ROUTER_URL" "$PREFIXES SELECT ?l WHERE { eg:api skos:prefLabel ?l }")
+assert_contains "Concept query answered" "$CONCEPT" '"value": *"API"'
+assert_contains "Concept query sent to its shard" "$CONCEPT" "X-Shard: $OWNER$"
+GRAPH_QUERY=$(sparql "$ROUTER_URL" "SELECT ?s WHERE { GRAPH <http://glossary.example.org/engineering/> { ?s ?p ?o } } LIMIT 1")
+assert_contains "Graph query sent to its shard" "$GRAPH_QUERY" "X-Shard: a$"
+STORE=$(curl -s -o /dev/null -w "%{http_code}" -D "$TEMP_DIR/headers" -H "Accept: application/n-triples" \
+    "$ROUTER_URL/skosmos/data?graph=http%3A%2F%2Fglossary.example.org%2Fengineering%2F")
+assert_equals "Graph Store read answered" "$STORE" "200"
+assert_contains "Graph Store read sent to its shard" "$(tr -d '\r' < "$TEMP_DIR/headers")" "X-Shard: a"
+curl -s -o /dev/null "$ROUTER_URL/skosmos/update" --data-urlencode \
+    "update=INSERT DATA { GRAPH <http://glossary.example.org/engineering/> { <urn:x:new> <urn:x:p> 'routed' } }"
+assert_contains "Update applied on the owning shard" "$(sparql "$SHARD_A" "ASK { <urn:x:new> ?p ?o }")" '"boolean": *true'
+
+# Test 4: Other queries fan out and merge like the reference
+echo "Test: Fan-out queries"
+ORDERED="$PREFIXES SELECT DISTINCT ?c WHERE { ?c a skos:Concept } ORDER BY DESC(?c) LIMIT 5"
+FANNED=$(sparql "$ROUTER_URL" "$ORDERED")
+assert_contains "Answered by both shards" "$FANNED" "X-Shard: a,b"
+assert_equals "ORDER BY / LIMIT merged like one dataset" "$(echo "$FANNED" | head -n 1 | bindings)" \
+    "$(sparql "$REFERENCE" "$ORDERED" | head -n 1 | bindings)"
+ALL="$PREFIXES SELECT DISTINCT ?c WHERE { ?c skos:inScheme eg:enterprise-glossary }"
+assert_equals "Union of bindings matches the reference" "$(sparql "$ROUTER_URL" "$ALL" | head -n 1 | values | md5sum)" \
+    "$(sparql "$REFERENCE" "$ALL" | head -n 1 | values | md5sum)"
+assert_contains "ASK true on any shard" "$(sparql "$ROUTER_URL" "$PREFIXES ASK { ?c skos:prefLabel 'Legal'@en }")" '"boolean": *true'
+CONSTRUCTED=$(curl -s "$ROUTER_URL/skosmos/sparql" --data-urlencode \
+    "query=$PREFIXES CONSTRUCT { ?c a <urn:x:Top> } WHERE { ?c skos:topConceptOf ?s }")
+assert_equals "CONSTRUCT graphs unioned" "$(echo "$CONSTRUCTED" | grep -c "urn:x:Top")" "9"
+UNMERGEABLE=$(sparql "$ROUTER_URL" "$PREFIXES SELECT (COUNT(?c) AS ?n) WHERE { ?c a skos:Concept }")
+assert_contains "Aggregate across shards refused" "$UNMERGEABLE" "HTTP/1.1 400"
+assert_contains "Refusal explains how to route" "$UNMERGEABLE" "name a graph"
+ON_B=$(python3 -c "
+import json; print([p['graph'] for p in json.load(open('$MAP'))['partitions'] if p['shard'] == 'b'][0])")
+SPLIT_UPDATE=$(curl -s "$ROUTER_URL/skosmos/update" --data-urlencode \
+    "update=CLEAR GRAPH <http://glossary.example.org/engineering/> ; CLEAR GRAPH <$ON_B>")
+assert_contains "Update across shards refused" "$SPLIT_UPDATE" "send one update per shard"
+assert_contains "Refused update changed nothing" "$(sparql "$SHARD_A" \
+    "ASK { GRAPH <http://glossary.example.org/engineering/> { ?s ?p ?o } }")" '"boolean": *true'
+
+OBJECT_QUERY="$PREFIXES SELECT ?s WHERE { ?s skos:related eg:load-balancer }"
+OBJECT_ANSWER=$(sparql "$ROUTER_URL" "$OBJECT_QUERY")
+assert_contains "Concept as object fans out" "$OBJECT_ANSWER" "X-Shard: a,b"
+assert_equals "Links from every shard found" "$(echo "$OBJECT_ANSWER" | head -n 1 | values)" \
+    "$(sparql "$REFERENCE" "$OBJECT_QUERY" | head -n 1 | values)"
+SHARED_QUERY="$PREFIXES SELECT ?p ?o WHERE { eg:enterprise-glossary ?p ?o }"
+SHARED_ANSWER=$(sparql "$ROUTER_URL" "$SHARED_QUERY")
+assert_contains "Shared subject answered by the default shard" "$SHARED_ANSWER" "X-Shard: a$"
+assert_equals "Shared triples returned once without DISTINCT" \
+    "$(echo "$SHARED_ANSWER" | head -n 1 | values | wc -l)" \
+    "$(sparql "$REFERENCE" "$SHARED_QUERY" | head -n 1 | values | wc -l)"
+JOIN=$(sparql "$ROUTER_URL" "$PREFIXES SELECT ?l WHERE { eg:api skos:related ?r . ?r skos:prefLabel ?l }")
+assert_contains "Join through an object variable refused" "$JOIN" "HTTP/1.1 400"
+assert_contains "Join refusal explains why" "$JOIN" "other shards"
+PATH_JOIN=$(sparql "$ROUTER_URL" "$PREFIXES SELECT ?l WHERE { eg:api skos:broader/skos:prefLabel ?l }")
+assert_contains "Property path join refused" "$PATH_JOIN" "HTTP/1.1 400"
+SAME_SUBJECT=$(sparql "$ROUTER_URL" "$PREFIXES SELECT ?l ?d WHERE { ?c skos:prefLabel ?l ; skos:definition ?d . FILTER(?l = 'API'@en) }")
+assert_contains "Patterns sharing a subject still fan out" "$SAME_SUBJECT" "X-Shard: a,b"
+UNSCOPED=$(curl -s -w "%{http_code}" "$ROUTER_URL/skosmos/update" --data-urlencode \
+    "update=$PREFIXES DELETE WHERE { ?c skos:altLabel ?l }")
+assert_contains "Unscoped update refused" "$UNSCOPED" "400$"
+assert_contains "Refused update kept the labels" "$(sparql "$SHARD_A" \
+    "$PREFIXES ASK { ?c skos:altLabel ?l }")" '"boolean": *true'
+
+# Test 5: Label search across shards
+echo "Test: Label search"
+for term in deploy lease data; do
+    assert_equals "Merged '$term' results match one dataset" "$(search_uris "$MAP" "$term")" \
+        "$(search_uris "$TEMP_DIR/reference.json" "$term")"
+done
+SEARCH=$(curl -s "$ROUTER_URL/search?q=engineering&lang=en&limit=3")
+assert_contains "Exact prefLabel match first" "$SEARCH" '"results": \[{"uri": "http://glossary.example.org/terms/engineering", "prefLabel": "Engineering", "match": "exact", "property": "prefLabel"'
+
+# Test 6: Re-indexing and a failed shard
+echo "Test: Re-index and shard failure"
+sed 's|skos:broader eg:engineering|skos:broader eg:legal|' "$PROJECT_DIR/data/enterprise-glossary.ttl" > "$TEMP_DIR/moved.ttl"
+MOVED=$(python3 "$ROUTER" load "$PROJECT_DIR/data/concept-scheme.ttl" "$TEMP_DIR/moved.ttl" \
+    "$PROJECT_DIR/data/imported-glossary.ttl" --map "$MAP" 2>&1)
+assert_contains "Moved concepts re-indexed" "$MOVED" "Updated concept index"
+assert_contains "Router follows the new index" "$(sparql "$ROUTER_URL" "$PREFIXES SELECT ?l WHERE { eg:api skos:prefLabel ?l }")" \
+    "X-Shard: $(python3 -c "
+import json; m = json.load(open('$MAP'))
+print([p['shard'] for p in m['partitions'] if p['graph'].endswith('/legal/')][0])")$"
+kill "$SHARD_A_PID"
+sleep 0.5
+PARTIAL=$(curl -s -w "\n%{http_code}" "$ROUTER_URL/search?q=lease&lang=en")
+assert_contains "Search still answers" "$PARTIAL" "^200$"
+assert_contains "Failed shard reported" "$PARTIAL" '"a": {"error"'
+assert_contains "Fanned-out query fails loudly" "$(sparql "$ROUTER_URL" "$ALL")" "HTTP/1.1 502"
+
+echo ""
+echo "Shard Router Tests: $PASS passed, $FAIL failed"
+exit $FAIL
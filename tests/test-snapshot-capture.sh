@@ -0,0 +1,174 @@
+#!/usr/bin/env bash
+# Test streaming snapshot capture (snapshot-store.py capture / snapshot.sh).
+#
+# Runs offline against a local Fuseki stand-in: checks the counts, sha256
+# and per-concept hashes computed while the export streams in, that they
+# match what the Turtle path (add + audit-log.py --index) produces, delta
+# storage of a later capture, and that a failed export leaves the manifest
+# untouched.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-snapshot-capture-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+STORE="$PROJECT_DIR/scripts/snapshot-store.py"
+MANIFEST="$TEMP_DIR/store/manifest.json"
+# snapshot.sh must keep its change history next to the store it writes
+REPO_HISTORY=$(test -e "$PROJECT_DIR/snapshots/history.db" && echo written || echo none)
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# entry INDEX FIELD -- a field of a manifest entry
+entry() {
+    python3 -c "import json, sys; print(json.load(open(sys.argv[1]))['snapshots'][$1]['$2'])" "$MANIFEST"
+}
+
+echo "=== Snapshot Capture Tests ==="
+echo ""
+
+# Concepts typed in ways a line grep for "a skos:Concept" misses
+cat > "$TEMP_DIR/odd-typing.ttl" <<'TTL'
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+@prefix rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix eg:   <http://glossary.example.org/terms/> .
+
+eg:odd-one rdf:type skos:Concept ; skos:prefLabel "Odd One"@en .
+eg:odd-two a eg:Term , skos:Concept ;
+    skos:prefLabel "Odd Two"@en .
+TTL
+DATA=("$PROJECT_DIR"/data/*.ttl "$TEMP_DIR/odd-typing.ttl")
+start_stand_in fuseki "${DATA[@]}"
+export FUSEKI_URL="$STAND_IN_URL"
+mkdir -p "$TEMP_DIR/store"
+
+# Test 1: One streamed pass yields the stored version and its metadata
+echo "Test: Capture streams the export into a new version"
+CAPTURE=$(python3 "$STORE" capture --manifest "$MANIFEST" --message "first")
+EXPECTED_TERMS=$(python3 -c "
+import sys
+from rdflib import Graph
+from rdflib.namespace import RDF, SKOS
+g = Graph()
+for path in sys.argv[1:]:
+    g.parse(path, format='turtle')
+print(len(set(g.subjects(RDF.type, SKOS.Concept))), len(g))" "${DATA[@]}")
+assert_contains "First version numbered automatically" "$CAPTURE" "Stored v0.0.1 as full base"
+assert_equals "Accurate concept and triple counts" "$(entry 0 term_count) $(entry 0 triple_count)" "$EXPECTED_TERMS"
+assert_equals "Export size recorded" "$(entry 0 export_bytes | awk '{print ($1 > 0)}')" "1"
+assert_contains "Stored content verifies" "$(python3 "$STORE" verify --manifest "$MANIFEST" --all)" "Verified 1/1"
+
+# Test 2: Same results as the Turtle export path
+echo "Test: Capture matches export + add + index"
+curl -s -H "Accept: text/turtle" "$FUSEKI_URL/skosmos/data?graph=http://glossary.example.org/" \
+    > "$TEMP_DIR/export.ttl"
+mkdir -p "$TEMP_DIR/legacy"
+python3 "$STORE" add "$TEMP_DIR/export.ttl" --manifest "$TEMP_DIR/legacy/manifest.json" --version 0.0.1 > /dev/null
+python3 "$PROJECT_DIR/scripts/audit-log.py" --index "$TEMP_DIR/legacy/manifest.json" 2> /dev/null
+SAME=$(python3 - "$MANIFEST" "$TEMP_DIR/legacy/manifest.json" <<'PY'
+import gzip, json, os, sys
+entries = []
+for path in sys.argv[1:]:
+    entry = json.load(open(path))["snapshots"][0]
+    with gzip.open(os.path.join(os.path.dirname(path), entry["concept_hashes"]), "rt") as f:
+        entries.append((entry["sha256"], entry["content_hash"], json.load(f)["concepts"]))
+print(entries[0] == entries[1])
+PY
+)
+assert_equals "Same sha256 and concept hashes" "$SAME" "True"
+
+# Test 3: A later capture is stored as a delta and audited from cached hashes
+echo "Test: Second capture after an edit"
+curl -s -o /dev/null "$FUSEKI_URL/skosmos/update" --data-urlencode "update=
+PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+INSERT DATA { GRAPH <http://glossary.example.org/> {
+  <http://glossary.example.org/terms/odd-one> skos:altLabel \"Oddity\"@en } }"
+CAPTURE=$(python3 "$STORE" capture --manifest "$MANIFEST")
+assert_contains "Delta of one triple" "$CAPTURE" "Stored v0.0.2 as delta from v0.0.1: +1 -0 triples"
+AUDIT=$(python3 "$PROJECT_DIR/scripts/audit-log.py" --manifest "$MANIFEST" 2>&1 > /dev/null)
+assert_contains "Audit sees the modified concept" "$AUDIT" "0 added, 0 removed, 0 renamed, 1 modified"
+
+# Test 4: snapshot.sh drives the capture
+echo "Test: snapshot.sh"
+SNAP=$(SNAPSHOT_DIR="$TEMP_DIR/store" bash "$PROJECT_DIR/scripts/snapshot.sh" --message "via script" 2>&1)
+assert_contains "Version auto-incremented" "$SNAP" "Version:    v0.0.3"
+assert_equals "History recorded in the store" \
+    "$(python3 -c 'import sqlite3, sys; print(sqlite3.connect(sys.argv[1]).execute("SELECT COUNT(*) FROM versions").fetchone()[0])' "$TEMP_DIR/store/history.db")" "3"
+assert_equals "Repository history untouched" \
+    "$(test -e "$PROJECT_DIR/snapshots/history.db" && echo written || echo none)" "$REPO_HISTORY"
+assert_equals "No export or temp files left" \
+    "$(ls -a "$TEMP_DIR/store" | grep -c -e '^\.export' -e '\.tmp$' || true)" "0"
+
+# Test 5: A failed export changes nothing
+echo "Test: Unreachable Fuseki"
+cp "$MANIFEST" "$TEMP_DIR/manifest.before"
+set +e
+FAILED=$(FUSEKI_URL="http://127.0.0.1:9" python3 "$STORE" capture --manifest "$MANIFEST" 2>&1)
+FAILED_EXIT=$?
+set -e
+assert_equals "Capture fails" "$FAILED_EXIT" "1"
+assert_contains "Error reported" "$FAILED" "ERROR: Could not export"
+assert_equals "Manifest unchanged" "$(cmp -s "$MANIFEST" "$TEMP_DIR/manifest.before" && echo same)" "same"
+
+echo ""
+echo "Snapshot Capture Tests: $PASS passed, $FAIL failed"
+exit $FAIL
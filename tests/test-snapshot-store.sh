@@ -0,0 +1,159 @@
+#!/usr/bin/env bash
+# Test delta-chain snapshot storage (snapshot-store.py add/restore/verify/prune).
+#
+# Runs offline: stores six versions of the sample glossary with a short
+# chain length, and checks that bases and deltas alternate as configured,
+# that a delta version restores byte-for-byte, that verify --all catches a
+# corrupted delta and every version built on it, and that prune keeps the
+# base the remaining deltas depend on.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-snapshot-store-$$"
+mkdir -p "$TEMP_DIR/store"
+STORE="$PROJECT_DIR/scripts/snapshot-store.py"
+MANIFEST="$TEMP_DIR/store/manifest.json"
+GLOSSARY="$PROJECT_DIR/data/enterprise-glossary.ttl"
+
+cleanup() {
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# Prints "<version>:<storage>[:<parent>]" for every manifest entry
+chain_layout() {
+    python3 -c '
+import json, sys
+for e in json.load(open(sys.argv[1]))["snapshots"]:
+    print(":".join(filter(None, [e["version"], e["storage"], e.get("parent")])))
+' "$MANIFEST" | tr '\n' ' '
+}
+
+# Version N adds extra terms 1..N to the sample glossary; version 3 also
+# drops extra term 1, so its delta carries both deletions and additions.
+for v in 1 2 3 4 5 6; do
+    cp "$GLOSSARY" "$TEMP_DIR/v$v.ttl"
+    for k in $(seq 1 "$v"); do
+        [ "$v" -eq 3 ] && [ "$k" -eq 1 ] && continue
+        echo "eg:extra-$k a skos:Concept ; skos:prefLabel \"Extra $k\"@en ." >> "$TEMP_DIR/v$v.ttl"
+    done
+done
+
+# Test 1: Bases and deltas
+echo "Test: Delta chains"
+for v in 1 2 3 4 5 6; do
+    OUT=$(python3 "$STORE" add "$TEMP_DIR/v$v.ttl" --manifest "$MANIFEST" --version "1.0.$v" --base-every 3 2>&1)
+done
+assert_contains "Last version stored as a delta" "$OUT" "delta from v1.0.5: +2 -0 triples"
+assert_equals "A new base every three versions" "$(chain_layout)" \
+    "1.0.1:base 1.0.2:delta:1.0.1 1.0.3:delta:1.0.2 1.0.4:base 1.0.5:delta:1.0.4 1.0.6:delta:1.0.5 "
+DELTA=$(python3 -c '
+import json, sys
+e = json.load(open(sys.argv[1]))["snapshots"][2]
+print(e["added"], e["deleted"])
+' "$MANIFEST")
+assert_equals "Delta records both additions and deletions" "$DELTA" "2 2"
+set +e
+DUP=$(python3 "$STORE" add "$TEMP_DIR/v6.ttl" --manifest "$MANIFEST" --version 1.0.6 2>&1)
+STATUS=$?
+set -e
+assert_equals "Existing version refused" "$STATUS" "1"
+assert_contains "Refusal names the version" "$DUP" "version 1.0.6 already exists"
+
+# Test 2: Restore a delta version
+echo "Test: Restore"
+python3 "$STORE" restore 1.0.3 --manifest "$MANIFEST" -o "$TEMP_DIR/restored.nt" 2>/dev/null
+EXPECTED=$(python3 - "$STORE" "$TEMP_DIR/v3.ttl" <<'PY'
+import importlib.util, os, sys
+sys.path.insert(0, os.path.dirname(sys.argv[1]))
+spec = importlib.util.spec_from_file_location("snapshot_store", sys.argv[1])
+store = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(store)
+sys.stdout.write("".join(line + "\n" for line in store.canonical_lines(sys.argv[2])))
+PY
+)
+assert_equals "Delta version restores byte-for-byte" \
+    "$(sha256sum < "$TEMP_DIR/restored.nt")" "$(printf '%s\n' "$EXPECTED" | sha256sum)"
+assert_equals "Deleted term absent from the restored version" \
+    "$(grep -c 'extra-1>' "$TEMP_DIR/restored.nt" || true)" "0"
+set +e
+python3 "$STORE" restore 9.9.9 --manifest "$MANIFEST" -o "$TEMP_DIR/missing.nt" 2>/dev/null
+STATUS=$?
+set -e
+assert_equals "Unknown version exits 1" "$STATUS" "1"
+assert_equals "No partial output left behind" "$(ls "$TEMP_DIR" | grep -c 'missing.nt' || true)" "0"
+LATEST=$(python3 "$STORE" restore latest --manifest "$MANIFEST" | grep -c 'extra-' || true)
+assert_equals "Latest restores through two deltas" "$LATEST" "12"
+
+# Test 3: Verify
+echo "Test: Verify"
+VERIFY=$(python3 "$STORE" verify --manifest "$MANIFEST" --all 2>&1)
+assert_contains "Every version verifies" "$VERIFY" "Verified 6/6 version(s)"
+DELTA_FILE=$(python3 -c '
+import json, sys
+print(json.load(open(sys.argv[1]))["snapshots"][1]["file"])
+' "$MANIFEST")
+cp "$TEMP_DIR/store/$DELTA_FILE" "$TEMP_DIR/delta.bak"
+python3 - "$TEMP_DIR/store/$DELTA_FILE" <<'PY'
+import gzip, sys
+with gzip.open(sys.argv[1], "rt") as f:
+    lines = [l for l in f if "extra-2" not in l]
+with gzip.open(sys.argv[1], "wt") as f:
+    f.writelines(lines)
+PY
+set +e
+VERIFY=$(python3 "$STORE" verify --manifest "$MANIFEST" --all 2>&1)
+STATUS=$?
+set -e
+assert_equals "Corrupted delta fails verification" "$STATUS" "1"
+assert_contains "Versions built on it fail too" "$VERIFY" "FAIL: v1.0.3"
+assert_contains "Other chain unaffected" "$VERIFY" "Verified 4/6 version(s)"
+cp "$TEMP_DIR/delta.bak" "$TEMP_DIR/store/$DELTA_FILE"
+
+# Test 4: Prune keeps the chain's base
+echo "Test: Prune"
+PRUNE=$(python3 "$STORE" prune --manifest "$MANIFEST" --keep 2 2>&1)
+assert_contains "Older chain removed" "$PRUNE" "Pruned 3 version(s), keeping 2"
+assert_equals "Base of the kept deltas retained" "$(chain_layout)" \
+    "1.0.4:base 1.0.5:delta:1.0.4 1.0.6:delta:1.0.5 "
+assert_equals "Only the kept chain's files remain" "$(ls "$TEMP_DIR/store" | grep -c 'glossary-v' || true)" "3"
+VERIFY=$(python3 "$STORE" verify --manifest "$MANIFEST" --all 2>&1)
+assert_contains "Pruned store still verifies" "$VERIFY" "Verified 3/3 version(s)"
+
+echo ""
+echo "Snapshot Store Tests: $PASS passed, $FAIL failed"
+exit $FAIL
@@ -0,0 +1,183 @@
+#!/usr/bin/env bash
+# Test sorted-diff.py and audit-log.py --external.
+#
+# Runs offline: checks that the external sort matches rdflib's canonical
+# N-Triples with the buffer forced to spill (including an intermediate
+# merge pass), that the sorted merge-join audit reports the same changes
+# as the in-memory engine in the same JSON schema, for files and for
+# stored snapshot versions, and the triple-level diff grouped by subject.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-sorted-diff-$$"
+mkdir -p "$TEMP_DIR/scratch"
+DIFF="$PROJECT_DIR/scripts/sorted-diff.py"
+AUDIT="$PROJECT_DIR/scripts/audit-log.py"
+export SORTED_DIFF_TMP_DIR="$TEMP_DIR/scratch"
+
+cleanup() {
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# same_changes A B -- "True" if two audit documents hold the same records
+same_changes() {
+    python3 - "$1" "$2" <<'PY'
+import json, sys
+docs = [json.load(open(path)) for path in sys.argv[1:]]
+key = lambda c: (c["action"], c["uri"])
+print(docs[0]["summary"] == docs[1]["summary"] and set(docs[0]) == set(docs[1])
+      and sorted(docs[0]["changes"], key=key) == sorted(docs[1]["changes"], key=key))
+PY
+}
+
+echo "=== Sorted Diff Tests ==="
+echo ""
+
+# Old: the imported glossary. New (N-Triples): one concept removed, one
+# definition changed, one concept re-slugged, one added
+cp "$PROJECT_DIR/data/imported-glossary.ttl" "$TEMP_DIR/old.ttl"
+python3 - "$TEMP_DIR" <<'PY'
+import sys
+from rdflib import Graph, Literal, Namespace, RDF, URIRef
+SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
+g = Graph().parse(sys.argv[1] + "/old.ttl", format="turtle")
+concepts = sorted(g.subjects(RDF.type, SKOS.Concept))
+g.remove((concepts[5], None, None))
+g.remove((concepts[10], SKOS.definition, None))
+g.add((concepts[10], SKOS.definition, Literal("A changed definition.", lang="en")))
+renamed = URIRef(str(concepts[20]) + "-renamed")
+for p, o in list(g.predicate_objects(concepts[20])):
+    g.add((renamed, p, o))
+g.remove((concepts[20], None, None))
+added = URIRef("http://glossary.example.org/terms/brand-new-term")
+g.add((added, RDF.type, SKOS.Concept))
+g.add((added, SKOS.prefLabel, Literal("Brand New Term", lang="en")))
+for lang in ("en", "es", "fr"):
+    g.add((added, SKOS.altLabel, Literal("BNT", lang=lang)))
+g.serialize(sys.argv[1] + "/new.nt", format="nt", encoding="utf-8")
+PY
+
+# Test 1: External sort
+echo "Test: External sort matches canonical N-Triples"
+python3 -c "
+import sys
+from rdflib import Graph
+nt = Graph().parse(sys.argv[1], format='turtle').serialize(format='nt')
+print('\n'.join(sorted({line for line in nt.splitlines() if line.strip()})))" \
+    "$TEMP_DIR/old.ttl" > "$TEMP_DIR/expected.nt"
+SORT=$(python3 "$DIFF" sort "$TEMP_DIR/old.ttl" -o "$TEMP_DIR/sorted.nt" --buffer-mb 0.01 2>&1)
+assert_equals "Sorted output identical" "$(cmp -s "$TEMP_DIR/expected.nt" "$TEMP_DIR/sorted.nt" && echo same)" "same"
+assert_contains "Buffer spilled to runs" "$SORT" "sorted in [0-9]* run(s), 1 intermediate merge pass"
+python3 "$DIFF" sort "$TEMP_DIR/sorted.nt" -o "$TEMP_DIR/resorted.nt.gz" 2>/dev/null
+assert_equals "Gzipped N-Triples round trip" "$(gunzip -c "$TEMP_DIR/resorted.nt.gz" | cmp -s - "$TEMP_DIR/expected.nt" && echo same)" "same"
+assert_equals "Runs removed afterwards" "$(ls -A "$TEMP_DIR/scratch" | wc -l)" "0"
+
+# Test 2: Audit JSON matches the in-memory engine
+echo "Test: audit-log.py --external"
+python3 "$AUDIT" "$TEMP_DIR/old.ttl" "$TEMP_DIR/new.nt" -o "$TEMP_DIR/memory.json" 2>/dev/null
+EXTERNAL=$(python3 "$AUDIT" "$TEMP_DIR/old.ttl" "$TEMP_DIR/new.nt" --external --buffer-mb 0.02 \
+    -o "$TEMP_DIR/external.json" 2>&1)
+assert_contains "Every kind of change found" "$EXTERNAL" "Changes: 1 added, 1 removed, 1 renamed, 1 modified"
+assert_equals "Same records as the in-memory engine" "$(same_changes "$TEMP_DIR/memory.json" "$TEMP_DIR/external.json")" "True"
+assert_contains "Rename detected from content" "$(cat "$TEMP_DIR/external.json")" '"old_uri": "http://glossary.example.org/terms/.*",'
+assert_equals "A value stated in several languages listed once" "$(python3 -c "
+import json, sys
+for path in sys.argv[1:]:
+    print([c for c in json.load(open(path))['changes'] if c['action'] == 'added'][0]['details']['altLabel'])
+" "$TEMP_DIR/memory.json" "$TEMP_DIR/external.json" | tr '\n' ' ')" "['BNT'] ['BNT'] "
+JSONL=$(python3 "$AUDIT" "$TEMP_DIR/old.ttl" "$TEMP_DIR/new.nt" --external --jsonl 2>/dev/null)
+assert_contains "JSON Lines summary record" "$(echo "$JSONL" | tail -n 1)" '"action":"summary"'
+assert_equals "Records before the summary" "$(echo "$JSONL" | head -n -1 | wc -l)" "4"
+assert_equals "Scratch directory cleaned up" "$(ls -A "$TEMP_DIR/scratch" | wc -l)" "0"
+
+# Test 3: Stored versions stream without re-sorting
+echo "Test: --manifest --external"
+python3 -c "
+import sys
+from rdflib import Graph
+Graph().parse(sys.argv[1], format='nt').serialize(sys.argv[2], format='turtle')" \
+    "$TEMP_DIR/new.nt" "$TEMP_DIR/new.ttl"
+mkdir -p "$TEMP_DIR/store"
+python3 "$PROJECT_DIR/scripts/snapshot-store.py" add "$TEMP_DIR/old.ttl" --manifest "$TEMP_DIR/store/manifest.json" --version 1.0.0 > /dev/null
+python3 "$PROJECT_DIR/scripts/snapshot-store.py" add "$TEMP_DIR/new.ttl" --manifest "$TEMP_DIR/store/manifest.json" --version 1.0.1 > /dev/null
+python3 "$AUDIT" --manifest "$TEMP_DIR/store/manifest.json" --external -o "$TEMP_DIR/stored.json" 2>/dev/null
+assert_equals "Same records from the delta chain" "$(same_changes "$TEMP_DIR/memory.json" "$TEMP_DIR/stored.json")" "True"
+assert_equals "No hash sidecars needed" "$(ls "$TEMP_DIR/store" | grep -c hashes || true)" "0"
+
+# Test 4: Triple-level diff grouped by subject
+echo "Test: Triple diff"
+TRIPLES=$(python3 "$DIFF" diff "$TEMP_DIR/old.ttl" "$TEMP_DIR/new.nt" -o "$TEMP_DIR/changes.rdfp" --buffer-mb 0.02 2>&1)
+assert_contains "Summary reported" "$TRIPLES" "subjects changed: [0-9]* triples removed, [0-9]* added"
+assert_contains "Changed definition removed and added" "$(cat "$TEMP_DIR/changes.rdfp")" '^A .*core#definition> "A changed definition."@en \.$'
+GROUPED=$(python3 - "$TEMP_DIR/changes.rdfp" <<'PY'
+import itertools, sys
+subjects = [line[2:].split(" ", 1)[0] for line in open(sys.argv[1])]
+runs = [key for key, _ in itertools.groupby(subjects)]
+print(len(runs) == len(set(runs)))
+PY
+)
+assert_equals "Each subject's changes are contiguous" "$GROUPED" "True"
+APPLIED=$(python3 - "$PROJECT_DIR/scripts/snapshot-store.py" "$TEMP_DIR" <<'PY'
+import importlib.util, os, sys
+sys.path.insert(0, os.path.dirname(sys.argv[1]))
+spec = importlib.util.spec_from_file_location("snapshot_store", sys.argv[1])
+store = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(store)
+patch = [line.rstrip("\n") for line in open(sys.argv[2] + "/changes.rdfp")]
+deletes = iter(sorted(line[2:] for line in patch if line.startswith("D ")))
+adds = iter(sorted(line[2:] for line in patch if line.startswith("A ")))
+old = [line.rstrip("\n") for line in open(sys.argv[2] + "/expected.nt")]
+new = list(store.apply_patch(iter(old), deletes, adds))
+print(new == store.canonical_lines(sys.argv[2] + "/new.ttl"))
+PY
+)
+assert_equals "Patch turns old into new" "$APPLIED" "True"
+
+# Test 5: Errors
+echo "Test: Errors"
+echo "<http://example.org/a> <http://example.org/b> ." > "$TEMP_DIR/broken.nt"
+set +e
+BROKEN=$(python3 "$DIFF" diff "$TEMP_DIR/old.ttl" "$TEMP_DIR/broken.nt" 2>&1)
+BROKEN_EXIT=$?
+set -e
+assert_equals "Syntax error exits 1" "$BROKEN_EXIT" "1"
+assert_contains "Offending file named" "$BROKEN" "ERROR: Syntax error in .*broken.nt"
+
+echo ""
+echo "Sorted Diff Tests: $PASS passed, $FAIL failed"
+exit $FAIL
@@ -0,0 +1,168 @@
+#!/usr/bin/env bash
+# Test sparql-canon.py against a local Fuseki stand-in emulating Varnish.
+#
+# Runs offline: checks that equivalent queries share one canonical form
+# without changing result variable names, that variants hit the same
+# cache entry through the proxy, that the proxy forwards chunked request
+# bodies, and the benchmark's hit-ratio report.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-sparql-canon-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+CANON="$PROJECT_DIR/scripts/sparql-canon.py"
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# start_proxy UPSTREAM -- sets PROXY_URL to a canonicalizing proxy in front of UPSTREAM
+start_proxy() {
+    local port
+    port=$(python3 -c "import socket; s = socket.socket(); s.bind(('127.0.0.1', 0)); print(s.getsockname()[1])")
+    python3 "$CANON" serve --port "$port" --upstream "$1" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    PROXY_URL="http://127.0.0.1:$port"
+    for _ in $(seq 1 100); do
+        if curl -sf "$PROXY_URL/\$/ping" > /dev/null 2>&1; then
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: proxy did not start" >&2
+    exit 1
+}
+
+SKOS="http://www.w3.org/2004/02/skos/core#"
+QUERY_A="PREFIX skos: <$SKOS>
+# concepts with English labels
+SELECT ?concept ?label WHERE {
+  ?concept a skos:Concept ; skos:prefLabel ?label .
+  FILTER(lang(?label) = 'en')
+} ORDER BY ?label LIMIT 5"
+QUERY_B="prefix s: <$SKOS> select ?concept ?label { ?concept a s:Concept; s:prefLabel \$l2 .
+filter(LANG(\$l2)=\"en\") bind(\$l2 as ?label) } order by ?label limit 5"
+QUERY_C="PREFIX skos: <$SKOS> SELECT ?concept ?label WHERE { ?concept a skos:Concept ; skos:prefLabel ?label . FILTER(LANG(?label) = \"en\") } ORDER BY ?label LIMIT 5"
+
+echo "=== SPARQL Canonicalizer Tests ==="
+echo ""
+
+# Test 1: Formatting, prefixes, case and hidden variable names do not matter
+echo "Test: Equivalent queries share one canonical form"
+CANON_A=$(python3 "$CANON" canonicalize "$QUERY_A")
+CANON_C=$(python3 "$CANON" canonicalize "$QUERY_C")
+assert_equals "Whitespace, comments, prefix and quote style" "$CANON_A" "$CANON_C"
+assert_equals "Hidden variables renamed" \
+    "$(python3 "$CANON" canonicalize 'ASK { ?x a ?type }')" \
+    "$(python3 "$CANON" canonicalize 'ask WHERE { $thing a ?t }')"
+assert_contains "Result variables keep their names" "$CANON_A" "SELECT ?concept ?label {"
+assert_equals "Unparseable query passed through" \
+    "$(python3 "$CANON" canonicalize 'SELECT ?x WHERE { ?x ex:p ?y }')" 'SELECT ?x WHERE { ?x ex:p ?y }'
+
+# Test 2: Variants hit one cache entry through the proxy
+echo "Test: Proxy canonicalizes queries before the cache"
+start_stand_in cache --cache "$PROJECT_DIR"/data/*.ttl
+start_proxy "$STAND_IN_URL"
+FIRST=$(curl -s -D "$TEMP_DIR/first.headers" -G "$PROXY_URL/skosmos/sparql" \
+    --data-urlencode "query=$QUERY_A" -H "Accept: application/sparql-results+json")
+SECOND=$(curl -s -D "$TEMP_DIR/second.headers" -G "$PROXY_URL/skosmos/sparql" \
+    --data-urlencode "query=$QUERY_C" -H "Accept: application/sparql-results+json")
+assert_contains "First variant is a miss" "$(cat "$TEMP_DIR/first.headers")" "X-Cache: MISS"
+assert_contains "Second variant is a hit" "$(cat "$TEMP_DIR/second.headers")" "X-Cache: HIT"
+assert_equals "Same results" "$FIRST" "$SECOND"
+assert_contains "Result variables unchanged" "$FIRST" '"vars": *\["concept", *"label"\]'
+POST_COUNT=$(curl -s "$PROXY_URL/skosmos/sparql" --data-urlencode "query=$QUERY_B" \
+    | python3 -c "import json, sys; print(len(json.load(sys.stdin)['results']['bindings']))")
+assert_equals "POST forwarded unchanged" "$POST_COUNT" "5"
+CHUNKED_COUNT=$(curl -s -m 10 "$PROXY_URL/skosmos/sparql" -H "Transfer-Encoding: chunked" \
+    --data-urlencode "query=$QUERY_B" \
+    | python3 -c "import json, sys; print(len(json.load(sys.stdin)['results']['bindings']))" 2>&1 || true)
+assert_equals "Chunked POST body decoded and forwarded" "$CHUNKED_COUNT" "5"
+
+# Test 3: Benchmark on a captured query mix
+echo "Test: Benchmark reports the hit-ratio gain"
+# Three queries, each logged in four spellings, each spelling twice
+python3 - "$TEMP_DIR/access.log" <<'PY'
+import sys
+from urllib.parse import quote
+
+skos = "http://www.w3.org/2004/02/skos/core#"
+templates = [
+    "SELECT ?c WHERE {{ ?c {p} ?l }} LIMIT {n}",
+    "select ?c {{ ?c {p} ?x }} limit {n}",
+    "PREFIX s: <" + skos + ">\nSELECT ?c WHERE {{\n  ?c {q} $lbl\n}} LIMIT {n}",
+    "# lookup\nSELECT  ?c  WHERE  {{ ?c {p} ?label . }}  LIMIT {n}",
+]
+fmt = '10.0.0.1 - - [19/Oct/2026:10:00:00 +0000] "GET /skosmos/sparql?query={q} HTTP/1.1" 200 99 "-" "EasyRdf"\n'
+with open(sys.argv[1], "w") as f:
+    for n in (1, 2, 3):
+        for t in templates:
+            query = t.format(p=f"<{skos}prefLabel>", q="s:prefLabel", n=n)
+            f.write(fmt.format(q=quote(query)) * 2)
+PY
+BENCH_OUTPUT=$(python3 "$CANON" bench "$TEMP_DIR/access.log")
+assert_contains "Raw hit ratio" "$BENCH_OUTPUT" "Raw URLs:   12 distinct, hit ratio 50.0%"
+assert_contains "Canonical hit ratio" "$BENCH_OUTPUT" "Canonical:  3 distinct, hit ratio 87.5% (+37.5 points)"
+assert_contains "Per-request overhead reported" "$BENCH_OUTPUT" "Overhead:   mean [0-9]*us"
+
+echo ""
+echo "SPARQL Canonicalizer Tests: $PASS passed, $FAIL failed"
+exit $FAIL
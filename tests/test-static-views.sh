@@ -0,0 +1,170 @@
+#!/usr/bin/env bash
+# Test build-static-views.py on the sample data and a local Fuseki stand-in.
+#
+# Runs offline: checks the concept, hierarchy and index documents and
+# their gzip copies, that rebuilding rewrites only the documents whose
+# content changed, removal of views for deleted concepts, and the build
+# load-data.sh runs after loading.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-static-views-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+BUILD="$PROJECT_DIR/scripts/build-static-views.py"
+VIEWS="$TEMP_DIR/views"
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# py EXPRESSION -- evaluate a Python expression with json, gzip and VIEWS available
+py() {
+    VIEWS="$VIEWS" python3 -c "
+import gzip, json, os
+VIEWS = os.environ['VIEWS']
+def load(rel):
+    with open(os.path.join(VIEWS, rel), encoding='utf-8') as f:
+        return json.load(f)
+print($1)"
+}
+
+echo "=== Static Views Tests ==="
+echo ""
+
+cp "$PROJECT_DIR"/data/*.ttl "$TEMP_DIR/"
+DATA=("$TEMP_DIR"/concept-scheme.ttl "$TEMP_DIR"/enterprise-glossary.ttl "$TEMP_DIR"/imported-glossary.ttl)
+
+# Test 1: Documents for concepts, hierarchy levels and languages
+echo "Test: Full build from Turtle files"
+FIRST=$(python3 "$BUILD" "${DATA[@]}" -o "$VIEWS")
+CONCEPTS=$(python3 -c "
+import sys
+from rdflib import Graph
+from rdflib.namespace import RDF, SKOS
+g = Graph()
+for path in sys.argv[1:]:
+    g.parse(path, format='turtle')
+print(len(set(g.subjects(RDF.type, SKOS.Concept))))" "${DATA[@]}")
+assert_equals "One document per concept" "$(ls "$VIEWS"/concept/*.jsonld | wc -l | tr -d ' ')" "$CONCEPTS"
+assert_equals "Concept labels by language" \
+    "$(py "load('concept/deployment-pipeline.jsonld')['prefLabel']['es']")" "Pipeline de Despliegue"
+assert_equals "Narrower inferred from broader" \
+    "$(py "[n['slug'] for n in load('concept/engineering.jsonld')['narrower']][:1] != []")" "True"
+assert_equals "Valid JSON-LD" "$(python3 -c "
+from rdflib import Graph, URIRef
+from rdflib.namespace import SKOS
+g = Graph()
+g.parse('$VIEWS/concept/ci-cd.jsonld', format='json-ld')
+print(len(list(g.objects(URIRef('http://glossary.example.org/terms/ci-cd'), SKOS.prefLabel))))")" "3"
+assert_contains "Top level lists the scheme's top concepts" \
+    "$(py "[c['slug'] for c in load('hierarchy/top.json')['schemes'][0]['topConcepts']]")" "'engineering'"
+assert_equals "Hierarchy level per parent" \
+    "$(py "all(c['slug'] for c in load('hierarchy/engineering.json')['narrower'])")" "True"
+assert_equals "Index per language" "$(ls "$VIEWS"/index/*.json | xargs -n1 basename | tr '\n' ' ')" "en.json es.json fr.json "
+assert_equals "Index is alphabetical" "$(py "
+[e['label'] for entries in load('index/en.json')['letters'].values() for e in entries][:3]
+")" "['3-Pack', '301 Redirect', '360 Tours']"
+assert_equals "Gzip copies match" "$(py "
+all(gzip.open(os.path.join(VIEWS, rel) + '.gz').read() == open(os.path.join(VIEWS, rel), 'rb').read()
+    for rel in load('manifest.json')['documents'])")" "True"
+
+# Test 2: Rebuilds rewrite only changed documents
+echo "Test: Incremental rebuild"
+assert_contains "Unchanged data writes nothing" \
+    "$(python3 "$BUILD" "${DATA[@]}" -o "$VIEWS")" "0 written, [0-9]* unchanged, 0 removed"
+touch -d "2020-01-01" "$VIEWS/concept/ci-cd.jsonld" "$VIEWS/concept/business.jsonld"
+sed -i 's/"Deployment Pipeline"@en/"Delivery Pipeline"@en/' "$TEMP_DIR/enterprise-glossary.ttl"
+REBUILD=$(python3 "$BUILD" "${DATA[@]}" -o "$VIEWS")
+# The concept, its five broader/narrower/related neighbours, the two levels it appears on, the en index
+assert_contains "Only affected documents rewritten" "$REBUILD" " 9 written"
+assert_equals "Neighbour shows the new label" \
+    "$(py "[r['prefLabel']['en'] for r in load('concept/ci-cd.jsonld')['related'] if r['slug'] == 'deployment-pipeline'][0]")" \
+    "Delivery Pipeline"
+assert_equals "Unrelated document untouched" "$(date -r "$VIEWS/concept/business.jsonld" +%Y)" "2020"
+
+# Test 3: Deleted concepts lose their views
+echo "Test: Removed concepts"
+python3 - "$TEMP_DIR/enterprise-glossary.ttl" <<'PY'
+import re, sys
+path = sys.argv[1]
+text = open(path).read()
+text = re.sub(r"\neg:canary-release a skos:Concept ;.*?\.\n", "\n", text, flags=re.S)
+open(path, "w").write(text)
+PY
+REMOVED=$(python3 "$BUILD" "${DATA[@]}" -o "$VIEWS")
+# The concept and the level of its parent, which has no other children
+assert_contains "Removal reported" "$REMOVED" " 2 removed"
+assert_equals "Document and gzip copy deleted" \
+    "$(ls "$VIEWS"/concept/canary-release.* 2>/dev/null | wc -l | tr -d ' ')" "0"
+
+# Test 4: load-data.sh rebuilds the views from Fuseki after loading
+echo "Test: Build after load-data.sh"
+start_stand_in fuseki
+LOAD_OUTPUT=$(FUSEKI_URL="$STAND_IN_URL" VARNISH_URL="" VARNISH_RELOAD="" \
+    DATASET_VERSION_FILE="$TEMP_DIR/dataset-version" STATIC_VIEWS_DIR="$TEMP_DIR/loaded-views" \
+    bash "$PROJECT_DIR/scripts/load-data.sh" "$PROJECT_DIR"/data/*.ttl 2>&1)
+assert_contains "Views built from the loaded graph" "$LOAD_OUTPUT" "Static views for <http://glossary.example.org/>"
+assert_equals "Same documents as a file build" \
+    "$(ls "$TEMP_DIR/loaded-views/concept" | grep -c 'jsonld$')" "$CONCEPTS"
+
+echo ""
+echo "Static Views Tests: $PASS passed, $FAIL failed"
+exit $FAIL
@@ -0,0 +1,131 @@
+#!/usr/bin/env bash
+# Test suggest-related.py.
+#
+# Runs offline: suggests related terms for the imported glossary and
+# checks that the candidates are ranked, exclude the term itself and its
+# broader concept, do not depend on the block size, and that applying a
+# reviewed file fills related_slugs for csv-to-skos.py.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-suggest-related-$$"
+mkdir -p "$TEMP_DIR"
+SUGGEST="$PROJECT_DIR/scripts/suggest-related.py"
+TERMS="$PROJECT_DIR/data/imported-terms.csv"
+
+cleanup() {
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+assert_equals() {
+    local test_name="$1"
+    local actual="$2"
+    local expected="$3"
+
+    if [ "$actual" = "$expected" ]; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected', got '$actual')"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# Hand-checkable terms: two lease charges, a broader/narrower pair and an outlier
+cat > "$TEMP_DIR/small.csv" <<'CSV'
+uri_slug,pref_label,alt_labels,hidden_labels,definition,broader_slug,related_slugs,scope_note,example
+base-rent,Base Rent,,,The fixed rent a tenant pays for leased office space each month.,lease,,,
+additional-rent,Additional Rent,,,Charges a tenant pays on top of base rent for leased office space.,lease,,,
+lease,Lease,,,A contract for renting office space to a tenant.,,,,
+net-lease,Net Lease,,,A lease where the tenant pays rent plus property charges.,lease,,,
+backlink,Backlink,Inbound Link,,A link from another website to a page.,,,,
+CSV
+
+echo "=== Related Term Suggestion Tests ==="
+echo ""
+
+# Test 1: Candidates on hand-checkable terms
+echo "Test: Small vocabulary"
+SMALL=$(python3 "$SUGGEST" suggest "$TEMP_DIR/small.csv" --min-score 0.05 2>&1 > "$TEMP_DIR/small-review.csv")
+assert_contains "Summary reported" "$SMALL" "candidates for 5 terms"
+assert_equals "Review header" "$(head -n 1 "$TEMP_DIR/small-review.csv" | tr -d '\r')" "uri_slug,pref_label,related_slug,related_label,score,rank"
+assert_contains "Rent terms suggested for each other" "$(cat "$TEMP_DIR/small-review.csv")" "^base-rent,Base Rent,additional-rent,Additional Rent,0\.[0-9]*,1"
+assert_equals "Broader concept not suggested" "$(grep -c '^[a-z-]*,[^,]*,lease,' "$TEMP_DIR/small-review.csv" || true)" "0"
+assert_equals "Unrelated term has no candidates" "$(grep -c 'backlink' "$TEMP_DIR/small-review.csv" || true)" "0"
+
+# Test 2: The imported glossary
+echo "Test: Imported glossary"
+python3 "$SUGGEST" suggest "$TERMS" -o "$TEMP_DIR/review.csv" 2>/dev/null
+python3 "$SUGGEST" suggest "$TERMS" --block-size 7 -o "$TEMP_DIR/review-blocked.csv" 2>/dev/null
+assert_equals "Block size does not change results" \
+    "$(cmp -s "$TEMP_DIR/review.csv" "$TEMP_DIR/review-blocked.csv" && echo same)" "same"
+CHECKS=$(python3 - "$TEMP_DIR/review.csv" <<'PY'
+import csv, sys
+from collections import defaultdict
+rows = list(csv.DictReader(open(sys.argv[1])))
+by_term = defaultdict(list)
+for r in rows:
+    by_term[r["uri_slug"]].append(r)
+print(len(rows) > 0,
+      all(r["uri_slug"] != r["related_slug"] for r in rows),
+      all(len(c) <= 5 for c in by_term.values()),
+      all(float(r["score"]) >= 0.2 for r in rows),
+      all([float(r["score"]) for r in c] == sorted((float(r["score"]) for r in c), reverse=True)
+          and [int(r["rank"]) for r in c] == list(range(1, len(c) + 1)) for c in by_term.values()))
+PY
+)
+assert_equals "Non-empty, no self links, top 5, above 0.2, ranked" "$CHECKS" "True True True True True"
+
+# Test 3: Applying a reviewed file
+echo "Test: Apply reviewed candidates"
+APPLY=$(python3 "$SUGGEST" apply "$TERMS" "$TEMP_DIR/review.csv" -o "$TEMP_DIR/terms.csv" --min-score 0.3 2>&1)
+assert_contains "Links added" "$APPLY" "Added [1-9][0-9]* related links"
+assert_equals "Only candidates above --min-score applied" "$(python3 - "$TEMP_DIR/review.csv" "$TEMP_DIR/terms.csv" <<'PY'
+import csv, sys
+review = list(csv.DictReader(open(sys.argv[1])))
+terms = {r["uri_slug"]: r["related_slugs"].split("|") for r in csv.DictReader(open(sys.argv[2]))}
+expected = {(r["uri_slug"], r["related_slug"]) for r in review if float(r["score"]) >= 0.3}
+actual = {(s, rel) for s, rels in terms.items() for rel in rels if rel}
+print(expected == actual)
+PY
+)" "True"
+python3 "$PROJECT_DIR/scripts/csv-to-skos.py" "$TEMP_DIR/terms.csv" -o "$TEMP_DIR/terms.ttl" 2>/dev/null
+assert_contains "skos:related in the Turtle" "$(grep -m 1 "skos:related" "$TEMP_DIR/terms.ttl")" "skos:related eg:"
+AGAIN=$(python3 "$SUGGEST" apply "$TEMP_DIR/terms.csv" "$TEMP_DIR/review.csv" -o "$TEMP_DIR/terms.csv" --min-score 0.3 2>&1)
+assert_contains "Re-applying adds nothing" "$AGAIN" "Added 0 related links"
+
+# Test 4: Benchmark and errors
+echo "Test: Benchmark and errors"
+BENCH=$(python3 "$SUGGEST" bench --terms 2000 --vocabulary 3000 2>&1)
+assert_contains "Synthetic run timed" "$BENCH" "candidates for 2000 terms .* top-k [0-9.]*s"
+set +e
+MISSING=$(python3 "$SUGGEST" suggest "$TEMP_DIR/missing.csv" 2>&1)
+MISSING_EXIT=$?
+set -e
+assert_equals "Missing input exits 1" "$MISSING_EXIT" "1"
+assert_contains "Missing input named" "$MISSING" "ERROR: File not found: .*missing.csv"
+
+echo ""
+echo "Related Term Suggestion Tests: $PASS passed, $FAIL failed"
+exit $FAIL
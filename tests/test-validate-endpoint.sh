@@ -0,0 +1,101 @@
+#!/usr/bin/env bash
+# Test validate-skos.py --endpoint against a local Fuseki stand-in.
+#
+# Runs offline: starts tests/fuseki-stand-in.py preloaded with data/*.ttl
+# and checks that server-side validation agrees with file validation.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-validate-endpoint-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME FILES... -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+echo "=== Endpoint Validation Tests ==="
+echo ""
+
+# Test 1: Endpoint mode matches file mode on the shipped data
+echo "Test: Endpoint results match file validation"
+start_stand_in data "$PROJECT_DIR"/data/*.ttl
+BASE_URL="$STAND_IN_URL"
+FILE_RESULT=$(python3 "$PROJECT_DIR/scripts/validate-skos.py" "$PROJECT_DIR"/data/*.ttl | grep "^Results:")
+ENDPOINT_OUTPUT=$(python3 "$PROJECT_DIR/scripts/validate-skos.py" \
+    --endpoint "$BASE_URL/skosmos/sparql" --sample 5 || true)
+assert_contains "Same error/warning counts" "$ENDPOINT_OUTPUT" "$FILE_RESULT"
+assert_contains "Validation passes" "$ENDPOINT_OUTPUT" "VALIDATION PASSED"
+
+# Test 2: Only samples cross the wire
+echo "Test: Sample size bounds the reported offenders"
+SHOWN=$(echo "$ENDPOINT_OUTPUT" | grep -c "Non-reciprocal:" || true)
+if [ "$SHOWN" -eq 5 ]; then
+    echo "  PASS: 5 non-reciprocal samples shown"
+    PASS=$((PASS + 1))
+else
+    echo "  FAIL: expected 5 non-reciprocal samples, got $SHOWN"
+    FAIL=$((FAIL + 1))
+fi
+assert_contains "Remaining offenders summarized" "$ENDPOINT_OUTPUT" "more 'reciprocal' violation"
+
+# Test 3: Errors are detected server-side
+echo "Test: Missing prefLabel and scheme reported as errors"
+cat > "$TEMP_DIR/broken.ttl" <<'EOF'
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+<http://glossary.example.org/terms/unlabelled> a skos:Concept .
+EOF
+start_stand_in broken "$TEMP_DIR/broken.ttl"
+BROKEN_URL="$STAND_IN_URL"
+BROKEN_OUTPUT=$(python3 "$PROJECT_DIR/scripts/validate-skos.py" \
+    --endpoint "$BROKEN_URL/skosmos/sparql" || true)
+assert_contains "Missing prefLabel error" "$BROKEN_OUTPUT" "Missing skos:prefLabel on <http://glossary.example.org/terms/unlabelled>"
+assert_contains "Missing scheme error" "$BROKEN_OUTPUT" "No skos:ConceptScheme found"
+assert_contains "Validation fails" "$BROKEN_OUTPUT" "VALIDATION FAILED"
+
+echo ""
+echo "Endpoint Validation Tests: $PASS passed, $FAIL failed"
+exit $FAIL
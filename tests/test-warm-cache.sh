@@ -0,0 +1,148 @@
+#!/usr/bin/env bash
+# Test warm-cache.py against a local Fuseki stand-in emulating Varnish.
+#
+# Runs offline: builds a synthetic access log, then checks query ranking,
+# replay through the cache and the reported X-Cache hit ratio.
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+PASS=0
+FAIL=0
+
+TEMP_DIR="/tmp/egms-warm-cache-$$"
+mkdir -p "$TEMP_DIR"
+STAND_IN_PIDS=""
+WARM="$PROJECT_DIR/scripts/warm-cache.py"
+# Keep stamped dataset versions out of config/state; no Varnish to reload
+export DATASET_VERSION_FILE="$TEMP_DIR/dataset-version"
+export VARNISH_RELOAD=""
+export STATIC_VIEWS_DIR=""
+
+cleanup() {
+    for pid in $STAND_IN_PIDS; do
+        kill "$pid" 2>/dev/null || true
+    done
+    rm -rf "$TEMP_DIR"
+}
+trap cleanup EXIT
+
+assert_contains() {
+    local test_name="$1"
+    local response="$2"
+    local expected="$3"
+
+    if echo "$response" | grep -qi -- "$expected"; then
+        echo "  PASS: $test_name"
+        PASS=$((PASS + 1))
+    else
+        echo "  FAIL: $test_name (expected '$expected' in response)"
+        FAIL=$((FAIL + 1))
+    fi
+}
+
+# start_stand_in NAME [ARGS...] -- sets STAND_IN_URL to the stand-in base URL
+start_stand_in() {
+    local name="$1"
+    shift
+    local port_file="$TEMP_DIR/$name.port"
+
+    python3 "$SCRIPT_DIR/fuseki-stand-in.py" --port-file "$port_file" "$@" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    for _ in $(seq 1 100); do
+        if [ -f "$port_file" ]; then
+            STAND_IN_URL="http://127.0.0.1:$(cat "$port_file")"
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: stand-in '$name' did not start" >&2
+    exit 1
+}
+
+# start_proxy UPSTREAM -- sets PROXY_URL to a sparql-canon proxy in front of UPSTREAM
+start_proxy() {
+    local port
+    port=$(python3 -c "import socket; s = socket.socket(); s.bind(('127.0.0.1', 0)); print(s.getsockname()[1])")
+    python3 "$PROJECT_DIR/scripts/sparql-canon.py" serve --port "$port" --upstream "$1" > /dev/null 2>&1 &
+    STAND_IN_PIDS="$STAND_IN_PIDS $!"
+    PROXY_URL="http://127.0.0.1:$port"
+    for _ in $(seq 1 100); do
+        if curl -sf "$PROXY_URL/\$/ping" > /dev/null 2>&1; then
+            return 0
+        fi
+        sleep 0.1
+    done
+    echo "ERROR: proxy did not start" >&2
+    exit 1
+}
+
+# Synthetic combined-format log: four queries with frequencies 10, 6, 3, 1,
+# one of them logged via the gateway's /sparql path, plus lines to ignore
+python3 - "$TEMP_DIR/access.log" <<'PY'
+import sys
+from urllib.parse import quote
+
+queries = [
+    ("/skosmos/sparql", "SELECT ?s WHERE { ?s a <http://www.w3.org/2004/02/skos/core#Concept> } LIMIT 10", 10),
+    ("/sparql", "SELECT ?l WHERE { <http://glossary.example.org/terms/api> <http://www.w3.org/2004/02/skos/core#prefLabel> ?l }", 6),
+    ("/skosmos/sparql", "ASK { ?s ?p ?o }", 3),
+    ("/skosmos/query", "SELECT (COUNT(*) AS ?n) WHERE { ?s ?p ?o }", 1),
+]
+fmt = '172.18.0.5 - - [19/Oct/2026:10:00:00 +0000] "{method} {path} HTTP/1.1" {status} 512 "-" "EasyRdf"\n'
+with open(sys.argv[1], "w") as f:
+    for path, query, n in queries:
+        for _ in range(n):
+            f.write(fmt.format(method="GET", path=f"{path}?query={quote(query)}", status=200))
+    f.write(fmt.format(method="POST", path="/skosmos/sparql", status=200))
+    f.write(fmt.format(method="GET", path="/skosmos/sparql?query=broken", status=400))
+    f.write(fmt.format(method="GET", path="/enterprise-glossary/en/", status=200))
+PY
+
+echo "=== Cache Warmer Tests ==="
+echo ""
+
+# Test 1: Queries are ranked by frequency from the log
+echo "Test: Top queries extracted from the access log"
+LIST_OUTPUT=$(python3 "$WARM" "$TEMP_DIR/access.log" --list --top 2)
+assert_contains "Distinct cacheable queries counted" "$LIST_OUTPUT" "Found 4 distinct queries in 20 cacheable requests"
+assert_contains "Coverage of top 2 reported" "$LIST_OUTPUT" "top 2 cover 80% of traffic"
+FIRST=$(echo "$LIST_OUTPUT" | sed -n 2p)
+assert_contains "Most frequent query first" "$FIRST" "^ *10  /skosmos/sparql?query=SELECT"
+assert_contains "Gateway path mapped to Varnish path" "$LIST_OUTPUT" " 6  /skosmos/sparql?query="
+
+# Test 2: Replay fills the cache
+echo "Test: Replay warms the cache"
+start_stand_in cache --cache "$PROJECT_DIR"/data/*.ttl
+CACHE_URL="$STAND_IN_URL"
+WARM_OUTPUT=$(python3 "$WARM" "$TEMP_DIR/access.log" --cache-url "$CACHE_URL" 2>&1 || true)
+assert_contains "All queries fetched" "$WARM_OUTPUT" "Warm-up:   4 queries in .* (4 fetched, 0 already cached, 0 failed)"
+assert_contains "Full post-warm hit ratio" "$WARM_OUTPUT" "Post-warm: 4/4 X-Cache hits (100% hit ratio)"
+# Clients reach the cache through the canonicalizing proxy
+start_proxy "$CACHE_URL"
+REAL_HIT=$(curl -s -o /dev/null -D - "$PROXY_URL/skosmos/sparql?query=ask%20%7B%3Fx%20%3Fy%20%3Fz%7D" \
+    -H "Accept: application/sparql-results+json" | tr -d '\r')
+assert_contains "Client request served from cache" "$REAL_HIT" "X-Cache: HIT"
+
+# Test 3: A second run finds everything cached; a ban empties the cache
+echo "Test: Warm state detected, ban resets it"
+AGAIN_OUTPUT=$(python3 "$WARM" "$TEMP_DIR/access.log" --cache-url "$CACHE_URL" 2>&1 || true)
+assert_contains "Already cached" "$AGAIN_OUTPUT" "(0 fetched, 4 already cached"
+curl -s -X BAN "$CACHE_URL/skosmos/sparql" > /dev/null
+gzip -c "$TEMP_DIR/access.log" > "$TEMP_DIR/access.log.1.gz"
+BANNED_OUTPUT=$(python3 "$WARM" "$TEMP_DIR/access.log.1.gz" --cache-url "$CACHE_URL" 2>&1 || true)
+assert_contains "Gzipped log replayed after ban" "$BANNED_OUTPUT" "(4 fetched, 0 already cached"
+
+# Test 4: load-data.sh warms the cache after loading
+echo "Test: load-data.sh warms the cache after a load"
+start_stand_in load_cache --cache
+LOAD_OUTPUT=$(FUSEKI_URL="$STAND_IN_URL" VARNISH_URL="$STAND_IN_URL" \
+    WARM_ACCESS_LOG="$TEMP_DIR/access.log" bash "$PROJECT_DIR/scripts/load-data.sh" 2>&1 || true)
+assert_contains "Load succeeded" "$LOAD_OUTPUT" "All files loaded successfully"
+assert_contains "Cache warmed" "$LOAD_OUTPUT" "Post-warm: 4/4 X-Cache hits"
+
+echo ""
+echo "Cache Warmer Tests: $PASS passed, $FAIL failed"
+exit $FAIL